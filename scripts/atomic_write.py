@@ -0,0 +1,27 @@
+"""Replace a file in one step, so other processes never read it half written.
+
+The state, snapshot and cache files of these scripts are read by concurrent runs (batch
+builds, trend queries, the next scheduled sync). ``atomic_write`` hands out a temporary
+file next to the target and moves it over the target only once it was written completely.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+
+@contextmanager
+def atomic_write(path: Path) -> Iterator[BinaryIO]:
+    """Open a binary file that replaces ``path`` when the block completes; on an error ``path`` is left as it was."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The process id keeps concurrent writers of the same target off each other's temporary file.
+    partial_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with partial_path.open("wb") as handle:
+            yield handle
+        os.replace(partial_path, path)
+    finally:
+        partial_path.unlink(missing_ok=True)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""Build the data quality dashboards of many tenants in parallel.
+
+Takes a directory of raw exports (``<TENANT>-raw*.xlsx``) or a CSV manifest with
+``tenant,input,output`` columns and builds one dashboard per export in a process pool.
+Every tenant reports its build time and peak memory; a failing export is recorded in the
+report and the remaining tenants still build. When a worker process dies (out of memory,
+a crash in a native library), the pool is restarted and the tenants that were building
+are retried one at a time, so only the tenant that kills its worker fails.
+
+Usage:
+  python3 scripts/batch_build_data_quality_dashboards.py --input-dir exports/ --output-dir dashboards/
+  python3 scripts/batch_build_data_quality_dashboards.py --manifest tenants.csv --mode hybrid --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if __package__:
+    from .build_data_quality_excel_dashboard import (
+        BUILD_MODES,
+        DEFAULT_SOURCE_CACHE_DIR,
+        LIST_BACKENDS,
+        SHEET_WRITERS,
+        build_dashboard,
+    )
+    from .data_quality_snapshots import SnapshotRecorder, SnapshotStore, tenant_from_path
+else:
+    from build_data_quality_excel_dashboard import (
+        BUILD_MODES,
+        DEFAULT_SOURCE_CACHE_DIR,
+        LIST_BACKENDS,
+        SHEET_WRITERS,
+        build_dashboard,
+    )
+    from data_quality_snapshots import SnapshotRecorder, SnapshotStore, tenant_from_path
+
+DEFAULT_INPUT_PATTERN = "*-raw*.xlsx"
+DASHBOARD_SUFFIX = "-DataQuality-Dashboard.xlsx"
+REPORT_NAME = "batch-report.json"
+
+
+@dataclass(frozen=True)
+class TenantJob:
+    tenant: str
+    input_path: Path
+    output_path: Path
+
+
+@dataclass
+class TenantResult:
+    tenant: str
+    input_path: str
+    output_path: str
+    status: str
+    seconds: float
+    # Peak resident memory of the worker while building this tenant (its lifetime peak
+    # where the kernel cannot reset the high-water mark).
+    peak_rss_mb: Optional[float] = None
+    error: Optional[str] = None
+    traceback: Optional[str] = None
+
+
+def jobs_from_directory(input_dir: Path, output_dir: Path, pattern: str = DEFAULT_INPUT_PATTERN) -> List[TenantJob]:
+    return [
+        TenantJob(tenant_from_path(path), path, output_dir / f"{tenant_from_path(path)}{DASHBOARD_SUFFIX}")
+        for path in sorted(input_dir.glob(pattern))
+        # Skip the lock files Excel leaves next to open workbooks.
+        if path.is_file() and not path.name.startswith("~$")
+    ]
+
+
+def jobs_from_manifest(manifest_path: Path, output_dir: Path) -> List[TenantJob]:
+    """Read ``tenant,input,output`` rows; tenant and output are optional, paths are relative to the manifest."""
+    jobs = []
+    with manifest_path.open(newline="", encoding="utf-8") as handle:
+        for line, row in enumerate(csv.DictReader(handle), start=2):
+            raw_input = (row.get("input") or "").strip()
+            if not raw_input:
+                raise ValueError(f"{manifest_path}:{line}: missing input path")
+            input_path = (manifest_path.parent / raw_input).resolve()
+            tenant = (row.get("tenant") or "").strip() or tenant_from_path(input_path)
+            raw_output = (row.get("output") or "").strip()
+            output_path = (manifest_path.parent / raw_output).resolve() if raw_output else output_dir / f"{tenant}{DASHBOARD_SUFFIX}"
+            jobs.append(TenantJob(tenant, input_path, output_path))
+    return jobs
+
+
+def check_unique_outputs(jobs: List[TenantJob]) -> None:
+    seen: Dict[Path, str] = {}
+    for job in jobs:
+        other = seen.setdefault(job.output_path, job.tenant)
+        if other != job.tenant:
+            raise ValueError(f"Tenants {other!r} and {job.tenant!r} would both write {job.output_path}")
+
+
+def reset_peak_rss() -> None:
+    """Reset the process's peak RSS so the next reading covers one tenant (Linux only)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_tenant(job: TenantJob, options: Dict[str, object], started_marker: Optional[Path] = None) -> TenantResult:
+    """Build one dashboard in a worker; errors are returned, not raised.
+
+    ``started_marker`` is created first, so the parent knows which tenants were building
+    when a worker died.
+    """
+    if started_marker is not None:
+        started_marker.touch()
+    options = dict(options)
+    snapshot_dir = options.pop("snapshot_dir", None)
+    trends = options.pop("trends", False)
+    hooks = SnapshotRecorder(SnapshotStore(snapshot_dir), job.tenant, trends_sheet=trends) if snapshot_dir else None
+    reset_peak_rss()
+    started = time.perf_counter()
+    try:
+        build_dashboard(job.input_path, job.output_path, hooks=hooks, **options)
+        status, error, trace = "ok", None, None
+    except Exception as exc:  # Fail soft: one broken export must not stop the fleet.
+        status, error, trace = "failed", f"{type(exc).__name__}: {exc}", traceback.format_exc()
+    return TenantResult(
+        tenant=job.tenant,
+        input_path=str(job.input_path),
+        output_path=str(job.output_path),
+        status=status,
+        seconds=round(time.perf_counter() - started, 3),
+        peak_rss_mb=peak_rss_mb(),
+        error=error,
+        traceback=trace,
+    )
+
+
+def crashed_result(job: TenantJob, error: str) -> TenantResult:
+    return TenantResult(job.tenant, str(job.input_path), str(job.output_path), "failed", 0.0, error=error)
+
+
+def run_pool(
+    jobs: List[TenantJob],
+    options: Dict[str, object],
+    workers: Optional[int],
+    markers: Dict[TenantJob, Path],
+    results: Dict[TenantJob, TenantResult],
+) -> List[TenantJob]:
+    """Build ``jobs`` in one process pool; returns the jobs left unfinished when a worker died."""
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_tenant, job, options, markers[job]): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                unfinished.append(job)
+                continue
+            except Exception as exc:
+                result = crashed_result(job, f"{type(exc).__name__}: {exc}")
+            results[job] = result
+            print(format_result(result), flush=True)
+    return [job for job in jobs if job in unfinished]
+
+
+def build_all(jobs: List[TenantJob], options: Dict[str, object], workers: Optional[int] = None) -> List[TenantResult]:
+    """Build every job in a process pool and return the results in job order."""
+    check_unique_outputs(jobs)
+    results: Dict[TenantJob, TenantResult] = {}
+    with tempfile.TemporaryDirectory(prefix="dq-batch-") as marker_dir:
+        markers = {job: Path(marker_dir) / f"{position}.started" for position, job in enumerate(jobs)}
+        pending = list(jobs)
+        while pending:
+            unfinished = run_pool(pending, options, workers, markers, results)
+            # A worker died (killed, out of memory, ...) and took the pool with it. The
+            # tenants that were building are retried alone; one that breaks its own pool
+            # is the culprit. The others go back to a fresh pool.
+            building = [job for job in unfinished if markers[job].exists()] or unfinished
+            for job in building:
+                if run_pool([job], options, 1, markers, results):
+                    results[job] = crashed_result(job, "BrokenProcessPool: the worker building this tenant died")
+                    print(format_result(results[job]), flush=True)
+            pending = [job for job in unfinished if job not in building]
+    return [results[job] for job in jobs]
+
+
+def format_result(result: TenantResult) -> str:
+    memory = f"{result.peak_rss_mb:8.1f} MB" if result.peak_rss_mb is not None else "       - MB"
+    line = f"{result.status:<6} {result.tenant:<24} {result.seconds:8.2f}s {memory}"
+    return f"{line}  {result.error}" if result.error else line
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build data quality dashboards for many tenant exports in parallel")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input-dir", help="Directory of raw exports")
+    source.add_argument("--manifest", help="CSV with tenant,input,output columns (tenant and output optional)")
+    parser.add_argument("--pattern", default=DEFAULT_INPUT_PATTERN, help="Glob for exports in --input-dir (default: %(default)s)")
+    parser.add_argument("--output-dir", help="Dashboard directory (default: the input directory or the manifest's directory)")
+    parser.add_argument("--report", help=f"JSON report path (default: <output-dir>/{REPORT_NAME})")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (defaults to CPU count)")
+    parser.add_argument("--mode", choices=BUILD_MODES, default="formula")
+    parser.add_argument("--list-backend", choices=LIST_BACKENDS, default="legacy")
+    parser.add_argument("--writer", choices=SHEET_WRITERS, default="stream")
+    parser.add_argument("--today", type=date.fromisoformat, help="Build as of this date (YYYY-MM-DD)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_SOURCE_CACHE_DIR), help="Parsed export cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the input workbooks")
+    parser.add_argument("--snapshot-dir", help="Store every parsed export in this snapshot history, per tenant")
+    parser.add_argument("--trends", action="store_true", help="With --snapshot-dir, add a Trends sheet to every dashboard")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.trends and not args.snapshot_dir:
+        raise SystemExit("--trends needs --snapshot-dir")
+    if args.input_dir:
+        input_dir = Path(args.input_dir).expanduser().resolve()
+        output_dir = Path(args.output_dir).expanduser().resolve() if args.output_dir else input_dir
+        jobs = jobs_from_directory(input_dir, output_dir, args.pattern)
+    else:
+        manifest_path = Path(args.manifest).expanduser().resolve()
+        output_dir = Path(args.output_dir).expanduser().resolve() if args.output_dir else manifest_path.parent
+        jobs = jobs_from_manifest(manifest_path, output_dir)
+    if not jobs:
+        raise SystemExit("No raw exports found.")
+
+    options = {
+        "mode": args.mode,
+        "list_backend": args.list_backend,
+        "writer": args.writer,
+        "today": args.today,
+        "cache_dir": None if args.no_cache else Path(args.cache_dir).expanduser(),
+        "snapshot_dir": Path(args.snapshot_dir).expanduser() if args.snapshot_dir else None,
+        "trends": args.trends,
+    }
+    started = time.perf_counter()
+    results = build_all(jobs, options, args.workers)
+    elapsed = time.perf_counter() - started
+
+    failed = [result for result in results if result.status != "ok"]
+    report_path = Path(args.report).expanduser() if args.report else output_dir / REPORT_NAME
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "tenants": len(results),
+        "failed": len(failed),
+        "workers": args.workers or os.cpu_count(),
+        "elapsed_seconds": round(elapsed, 3),
+        "build_seconds": round(sum(result.seconds for result in results), 3),
+        "results": [asdict(result) for result in results],
+    }
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Built {len(results) - len(failed)} of {len(results)} dashboards in {elapsed:.1f}s; report: {report_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
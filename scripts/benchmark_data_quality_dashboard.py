@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Benchmark the data quality dashboard build on synthetic exports of growing size.
+
+Every size gets a synthetic export (generated once and kept in ``--data-dir``) and is
+built in a fresh process, recording the wall time, peak resident memory, the size of the
+written workbook and the time spent in each build stage. Results can be stored as a
+baseline and later runs compared against it; a metric that grew by more than
+``--tolerance`` counts as a regression and sets the exit status.
+
+Usage:
+  python3 scripts/benchmark_data_quality_dashboard.py --sizes 1000,10000 --output bench.json
+  python3 scripts/benchmark_data_quality_dashboard.py --baseline bench-baseline.json --save-baseline
+  python3 scripts/benchmark_data_quality_dashboard.py --baseline bench-baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+if __package__:
+    from . import build_data_quality_excel_dashboard as builder
+    from .batch_build_data_quality_dashboards import peak_rss_mb, reset_peak_rss
+    from .build_profiler import BuildProfiler
+    from .generate_data_quality_export import DEFAULT_SEED, generate_export
+else:
+    import build_data_quality_excel_dashboard as builder
+    from batch_build_data_quality_dashboards import peak_rss_mb, reset_peak_rss
+    from build_profiler import BuildProfiler
+    from generate_data_quality_export import DEFAULT_SEED, generate_export
+
+DEFAULT_SIZES = [1000, 10000, 50000, 100000]
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / "matchical-data-quality-benchmark"
+DEFAULT_TOLERANCE = 0.2
+# Changes below these amounts are measurement noise, whatever their relative size.
+NOISE_FLOORS = {"seconds": 0.05, "peak_rss_mb": 5.0, "output_bytes": 4096}
+
+
+@dataclass
+class BenchmarkRun:
+    consultants: int
+    seconds: float
+    peak_rss_mb: Optional[float]
+    output_bytes: int
+    stages: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Regression:
+    consultants: int
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1 if self.baseline else float("inf")
+
+
+def measure_build(input_path: Path, output_path: Path, options: Dict[str, object]) -> BenchmarkRun:
+    """Build one dashboard in this process and time it, stage by stage."""
+    # Stage timing only: tracing allocations would slow the build down several times.
+    profiler = BuildProfiler(trace_memory=False, count_cells=False)
+    reset_peak_rss()
+    started = time.perf_counter()
+    builder.build_dashboard(input_path, output_path, cache_dir=None, hooks=profiler, **options)
+    seconds = time.perf_counter() - started
+    peak = peak_rss_mb()
+    return BenchmarkRun(
+        consultants=0,
+        seconds=round(seconds, 3),
+        peak_rss_mb=round(peak, 1) if peak is not None else None,
+        output_bytes=output_path.stat().st_size,
+        stages={name: round(stage.seconds, 3) for name, stage in profiler.stages.items()},
+    )
+
+
+def measure_in_subprocess(input_path: Path, output_path: Path, options: Dict[str, object]) -> BenchmarkRun:
+    # A fresh interpreter per build keeps one size's memory peak out of the next one's.
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure_build, input_path, output_path, options).result()
+
+
+def synthetic_export(data_dir: Path, consultants: int, seed: int, today: Optional[date]) -> Path:
+    path = data_dir / f"synthetic-{consultants}-{seed}-raw.xlsx"
+    if not path.exists():
+        started = time.perf_counter()
+        generate_export(path, consultants, today, seed)
+        print(f"Generated {path} in {time.perf_counter() - started:.1f}s", flush=True)
+    return path
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    data_dir: Path,
+    options: Dict[str, object],
+    repeat: int = 1,
+    seed: int = DEFAULT_SEED,
+) -> List[BenchmarkRun]:
+    """Build every size ``repeat`` times and keep the fastest run of each."""
+    runs = []
+    for consultants in sizes:
+        input_path = synthetic_export(data_dir, consultants, seed, options.get("today"))
+        output_path = data_dir / f"synthetic-{consultants}-{seed}-dashboard.xlsx"
+        best = min(
+            (measure_in_subprocess(input_path, output_path, options) for _ in range(max(1, repeat))),
+            key=lambda run: run.seconds,
+        )
+        best.consultants = consultants
+        print(format_run(best), flush=True)
+        runs.append(best)
+    return runs
+
+
+def run_metrics(run: Dict[str, object]) -> Dict[str, float]:
+    metrics = {name: run[name] for name in NOISE_FLOORS if run.get(name) is not None}
+    metrics.update({f"stages.{name}": seconds for name, seconds in run.get("stages", {}).items()})
+    return metrics
+
+
+def compare_runs(current: Dict[str, object], baseline: Dict[str, object], tolerance: float = DEFAULT_TOLERANCE) -> List[Regression]:
+    """Metrics of ``current`` that grew by more than ``tolerance`` over the baseline run of the same size."""
+    baseline_runs = {run["consultants"]: run for run in baseline["runs"]}
+    regressions = []
+    for run in current["runs"]:
+        reference = baseline_runs.get(run["consultants"])
+        if reference is None:
+            continue
+        reference_metrics = run_metrics(reference)
+        for metric, value in run_metrics(run).items():
+            previous = reference_metrics.get(metric)
+            if previous is None:
+                continue
+            floor = NOISE_FLOORS.get(metric, NOISE_FLOORS["seconds"])
+            if value > previous * (1 + tolerance) and value - previous > floor:
+                regressions.append(Regression(run["consultants"], metric, previous, value))
+    return regressions
+
+
+def format_run(run: BenchmarkRun) -> str:
+    memory = f"{run.peak_rss_mb:8.1f} MB" if run.peak_rss_mb is not None else "       - MB"
+    stages = "  ".join(f"{name}={seconds:.2f}s" for name, seconds in run.stages.items())
+    return f"{run.consultants:>7} consultants {run.seconds:8.2f}s {memory} {run.output_bytes / 1e6:8.1f} MB  {stages}"
+
+
+def parse_sizes(value: str) -> List[int]:
+    try:
+        sizes = [int(size) for size in value.split(",") if size.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated consultant counts, got {value!r}")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("consultant counts must be positive")
+    return sizes
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the data quality dashboard build on synthetic exports")
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES, help="Comma separated consultant counts (default: 1000,10000,50000,100000)")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="Synthetic exports and built dashboards (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=1, help="Builds per size; the fastest is kept")
+    parser.add_argument("--mode", choices=builder.BUILD_MODES, default="formula")
+    parser.add_argument("--list-backend", choices=builder.LIST_BACKENDS, default="legacy")
+    parser.add_argument("--writer", choices=builder.SHEET_WRITERS, default="stream")
+    parser.add_argument("--today", type=date.fromisoformat, help="Build as of this date (YYYY-MM-DD)")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative growth per metric (default: %(default)s)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.save_baseline and not args.baseline:
+        raise SystemExit("--save-baseline needs --baseline")
+    options = {"mode": args.mode, "list_backend": args.list_backend, "writer": args.writer, "today": args.today}
+    data_dir = Path(args.data_dir).expanduser()
+    runs = run_benchmark(args.sizes, data_dir, options, args.repeat, args.seed)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {"mode": args.mode, "list_backend": args.list_backend, "writer": args.writer, "seed": args.seed},
+        "runs": [asdict(run) for run in runs],
+    }
+    text = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        Path(args.output).expanduser().write_text(text, encoding="utf-8")
+    if not args.baseline:
+        return 0
+
+    baseline_path = Path(args.baseline).expanduser()
+    if args.save_baseline:
+        baseline_path.write_text(text, encoding="utf-8")
+        print(f"Saved baseline: {baseline_path}")
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("options") != results["options"]:
+        print(f"Warning: baseline was built with {baseline.get('options')}, this run with {results['options']}", file=sys.stderr)
+    regressions = compare_runs(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.consultants:>7} consultants {regression.metric}: "
+            f"{regression.baseline:g} -> {regression.current:g} ({regression.change:+.0%})"
+        )
+    print(f"{len(regressions)} regression(s) against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
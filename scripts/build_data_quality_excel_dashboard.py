@@ -4,21 +4,68 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import os
+import pickle
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import zip_longest
 from pathlib import Path
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import Cell, WriteOnlyCell
 from openpyxl.chart import BarChart, PieChart, Reference
 from openpyxl.chart.label import DataLabelList
 from openpyxl.chart.series import DataPoint
 from openpyxl.comments import Comment
 from openpyxl.formatting.rule import CellIsRule
 from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils import get_column_letter
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
+from openpyxl.utils.datetime import from_excel, to_excel
 from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.worksheet.formula import ArrayFormula
+
+if __package__:
+    from .atomic_write import atomic_write
+    from .build_profiler import CPROFILE_SUFFIX, BuildHooks, BuildProfiler, HookList, format_stages, sidecar_path
+    from .source_table import SourceTable
+    from .xlsx_stream_writer import SharedFormulaColumns, StreamedWorkbook
+else:
+    from atomic_write import atomic_write
+    from build_profiler import CPROFILE_SUFFIX, BuildHooks, BuildProfiler, HookList, format_stages, sidecar_path
+    from source_table import SourceTable
+    from xlsx_stream_writer import SharedFormulaColumns, StreamedWorkbook
 
 METRIC_TYPES = ["Weighted", "Absolute"]
 SEGMENT_DIMENSIONS = ["Department", "Team", "Unit", "Legal entity", "Location", "Lead"]
+# Consultant attributes matched against the Dashboard filter cells B4:B10, in that order.
+FILTER_HEADERS = SEGMENT_DIMENSIONS + ["Is available"]
+DEFAULT_METRIC_TYPE = METRIC_TYPES[0]
+DEFAULT_SEGMENT_DIMENSION = SEGMENT_DIMENSIONS[0]
+BUILD_MODES = ["formula", "hybrid", "static"]
+# legacy: build-time presorted order walked with a binary-search MATCH (formula builds, whose scores
+# move with TODAY(), rank with one LARGE/MATCH per row instead, which stays quadratic);
+# excel365: one FILTER/SORTBY array formula yields the Model row of every rank.
+LIST_BACKENDS = ["legacy", "excel365"]
+# openpyxl: every sheet goes through openpyxl; stream: Raw_data, Segments and Model rows are written as raw sheet XML.
+SHEET_WRITERS = ["openpyxl", "stream"]
+# Columns that do not depend on any Dashboard filter and are written as values in hybrid mode.
+HYBRID_VALUE_COLUMNS = ("D", "E")
+# A formula yielding empty text; an empty cell would compare as 0 where the formulas compare against "".
+BLANK_TEXT = '=""'
+COVERAGE_BANDS = ["<0.3", "0.3-0.49", "0.5-0.79", ">=0.8"]
+ONGOING_AGE_BUCKETS = ["<12m", "12-24m", ">24m"]
+TOP_SEGMENT_END_ROW = 11
+MODEL_COLUMNS = [get_column_letter(c) for c in range(1, 23)]
+LEGACY_LIST_COLUMNS = ["W", "X", "Y", "Z", "AA"]
+RATIO_HEADERS = [
+    "Absolute coverage ratio since entry",
+    "Weighted coverage ratio since entry",
+    "Absolute coverage ratio before entry",
+    "Weighted coverage ratio before entry",
+]
 
 REQUIRED_HEADERS = [
     "External",
@@ -65,6 +112,20 @@ REQUIRED_HEADERS = [
     "Location",
     "Lead",
 ]
+# Source columns stored once per distinct value, and those read as dates.
+CATEGORICAL_HEADERS = FILTER_HEADERS
+DATE_HEADERS = [
+    "Entry date",
+    "Work experience since",
+    "Oldest ongoing engagement start date",
+    "Last finished engagement start date",
+    "Last finished engagement end date",
+    "Available from",
+    "Available to",
+]
+# Bump when parsing changes; with the header lists above and the SourceTable state layout it keys the source cache.
+SOURCE_CACHE_FORMAT = 1
+DEFAULT_SOURCE_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "matchical" / "data-quality-sources"
 
 
 
@@ -72,39 +133,338 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Build Excel dashboard from raw data quality export")
     parser.add_argument("--input", required=True, help="Path to input workbook")
     parser.add_argument("--output", required=True, help="Path to output workbook")
+    parser.add_argument(
+        "--mode",
+        choices=BUILD_MODES,
+        default="formula",
+        help=(
+            "formula: every Model column is a live formula; "
+            "hybrid: filter-independent Model columns are precomputed values; "
+            "static: the whole Model sheet is precomputed for the default filters"
+        ),
+    )
+    parser.add_argument(
+        "--list-backend",
+        choices=LIST_BACKENDS,
+        default="legacy",
+        help=(
+            "legacy: the list walks an anomaly order presorted at build time in hybrid/static builds; "
+            "formula builds rank with one LARGE/MATCH per row, which recalculates in quadratic time, "
+            "because their scores change with TODAY(); "
+            "excel365: a single FILTER/SORTBY array formula ranks the list (Excel 2021+)"
+        ),
+    )
+    parser.add_argument(
+        "--writer",
+        choices=SHEET_WRITERS,
+        default="openpyxl",
+        help=(
+            "openpyxl: write every sheet through openpyxl; "
+            "stream: write the Raw_data, Segments and Model rows as raw sheet XML with shared strings (faster for large exports)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_SOURCE_CACHE_DIR),
+        help="Reuse the parsed export from this directory when the input file is unchanged (default: %(default)s)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the input workbook")
+    parser.add_argument("--today", type=date.fromisoformat, help="Build as of this date (YYYY-MM-DD; default: today)")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record wall time and cell/formula counts per build stage in <output>.profile.json",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile, also record allocated memory per stage (tracemalloc; slows the build several times, so wall times are not comparable)",
+    )
+    parser.add_argument("--cprofile", action="store_true", help="With --profile, also dump cProfile stats to <output>.pstats")
+    parser.add_argument("--snapshot-dir", help="Store the parsed export in this snapshot history (see data_quality_snapshots.py)")
+    parser.add_argument("--tenant", help="Tenant name in the snapshot history (default: the input file name before \"-raw\")")
+    parser.add_argument(
+        "--trends",
+        action="store_true",
+        help="With --snapshot-dir, add a Trends sheet with per-department coverage and anomalies across all snapshots",
+    )
     return parser.parse_args()
 
 
 
-def load_source(input_path: Path) -> Tuple[List[str], List[List[object]]]:
-    source_wb = load_workbook(input_path, data_only=False)
-    candidate_sheets = [source_wb.active]
-    if "Raw_data" in source_wb.sheetnames and source_wb["Raw_data"] not in candidate_sheets:
-        candidate_sheets.append(source_wb["Raw_data"])
+def load_source(input_path: Path, cache_dir: Optional[Path] = None) -> SourceTable:
+    """Parse the raw export, or reuse the table cached for identical file contents in ``cache_dir``."""
+    if cache_dir is None:
+        return parse_source(input_path)
+
+    cache_path = Path(cache_dir) / f"{source_cache_key(input_path)}.pickle"
+    try:
+        with cache_path.open("rb") as handle:
+            return SourceTable.from_state(pickle.load(handle))
+    except Exception:
+        # A missing, truncated or foreign cache file is rebuilt from the workbook; unpickling
+        # can fail with almost any exception, and none of them should fail the build.
+        pass
+
+    table = parse_source(input_path)
+    # Replaced in one step, so a concurrent build never reads a partial file.
+    try:
+        with atomic_write(cache_path) as handle:
+            pickle.dump(table.to_state(), handle, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        # The cache only saves time; a read-only or full cache directory is skipped.
+        pass
+    return table
+
+
+
+def source_cache_key(input_path: Path) -> str:
+    """Digest of the file contents and of everything that shapes the parsed table."""
+    digest = hashlib.sha256(
+        json.dumps(
+            [SOURCE_CACHE_FORMAT, SourceTable.state_layout(), REQUIRED_HEADERS, CATEGORICAL_HEADERS, DATE_HEADERS]
+        ).encode("utf-8")
+    )
+    with Path(input_path).open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+
+def parse_source(input_path: Path) -> SourceTable:
+    # Read-only mode streams rows from the sheet XML instead of building a cell object graph.
+    source_wb = load_workbook(input_path, read_only=True, data_only=False)
+    try:
+        candidate_sheets = [source_wb.active]
+        if "Raw_data" in source_wb.sheetnames and source_wb["Raw_data"].title != source_wb.active.title:
+            candidate_sheets.append(source_wb["Raw_data"])
+
+        source_ws = None
+        headers: List[str] = []
+        missing: List[str] = REQUIRED_HEADERS.copy()
+
+        for sheet in candidate_sheets:
+            first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            sheet_headers = [str(h).strip() if h is not None else "" for h in first_row]
+            sheet_missing = [h for h in REQUIRED_HEADERS if h not in sheet_headers]
+            if not sheet_missing:
+                source_ws = sheet
+                headers = sheet_headers
+                missing = []
+                break
+
+        if source_ws is None:
+            raise ValueError(f"Input workbook missing required columns: {missing}")
+
+        rows = (
+            row
+            for row in source_ws.iter_rows(min_row=2, min_col=1, max_col=len(headers), values_only=True)
+            if any(v is not None and v != "" for v in row)
+        )
+        table = source_table(headers, rows)
+    finally:
+        source_wb.close()
+
+    return table
 
-    source_ws = None
-    headers: List[str] = []
-    missing: List[str] = REQUIRED_HEADERS.copy()
 
-    for sheet in candidate_sheets:
-        sheet_headers = [sheet.cell(row=1, column=c).value for c in range(1, sheet.max_column + 1)]
-        sheet_headers = [str(h).strip() if h is not None else "" for h in sheet_headers]
-        sheet_missing = [h for h in REQUIRED_HEADERS if h not in sheet_headers]
-        if not sheet_missing:
-            source_ws = sheet
-            headers = sheet_headers
-            missing = []
-            break
 
-    if source_ws is None:
-        raise ValueError(f"Input workbook missing required columns: {missing}")
+def source_table(headers: Sequence[str], rows: Iterable[Sequence[object]]) -> SourceTable:
+    """Columnar table of export rows with the dashboard's categorical and date columns."""
+    return SourceTable.from_rows(headers, rows, CATEGORICAL_HEADERS, DATE_HEADERS)
 
-    rows: List[List[object]] = []
-    for row in source_ws.iter_rows(min_row=2, max_row=source_ws.max_row, min_col=1, max_col=len(headers), values_only=True):
-        if any(v is not None and v != "" for v in row):
-            rows.append(list(row))
 
-    return headers, rows
+
+def segment_candidate_end_row(unique_counts: Iterable[int]) -> int:
+    """Last Model row of the candidate-segment block, sized for the dimension with the most values."""
+    # An empty list still yields one candidate row (see the INDEX fallback in write_model_sheet).
+    return 1 + max(1, *unique_counts)
+
+
+
+# The helpers below mirror how Excel evaluates the Model formulas so precomputed values
+# match what the formula workbook shows for the same data.
+def is_blank(value: object) -> bool:
+    return value is None or value == ""
+
+
+
+def excel_number(value: object) -> Optional[float]:
+    """Coerce a cell value like Excel arithmetic does; None stands for #VALUE!."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return float(to_excel(value))
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+
+def excel_compare(value: object, number: float) -> int:
+    """Compare a cell value with a number using Excel ordering (numbers < text < logicals)."""
+    if isinstance(value, (bool, str)):
+        return 1
+    if value is None:
+        numeric = 0.0
+    elif isinstance(value, (datetime, date)):
+        numeric = float(to_excel(value))
+    elif isinstance(value, (int, float)):
+        numeric = float(value)
+    else:
+        return 1
+    return (numeric > number) - (numeric < number)
+
+
+
+def excel_key(value: object) -> Tuple[str, object]:
+    """Key under which values compare equal with Excel "=" (text is case-insensitive, TRUE is not 1)."""
+    if isinstance(value, str):
+        return ("text", value.casefold())
+    if isinstance(value, bool):
+        return ("logical", value)
+    return ("value", value)
+
+
+
+def excel_equals(left: object, right: object) -> bool:
+    return excel_key(left) == excel_key(right)
+
+
+
+def excel_ratio(months: object, baseline: object) -> object:
+    numerator = excel_number(months)
+    denominator = excel_number(baseline)
+    if numerator is None or not denominator:
+        return ""
+    return numerator / denominator
+
+
+
+def months_between(start: object, today: date) -> int:
+    """DATEDIF(start, today, "M")."""
+    start_date = start if isinstance(start, date) else from_excel(start)
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    months = (today.year - start_date.year) * 12 + today.month - start_date.month
+    return months - 1 if today.day < start_date.day else months
+
+
+
+def ongoing_age_months(ongoing: object, oldest: object, today: date) -> object:
+    """Model!D: months since the oldest ongoing engagement started, or "" without one."""
+    if is_blank(ongoing) or excel_compare(ongoing, 0) <= 0 or is_blank(oldest):
+        return ""
+    if excel_compare(oldest, float(to_excel(today))) > 0:
+        return 0
+    return months_between(oldest, today)
+
+
+
+def is_availability_inconsistent(is_available: object, available_from: object, days_per_week: object, comment: object) -> bool:
+    """Model!E: marked unavailable while availability details are filled in."""
+    return excel_equals(is_available, "No") and (
+        not is_blank(available_from) or excel_compare(days_per_week, 0) > 0 or not is_blank(comment)
+    )
+
+
+
+def compute_model_values(table: SourceTable, today: date, metric: str = DEFAULT_METRIC_TYPE) -> Dict[int, Dict[str, object]]:
+    """Evaluate every Model column for the default Dashboard filters, keyed by sheet row."""
+    today_serial = float(to_excel(today))
+    idx = table.index
+    values: Dict[int, Dict[str, object]] = {}
+
+    for r, source in enumerate(table.rows(), start=2):
+        def raw(header: str) -> object:
+            return source[idx[header]]
+
+        ratios = {
+            (kind, period): excel_ratio(raw(f"{kind} months {period} entry"), raw(f"Months {period} entry baseline"))
+            for kind in METRIC_TYPES
+            for period in ("since", "before")
+        }
+
+        entry = raw("Entry date")
+        include = 1 if is_blank(entry) or excel_compare(entry, today_serial) <= 0 else 0
+
+        ongoing_age = ongoing_age_months(raw("Ongoing engagements"), raw("Oldest ongoing engagement start date"), today)
+        availability_inconsistent = int(
+            is_availability_inconsistent(
+                raw("Is available"), raw("Available from"), raw("Available days per week"), raw("Availability comment")
+            )
+        )
+
+        since = ratios[(metric, "since")]
+        low_coverage = isinstance(since, float) and since < 0.5
+        stale_ongoing = excel_compare(ongoing_age, 24) >= 0
+        invalid_dates = excel_compare(raw("Engagements with invalid dates"), 0) > 0
+        experience_after_entry = raw("Is work experience since after entry date") is True
+
+        anomaly_score = max(0.0, (0.5 - since) * 100) if isinstance(since, float) else 0
+        anomaly_score += (20 if stale_ongoing else 0) + (20 if invalid_dates else 0) + (10 if experience_after_entry else 0)
+
+        segment = raw(DEFAULT_SEGMENT_DIMENSION)
+        values[r] = {
+            "A": include,
+            "B": since,
+            "C": ratios[(metric, "before")],
+            "D": ongoing_age,
+            "E": availability_inconsistent,
+            "F": int((low_coverage and (stale_ongoing or invalid_dates)) or experience_after_entry),
+            "G": 0 if segment is None else segment,
+            "H": int(low_coverage),
+            "I": anomaly_score,
+            "R": anomaly_score + r / 100000000 if include else -1e99,
+            "S": ratios[("Absolute", "since")] if include else "",
+            "T": ratios[("Absolute", "before")] if include else "",
+            "U": ratios[("Weighted", "since")] if include else "",
+            "V": ratios[("Weighted", "before")] if include else "",
+        }
+
+    # INDEX over the one-cell fallback range of an empty list yields 0 rather than an error.
+    candidates: List[object] = table.unique_values(DEFAULT_SEGMENT_DIMENSION) or [0]
+    segment_counts: Dict[Tuple[str, object], Tuple[int, int]] = {}
+    for r in range(2, len(table) + 2):
+        if values[r]["A"] == 1:
+            key = excel_key(values[r]["G"])
+            total, low = segment_counts.get(key, (0, 0))
+            segment_counts[key] = (total + 1, low + values[r]["H"])
+
+    candidate_end_row = segment_candidate_end_row(len(table.unique_values(dim)) for dim in SEGMENT_DIMENSIONS)
+    ranked: List[Tuple[float, int]] = []
+    for r in range(2, candidate_end_row + 1):
+        row_values = values.setdefault(r, {})
+        if r - 2 >= len(candidates):
+            row_values.update({"J": "", "K": "", "L": "", "M": "", "N": ""})
+            continue
+        candidate = candidates[r - 2]
+        total, low = segment_counts.get(excel_key(candidate), (0, 0))
+        rate = low / total if total else ""
+        row_values.update({"J": candidate, "K": total, "L": low, "M": rate})
+        if total:
+            rank_key = rate + total / 100000 + r / 100000000
+            row_values["N"] = rank_key
+            ranked.append((rank_key, r))
+        else:
+            row_values["N"] = ""
+
+    ranked.sort(reverse=True)
+    for k in range(1, TOP_SEGMENT_END_ROW):
+        row_values = values.setdefault(k + 1, {})
+        if k > len(ranked):
+            row_values.update({"O": "", "P": "", "Q": ""})
+        else:
+            source = values[ranked[k - 1][1]]
+            row_values.update({"O": source["J"], "P": source["M"], "Q": source["K"]})
+
+    return values
 
 
 
@@ -114,87 +474,112 @@ def set_column_widths(ws, widths: Dict[str, float]) -> None:
 
 
 
-def write_raw_data_sheet(wb: Workbook, headers: Sequence[str], rows: Sequence[Sequence[object]]) -> Tuple[Dict[str, str], int]:
-    ws = wb.active
-    ws.title = "Raw_data"
+class SheetBuffer:
+    """Stage cells by coordinate and stream them to a write-only worksheet in row order."""
 
-    for col_idx, header in enumerate(headers, start=1):
-        ws.cell(row=1, column=col_idx, value=header)
+    def __init__(self, ws) -> None:
+        self.ws = ws
+        self.rows: Dict[int, Dict[int, Cell]] = {}
+
+    def cell(self, row: int, column: int, value: object = None) -> Cell:
+        row_cells = self.rows.setdefault(row, {})
+        cell = row_cells.get(column)
+        if cell is None:
+            cell = WriteOnlyCell(self.ws)
+            row_cells[column] = cell
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def __getitem__(self, coordinate: str) -> Cell:
+        row, column = coordinate_to_tuple(coordinate)
+        return self.cell(row, column)
+
+    def __setitem__(self, coordinate: str, value: object) -> None:
+        self[coordinate].value = value
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        for row in range(1, max(self.rows) + 1):
+            row_cells = self.rows.pop(row, {})
+            width = max(row_cells, default=0)
+            self.ws.append([row_cells.get(column) for column in range(1, width + 1)])
 
-    for row_idx, row_values in enumerate(rows, start=2):
-        for col_idx, value in enumerate(row_values, start=1):
-            ws.cell(row=row_idx, column=col_idx, value=value)
 
-    max_row = len(rows) + 1
+
+def styled_cell(ws, value: object, *, font: Font = None, fill: PatternFill = None, alignment: Alignment = None, number_format: str = None) -> Cell:
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    if number_format is not None:
+        cell.number_format = number_format
+    return cell
+
+
+
+def write_raw_data_sheet(wb: Workbook, table: SourceTable, stream: Optional[StreamedWorkbook] = None) -> Tuple[Dict[str, str], int]:
+    ws = wb.create_sheet("Raw_data")
+    out = stream.stream(ws) if stream else ws
+    headers = table.headers
+
+    max_row = len(table) + 1
     max_col = len(headers)
 
     ws.freeze_panes = "A2"
     ws.auto_filter.ref = f"A1:{get_column_letter(max_col)}{max_row}"
 
-    header_fill = PatternFill(fill_type="solid", start_color="1F4E78", end_color="1F4E78")
-    for cell in ws[1]:
-        cell.font = Font(color="FFFFFF", bold=True)
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+    header_to_col = {h: get_column_letter(i + 1) for i, h in enumerate(headers)}
+    header_to_idx = {h: i for i, h in enumerate(headers)}
 
     for col_idx, header in enumerate(headers, start=1):
         ws.column_dimensions[get_column_letter(col_idx)].width = min(max(len(header) + 2, 12), 38)
+    for ratio_header in RATIO_HEADERS:
+        ws.column_dimensions[header_to_col[ratio_header]].width = 20
 
-    header_to_col = {h: get_column_letter(i + 1) for i, h in enumerate(headers)}
+    # Styles are created once and shared by every cell that uses them.
+    header_font = Font(color="FFFFFF", bold=True)
+    header_fill = PatternFill(fill_type="solid", start_color="1F4E78", end_color="1F4E78")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    out.append([styled_cell(ws, header, font=header_font, fill=header_fill, alignment=header_alignment) for header in headers])
 
     # Recalculate missing-month and coverage-ratio fields in Excel for transparency.
     # This makes it explicit to users how each derived value is computed.
-    for row_idx in range(2, max_row + 1):
-        baseline_since = f"{header_to_col['Months since entry baseline']}{row_idx}"
-        absolute_since = f"{header_to_col['Absolute months since entry']}{row_idx}"
-        weighted_since = f"{header_to_col['Weighted months since entry']}{row_idx}"
-        absolute_missing_since = f"{header_to_col['Absolute missing months since entry']}{row_idx}"
-        weighted_missing_since = f"{header_to_col['Weighted missing months since entry']}{row_idx}"
-        absolute_ratio_since = f"{header_to_col['Absolute coverage ratio since entry']}{row_idx}"
-        weighted_ratio_since = f"{header_to_col['Weighted coverage ratio since entry']}{row_idx}"
-
-        baseline_before = f"{header_to_col['Months before entry baseline']}{row_idx}"
-        absolute_before = f"{header_to_col['Absolute months before entry']}{row_idx}"
-        weighted_before = f"{header_to_col['Weighted months before entry']}{row_idx}"
-        absolute_missing_before = f"{header_to_col['Absolute missing months before entry']}{row_idx}"
-        weighted_missing_before = f"{header_to_col['Weighted missing months before entry']}{row_idx}"
-        absolute_ratio_before = f"{header_to_col['Absolute coverage ratio before entry']}{row_idx}"
-        weighted_ratio_before = f"{header_to_col['Weighted coverage ratio before entry']}{row_idx}"
-
-        ws[absolute_missing_since] = f"=ROUND({baseline_since}-{absolute_since},2)"
-        ws[weighted_missing_since] = f"=ROUND({baseline_since}-{weighted_since},2)"
-        ws[absolute_ratio_since] = f"=IFERROR({absolute_since}/{baseline_since},\"\")"
-        ws[weighted_ratio_since] = f"=IFERROR({weighted_since}/{baseline_since},\"\")"
-
-        ws[absolute_missing_before] = f"=ROUND({baseline_before}-{absolute_before},2)"
-        ws[weighted_missing_before] = f"=ROUND({baseline_before}-{weighted_before},2)"
-        ws[absolute_ratio_before] = f"=IFERROR({absolute_before}/{baseline_before},\"\")"
-        ws[weighted_ratio_before] = f"=IFERROR({weighted_before}/{baseline_before},\"\")"
-
-    ws.column_dimensions[header_to_col["Absolute coverage ratio since entry"]].width = 20
-    ws.column_dimensions[header_to_col["Weighted coverage ratio since entry"]].width = 20
-    ws.column_dimensions[header_to_col["Absolute coverage ratio before entry"]].width = 20
-    ws.column_dimensions[header_to_col["Weighted coverage ratio before entry"]].width = 20
-
-    for ratio_header in (
-        "Absolute coverage ratio since entry",
-        "Weighted coverage ratio since entry",
-        "Absolute coverage ratio before entry",
-        "Weighted coverage ratio before entry",
-    ):
-        ratio_col = header_to_col[ratio_header]
-        for row_idx in range(2, max_row + 1):
-            ws[f"{ratio_col}{row_idx}"].number_format = "0%"
+    derived_columns = []
+    for period in ("since", "before"):
+        baseline = header_to_col[f"Months {period} entry baseline"]
+        for metric in ("Absolute", "Weighted"):
+            months = header_to_col[f"{metric} months {period} entry"]
+            derived_columns.append(
+                (header_to_idx[f"{metric} missing months {period} entry"], f"=ROUND({baseline}{{row}}-{months}{{row}},2)", None)
+            )
+            derived_columns.append(
+                (header_to_idx[f"{metric} coverage ratio {period} entry"], f"=IFERROR({months}{{row}}/{baseline}{{row}},\"\")", "0%")
+            )
+    # Every row repeats the same derived formulas, so each column stores its formula once.
+    shared = SharedFormulaColumns()
+    for col_idx, _, _ in derived_columns:
+        shared.add(get_column_letter(col_idx + 1), range(2, max_row + 1), key=col_idx)
+
+    for row_idx, row_values in enumerate(table.rows(), start=2):
+        values: List[object] = list(row_values)
+        for col_idx, template, number_format in derived_columns:
+            formula = shared.formula(col_idx, row_idx, template.format(row=row_idx))
+            values[col_idx] = styled_cell(ws, formula, number_format=number_format) if number_format else formula
+        out.append(values)
 
     return header_to_col, max_row
 
 
 
-def write_lists_sheet(wb: Workbook, rows: Sequence[Sequence[object]], headers: Sequence[str]) -> Dict[str, int]:
+def write_lists_sheet(wb: Workbook, table: SourceTable) -> Dict[str, int]:
     ws = wb.create_sheet("Lists")
     ws.sheet_state = "hidden"
 
-    idx = {h: i for i, h in enumerate(headers)}
     list_defs = [
         ("Metric_type", METRIC_TYPES, "A"),
         ("Department", None, "B"),
@@ -208,27 +593,16 @@ def write_lists_sheet(wb: Workbook, rows: Sequence[Sequence[object]], headers: S
     ]
 
     end_rows: Dict[str, int] = {}
+    columns: List[List[object]] = []
 
     for list_name, static_values, col in list_defs:
-        ws[f"{col}1"] = list_name
-
         if static_values is not None:
             values = list(static_values)
         else:
             source_header = list_name.replace("_", " ")
-            source_idx = idx[source_header]
-            unique = sorted(
-                {
-                    str(row[source_idx]).strip()
-                    for row in rows
-                    if row[source_idx] is not None and str(row[source_idx]).strip() != ""
-                }
-            )
-            values = ["All"] + unique
-
-        for r, value in enumerate(values, start=2):
-            ws[f"{col}{r}"] = value
+            values = ["All"] + table.unique_values(source_header)
 
+        columns.append([list_name] + values)
         end_rows[list_name] = len(values) + 1
 
     set_column_widths(
@@ -246,15 +620,146 @@ def write_lists_sheet(wb: Workbook, rows: Sequence[Sequence[object]], headers: S
         },
     )
 
+    for row_values in zip_longest(*columns):
+        ws.append(list(row_values))
+
     return end_rows
 
 
 
-def write_model_sheet(wb: Workbook, max_raw_row: int, raw_cols: Dict[str, str], list_end_rows: Dict[str, int]) -> None:
+def presorted_anomaly_rows(table: SourceTable, today: date, metric: str) -> List[int]:
+    """Model sheet rows in Rank_key order (anomaly score, later rows first on ties), ignoring filters."""
+    values = compute_model_values(table, today, metric)
+    return sorted(range(2, len(table) + 2), key=lambda r: values[r]["I"] + r / 100000000, reverse=True)
+
+
+
+def segment_order(table: SourceTable) -> Tuple[Dict[str, List[int]], Dict[str, List[Tuple[int, int]]]]:
+    """Per segment dimension, the Model rows grouped by segment and the span of each candidate.
+
+    Consultants whose values compare equal with Excel "=" form one contiguous run, in the
+    order of the candidates (the Lists values) and with unlisted values last. A candidate's
+    span is (consultants before its run, consultants up to its last one), so its counts are
+    the difference of two running sums.
+    """
+    orders: Dict[str, List[int]] = {}
+    spans: Dict[str, List[Tuple[int, int]]] = {}
+    for dimension in SEGMENT_DIMENSIONS:
+        candidates = table.unique_values(dimension)
+        groups: Dict[Tuple[str, object], int] = {}
+        for candidate in candidates:
+            groups.setdefault(excel_key(candidate), len(groups))
+        members: List[List[int]] = [[] for _ in range(len(groups) + 1)]
+        for r, value in enumerate(table.column(dimension), start=2):
+            members[groups.get(excel_key(value), len(groups))].append(r)
+        bounds, order = [], []
+        for rows in members:
+            bounds.append((len(order), len(order) + len(rows)))
+            order.extend(rows)
+        orders[dimension] = order
+        spans[dimension] = [bounds[groups[excel_key(candidate)]] for candidate in candidates]
+    return orders, spans
+
+
+
+def write_segments_sheet(wb: Workbook, table: SourceTable, max_raw_row: int, stream: Optional[StreamedWorkbook] = None) -> int:
+    """Write the running counts the segment hotspot takes its per-segment counts from.
+
+    Rows 3 onward list the Model rows in each dimension's segment order (``segment_order``)
+    with running counts of included and low-coverage consultants in the selected
+    dimension's order; row 2 is the zero they start from. Each candidate segment keeps the
+    sheet rows just before and at the end of its run, so the Model counts it with two
+    lookups and a recalc costs one pass over the consultants plus one step per segment.
+    Returns the last row.
+    """
+    ws = wb.create_sheet("Segments")
+    ws.sheet_state = "hidden"
+    out = stream.stream(ws) if stream else ws
+
+    dimensions = [dimension.replace(" ", "_") for dimension in SEGMENT_DIMENSIONS]
+    out.append(
+        [f"Order_{dimension}" for dimension in dimensions]
+        + ["Selected_row", "Included_running", "Low_running"]
+        + [f"Before_row_{dimension}" for dimension in dimensions]
+        + [f"Last_row_{dimension}" for dimension in dimensions]
+    )
+
+    orders, spans = segment_order(table)
+    dimension_match = "MATCH(Dashboard!$B$11,{\"Department\",\"Team\",\"Unit\",\"Legal entity\",\"Location\",\"Lead\"},0)"
+    model_rows = f"Model!$A$2:$A${max_raw_row}"
+    low_flags = f"Model!$H$2:$H${max_raw_row}"
+    end_row = len(table) + 2
+    shared = SharedFormulaColumns()
+    for col in "GHI":
+        shared.add(col, range(3, end_row + 1))
+    # A dimension without values still gets an empty span, so its lookups stay in range.
+    spans = {dimension: dimension_spans or [(0, 0)] for dimension, dimension_spans in spans.items()}
+    for r in range(2, max(end_row, 1 + max(len(dimension_spans) for dimension_spans in spans.values())) + 1):
+        row: Dict[str, object] = {}
+        if r == 2:
+            row.update({"H": 0, "I": 0})
+        elif r <= end_row:
+            for col, dimension in zip("ABCDEF", SEGMENT_DIMENSIONS):
+                row[col] = orders[dimension][r - 3]
+            row["G"] = f"=INDEX(A{r}:F{r},{dimension_match})"
+            row["H"] = f"=H{r - 1}+INDEX({model_rows},G{r}-1)"
+            row["I"] = f"=I{r - 1}+INDEX({model_rows},G{r}-1)*INDEX({low_flags},G{r}-1)"
+        for before_col, last_col, dimension in zip("JKLMNO", "PQRSTU", SEGMENT_DIMENSIONS):
+            if r - 2 < len(spans[dimension]):
+                before, last = spans[dimension][r - 2]
+                row[before_col], row[last_col] = before + 2, last + 2
+        shared.apply(r, row)
+        out.append([row.get(get_column_letter(c)) for c in range(1, 22)])
+    return end_row
+
+
+
+def write_model_sheet(
+    wb: Workbook,
+    max_raw_row: int,
+    raw_cols: Dict[str, str],
+    list_end_rows: Dict[str, int],
+    mode: str = "formula",
+    model_values: Optional[Dict[int, Dict[str, object]]] = None,
+    segments_end_row: int = 1,
+    presorted_rows: Optional[Dict[str, List[int]]] = None,
+    stream: Optional[StreamedWorkbook] = None,
+) -> None:
     ws = wb.create_sheet("Model")
     ws.sheet_state = "hidden"
+    out = stream.stream(ws) if stream else ws
 
-    ws.append(
+    set_column_widths(
+        ws,
+        {
+            "A": 10,
+            "B": 18,
+            "C": 18,
+            "D": 16,
+            "E": 24,
+            "F": 12,
+            "G": 24,
+            "H": 14,
+            "I": 14,
+            "J": 24,
+            "K": 14,
+            "L": 12,
+            "M": 14,
+            "N": 16,
+            "O": 24,
+            "P": 14,
+            "Q": 12,
+            "R": 16,
+            "S": 16,
+            "T": 16,
+            "U": 16,
+            "V": 16,
+            **{col: 16 for col in LEGACY_LIST_COLUMNS},
+        },
+    )
+    columns = MODEL_COLUMNS + (LEGACY_LIST_COLUMNS if presorted_rows else [])
+
+    out.append(
         [
             "Include",
             "Selected_ratio_since",
@@ -279,10 +784,14 @@ def write_model_sheet(wb: Workbook, max_raw_row: int, raw_cols: Dict[str, str],
             "Weighted_since_included",
             "Weighted_before_included",
         ]
+        + (["Presorted_row_weighted", "Presorted_row_absolute", "Presorted_row", "Presorted_included", "Presorted_running"] if presorted_rows else [])
     )
 
     start_row = 2
     end_row = max_raw_row
+    # Lists rows hold the "All" entry plus the distinct values of each dimension.
+    candidate_end_row = segment_candidate_end_row(list_end_rows[dim.replace(" ", "_")] - 2 for dim in SEGMENT_DIMENSIONS)
+    candidate_keys = f"$N$2:$N${candidate_end_row}"
 
     dep_list = f"Lists!$B$3:$B${max(3, list_end_rows['Department'])}"
     team_list = f"Lists!$C$3:$C${max(3, list_end_rows['Team'])}"
@@ -291,74 +800,9 @@ def write_model_sheet(wb: Workbook, max_raw_row: int, raw_cols: Dict[str, str],
     location_list = f"Lists!$F$3:$F${max(3, list_end_rows['Location'])}"
     lead_list = f"Lists!$G$3:$G${max(3, list_end_rows['Lead'])}"
 
-    for r in range(start_row, end_row + 1):
-        ws[f"A{r}"] = (
-            f"=--(AND("
-            f"OR(Dashboard!$B$4=\"All\",Raw_data!${raw_cols['Department']}{r}=Dashboard!$B$4),"
-            f"OR(Dashboard!$B$5=\"All\",Raw_data!${raw_cols['Team']}{r}=Dashboard!$B$5),"
-            f"OR(Dashboard!$B$6=\"All\",Raw_data!${raw_cols['Unit']}{r}=Dashboard!$B$6),"
-            f"OR(Dashboard!$B$7=\"All\",Raw_data!${raw_cols['Legal entity']}{r}=Dashboard!$B$7),"
-            f"OR(Dashboard!$B$8=\"All\",Raw_data!${raw_cols['Location']}{r}=Dashboard!$B$8),"
-            f"OR(Dashboard!$B$9=\"All\",Raw_data!${raw_cols['Lead']}{r}=Dashboard!$B$9),"
-            f"OR(Dashboard!$B$10=\"All\",Raw_data!${raw_cols['Is available']}{r}=Dashboard!$B$10),"
-            f"OR(Raw_data!${raw_cols['Entry date']}{r}=\"\",Raw_data!${raw_cols['Entry date']}{r}<=TODAY())"
-            f"))"
-        )
-
-        ws[f"B{r}"] = (
-            f"=IFERROR(IF(Dashboard!$B$3=\"Weighted\",Raw_data!${raw_cols['Weighted coverage ratio since entry']}{r},"
-            f"Raw_data!${raw_cols['Absolute coverage ratio since entry']}{r}),\"\")"
-        )
-        ws[f"C{r}"] = (
-            f"=IFERROR(IF(Dashboard!$B$3=\"Weighted\",Raw_data!${raw_cols['Weighted coverage ratio before entry']}{r},"
-            f"Raw_data!${raw_cols['Absolute coverage ratio before entry']}{r}),\"\")"
-        )
-
-        ws[f"D{r}"] = (
-            f"=IF(OR(Raw_data!${raw_cols['Ongoing engagements']}{r}=\"\","
-            f"Raw_data!${raw_cols['Ongoing engagements']}{r}<=0,"
-            f"Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r}=\"\"),\"\","
-            f"IF(Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r}>TODAY(),0,"
-            f"DATEDIF(Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r},TODAY(),\"M\")))"
-        )
-
-        ws[f"E{r}"] = (
-            f"=--(AND(Raw_data!${raw_cols['Is available']}{r}=\"No\","
-            f"OR(Raw_data!${raw_cols['Available from']}{r}<>\"\","
-            f"Raw_data!${raw_cols['Available days per week']}{r}>0,"
-            f"Raw_data!${raw_cols['Availability comment']}{r}<>\"\")))"
-        )
-
-        ws[f"F{r}"] = (
-            f"=--(OR(AND(ISNUMBER(B{r}),B{r}<0.5,OR(D{r}>=24,Raw_data!${raw_cols['Engagements with invalid dates']}{r}>0)),"
-            f"Raw_data!${raw_cols['Is work experience since after entry date']}{r}=TRUE))"
-        )
-
-        ws[f"G{r}"] = (
-            f"=IF(Dashboard!$B$11=\"Department\",Raw_data!${raw_cols['Department']}{r},"
-            f"IF(Dashboard!$B$11=\"Team\",Raw_data!${raw_cols['Team']}{r},"
-            f"IF(Dashboard!$B$11=\"Unit\",Raw_data!${raw_cols['Unit']}{r},"
-            f"IF(Dashboard!$B$11=\"Legal entity\",Raw_data!${raw_cols['Legal entity']}{r},"
-            f"IF(Dashboard!$B$11=\"Location\",Raw_data!${raw_cols['Location']}{r},Raw_data!${raw_cols['Lead']}{r})))))"
-        )
-
-        ws[f"H{r}"] = f"=--(AND(ISNUMBER(B{r}),B{r}<0.5))"
-
-        ws[f"I{r}"] = (
-            f"=IFERROR(MAX(0,(0.5-B{r})*100),0)+"
-            f"IF(D{r}>=24,20,0)+"
-            f"IF(Raw_data!${raw_cols['Engagements with invalid dates']}{r}>0,20,0)+"
-            f"IF(Raw_data!${raw_cols['Is work experience since after entry date']}{r}=TRUE,10,0)"
-        )
-
-        ws[f"R{r}"] = f"=IF(A{r}=1,IFERROR(I{r},0)+ROW()/100000000,-1E+99)"
-        ws[f"S{r}"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Absolute coverage ratio since entry']}{r},\"\"),\"\")"
-        ws[f"T{r}"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Absolute coverage ratio before entry']}{r},\"\"),\"\")"
-        ws[f"U{r}"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Weighted coverage ratio since entry']}{r},\"\"),\"\")"
-        ws[f"V{r}"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Weighted coverage ratio before entry']}{r},\"\"),\"\")"
-
+    dimension_match = "MATCH(Dashboard!$B$11,{\"Department\",\"Team\",\"Unit\",\"Legal entity\",\"Location\",\"Lead\"},0)"
     choose_expr = (
-        "CHOOSE(MATCH(Dashboard!$B$11,{\"Department\",\"Team\",\"Unit\",\"Legal entity\",\"Location\",\"Lead\"},0),"
+        f"CHOOSE({dimension_match},"
         f"INDEX({dep_list},ROW()-1),"
         f"INDEX({team_list},ROW()-1),"
         f"INDEX({unit_list},ROW()-1),"
@@ -367,46 +811,159 @@ def write_model_sheet(wb: Workbook, max_raw_row: int, raw_cols: Dict[str, str],
         f"INDEX({lead_list},ROW()-1))"
     )
 
-    for r in range(2, 1002):
-        ws[f"J{r}"] = f"=IFERROR({choose_expr},\"\")"
-        ws[f"K{r}"] = f"=IF(J{r}=\"\",\"\",SUMPRODUCT(($A$2:$A${end_row}=1)*($G$2:$G${end_row}=J{r})))"
-        ws[f"L{r}"] = f"=IF(J{r}=\"\",\"\",SUMPRODUCT(($A$2:$A${end_row}=1)*($G$2:$G${end_row}=J{r})*(ISNUMBER($B$2:$B${end_row}))*($B$2:$B${end_row}<0.5)))"
-        ws[f"M{r}"] = f"=IFERROR(L{r}/K{r},\"\")"
-        ws[f"N{r}"] = f"=IF(K{r}=\"\",\"\",M{r}+K{r}/100000+ROW()/100000000)"
+    # Candidate segment counts are differences of the running counts on the Segments sheet,
+    # taken at the rows around the candidate's run, so each costs two lookups.
+    seg_end = max(2, segments_end_row)
+    included_running = f"Segments!$H$1:$H${seg_end}"
+    low_running = f"Segments!$I$1:$I${seg_end}"
+    segment_span = "INDEX(Segments!$J{row}:$O{row},{match})", "INDEX(Segments!$P{row}:$U{row},{match})"
+
+    # Per-consultant and candidate formulas only differ in their row, so each column run is
+    # written as one shared formula. Hybrid builds break the Include run where it is a value.
+    shared = SharedFormulaColumns()
+    if mode != "static":
+        consultant_rows = range(start_row, end_row + 1)
+        shared.add(
+            "A",
+            [r for r in consultant_rows if model_values[r]["A"] != 0] if mode == "hybrid" else consultant_rows,
+        )
+        for col in "BCDEFGHIRSTUV":
+            if mode != "hybrid" or col not in HYBRID_VALUE_COLUMNS:
+                shared.add(col, consultant_rows)
+        for col in "JKLMN":
+            shared.add(col, range(start_row, candidate_end_row + 1))
+    if presorted_rows and mode != "static":
+        shared.add("Y", range(start_row, end_row + 1))
+        shared.add("Z", range(start_row, end_row + 1))
+        shared.add("AA", range(start_row + 1, end_row + 1))
+
+    # Write-only sheets are streamed top to bottom, so each row carries its slice of the
+    # per-consultant, candidate-segment and top-10 blocks.
+    presorted_running = 0
+    for r in range(start_row, max(end_row, candidate_end_row, TOP_SEGMENT_END_ROW) + 1):
+        row: Dict[str, object] = {}
+        if presorted_rows and r <= end_row:
+            # The selected metric's presorted order, whether each entry passes the filters, and a
+            # running count of those that do. The running count is sorted, so the Dashboard can
+            # find its n-th consultant with a binary-search MATCH.
+            row["W"] = presorted_rows["Weighted"][r - 2]
+            row["X"] = presorted_rows["Absolute"][r - 2]
+            if mode == "static":
+                # The static Model is evaluated for the default metric and filters only.
+                row["Y"] = presorted_rows[DEFAULT_METRIC_TYPE][r - 2]
+                row["Z"] = model_values[row["Y"]]["A"]
+                presorted_running += row["Z"]
+                row["AA"] = presorted_running
+            else:
+                row["Y"] = f"=IF(Dashboard!$B$3=\"Weighted\",W{r},X{r})"
+                row["Z"] = f"=INDEX($A$2:$A${end_row},Y{r}-1)"
+                row["AA"] = f"=Z{r}" if r == start_row else f"=AA{r - 1}+Z{r}"
+
+        if mode == "static":
+            row.update({col: BLANK_TEXT if value == "" else value for col, value in model_values.get(r, {}).items()})
+            shared.apply(r, row)
+            out.append([row.get(col) for col in columns])
+            continue
+
+        if r <= end_row:
+            # Hybrid mode settles the entry-date check at build time, which keeps the
+            # volatile TODAY() out of the Include column.
+            entry_clause = (
+                ""
+                if mode == "hybrid"
+                else f",OR(Raw_data!${raw_cols['Entry date']}{r}=\"\",Raw_data!${raw_cols['Entry date']}{r}<=TODAY())"
+            )
+            row["A"] = (
+                f"=--(AND("
+                f"OR(Dashboard!$B$4=\"All\",Raw_data!${raw_cols['Department']}{r}=Dashboard!$B$4),"
+                f"OR(Dashboard!$B$5=\"All\",Raw_data!${raw_cols['Team']}{r}=Dashboard!$B$5),"
+                f"OR(Dashboard!$B$6=\"All\",Raw_data!${raw_cols['Unit']}{r}=Dashboard!$B$6),"
+                f"OR(Dashboard!$B$7=\"All\",Raw_data!${raw_cols['Legal entity']}{r}=Dashboard!$B$7),"
+                f"OR(Dashboard!$B$8=\"All\",Raw_data!${raw_cols['Location']}{r}=Dashboard!$B$8),"
+                f"OR(Dashboard!$B$9=\"All\",Raw_data!${raw_cols['Lead']}{r}=Dashboard!$B$9),"
+                f"OR(Dashboard!$B$10=\"All\",Raw_data!${raw_cols['Is available']}{r}=Dashboard!$B$10)"
+                f"{entry_clause}"
+                f"))"
+            )
 
-    for r in range(2, 12):
-        k = r - 1
-        ws[f"O{r}"] = f"=IFERROR(INDEX($J$2:$J$1001,MATCH(LARGE($N$2:$N$1001,{k}),$N$2:$N$1001,0)),\"\")"
-        ws[f"P{r}"] = f"=IFERROR(INDEX($M$2:$M$1001,MATCH(LARGE($N$2:$N$1001,{k}),$N$2:$N$1001,0)),\"\")"
-        ws[f"Q{r}"] = f"=IFERROR(INDEX($K$2:$K$1001,MATCH(LARGE($N$2:$N$1001,{k}),$N$2:$N$1001,0)),\"\")"
+            row["B"] = (
+                f"=IFERROR(IF(Dashboard!$B$3=\"Weighted\",Raw_data!${raw_cols['Weighted coverage ratio since entry']}{r},"
+                f"Raw_data!${raw_cols['Absolute coverage ratio since entry']}{r}),\"\")"
+            )
+            row["C"] = (
+                f"=IFERROR(IF(Dashboard!$B$3=\"Weighted\",Raw_data!${raw_cols['Weighted coverage ratio before entry']}{r},"
+                f"Raw_data!${raw_cols['Absolute coverage ratio before entry']}{r}),\"\")"
+            )
 
-    set_column_widths(
-        ws,
-        {
-            "A": 10,
-            "B": 18,
-            "C": 18,
-            "D": 16,
-            "E": 24,
-            "F": 12,
-            "G": 24,
-            "H": 14,
-            "I": 14,
-            "J": 24,
-            "K": 14,
-            "L": 12,
-            "M": 14,
-            "N": 16,
-            "O": 24,
-            "P": 14,
-            "Q": 12,
-            "R": 16,
-            "S": 16,
-            "T": 16,
-            "U": 16,
-            "V": 16,
-        },
-    )
+            row["D"] = (
+                f"=IF(OR(Raw_data!${raw_cols['Ongoing engagements']}{r}=\"\","
+                f"Raw_data!${raw_cols['Ongoing engagements']}{r}<=0,"
+                f"Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r}=\"\"),\"\","
+                f"IF(Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r}>TODAY(),0,"
+                f"DATEDIF(Raw_data!${raw_cols['Oldest ongoing engagement start date']}{r},TODAY(),\"M\")))"
+            )
+
+            row["E"] = (
+                f"=--(AND(Raw_data!${raw_cols['Is available']}{r}=\"No\","
+                f"OR(Raw_data!${raw_cols['Available from']}{r}<>\"\","
+                f"Raw_data!${raw_cols['Available days per week']}{r}>0,"
+                f"Raw_data!${raw_cols['Availability comment']}{r}<>\"\")))"
+            )
+
+            row["F"] = (
+                f"=--(OR(AND(ISNUMBER(B{r}),B{r}<0.5,OR(D{r}>=24,Raw_data!${raw_cols['Engagements with invalid dates']}{r}>0)),"
+                f"Raw_data!${raw_cols['Is work experience since after entry date']}{r}=TRUE))"
+            )
+
+            row["G"] = (
+                f"=IF(Dashboard!$B$11=\"Department\",Raw_data!${raw_cols['Department']}{r},"
+                f"IF(Dashboard!$B$11=\"Team\",Raw_data!${raw_cols['Team']}{r},"
+                f"IF(Dashboard!$B$11=\"Unit\",Raw_data!${raw_cols['Unit']}{r},"
+                f"IF(Dashboard!$B$11=\"Legal entity\",Raw_data!${raw_cols['Legal entity']}{r},"
+                f"IF(Dashboard!$B$11=\"Location\",Raw_data!${raw_cols['Location']}{r},Raw_data!${raw_cols['Lead']}{r})))))"
+            )
+
+            row["H"] = f"=--(AND(ISNUMBER(B{r}),B{r}<0.5))"
+
+            row["I"] = (
+                f"=IFERROR(MAX(0,(0.5-B{r})*100),0)+"
+                f"IF(D{r}>=24,20,0)+"
+                f"IF(Raw_data!${raw_cols['Engagements with invalid dates']}{r}>0,20,0)+"
+                f"IF(Raw_data!${raw_cols['Is work experience since after entry date']}{r}=TRUE,10,0)"
+            )
+
+            row["R"] = f"=IF(A{r}=1,IFERROR(I{r},0)+ROW()/100000000,-1E+99)"
+            row["S"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Absolute coverage ratio since entry']}{r},\"\"),\"\")"
+            row["T"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Absolute coverage ratio before entry']}{r},\"\"),\"\")"
+            row["U"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Weighted coverage ratio since entry']}{r},\"\"),\"\")"
+            row["V"] = f"=IF(A{r}=1,IFERROR(Raw_data!${raw_cols['Weighted coverage ratio before entry']}{r},\"\"),\"\")"
+
+            if mode == "hybrid":
+                computed = model_values[r]
+                for col in HYBRID_VALUE_COLUMNS:
+                    row[col] = BLANK_TEXT if computed[col] == "" else computed[col]
+                # With every filter on "All", Include only fails on a future entry date.
+                if computed["A"] == 0:
+                    row["A"] = 0
+
+        if r <= candidate_end_row:
+            row["J"] = f"=IFERROR({choose_expr},\"\")"
+            before, last = (bound.format(row=r, match=dimension_match) for bound in segment_span)
+            row["K"] = f"=IF(J{r}=\"\",\"\",INDEX({included_running},{last})-INDEX({included_running},{before}))"
+            row["L"] = f"=IF(J{r}=\"\",\"\",INDEX({low_running},{last})-INDEX({low_running},{before}))"
+            row["M"] = f"=IFERROR(L{r}/K{r},\"\")"
+            # Segments emptied by the filters rank nowhere; an error here would blank the whole Top 10.
+            row["N"] = f"=IF(OR(K{r}=\"\",K{r}=0),\"\",M{r}+K{r}/100000+ROW()/100000000)"
+
+        if r <= TOP_SEGMENT_END_ROW:
+            k = r - 1
+            top_match = f"MATCH(LARGE({candidate_keys},{k}),{candidate_keys},0)"
+            row["O"] = f"=IFERROR(INDEX($J$2:$J${candidate_end_row},{top_match}),\"\")"
+            row["P"] = f"=IFERROR(INDEX($M$2:$M${candidate_end_row},{top_match}),\"\")"
+            row["Q"] = f"=IFERROR(INDEX($K$2:$K${candidate_end_row},{top_match}),\"\")"
+
+        shared.apply(r, row)
+        out.append([row.get(col) for col in columns])
 
 
 
@@ -416,7 +973,7 @@ def add_dropdown(ws, cell: str, formula: str) -> None:
     dv.errorTitle = "Invalid selection"
     dv.prompt = "Choose a filter value"
     dv.promptTitle = "Filter"
-    ws.add_data_validation(dv)
+    ws.data_validations.append(dv)
     dv.add(cell)
 
 
@@ -479,12 +1036,28 @@ def add_comments(ws) -> None:
 
 
 
-def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[str, int], raw_cols: Dict[str, str]) -> None:
+def write_dashboard_sheet(
+    wb: Workbook,
+    max_raw_row: int,
+    list_end_rows: Dict[str, int],
+    raw_cols: Dict[str, str],
+    static_as_of: Optional[date] = None,
+    list_backend: str = "legacy",
+    presorted: bool = True,
+) -> None:
     ws = wb.create_sheet("Dashboard")
     ws.sheet_view.showGridLines = False
+    cells = SheetBuffer(ws)
+
+    cells["A1"] = "Internal Consultant Data Quality Dashboard"
+    cells["A1"].font = Font(size=18, bold=True, color="1F4E78")
 
-    ws["A1"] = "Internal Consultant Data Quality Dashboard"
-    ws["A1"].font = Font(size=18, bold=True, color="1F4E78")
+    if static_as_of is not None:
+        cells["A2"] = (
+            f"Static snapshot for the default filters as of {static_as_of.isoformat()}. "
+            "Filter changes have no effect; rebuild with --mode hybrid or formula to filter."
+        )
+        cells["A2"].font = Font(italic=True, color="7F7F7F")
 
     # Filter panel
     labels = [
@@ -499,18 +1072,18 @@ def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[st
         "Segment_dimension",
     ]
     for row, label in enumerate(labels, start=3):
-        ws[f"A{row}"] = label
-        ws[f"A{row}"].font = Font(bold=True, color="1F4E78")
-
-    ws["B3"] = "Weighted"
-    ws["B4"] = "All"
-    ws["B5"] = "All"
-    ws["B6"] = "All"
-    ws["B7"] = "All"
-    ws["B8"] = "All"
-    ws["B9"] = "All"
-    ws["B10"] = "All"
-    ws["B11"] = "Department"
+        cells[f"A{row}"] = label
+        cells[f"A{row}"].font = Font(bold=True, color="1F4E78")
+
+    cells["B3"] = DEFAULT_METRIC_TYPE
+    cells["B4"] = "All"
+    cells["B5"] = "All"
+    cells["B6"] = "All"
+    cells["B7"] = "All"
+    cells["B8"] = "All"
+    cells["B9"] = "All"
+    cells["B10"] = "All"
+    cells["B11"] = DEFAULT_SEGMENT_DIMENSION
 
     add_dropdown(ws, "B3", "=Lists!$A$2:$A$3")
     add_dropdown(ws, "B4", f"=Lists!$B$2:$B${list_end_rows['Department']}")
@@ -523,116 +1096,107 @@ def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[st
     add_dropdown(ws, "B11", f"=Lists!$I$2:$I${list_end_rows['Segment_dimension']}")
 
     for cell in ["B3", "B4", "B5", "B6", "B7", "B8", "B9", "B10", "B11"]:
-        ws[cell].fill = PatternFill(fill_type="solid", start_color="E8F1FA", end_color="E8F1FA")
+        cells[cell].fill = PatternFill(fill_type="solid", start_color="E8F1FA", end_color="E8F1FA")
 
-    ws["D3"] = "Selected metric"
-    ws["E3"] = "=B3"
-    ws["D3"].font = Font(bold=True)
-    ws["E3"].font = Font(bold=True, color="1F4E78")
+    cells["D3"] = "Selected metric"
+    cells["E3"] = "=B3"
+    cells["D3"].font = Font(bold=True)
+    cells["E3"].font = Font(bold=True, color="1F4E78")
 
     end_row = max_raw_row
 
     # KPI block
-    ws["D5"] = "Consultants (filtered)"
-    ws["E5"] = f"=SUM(Model!$A$2:$A${end_row})"
-
-    ws["D6"] = "Weighted median since entry"
-    ws["E6"] = f"=IFERROR(MEDIAN(Model!$U$2:$U${end_row}),\"\")"
-
-    ws["D7"] = "Absolute median since entry"
-    ws["E7"] = f"=IFERROR(MEDIAN(Model!$S$2:$S${end_row}),\"\")"
-
-    ws["D8"] = "Weighted median before entry"
-    ws["E8"] = f"=IFERROR(MEDIAN(Model!$V$2:$V${end_row}),\"\")"
-
-    ws["D9"] = "Absolute median before entry"
-    ws["E9"] = f"=IFERROR(MEDIAN(Model!$T$2:$T${end_row}),\"\")"
-
-    ws["H5"] = "Ongoing >=24 months"
-    ws["I5"] = (
-        f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)"
-        f"*(Raw_data!${raw_cols['Ongoing engagements']}$2:${raw_cols['Ongoing engagements']}${end_row}>0)"
-        f"*(Model!$D$2:$D${end_row}>=24))"
+    cells["D5"] = "Consultants (filtered)"
+    cells["E5"] = f"=SUM(Model!$A$2:$A${end_row})"
+
+    cells["D6"] = "Weighted median since entry"
+    cells["E6"] = f"=IFERROR(MEDIAN(Model!$U$2:$U${end_row}),\"\")"
+
+    cells["D7"] = "Absolute median since entry"
+    cells["E7"] = f"=IFERROR(MEDIAN(Model!$S$2:$S${end_row}),\"\")"
+
+    cells["D8"] = "Weighted median before entry"
+    cells["E8"] = f"=IFERROR(MEDIAN(Model!$V$2:$V${end_row}),\"\")"
+
+    cells["D9"] = "Absolute median before entry"
+    cells["E9"] = f"=IFERROR(MEDIAN(Model!$T$2:$T${end_row}),\"\")"
+
+    # COUNTIFS keeps the KPI and band cells to one streaming pass over the Model columns
+    # instead of materializing SUMPRODUCT arrays.
+    included = f"Model!$A$2:$A${end_row},1"
+    ongoing_col = raw_cols["Ongoing engagements"]
+    with_ongoing = f"Raw_data!${ongoing_col}$2:${ongoing_col}${end_row},\">0\""
+    ongoing_age = f"Model!$D$2:$D${end_row}"
+    # An empty Ongoing_age_months (no oldest start date) is text, which Excel ranks above 24;
+    # it counts as stale here just like in the Model anomaly flag.
+    stale_ongoing = (
+        f"=COUNTIFS({included},{with_ongoing},{ongoing_age},\">=24\")"
+        f"+COUNTIFS({included},{with_ongoing},{ongoing_age},\"\")"
     )
 
-    ws["H6"] = "Invalid-date consultants"
-    ws["I6"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Raw_data!$I$2:$I${end_row}>0))"
+    cells["H5"] = "Ongoing >=24 months"
+    cells["I5"] = stale_ongoing
+
+    cells["H6"] = "Invalid-date consultants"
+    invalid_col = raw_cols["Engagements with invalid dates"]
+    cells["I6"] = f"=COUNTIFS({included},Raw_data!${invalid_col}$2:${invalid_col}${end_row},\">0\")"
 
-    ws["H7"] = "Anomaly consultants"
-    ws["I7"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$F$2:$F${end_row}=1))"
+    cells["H7"] = "Anomaly consultants"
+    cells["I7"] = f"=COUNTIFS({included},Model!$F$2:$F${end_row},1)"
 
     for row in range(5, 10):
-        ws[f"D{row}"].font = Font(bold=True)
+        cells[f"D{row}"].font = Font(bold=True)
     for row in range(5, 8):
-        ws[f"H{row}"].font = Font(bold=True)
+        cells[f"H{row}"].font = Font(bold=True)
     for c in ["E6", "E7", "E8", "E9"]:
-        ws[c].number_format = "0.00"
+        cells[c].number_format = "0.00"
 
     # Band tables
-    ws["A13"] = "Coverage since entry bands"
-    ws["A13"].font = Font(bold=True, color="1F4E78")
-    ws["B13"] = "Consultants"
-
-    ws["D13"] = "Coverage before entry bands"
-    ws["D13"].font = Font(bold=True, color="1F4E78")
-    ws["E13"] = "Consultants"
-
-    ws["H13"] = "Ongoing age buckets"
-    ws["H13"].font = Font(bold=True, color="1F4E78")
-    ws["I13"] = "Consultants"
-
-    bands = ["<0.3", "0.3-0.49", "0.5-0.79", ">=0.8"]
-    for i, band in enumerate(bands, start=14):
-        ws[f"A{i}"] = band
-        ws[f"D{i}"] = band
-
-    ws["B14"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$B$2:$B${end_row}<0.3)*(ISNUMBER(Model!$B$2:$B${end_row})))"
-    ws["B15"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$B$2:$B${end_row}>=0.3)*(Model!$B$2:$B${end_row}<0.5))"
-    ws["B16"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$B$2:$B${end_row}>=0.5)*(Model!$B$2:$B${end_row}<0.8))"
-    ws["B17"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(ISNUMBER(Model!$B$2:$B${end_row}))*(Model!$B$2:$B${end_row}>=0.8))"
-
-    ws["E14"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$C$2:$C${end_row}<0.3)*(ISNUMBER(Model!$C$2:$C${end_row})))"
-    ws["E15"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$C$2:$C${end_row}>=0.3)*(Model!$C$2:$C${end_row}<0.5))"
-    ws["E16"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(Model!$C$2:$C${end_row}>=0.5)*(Model!$C$2:$C${end_row}<0.8))"
-    ws["E17"] = f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)*(ISNUMBER(Model!$C$2:$C${end_row}))*(Model!$C$2:$C${end_row}>=0.8))"
-
-    ws["H14"] = "<12m"
-    ws["H15"] = "12-24m"
-    ws["H16"] = ">24m"
-    ws["I14"] = (
-        f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)"
-        f"*(Raw_data!${raw_cols['Ongoing engagements']}$2:${raw_cols['Ongoing engagements']}${end_row}>0)"
-        f"*(Model!$D$2:$D${end_row}<>\"\")*(Model!$D$2:$D${end_row}<12))"
-    )
-    ws["I15"] = (
-        f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)"
-        f"*(Raw_data!${raw_cols['Ongoing engagements']}$2:${raw_cols['Ongoing engagements']}${end_row}>0)"
-        f"*(Model!$D$2:$D${end_row}>=12)*(Model!$D$2:$D${end_row}<24))"
-    )
-    ws["I16"] = (
-        f"=SUMPRODUCT((Model!$A$2:$A${end_row}=1)"
-        f"*(Raw_data!${raw_cols['Ongoing engagements']}$2:${raw_cols['Ongoing engagements']}${end_row}>0)"
-        f"*(Model!$D$2:$D${end_row}>=24))"
-    )
+    cells["A13"] = "Coverage since entry bands"
+    cells["A13"].font = Font(bold=True, color="1F4E78")
+    cells["B13"] = "Consultants"
+
+    cells["D13"] = "Coverage before entry bands"
+    cells["D13"].font = Font(bold=True, color="1F4E78")
+    cells["E13"] = "Consultants"
+
+    cells["H13"] = "Ongoing age buckets"
+    cells["H13"].font = Font(bold=True, color="1F4E78")
+    cells["I13"] = "Consultants"
+
+    for i, band in enumerate(COVERAGE_BANDS, start=14):
+        cells[f"A{i}"] = band
+        cells[f"D{i}"] = band
+
+    band_criteria = ['"<0.3"', '">=0.3",{ratio},"<0.5"', '">=0.5",{ratio},"<0.8"', '">=0.8"']
+    for i, criteria in enumerate(band_criteria, start=14):
+        for col, ratio in (("B", f"Model!$B$2:$B${end_row}"), ("E", f"Model!$C$2:$C${end_row}")):
+            cells[f"{col}{i}"] = f"=COUNTIFS({included},{ratio},{criteria.format(ratio=ratio)})"
+
+    for i, bucket in enumerate(ONGOING_AGE_BUCKETS, start=14):
+        cells[f"H{i}"] = bucket
+    cells["I14"] = f"=COUNTIFS({included},{with_ongoing},{ongoing_age},\"<12\")"
+    cells["I15"] = f"=COUNTIFS({included},{with_ongoing},{ongoing_age},\">=12\",{ongoing_age},\"<24\")"
+    cells["I16"] = stale_ongoing
 
     # Segment table (Top 10)
-    ws["A21"] = "Segment hotspot (Top 10 by low coverage rate)"
-    ws["A21"].font = Font(bold=True, color="1F4E78")
-    ws["A22"] = "Segment"
-    ws["B22"] = "Low coverage rate"
-    ws["C22"] = "Consultants"
+    cells["A21"] = "Segment hotspot (Top 10 by low coverage rate)"
+    cells["A21"].font = Font(bold=True, color="1F4E78")
+    cells["A22"] = "Segment"
+    cells["B22"] = "Low coverage rate"
+    cells["C22"] = "Consultants"
 
     for row in range(23, 33):
         source = row - 21
-        ws[f"A{row}"] = f"=Model!$O${source}"
-        ws[f"B{row}"] = f"=Model!$P${source}"
-        ws[f"C{row}"] = f"=Model!$Q${source}"
-        ws[f"B{row}"].number_format = "0.0%"
-        ws[f"X{row}"] = f"=IF(LEN(A{row})<=26,A{row},LEFT(A{row},23)&\"...\")"
+        cells[f"A{row}"] = f"=Model!$O${source}"
+        cells[f"B{row}"] = f"=Model!$P${source}"
+        cells[f"C{row}"] = f"=Model!$Q${source}"
+        cells[f"B{row}"].number_format = "0.0%"
+        cells[f"X{row}"] = f"=IF(LEN(A{row})<=26,A{row},LEFT(A{row},23)&\"...\")"
 
     # Ranked consultant list (all selected)
-    ws["A35"] = "Filtered consultant list (anomaly-first order)"
-    ws["A35"].font = Font(bold=True, color="1F4E78")
+    cells["A35"] = "Filtered consultant list (anomaly-first order)"
+    cells["A35"].font = Font(bold=True, color="1F4E78")
 
     headers = [
         "Full_name",
@@ -647,35 +1211,26 @@ def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[st
         "Ongoing_age_m",
     ]
     for idx, header in enumerate(headers, start=1):
-        ws.cell(row=36, column=idx, value=header)
-        ws.cell(row=36, column=idx).font = Font(bold=True, color="FFFFFF")
-        ws.cell(row=36, column=idx).fill = PatternFill(fill_type="solid", start_color="1F4E78", end_color="1F4E78")
+        cells.cell(row=36, column=idx, value=header)
+        cells.cell(row=36, column=idx).font = Font(bold=True, color="FFFFFF")
+        cells.cell(row=36, column=idx).fill = PatternFill(fill_type="solid", start_color="1F4E78", end_color="1F4E78")
 
-    ws["K36"] = "rank_key"
+    cells["K36"] = "model_row"
 
     data_start = 37
     data_end = data_start + (end_row - 2)
-
-    for row in range(data_start, data_end + 1):
-        rank = row - 36
-        ws[f"K{row}"] = f"=IF({rank}<=$E$5,LARGE(Model!$R$2:$R${end_row},{rank}),\"\")"
-        ws[f"A{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!$D$2:$D${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"B{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!${raw_cols['Entry date']}$2:${raw_cols['Entry date']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"C{row}"] = (
-            f"=IF($K{row}=\"\",\"\","
-            f"HYPERLINK(INDEX(Raw_data!${raw_cols['Url']}$2:${raw_cols['Url']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)),"
-            f"INDEX(Raw_data!${raw_cols['Url']}$2:${raw_cols['Url']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0))))"
-        )
-        ws[f"D{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!${raw_cols['Department']}$2:${raw_cols['Department']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"E{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!${raw_cols['Team']}$2:${raw_cols['Team']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"F{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!${raw_cols['Lead']}$2:${raw_cols['Lead']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"G{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Raw_data!${raw_cols['Total engagements']}$2:${raw_cols['Total engagements']}${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"H{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Model!$B$2:$B${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"I{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Model!$C$2:$C${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"J{row}"] = f"=IF($K{row}=\"\",\"\",INDEX(Model!$D$2:$D${end_row},MATCH($K{row},Model!$R$2:$R${end_row},0)))"
-        ws[f"B{row}"].number_format = "yyyy-mm-dd"
-        ws[f"H{row}"].number_format = "0.00"
-        ws[f"I{row}"].number_format = "0.00"
+    list_columns = [
+        ("A", f"Raw_data!$D$2:$D${end_row}", None),
+        ("B", f"Raw_data!${raw_cols['Entry date']}$2:${raw_cols['Entry date']}${end_row}", "yyyy-mm-dd"),
+        ("C", f"Raw_data!${raw_cols['Url']}$2:${raw_cols['Url']}${end_row}", None),
+        ("D", f"Raw_data!${raw_cols['Department']}$2:${raw_cols['Department']}${end_row}", None),
+        ("E", f"Raw_data!${raw_cols['Team']}$2:${raw_cols['Team']}${end_row}", None),
+        ("F", f"Raw_data!${raw_cols['Lead']}$2:${raw_cols['Lead']}${end_row}", None),
+        ("G", f"Raw_data!${raw_cols['Total engagements']}$2:${raw_cols['Total engagements']}${end_row}", None),
+        ("H", f"Model!$B$2:$B${end_row}", "0.00"),
+        ("I", f"Model!$C$2:$C${end_row}", "0.00"),
+        ("J", f"Model!$D$2:$D${end_row}", None),
+    ]
 
     ws.conditional_formatting.add(
         "B14:B17",
@@ -686,8 +1241,6 @@ def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[st
         CellIsRule(operator="greaterThan", formula=["0"], stopIfTrue=False, fill=PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")),
     )
 
-    add_comments(ws)
-
     set_column_widths(
         ws,
         {
@@ -731,6 +1284,44 @@ def write_dashboard_sheet(wb: Workbook, max_raw_row: int, list_end_rows: Dict[st
     for col in ["K", "X", "Y", "Z", "AA", "AB", "AC", "AD", "AE", "AF", "AG", "AH"]:
         ws.column_dimensions[col].hidden = True
 
+    add_comments(cells)
+    cells.flush()
+
+    # The ranked list is the only block that grows with the tenant, so it is streamed row by row.
+    # Column K holds the Model row of each rank; the visible columns are plain INDEX lookups.
+    rank_keys = f"Model!$R$2:$R${end_row}"
+    if list_backend == "excel365" and data_end >= data_start:
+        # One array formula over K sorts once per recalc. INDEX pads the shorter filtered
+        # result to the fixed range with errors, which IFERROR turns into empty rows.
+        included = f"Model!$A$2:$A${end_row}=1"
+        ranked_rows = (
+            f"_xlfn.SORTBY(_xlfn._xlws.FILTER(ROW({rank_keys}),{included}),_xlfn._xlws.FILTER({rank_keys},{included}),-1)"
+        )
+        model_rows = ArrayFormula(
+            f"K{data_start}:K{data_end}", f"=IFERROR(INDEX({ranked_rows},ROW(K{data_start}:K{data_end})-{data_start - 1}),\"\")"
+        )
+    for row in range(data_start, data_end + 1):
+        rank = row - 36
+        values: List[object] = []
+        for col, source, number_format in list_columns:
+            value = f"INDEX({source},$K{row}-1)"
+            if col == "C":
+                value = f"HYPERLINK({value},{value})"
+            formula = f"=IF($K{row}=\"\",\"\",{value})"
+            values.append(styled_cell(ws, formula, number_format=number_format) if number_format else formula)
+        if list_backend == "excel365":
+            values.append(model_rows if row == data_start else None)
+        elif presorted:
+            # The n-th included consultant sits right after the last running count below n.
+            values.append(
+                f"=IF({rank}<=$E$5,INDEX(Model!$Y$2:$Y${end_row},"
+                f"IFERROR(MATCH({rank - 1},Model!$AA$2:$AA${end_row},1),0)+1),\"\")"
+            )
+        else:
+            # No build-time order: the n-th largest live Rank_key and its Model row.
+            values.append(f"=IF({rank}<=$E$5,MATCH(LARGE({rank_keys},{rank}),{rank_keys},0)+1,\"\")")
+        ws.append(values)
+
     add_dashboard_charts(ws)
 
 
@@ -805,23 +1396,100 @@ def add_dashboard_charts(ws) -> None:
 
 
 
-def build_dashboard(input_path: Path, output_path: Path) -> Path:
-    headers, rows = load_source(input_path)
+def build_dashboard(
+    input_path: Path,
+    output_path: Path,
+    mode: str = "formula",
+    today: Optional[date] = None,
+    list_backend: str = "legacy",
+    writer: str = "openpyxl",
+    cache_dir: Optional[Path] = None,
+    hooks: Optional[BuildHooks] = None,
+) -> Path:
+    if mode not in BUILD_MODES:
+        raise ValueError(f"Unknown build mode {mode!r}; expected one of {BUILD_MODES}")
+    if list_backend not in LIST_BACKENDS:
+        raise ValueError(f"Unknown list backend {list_backend!r}; expected one of {LIST_BACKENDS}")
+    if writer not in SHEET_WRITERS:
+        raise ValueError(f"Unknown sheet writer {writer!r}; expected one of {SHEET_WRITERS}")
+    hooks = hooks or BuildHooks()
+    hooks.build_started()
+    built = None
+    try:
+        with build_stage(hooks, "load_source"):
+            table = load_source(input_path, cache_dir)
+        today = today or date.today()
+        with build_stage(hooks, "source_loaded"):
+            hooks.source_loaded(table, today)
+        model_values = None
+        if mode != "formula":
+            with build_stage(hooks, "compute_model_values"):
+                model_values = compute_model_values(table, today)
+
+        # Write-only mode streams every sheet to disk as it is built instead of holding
+        # a second full cell graph next to the parsed source rows.
+        wb = Workbook(write_only=True)
+        wb.calculation.fullCalcOnLoad = True
+        # Forcing a full recalculation on every edit is only needed while the Model is volatile;
+        # hybrid and static builds keep TODAY() out of it and let Excel recalc incrementally.
+        wb.calculation.forceFullCalc = mode == "formula"
+        # The streamed sheets skip openpyxl's per-cell objects; the rest of the workbook
+        # (Lists, Segments, the Dashboard with its charts, validation and comments) is unchanged.
+        stream = StreamedWorkbook(wb) if writer == "stream" else None
+
+        with build_stage(hooks, "write_raw_data_sheet", "Raw_data"):
+            raw_cols, max_raw_row = write_raw_data_sheet(wb, table, stream)
+        with build_stage(hooks, "write_lists_sheet", "Lists"):
+            list_end_rows = write_lists_sheet(wb, table)
+        # Static builds write the segment counts as values and need no lookup table.
+        segments_end_row = 1
+        if mode != "static":
+            with build_stage(hooks, "write_segments_sheet", "Segments"):
+                segments_end_row = write_segments_sheet(wb, table, max_raw_row, stream)
+        # Formula builds derive Ongoing_age (and so the anomaly score) from TODAY(), which
+        # would leave an order sorted on the build date stale once the workbook is reopened.
+        presorted_rows = None
+        if list_backend == "legacy" and mode != "formula":
+            with build_stage(hooks, "presorted_anomaly_rows"):
+                presorted_rows = {metric: presorted_anomaly_rows(table, today, metric) for metric in METRIC_TYPES}
+        with build_stage(hooks, "write_model_sheet", "Model"):
+            write_model_sheet(wb, max_raw_row, raw_cols, list_end_rows, mode, model_values, segments_end_row, presorted_rows, stream)
+        with build_stage(hooks, "write_dashboard_sheet", "Dashboard"):
+            write_dashboard_sheet(
+                wb,
+                max_raw_row,
+                list_end_rows,
+                raw_cols,
+                static_as_of=today if mode == "static" else None,
+                list_backend=list_backend,
+                presorted=presorted_rows is not None,
+            )
 
-    wb = Workbook()
-    wb.calculation.fullCalcOnLoad = True
-    wb.calculation.forceFullCalc = True
+        with build_stage(hooks, "sheets_written"):
+            hooks.sheets_written(wb)
+        wb.active = wb["Dashboard"]
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with build_stage(hooks, "save"):
+            if stream:
+                stream.save(output_path)
+            else:
+                wb.save(output_path)
+        built = output_path
+    finally:
+        hooks.build_finished(built)
+    return output_path
 
-    raw_cols, max_raw_row = write_raw_data_sheet(wb, headers, rows)
-    list_end_rows = write_lists_sheet(wb, rows, headers)
-    write_model_sheet(wb, max_raw_row, raw_cols, list_end_rows)
-    write_dashboard_sheet(wb, max_raw_row, list_end_rows, raw_cols)
 
-    wb.active = wb["Dashboard"]
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    wb.save(output_path)
-    return output_path
+@contextmanager
+def build_stage(hooks: BuildHooks, name: str, sheet: Optional[str] = None):
+    """Report one build stage, and the sheet it writes, to ``hooks``."""
+    hooks.stage_started(name, sheet)
+    try:
+        yield
+    finally:
+        hooks.stage_finished(name, sheet)
 
 
 
@@ -835,8 +1503,49 @@ def main() -> None:
     if not input_path.exists():
         raise FileNotFoundError(f"Input workbook not found: {input_path}")
 
-    created = build_dashboard(input_path, output_path)
+    if args.trends and not args.snapshot_dir:
+        raise SystemExit("--trends needs --snapshot-dir")
+    for flag, given in (("--profile-memory", args.profile_memory), ("--cprofile", args.cprofile)):
+        if given and not args.profile:
+            raise SystemExit(f"{flag} needs --profile")
+    profiler = recorder = None
+    if args.profile:
+        profiler = BuildProfiler(
+            trace_memory=args.profile_memory,
+            cprofile_path=sidecar_path(output_path, CPROFILE_SUFFIX) if args.cprofile else None,
+        )
+    if args.snapshot_dir:
+        # Imported here because the snapshot module itself builds on this one.
+        if __package__:
+            from .data_quality_snapshots import SnapshotRecorder, SnapshotStore, tenant_from_path
+        else:
+            from data_quality_snapshots import SnapshotRecorder, SnapshotStore, tenant_from_path
+        store = SnapshotStore(Path(args.snapshot_dir).expanduser())
+        recorder = SnapshotRecorder(store, args.tenant or tenant_from_path(input_path), trends_sheet=args.trends)
+    created = build_dashboard(
+        input_path,
+        output_path,
+        mode=args.mode,
+        today=args.today,
+        list_backend=args.list_backend,
+        writer=args.writer,
+        cache_dir=None if args.no_cache else Path(args.cache_dir).expanduser(),
+        hooks=HookList(profiler, recorder),
+    )
     print(f"Created dashboard workbook: {created}")
+    if recorder:
+        print(f"Stored snapshot: {recorder.snapshot_path}")
+    if profiler:
+        details = {
+            "input": str(input_path),
+            "mode": args.mode,
+            "list_backend": args.list_backend,
+            "writer": args.writer,
+            "memory_traced": args.profile_memory,
+        }
+        profile_path = profiler.write(sidecar_path(created), **details)
+        print(format_stages(list(profiler.stages.values())))
+        print(f"Wrote build profile: {profile_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,231 @@
+"""Stage hooks for the dashboard build and a profiler that records them.
+
+``build_dashboard`` reports the start and end of each of its stages to a ``BuildHooks``
+object. ``BuildProfiler`` uses them to record wall time per stage, optionally memory
+allocated per stage (through tracemalloc, which slows the build several times over, so the
+wall times of such a run are not comparable) and cProfile over the whole build, and counts
+the cells and formulas of each written sheet once the workbook is saved. The result is a
+JSON-ready dict, written next to the workbook by the builder's ``--profile`` flag.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import time
+import tracemalloc
+import zipfile
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+if __package__:
+    from .xlsx_stream_writer import worksheet_parts
+else:
+    from xlsx_stream_writer import worksheet_parts
+
+PROFILE_SUFFIX = ".profile.json"
+CPROFILE_SUFFIX = ".pstats"
+# Cell and formula elements of sheet XML; "<c " and "<f " skip <cols>, <cfRule>, <filterColumn>, <formula1>.
+CELL_TOKENS = (b"<c ",)
+FORMULA_TOKENS = (b"<f>", b"<f ")
+READ_CHUNK = 1 << 20
+
+
+class BuildHooks:
+    """Callbacks for the stages of one dashboard build; override the ones you need."""
+
+    def build_started(self) -> None:
+        pass
+
+    def stage_started(self, name: str, sheet: Optional[str] = None) -> None:
+        pass
+
+    def stage_finished(self, name: str, sheet: Optional[str] = None) -> None:
+        pass
+
+    def source_loaded(self, table, today: date) -> None:
+        """Called with the parsed export and the build date before any sheet is written."""
+
+    def sheets_written(self, wb) -> None:
+        """Called before the save; sheets created here are appended to the workbook."""
+
+    def build_finished(self, output_path: Optional[Path]) -> None:
+        """Called after the save, or with ``None`` when the build failed."""
+
+
+class HookList(BuildHooks):
+    """Forward every callback to several hooks, in order."""
+
+    def __init__(self, *hooks: BuildHooks) -> None:
+        self.hooks = [hook for hook in hooks if hook is not None]
+
+    def build_started(self) -> None:
+        for hook in self.hooks:
+            hook.build_started()
+
+    def stage_started(self, name: str, sheet: Optional[str] = None) -> None:
+        for hook in self.hooks:
+            hook.stage_started(name, sheet)
+
+    def stage_finished(self, name: str, sheet: Optional[str] = None) -> None:
+        for hook in self.hooks:
+            hook.stage_finished(name, sheet)
+
+    def source_loaded(self, table, today: date) -> None:
+        for hook in self.hooks:
+            hook.source_loaded(table, today)
+
+    def sheets_written(self, wb) -> None:
+        for hook in self.hooks:
+            hook.sheets_written(wb)
+
+    def build_finished(self, output_path: Optional[Path]) -> None:
+        for hook in self.hooks:
+            hook.build_finished(output_path)
+
+
+@dataclass
+class StageProfile:
+    name: str
+    sheet: Optional[str] = None
+    calls: int = 0
+    seconds: float = 0.0
+    # Memory still held when the stage ended, and the stage's highest point, both relative
+    # to where it started (tracemalloc, Python allocations only).
+    allocated_mb: Optional[float] = None
+    peak_mb: Optional[float] = None
+    cells: Optional[int] = None
+    formulas: Optional[int] = None
+
+
+def count_tokens(handle, tokens) -> Dict[bytes, int]:
+    """Occurrences of each token in a binary stream, read in chunks."""
+    counts = dict.fromkeys(tokens, 0)
+    overlap = max(len(token) for token in tokens) - 1
+    tail = b""
+    for chunk in iter(lambda: handle.read(READ_CHUNK), b""):
+        data = tail + chunk
+        for token in tokens:
+            # Matches ending inside the carried-over tail were counted with the previous chunk.
+            counts[token] += data.count(token) - tail.count(token)
+        tail = data[-overlap:]
+    return counts
+
+
+def sheet_counts(workbook_path: Path) -> Dict[str, Dict[str, int]]:
+    """Cells and formulas written to each worksheet of a saved workbook."""
+    counts = {}
+    with zipfile.ZipFile(workbook_path) as package:
+        for title, part in worksheet_parts(package).items():
+            with package.open(part) as handle:
+                found = count_tokens(handle, CELL_TOKENS + FORMULA_TOKENS)
+            counts[title] = {
+                "cells": sum(found[token] for token in CELL_TOKENS),
+                "formulas": sum(found[token] for token in FORMULA_TOKENS),
+            }
+    return counts
+
+
+class BuildProfiler(BuildHooks):
+    """Record time, allocations and output size per build stage."""
+
+    def __init__(self, trace_memory: bool = False, count_cells: bool = True, cprofile_path: Optional[Path] = None) -> None:
+        self.trace_memory = trace_memory
+        self.count_cells = count_cells
+        self.cprofile_path = cprofile_path
+        self.stages: Dict[str, StageProfile] = {}
+        self.sheets: Dict[str, Dict[str, int]] = {}
+        self.seconds = 0.0
+        self.peak_mb: Optional[float] = None
+        self.output_path: Optional[Path] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._started_tracing = False
+        self._build_start = 0.0
+        self._build_memory = 0
+        self._stage_start = 0.0
+        self._stage_memory = 0
+
+    def build_started(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._build_memory = tracemalloc.get_traced_memory()[0]
+        if self.cprofile_path is not None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._build_start = time.perf_counter()
+
+    def stage_started(self, name: str, sheet: Optional[str] = None) -> None:
+        if self.trace_memory:
+            self._stage_memory = tracemalloc.get_traced_memory()[0]
+            self.peak_mb = max(self.peak_mb or 0.0, megabytes(tracemalloc.get_traced_memory()[1] - self._build_memory))
+            tracemalloc.reset_peak()
+        self._stage_start = time.perf_counter()
+
+    def stage_finished(self, name: str, sheet: Optional[str] = None) -> None:
+        seconds = time.perf_counter() - self._stage_start
+        stage = self.stages.setdefault(name, StageProfile(name, sheet))
+        stage.calls += 1
+        stage.seconds = round(stage.seconds + seconds, 4)
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stage.allocated_mb = round((stage.allocated_mb or 0.0) + megabytes(current - self._stage_memory), 3)
+            stage.peak_mb = round(max(stage.peak_mb or 0.0, megabytes(peak - self._stage_memory)), 3)
+            self.peak_mb = max(self.peak_mb or 0.0, megabytes(peak - self._build_memory))
+
+    def build_finished(self, output_path: Optional[Path]) -> None:
+        self.seconds = round(time.perf_counter() - self._build_start, 4)
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(str(self.cprofile_path))
+            self._profile = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self.peak_mb is not None:
+            self.peak_mb = round(self.peak_mb, 3)
+        self.output_path = output_path
+        if output_path is not None and self.count_cells:
+            self.sheets = sheet_counts(output_path)
+            for stage in self.stages.values():
+                if stage.sheet in self.sheets:
+                    stage.cells = self.sheets[stage.sheet]["cells"]
+                    stage.formulas = self.sheets[stage.sheet]["formulas"]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "output": str(self.output_path) if self.output_path else None,
+            "seconds": self.seconds,
+            "traced_peak_mb": self.peak_mb,
+            "output_bytes": self.output_path.stat().st_size if self.output_path else None,
+            "cprofile": str(self.cprofile_path) if self.cprofile_path else None,
+            "stages": [asdict(stage) for stage in self.stages.values()],
+            "sheets": self.sheets,
+        }
+
+    def write(self, path: Path, **details: object) -> Path:
+        """Write the profile as JSON; ``details`` (build options and the like) are added on top."""
+        path.write_text(json.dumps({**details, **self.to_dict()}, indent=2, default=str) + "\n", encoding="utf-8")
+        return path
+
+
+def megabytes(size: int) -> float:
+    return size / (1024 * 1024)
+
+
+def sidecar_path(output_path: Path, suffix: str = PROFILE_SUFFIX) -> Path:
+    """"X-Dashboard.xlsx" -> "X-Dashboard.profile.json" next to it."""
+    return output_path.with_name(output_path.stem + suffix)
+
+
+def format_stages(stages: List[StageProfile]) -> str:
+    lines = []
+    for stage in stages:
+        memory = f"{stage.allocated_mb:+9.1f} MB (peak {stage.peak_mb:7.1f} MB)" if stage.allocated_mb is not None else ""
+        cells = f"{stage.cells:>10} cells {stage.formulas:>9} formulas" if stage.cells is not None else ""
+        lines.append(f"{stage.name:<24} {stage.seconds:8.3f}s {memory} {cells}".rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""Compute the data quality dashboard figures without Excel.
+
+Reads the same raw export as build_data_quality_excel_dashboard.py and evaluates the
+KPIs, coverage bands, ongoing-age buckets, Top 10 segments and the anomaly-first
+consultant list for any filter combination, matching the workbook formulas.
+
+Usage:
+  python3 scripts/data_quality_metrics.py --input raw.xlsx --department Sales
+  python3 scripts/data_quality_metrics.py --input raw.xlsx --group-by department team --format csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from openpyxl.utils.datetime import to_excel
+
+if __package__:
+    from .build_data_quality_excel_dashboard import (
+        COVERAGE_BANDS,
+        DEFAULT_METRIC_TYPE,
+        DEFAULT_SOURCE_CACHE_DIR,
+        DEFAULT_SEGMENT_DIMENSION,
+        FILTER_HEADERS,
+        METRIC_TYPES,
+        ONGOING_AGE_BUCKETS,
+        SEGMENT_DIMENSIONS,
+        TOP_SEGMENT_END_ROW,
+        excel_compare,
+        excel_key,
+        excel_ratio,
+        is_availability_inconsistent,
+        is_blank,
+        load_source,
+        ongoing_age_months,
+    )
+    from .source_table import SourceTable
+else:
+    from build_data_quality_excel_dashboard import (
+        COVERAGE_BANDS,
+        DEFAULT_METRIC_TYPE,
+        DEFAULT_SOURCE_CACHE_DIR,
+        DEFAULT_SEGMENT_DIMENSION,
+        FILTER_HEADERS,
+        METRIC_TYPES,
+        ONGOING_AGE_BUCKETS,
+        SEGMENT_DIMENSIONS,
+        TOP_SEGMENT_END_ROW,
+        excel_compare,
+        excel_key,
+        excel_ratio,
+        is_availability_inconsistent,
+        is_blank,
+        load_source,
+        ongoing_age_months,
+    )
+    from source_table import SourceTable
+
+ALL = "All"
+PERIODS = ("since", "before")
+OUTPUT_FORMATS = ["json", "csv"]
+FILTER_FIELDS = {header: header.lower().replace(" ", "_") for header in FILTER_HEADERS}
+LIST_FIELDS = {
+    "full_name": "Full name",
+    "entry_date": "Entry date",
+    "url": "Url",
+    "department": "Department",
+    "team": "Team",
+    "lead": "Lead",
+    "total_engagements": "Total engagements",
+}
+
+
+@dataclass(frozen=True)
+class MetricFilters:
+    """One Dashboard filter state (cells B3:B11)."""
+
+    metric_type: str = DEFAULT_METRIC_TYPE
+    department: str = ALL
+    team: str = ALL
+    unit: str = ALL
+    legal_entity: str = ALL
+    location: str = ALL
+    lead: str = ALL
+    is_available: str = ALL
+    segment_dimension: str = DEFAULT_SEGMENT_DIMENSION
+
+    def __post_init__(self) -> None:
+        if self.metric_type not in METRIC_TYPES:
+            raise ValueError(f"Unknown metric type {self.metric_type!r}; expected one of {METRIC_TYPES}")
+        if self.segment_dimension not in SEGMENT_DIMENSIONS:
+            raise ValueError(f"Unknown segment dimension {self.segment_dimension!r}; expected one of {SEGMENT_DIMENSIONS}")
+
+    def selected(self) -> Dict[str, str]:
+        """Filter header -> selected value, for every filter not on "All"."""
+        values = asdict(self)
+        return {header: values[field] for header, field in FILTER_FIELDS.items() if values[field] != ALL}
+
+
+def countifs_positive(value: object) -> bool:
+    """COUNTIFS criterion ">0": only numbers (and dates) match, text and logicals never do."""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float, datetime, date)):
+        return excel_compare(value, 0) > 0
+    return False
+
+
+def json_value(value: object) -> object:
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def optional_float(value: object) -> float:
+    return value if isinstance(value, float) else np.nan
+
+
+class DataQualityMetrics:
+    """Column arrays for one export, evaluated per filter state with NumPy masks."""
+
+    def __init__(self, table: SourceTable, today: Optional[date] = None) -> None:
+        self.today = today or date.today()
+        self.table = table
+        column = table.column
+
+        self.sheet_rows = np.arange(2, len(table) + 2, dtype=float)
+        entries = column("Entry date")
+        today_serial = float(to_excel(self.today))
+        self.entered = np.array([is_blank(entry) or excel_compare(entry, today_serial) <= 0 for entry in entries], dtype=bool)
+
+        self.ratios: Dict[Tuple[str, str], np.ndarray] = {
+            (metric, period): np.array(
+                [
+                    optional_float(excel_ratio(months, baseline))
+                    for months, baseline in zip(column(f"{metric} months {period} entry"), column(f"Months {period} entry baseline"))
+                ],
+                dtype=float,
+            )
+            for metric in METRIC_TYPES
+            for period in PERIODS
+        }
+
+        ongoing = column("Ongoing engagements")
+        ages = [ongoing_age_months(count, oldest, self.today) for count, oldest in zip(ongoing, column("Oldest ongoing engagement start date"))]
+        self.ongoing_age = np.array([np.nan if age == "" else float(age) for age in ages], dtype=float)
+        # An empty Ongoing_age_months is text, which Excel ranks above any age in ">=24" comparisons.
+        self.stale_ongoing = np.isnan(self.ongoing_age) | (np.nan_to_num(self.ongoing_age) >= 24)
+        self.ongoing_positive = np.array([countifs_positive(value) for value in ongoing], dtype=bool)
+
+        invalid = column("Engagements with invalid dates")
+        self.invalid_dates = np.array([excel_compare(value, 0) > 0 for value in invalid], dtype=bool)
+        self.invalid_positive = np.array([countifs_positive(value) for value in invalid], dtype=bool)
+        self.experience_after_entry = np.array([value is True for value in column("Is work experience since after entry date")], dtype=bool)
+        self.availability_inconsistent = np.array(
+            [
+                is_availability_inconsistent(*values)
+                for values in zip(column("Is available"), column("Available from"), column("Available days per week"), column("Availability comment"))
+            ],
+            dtype=bool,
+        )
+
+        # Filter and segment values are matched through integer codes of their Excel "=" keys,
+        # mapped from the table's categorical codes so only the distinct values are keyed.
+        # Blank cells read as 0 through a formula reference, as in Model!G.
+        self.codes: Dict[str, np.ndarray] = {}
+        self.code_of: Dict[str, Dict[Tuple[str, object], int]] = {}
+        for header in FILTER_HEADERS:
+            lookup: Dict[Tuple[str, object], int] = {}
+            remap = np.array(
+                [lookup.setdefault(excel_key(0 if value is None else value), len(lookup)) for value in table.categories[header]],
+                dtype=np.int64,
+            )
+            self.codes[header] = remap[np.asarray(table.codes[header], dtype=np.int64)]
+            self.code_of[header] = lookup
+
+    @classmethod
+    def from_workbook(cls, input_path: Path, today: Optional[date] = None, cache_dir: Optional[Path] = None) -> "DataQualityMetrics":
+        return cls(load_source(input_path, cache_dir), today)
+
+    def include_mask(self, filters: MetricFilters) -> np.ndarray:
+        """Model!A for the given filters."""
+        mask = self.entered.copy()
+        for header, value in filters.selected().items():
+            code = self.code_of[header].get(excel_key(value))
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= self.codes[header] == code
+        return mask
+
+    def compute(self, filters: MetricFilters = MetricFilters(), consultant_limit: Optional[int] = None) -> Dict[str, object]:
+        included = self.include_mask(filters)
+        since = self.ratios[(filters.metric_type, "since")]
+        before = self.ratios[(filters.metric_type, "before")]
+        low_coverage = np.nan_to_num(since, nan=1.0) < 0.5
+        anomaly = (low_coverage & (self.stale_ongoing | self.invalid_dates)) | self.experience_after_entry
+        since_score = np.where(np.isnan(since), 0.0, np.clip((0.5 - np.nan_to_num(since)) * 100, 0, None))
+        anomaly_score = since_score + 20 * self.stale_ongoing + 20 * self.invalid_dates + 10 * self.experience_after_entry
+
+        with_ongoing = included & self.ongoing_positive
+        age = np.nan_to_num(self.ongoing_age, nan=-1.0)
+        has_age = ~np.isnan(self.ongoing_age)
+
+        return {
+            "filters": asdict(filters),
+            "as_of": self.today.isoformat(),
+            "consultants": int(included.sum()),
+            "medians": {
+                f"{metric.lower()}_{period}_entry": self.median(self.ratios[(metric, period)][included])
+                for metric in METRIC_TYPES
+                for period in PERIODS
+            },
+            "ongoing_24_months": int((with_ongoing & self.stale_ongoing).sum()),
+            "invalid_date_consultants": int((included & self.invalid_positive).sum()),
+            "anomaly_consultants": int((included & anomaly).sum()),
+            "availability_inconsistent": int((included & self.availability_inconsistent).sum()),
+            "since_entry_bands": self.band_counts(since[included]),
+            "before_entry_bands": self.band_counts(before[included]),
+            "ongoing_age_buckets": dict(
+                zip(
+                    ONGOING_AGE_BUCKETS,
+                    [
+                        int((with_ongoing & has_age & (age < 12)).sum()),
+                        int((with_ongoing & (age >= 12) & (age < 24)).sum()),
+                        int((with_ongoing & self.stale_ongoing).sum()),
+                    ],
+                )
+            ),
+            "top_segments": self.top_segments(filters.segment_dimension, included, low_coverage),
+            "ranked_consultants": self.ranked_consultants(included, anomaly_score, since, before, consultant_limit),
+        }
+
+    @staticmethod
+    def median(values: np.ndarray) -> Optional[float]:
+        values = values[~np.isnan(values)]
+        return float(np.median(values)) if values.size else None
+
+    @staticmethod
+    def band_counts(ratios: np.ndarray) -> Dict[str, int]:
+        ratios = ratios[~np.isnan(ratios)]
+        counts = np.histogram(ratios, bins=[-np.inf, 0.3, 0.5, 0.8, np.inf])[0]
+        return {band: int(count) for band, count in zip(COVERAGE_BANDS, counts)}
+
+    def top_segments(self, dimension: str, included: np.ndarray, low_coverage: np.ndarray) -> List[Dict[str, object]]:
+        """Model!J:Q: segments ranked by low coverage rate, then size, then list position."""
+        codes = self.codes[dimension]
+        size = len(self.code_of[dimension])
+        totals = np.bincount(codes[included], minlength=size)
+        lows = np.bincount(codes[included & low_coverage], minlength=size)
+
+        # INDEX over the one-cell fallback range of an empty list yields 0 rather than an error.
+        candidates: List[object] = self.table.unique_values(dimension) or [0]
+        ranked: List[Tuple[float, Dict[str, object]]] = []
+        for position, candidate in enumerate(candidates):
+            code = self.code_of[dimension].get(excel_key(candidate))
+            total = int(totals[code]) if code is not None else 0
+            if not total:
+                continue
+            rate = int(lows[code]) / total
+            rank_key = rate + total / 100000 + (position + 2) / 100000000
+            ranked.append((rank_key, {"segment": candidate, "low_coverage_rate": rate, "consultants": total}))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [segment for _, segment in ranked[: TOP_SEGMENT_END_ROW - 1]]
+
+    def ranked_consultants(
+        self, included: np.ndarray, anomaly_score: np.ndarray, since: np.ndarray, before: np.ndarray, limit: Optional[int]
+    ) -> List[Dict[str, object]]:
+        """Dashboard rows 37+: included consultants by anomaly score, later sheet rows first on ties."""
+        positions = np.flatnonzero(included)
+        rank_keys = anomaly_score[positions] + self.sheet_rows[positions] / 100000000
+        ordered = positions[np.argsort(-rank_keys, kind="stable")]
+        if limit is not None:
+            ordered = ordered[:limit]
+        consultants = []
+        for position in ordered:
+            record = {field: json_value(self.table.column(header)[position]) for field, header in LIST_FIELDS.items()}
+            record["since_ratio"] = json_value(float(since[position]))
+            record["before_ratio"] = json_value(float(before[position]))
+            record["ongoing_age_months"] = json_value(float(self.ongoing_age[position]))
+            record["anomaly_score"] = float(anomaly_score[position])
+            consultants.append(record)
+        return consultants
+
+    def iter_group_filters(self, base: MetricFilters, group_by: Sequence[str]) -> Iterator[MetricFilters]:
+        """Yield one filter state per distinct non-blank value combination of the grouped headers."""
+        combinations = {
+            tuple(str(value).strip() for value in values)
+            for values in zip(*(self.table.column(header) for header in group_by))
+            if all(not is_blank(value) and str(value).strip() for value in values)
+        }
+        for combination in sorted(combinations):
+            yield replace(base, **{FILTER_FIELDS[header]: value for header, value in zip(group_by, combination)})
+
+
+def flatten_metrics(result: Dict[str, object]) -> Dict[str, object]:
+    """One CSV row per filter state; the consultant list is left to the JSON output."""
+    flat: Dict[str, object] = dict(result["filters"])
+    flat["as_of"] = result["as_of"]
+    flat["consultants"] = result["consultants"]
+    for name, value in result["medians"].items():
+        flat[f"median_{name}"] = value
+    for name in ("ongoing_24_months", "invalid_date_consultants", "anomaly_consultants", "availability_inconsistent"):
+        flat[name] = result[name]
+    for section in ("since_entry_bands", "before_entry_bands", "ongoing_age_buckets"):
+        for label, count in result[section].items():
+            flat[f"{section}_{label}"] = count
+    for rank in range(1, TOP_SEGMENT_END_ROW):
+        segment = result["top_segments"][rank - 1] if rank <= len(result["top_segments"]) else {}
+        for field in ("segment", "low_coverage_rate", "consultants"):
+            flat[f"top_{rank}_{field}"] = segment.get(field)
+    return flat
+
+
+def render_csv(results: Sequence[Dict[str, object]]) -> str:
+    rows = [flatten_metrics(result) for result in results]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]) if rows else [], lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compute data quality dashboard metrics from a raw export")
+    parser.add_argument("--input", required=True, help="Path to input workbook")
+    parser.add_argument("--output", help="Write the result to this file instead of stdout")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json")
+    parser.add_argument("--metric-type", choices=METRIC_TYPES, default=DEFAULT_METRIC_TYPE)
+    parser.add_argument("--segment-dimension", choices=SEGMENT_DIMENSIONS, default=DEFAULT_SEGMENT_DIMENSION)
+    for header, field in FILTER_FIELDS.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, default=ALL, help=f"{header} filter value (default: All)")
+    parser.add_argument(
+        "--group-by",
+        nargs="+",
+        choices=list(FILTER_FIELDS.values()),
+        default=[],
+        help="Compute one result per value combination of these filters",
+    )
+    parser.add_argument("--consultant-limit", type=int, help="Keep only the first N ranked consultants in JSON output")
+    parser.add_argument("--today", type=date.fromisoformat, help="Evaluate TODAY() as this date (YYYY-MM-DD)")
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_SOURCE_CACHE_DIR),
+        help="Reuse the parsed export from this directory when the input file is unchanged (default: %(default)s)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the input workbook")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    input_path = Path(args.input).expanduser().resolve()
+    if not input_path.exists():
+        raise FileNotFoundError(f"Input workbook not found: {input_path}")
+
+    metrics = DataQualityMetrics.from_workbook(input_path, args.today, None if args.no_cache else Path(args.cache_dir).expanduser())
+    base = MetricFilters(
+        metric_type=args.metric_type,
+        segment_dimension=args.segment_dimension,
+        **{field: getattr(args, field) for field in FILTER_FIELDS.values()},
+    )
+    header_of = {field: header for header, field in FILTER_FIELDS.items()}
+    filter_states = list(metrics.iter_group_filters(base, [header_of[field] for field in args.group_by])) if args.group_by else [base]
+    results = [metrics.compute(filters, consultant_limit=args.consultant_limit) for filters in filter_states]
+
+    if args.format == "csv":
+        text = render_csv(results)
+    else:
+        text = json.dumps(results if args.group_by else results[0], ensure_ascii=False, indent=2) + "\n"
+
+    if args.output:
+        output_path = Path(args.output).expanduser()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(text, encoding="utf-8")
+        print(f"Wrote {len(results)} metric set(s) to {output_path}")
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""Keep a history of data quality exports and compute trends from it.
+
+Each parsed export is stored as one snapshot per tenant and as-of date
+(``<store>/<tenant>/<YYYY-MM-DD>.npz``) of compact NumPy arrays: per consultant the
+coverage ratios, the anomaly inputs as bit flags and one integer code per segment
+dimension, and per dimension the trend measures of every segment, reduced with bincounts
+when the snapshot is stored. A trend query only reads those small per-segment summaries,
+so hundreds of snapshots take well under a second.
+
+Usage:
+  python3 scripts/data_quality_snapshots.py add --store snapshots/ --tenant BIT --input raw.xlsx
+  python3 scripts/data_quality_snapshots.py trends --store snapshots/ --tenant BIT --dimension Team
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import zipfile
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+
+if __package__:
+    from .atomic_write import atomic_write
+    from .build_data_quality_excel_dashboard import (
+        DEFAULT_METRIC_TYPE,
+        DEFAULT_SEGMENT_DIMENSION,
+        DEFAULT_SOURCE_CACHE_DIR,
+        METRIC_TYPES,
+        SEGMENT_DIMENSIONS,
+        is_blank,
+        load_source,
+        set_column_widths,
+        styled_cell,
+    )
+    from .build_profiler import BuildHooks
+    from .data_quality_metrics import PERIODS, DataQualityMetrics
+    from .source_table import SourceTable
+else:
+    from atomic_write import atomic_write
+    from build_data_quality_excel_dashboard import (
+        DEFAULT_METRIC_TYPE,
+        DEFAULT_SEGMENT_DIMENSION,
+        DEFAULT_SOURCE_CACHE_DIR,
+        METRIC_TYPES,
+        SEGMENT_DIMENSIONS,
+        is_blank,
+        load_source,
+        set_column_widths,
+        styled_cell,
+    )
+    from build_profiler import BuildHooks
+    from data_quality_metrics import PERIODS, DataQualityMetrics
+    from source_table import SourceTable
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".npz"
+# Bits of a snapshot's per-consultant "flags" array.
+ENTERED = 1
+STALE_ONGOING = 2
+INVALID_DATES = 4
+EXPERIENCE_AFTER_ENTRY = 8
+AVAILABILITY_INCONSISTENT = 16
+LOW_COVERAGE_RATIO = 0.5
+TREND_MEASURES = ["consultants", "median_coverage", "low_coverage_rate", "anomalies", "anomaly_rate"]
+TREND_MEASURE_LABELS = {
+    "consultants": "Consultants",
+    "median_coverage": "Median coverage since entry",
+    "low_coverage_rate": "Low coverage rate",
+    "anomalies": "Anomalies",
+    "anomaly_rate": "Anomaly rate",
+}
+COUNT_MEASURES = ("consultants", "anomalies")
+TREND_NUMBER_FORMATS = {"median_coverage": "0.00", "low_coverage_rate": "0%", "anomaly_rate": "0%"}
+OVERALL = "All"
+LABEL_SEPARATOR = "\x1f"
+
+
+def ratio_key(metric: str, period: str) -> str:
+    return f"ratio_{metric.lower()}_{period}"
+
+
+def segment_key(dimension: str) -> str:
+    return "segment_" + dimension.lower().replace(" ", "_")
+
+
+def labels_key(dimension: str) -> str:
+    return "labels_" + dimension.lower().replace(" ", "_")
+
+
+def summary_key(dimension: str) -> str:
+    return "summary_" + dimension.lower().replace(" ", "_")
+
+
+def tenant_from_path(path: Path) -> str:
+    """"BIT-raw-updated.xlsx" -> "BIT"; other names use their stem."""
+    stem = path.stem
+    return stem.split("-raw", 1)[0] if "-raw" in stem else stem
+
+
+def tenant_directory_name(tenant: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", tenant.strip()).strip("._")
+    if not name:
+        raise ValueError(f"Tenant name {tenant!r} has no usable characters")
+    return name
+
+
+def segment_codes(table: SourceTable, dimension: str) -> tuple:
+    """Per-consultant codes into the dimension's stripped text labels; -1 for blanks."""
+    labels: List[str] = []
+    index: Dict[str, int] = {}
+    remap = []
+    for value in table.categories[dimension]:
+        if is_blank(value) or not str(value).strip():
+            remap.append(-1)
+        else:
+            label = str(value).strip()
+            remap.append(index.setdefault(label, len(index)))
+            if len(labels) < len(index):
+                labels.append(label)
+    codes = np.asarray(remap, dtype=np.int32)[np.asarray(table.codes[dimension], dtype=np.int64)]
+    return codes, encode_labels(labels)
+
+
+def encode_labels(labels: List[str]) -> np.ndarray:
+    # UTF-8 bytes with a separator take a fraction of the room of a fixed-width unicode array.
+    return np.frombuffer(LABEL_SEPARATOR.join(labels).encode("utf-8"), dtype=np.uint8)
+
+
+def decode_labels(data: np.ndarray) -> List[str]:
+    return data.tobytes().decode("utf-8").split(LABEL_SEPARATOR) if data.size else []
+
+
+def snapshot_arrays(metrics: DataQualityMetrics) -> Dict[str, np.ndarray]:
+    """The arrays stored for one export, from its evaluated metrics."""
+    flags = (
+        metrics.entered * ENTERED
+        | metrics.stale_ongoing * STALE_ONGOING
+        | metrics.invalid_dates * INVALID_DATES
+        | metrics.experience_after_entry * EXPERIENCE_AFTER_ENTRY
+        | metrics.availability_inconsistent * AVAILABILITY_INCONSISTENT
+    ).astype(np.uint8)
+    arrays = {"format": np.array([SNAPSHOT_FORMAT]), "flags": flags}
+    for metric in METRIC_TYPES:
+        for period in PERIODS:
+            arrays[ratio_key(metric, period)] = metrics.ratios[(metric, period)].astype(np.float32)
+    for dimension in SEGMENT_DIMENSIONS:
+        codes, labels = segment_codes(metrics.table, dimension)
+        arrays[segment_key(dimension)] = codes
+        arrays[labels_key(dimension)] = labels
+        arrays[summary_key(dimension)] = np.stack(
+            [
+                segment_summary(flags, arrays[ratio_key(metric, "since")], codes, len(decode_labels(labels)))
+                for metric in METRIC_TYPES
+            ]
+        ).astype(np.float32)
+    return arrays
+
+
+def segment_medians(codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """Median of ``values`` per code in ``range(size)``; NaN for codes without values."""
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    counts = np.bincount(codes, minlength=size)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(size, np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (values[low].astype(float) + values[high]) / 2
+    return medians
+
+
+def segment_summary(flags: np.ndarray, coverage: np.ndarray, codes: np.ndarray, size: int) -> np.ndarray:
+    """TREND_MEASURES (rows) per segment code plus the whole tenant in the last column.
+
+    Coverage is a since-entry ratio; like the dashboard, only consultants who have entered
+    count, a blank ratio is not low coverage, and a consultant is an anomaly with low
+    coverage plus a stale ongoing engagement or invalid dates, or with work experience
+    starting after entry.
+    """
+    included = (flags & ENTERED).astype(bool)
+    low = np.nan_to_num(coverage, nan=1.0) < LOW_COVERAGE_RATIO
+    anomaly = (low & (flags & (STALE_ONGOING | INVALID_DATES)).astype(bool)) | (flags & EXPERIENCE_AFTER_ENTRY).astype(bool)
+    low, anomaly, coverage = low[included], anomaly[included], coverage[included]
+    # Blank segments (-1) are left out of every segment but still count for the tenant.
+    segments = codes[included]
+    named = segments >= 0
+    totals = np.append(np.bincount(segments[named], minlength=size), included.sum()).astype(float)
+    lows = np.append(np.bincount(segments[named], weights=low[named], minlength=size), low.sum())
+    anomalies = np.append(np.bincount(segments[named], weights=anomaly[named], minlength=size), anomaly.sum())
+    rated = ~np.isnan(coverage)
+    medians = np.append(
+        segment_medians(segments[named & rated], coverage[named & rated], size),
+        np.median(coverage[rated]) if rated.any() else np.nan,
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.stack([totals, medians, lows / totals, anomalies, anomalies / totals])
+
+
+class SnapshotStore:
+    """Snapshots of parsed exports, one file per tenant and as-of date."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def path(self, tenant: str, as_of: date) -> Path:
+        return self.root / tenant_directory_name(tenant) / f"{as_of.isoformat()}{SNAPSHOT_SUFFIX}"
+
+    def tenants(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    def dates(self, tenant: str) -> List[date]:
+        directory = self.root / tenant_directory_name(tenant)
+        if not directory.is_dir():
+            return []
+        found = []
+        for path in directory.glob(f"*{SNAPSHOT_SUFFIX}"):
+            try:
+                found.append(date.fromisoformat(path.stem))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def add(self, tenant: str, metrics: DataQualityMetrics) -> Path:
+        """Store the export behind ``metrics`` as of its evaluation date, replacing an earlier one of that date."""
+        path = self.path(tenant, metrics.today)
+        # Replaced in one step, so a concurrent trend query never reads a partial file.
+        with atomic_write(path) as handle:
+            np.savez(handle, **snapshot_arrays(metrics))
+        return path
+
+    def add_table(self, tenant: str, table: SourceTable, as_of: Optional[date] = None) -> Path:
+        return self.add(tenant, DataQualityMetrics(table, as_of))
+
+    def trends(
+        self,
+        tenant: str,
+        dimension: str = DEFAULT_SEGMENT_DIMENSION,
+        metric: str = DEFAULT_METRIC_TYPE,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> "TrendSeries":
+        """Per-segment coverage and anomaly time series, one point per snapshot (see ``segment_summary``).
+
+        Only each snapshot's precomputed summary of ``dimension`` is read, so the cost grows
+        with the number of snapshots and segments, not consultants.
+        """
+        if dimension not in SEGMENT_DIMENSIONS:
+            raise ValueError(f"Unknown segment dimension {dimension!r}; expected one of {SEGMENT_DIMENSIONS}")
+        if metric not in METRIC_TYPES:
+            raise ValueError(f"Unknown metric type {metric!r}; expected one of {METRIC_TYPES}")
+        dates = [as_of for as_of in self.dates(tenant) if (start is None or as_of >= start) and (end is None or as_of <= end)]
+
+        segment_index: Dict[str, int] = {}
+        points = []
+        previous_labels, columns = None, None
+        for as_of in dates:
+            path = self.path(tenant, as_of)
+            with np.load(path) as snapshot:
+                if int(snapshot["format"][0]) != SNAPSHOT_FORMAT:
+                    raise ValueError(f"{path} was written by another version of this script; add its export again")
+                labels = snapshot[labels_key(dimension)]
+                summary = snapshot[summary_key(dimension)][METRIC_TYPES.index(metric)]
+            # Consecutive exports mostly have the same segments; only map labels that changed.
+            if previous_labels is None or not np.array_equal(labels, previous_labels):
+                # Segments get a column on first sight; -1 is the tenant total, moved last below.
+                columns = np.array(
+                    [segment_index.setdefault(label, len(segment_index)) for label in decode_labels(labels)] + [-1],
+                    dtype=np.int64,
+                )
+                previous_labels = labels
+            points.append((columns, summary))
+
+        segments = list(segment_index)
+        values = np.full((len(TREND_MEASURES), len(dates), len(segments) + 1), np.nan)
+        for row, (columns, summary) in enumerate(points):
+            values[:, row, columns] = summary
+        # A segment missing from a snapshot had no consultants in it.
+        for measure in COUNT_MEASURES:
+            np.nan_to_num(values[TREND_MEASURES.index(measure)], copy=False)
+        return TrendSeries(tenant, dimension, metric, dates, segments, values)
+
+
+@dataclass
+class TrendSeries:
+    """Trend measures as an array of (measure, snapshot date, segment); the last segment is the whole tenant."""
+
+    tenant: str
+    dimension: str
+    metric_type: str
+    dates: List[date]
+    segments: List[str]
+    values: np.ndarray
+
+    def measure(self, name: str, segment: Optional[str] = None) -> np.ndarray:
+        """One measure over time for ``segment``, or for the whole tenant."""
+        column = -1 if segment is None else self.segments.index(segment)
+        return self.values[TREND_MEASURES.index(name), :, column]
+
+    def to_dict(self) -> Dict[str, object]:
+        series = {}
+        for position, measure in enumerate(TREND_MEASURES):
+            # One list per segment (transposed), with NaN as None; converted in bulk rather than per value.
+            values = self.values[position].T
+            if measure in COUNT_MEASURES:
+                series[measure] = values.astype(np.int64).tolist()
+            else:
+                series[measure] = np.where(np.isnan(values), None, values.round(4)).tolist()
+        names = self.segments + [None]
+        by_segment = {
+            name: {measure: series[measure][column] for measure in TREND_MEASURES} for column, name in enumerate(names)
+        }
+        return {
+            "tenant": self.tenant,
+            "dimension": self.dimension,
+            "metric_type": self.metric_type,
+            "dates": [as_of.isoformat() for as_of in self.dates],
+            "overall": by_segment.pop(None),
+            "segments": by_segment,
+        }
+
+
+class SnapshotRecorder(BuildHooks):
+    """Build hooks that store the parsed export and optionally add a Trends sheet."""
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        tenant: str,
+        trends_sheet: bool = False,
+        dimension: str = DEFAULT_SEGMENT_DIMENSION,
+        metric: str = DEFAULT_METRIC_TYPE,
+    ) -> None:
+        self.store = store
+        self.tenant = tenant
+        self.trends_sheet = trends_sheet
+        self.dimension = dimension
+        self.metric = metric
+        self.snapshot_path: Optional[Path] = None
+
+    def source_loaded(self, table: SourceTable, today: date) -> None:
+        self.snapshot_path = self.store.add_table(self.tenant, table, today)
+
+    def sheets_written(self, wb) -> None:
+        if self.trends_sheet:
+            write_trends_sheet(wb, self.store.trends(self.tenant, self.dimension, self.metric))
+
+
+def write_trends_sheet(wb, trends: TrendSeries) -> None:
+    """One row per segment and measure, one column per snapshot date, the whole tenant first."""
+    ws = wb.create_sheet("Trends")
+    set_column_widths(ws, {"A": 44, "B": 28})
+    ws.freeze_panes = "C2"
+    header_font = Font(color="FFFFFF", bold=True)
+    header_fill = PatternFill(fill_type="solid", start_color="1F4E78", end_color="1F4E78")
+    ws.append(
+        [
+            styled_cell(ws, value, font=header_font, fill=header_fill)
+            for value in [trends.dimension, f"{trends.metric_type} measure"] + [as_of.isoformat() for as_of in trends.dates]
+        ]
+    )
+    data = trends.to_dict()
+    # Segments that are largest in the latest snapshot come first.
+    segments = sorted(data["segments"].items(), key=lambda item: (-(item[1]["consultants"][-1] if trends.dates else 0), item[0]))
+    for segment, measures in [(OVERALL, data["overall"])] + segments:
+        for measure in TREND_MEASURES:
+            number_format = TREND_NUMBER_FORMATS.get(measure)
+            ws.append(
+                [segment, TREND_MEASURE_LABELS[measure]]
+                + [
+                    styled_cell(ws, value, number_format=number_format) if number_format and value is not None else value
+                    for value in measures[measure]
+                ]
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Store data quality exports as snapshots and compute trends")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Store a raw export as a snapshot")
+    add.add_argument("--store", required=True, help="Snapshot store directory")
+    add.add_argument("--tenant", required=True)
+    add.add_argument("--input", required=True, help="Path to the raw export workbook")
+    add.add_argument("--today", type=date.fromisoformat, help="As-of date of the export (default: today)")
+    add.add_argument("--cache-dir", default=str(DEFAULT_SOURCE_CACHE_DIR), help="Parsed export cache (default: %(default)s)")
+    add.add_argument("--no-cache", action="store_true", help="Always parse the input workbook")
+
+    trends = commands.add_parser("trends", help="Per-segment coverage and anomaly time series as JSON")
+    trends.add_argument("--store", required=True, help="Snapshot store directory")
+    trends.add_argument("--tenant", required=True)
+    trends.add_argument("--dimension", choices=SEGMENT_DIMENSIONS, default=DEFAULT_SEGMENT_DIMENSION)
+    trends.add_argument("--metric-type", choices=METRIC_TYPES, default=DEFAULT_METRIC_TYPE)
+    trends.add_argument("--start", type=date.fromisoformat, help="First snapshot date to include")
+    trends.add_argument("--end", type=date.fromisoformat, help="Last snapshot date to include")
+    trends.add_argument("--output", help="Write the JSON to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    store = SnapshotStore(Path(args.store).expanduser())
+    if args.command == "add":
+        cache_dir = None if args.no_cache else Path(args.cache_dir).expanduser()
+        path = store.add_table(args.tenant, load_source(Path(args.input).expanduser(), cache_dir), args.today)
+        print(f"Stored snapshot: {path}")
+        return
+
+    try:
+        result = store.trends(args.tenant, args.dimension, args.metric_type, args.start, args.end).to_dict()
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+        raise SystemExit(f"Cannot read snapshots of {args.tenant!r}: {exc}")
+    text = json.dumps(result, ensure_ascii=False, indent=2) + "\n"
+    if args.output:
+        output_path = Path(args.output).expanduser()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(text, encoding="utf-8")
+        print(f"Wrote trends for {len(result['dates'])} snapshot(s) to {output_path}")
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
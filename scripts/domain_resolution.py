@@ -0,0 +1,109 @@
+"""Resolve hosts and email addresses to registrable (apex) domains offline.
+
+Uses the ICANN section of the public suffix list bundled in
+``scripts/data/public_suffix_list.dat``. Refresh it from
+https://publicsuffix.org/list/public_suffix_list.dat when new suffixes matter.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+PUBLIC_SUFFIX_LIST_PATH = Path(__file__).resolve().parent / "data" / "public_suffix_list.dat"
+DOMAIN_CACHE_SIZE = 8192
+RULE_KEY = "\0rule"
+EXCEPTION_KEY = "\0exception"
+WILDCARD_LABEL = "*"
+
+
+class PublicSuffixTrie:
+    """Public suffix rules stored label by label, starting at the TLD."""
+
+    def __init__(self) -> None:
+        self.root: dict[str, Any] = {}
+
+    def add_rule(self, rule: str) -> None:
+        is_exception = rule.startswith("!")
+        labels = rule.lstrip("!").lower().split(".")
+        node = self.root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        node[EXCEPTION_KEY if is_exception else RULE_KEY] = True
+
+    def suffix_label_count(self, labels: list[str]) -> int:
+        """Return how many trailing labels of ``labels`` form the public suffix."""
+        longest = 1  # The implicit "*" rule: an unknown TLD is its own public suffix.
+        exception: int | None = None
+        frontier = [self.root]
+        for depth, label in enumerate(reversed(labels)):
+            next_frontier = []
+            for node in frontier:
+                for key in (label, WILDCARD_LABEL):
+                    child = node.get(key)
+                    if child is None:
+                        continue
+                    if child.get(EXCEPTION_KEY) and key == label:
+                        exception = depth if exception is None else max(exception, depth)
+                    if child.get(RULE_KEY):
+                        longest = max(longest, depth + 1)
+                    next_frontier.append(child)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return exception if exception is not None else longest
+
+    @classmethod
+    def from_file(cls, path: Path) -> "PublicSuffixTrie":
+        trie = cls()
+        for raw_line in path.read_text(encoding="utf-8").splitlines():
+            line = raw_line.strip()
+            if not line or line.startswith("//"):
+                continue
+            rule = line.split()[0]
+            trie.add_rule(rule)
+            try:
+                ascii_rule = rule.encode("idna").decode("ascii")
+            except UnicodeError:
+                continue
+            if ascii_rule != rule:
+                trie.add_rule(ascii_rule)
+        return trie
+
+
+@lru_cache(maxsize=1)
+def public_suffix_trie() -> PublicSuffixTrie:
+    return PublicSuffixTrie.from_file(PUBLIC_SUFFIX_LIST_PATH)
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def normalize_host(value: str | None) -> str | None:
+    if not value:
+        return None
+    raw = value.strip().lower()
+    if not raw:
+        return None
+    parsed = urlparse(raw if "://" in raw else f"https://{raw}")
+    host = parsed.netloc or parsed.path
+    host = host.split("@")[-1].split(":")[0].strip(".")
+    return host or None
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def apex_domain(host: str | None) -> str | None:
+    if not host:
+        return None
+    parts = [part for part in host.lower().split(".") if part]
+    suffix_labels = public_suffix_trie().suffix_label_count(parts)
+    if len(parts) <= suffix_labels:
+        return ".".join(parts)
+    return ".".join(parts[-(suffix_labels + 1) :])
+
+
+@lru_cache(maxsize=DOMAIN_CACHE_SIZE)
+def normalize_email_domain(email: str | None) -> str | None:
+    if not email or "@" not in email:
+        return None
+    return apex_domain(email.rsplit("@", 1)[1].strip().lower())
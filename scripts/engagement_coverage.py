@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""Engagement month coverage per consultant, computed from engagement rows.
+
+Evaluates the coverage columns of ``GetInternalConsultantDataQuality.sql`` (months since
+and before entry, their baselines, missing months and coverage ratios) with NumPy, all
+consultants at once. Dates are day numbers (``date.toordinal()``, 0 when missing) and every
+engagement carries the index of its consultant, so a per-consultant sum is one bincount.
+
+Two ways of counting an engagement's months are supported:
+
+- ``prorated`` (the export's rule): each engagement adds its stored AbsoluteMonth and
+  WeightedMonth, prorated by the share of its days inside the window. Overlapping
+  engagements are counted twice, so absolute coverage can exceed 100%. Like the export,
+  a missing stored value counts as 0; ``--derive-months`` derives it from the dates and
+  capacity instead, for engagement rows without those columns.
+- ``union``: the window days covered by at least one engagement count once for absolute
+  months; weighted months add up the capacity booked on each day, capped at 100%.
+
+``CoverageEngine`` keeps the consultants, engagements and results of one tenant and, after
+engagement or consultant changes, recomputes only the consultants they touch. Its state is
+saved as one ``.npz`` file together with the computed coverage, which an update run starts
+from, so an export can be patched from engagement deltas:
+
+Usage:
+  python3 scripts/engagement_coverage.py init --consultants consultants.csv --engagements engagements.csv --state BIT.npz
+  python3 scripts/engagement_coverage.py update --state BIT.npz --engagements delta.csv \\
+    --export BIT-raw.xlsx --output BIT-raw-updated.xlsx
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+if __package__:
+    from .atomic_write import atomic_write
+    from .build_data_quality_excel_dashboard import load_source
+    from .generate_data_quality_export import write_export
+    from .source_table import SourceTable, column_stats
+else:
+    from atomic_write import atomic_write
+    from build_data_quality_excel_dashboard import load_source
+    from generate_data_quality_export import write_export
+    from source_table import SourceTable, column_stats
+
+DAYS_PER_MONTH = 30.4375
+# ODC stores "no date" as 1900-01-01; end and exit dates on or before it count as missing.
+NULL_DATE = date(1900, 1, 1).toordinal()
+NO_DAY = 0
+METHODS = ("prorated", "union")
+PERIODS = ("since", "before")
+# Coverage fields, each an array per period, saved with the engine state.
+COVERAGE_KINDS = ("baseline", "absolute", "weighted")
+STATE_FORMAT = 3
+# Engagements fields held as NumPy arrays, saved with the engine state.
+ARRAY_FIELDS = ("start", "end", "is_ongoing", "is_date_invalid", "capacity", "absolute_month", "weighted_month")
+# The export columns computed here, in export order.
+COVERAGE_HEADERS = [
+    "Months since entry baseline",
+    "Absolute months since entry",
+    "Weighted months since entry",
+    "Absolute missing months since entry",
+    "Weighted missing months since entry",
+    "Absolute coverage ratio since entry",
+    "Weighted coverage ratio since entry",
+    "Months before entry baseline",
+    "Absolute months before entry",
+    "Weighted months before entry",
+    "Absolute missing months before entry",
+    "Weighted missing months before entry",
+    "Absolute coverage ratio before entry",
+    "Weighted coverage ratio before entry",
+]
+
+
+def day_number(value: object) -> int:
+    """A date, datetime or ISO-8601 text as its day ordinal; blanks are NO_DAY."""
+    if value is None or value == "":
+        return NO_DAY
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip()[:10]).date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def day_numbers(values: Iterable[object]) -> np.ndarray:
+    return np.fromiter((day_number(value) for value in values), dtype=np.int32)
+
+
+def numbers(values: Iterable[object], blank: float = np.nan) -> np.ndarray:
+    return np.fromiter((blank if value is None or value == "" else float(value) for value in values), dtype=float)
+
+
+def flags(values: Iterable[object]) -> np.ndarray:
+    return np.fromiter((str(value).strip().lower() in ("1", "true", "yes") for value in values), dtype=bool)
+
+
+def round_half_up(values: np.ndarray) -> np.ndarray:
+    """ROUND(x::NUMERIC, 2): halves round away from zero, unlike np.round."""
+    return np.sign(values) * np.floor(np.abs(values) * 100 + 0.5) / 100
+
+
+@dataclass
+class Consultants:
+    ids: List[str]
+    entry: np.ndarray
+    exit: np.ndarray
+    work_experience_since: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, object]]) -> "Consultants":
+        """Rows keyed like the Consultant/ConsultancyUser attributes: ConsultantId, EntryDate, ExitDate, WorkExperienceSince."""
+        return cls(
+            ids=[str(row["ConsultantId"]) for row in rows],
+            entry=day_numbers(row.get("EntryDate") for row in rows),
+            exit=day_numbers(row.get("ExitDate") for row in rows),
+            work_experience_since=day_numbers(row.get("WorkExperienceSince") for row in rows),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class Engagements:
+    ids: List[str]
+    consultant_ids: List[str]
+    start: np.ndarray
+    end: np.ndarray
+    is_ongoing: np.ndarray
+    is_date_invalid: np.ndarray
+    # Percent of full time; blank counts as 100.
+    capacity: np.ndarray
+    # The stored Engagement.AbsoluteMonth and WeightedMonth; NaN where the row had none.
+    absolute_month: np.ndarray
+    weighted_month: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, object]]) -> "Engagements":
+        """Rows keyed like the Engagement attributes (Id, ConsultantId, StartDate, EndDate, IsOngoing, ...)."""
+        return cls(
+            ids=[str(row["Id"]) for row in rows],
+            consultant_ids=[str(row["ConsultantId"]) for row in rows],
+            start=day_numbers(row.get("StartDate") for row in rows),
+            end=day_numbers(row.get("EndDate") for row in rows),
+            is_ongoing=flags(row.get("IsOngoing") for row in rows),
+            is_date_invalid=flags(row.get("IsDateInvalid") for row in rows),
+            capacity=numbers((row.get("Capacity") for row in rows), blank=100.0),
+            absolute_month=numbers(row.get("AbsoluteMonth") for row in rows),
+            weighted_month=numbers(row.get("WeightedMonth") for row in rows),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, positions: np.ndarray) -> "Engagements":
+        return Engagements(
+            ids=[self.ids[p] for p in positions],
+            consultant_ids=[self.consultant_ids[p] for p in positions],
+            **{name: getattr(self, name)[positions] for name in ARRAY_FIELDS},
+        )
+
+
+@dataclass
+class Coverage:
+    """Unrounded months per consultant and period; NaN baselines are SQL NULLs."""
+
+    baseline: Dict[str, np.ndarray]
+    absolute: Dict[str, np.ndarray]
+    weighted: Dict[str, np.ndarray]
+
+    def columns(self) -> Dict[str, List[object]]:
+        """The export's coverage columns, rounded and with NULLs as None, keyed by COVERAGE_HEADERS."""
+        columns: Dict[str, np.ndarray] = {}
+        for period in PERIODS:
+            baseline = self.baseline[period]
+            known = ~np.isnan(baseline)
+            absolute = self.absolute[period]
+            # Weighted months never exceed the baseline; before entry a NULL baseline leaves them unclamped.
+            weighted = np.maximum(0.0, np.fmin(self.weighted[period], baseline))
+            positive = known & (baseline > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                absolute_ratio, weighted_ratio = absolute / baseline, weighted / baseline
+            columns[f"Months {period} entry baseline"] = (baseline, known)
+            # Absolute months since entry are NULL with the baseline; before entry they are always set.
+            columns[f"Absolute months {period} entry"] = (absolute, known if period == "since" else np.ones_like(known))
+            columns[f"Weighted months {period} entry"] = (weighted, known if period == "since" else np.ones_like(known))
+            columns[f"Absolute missing months {period} entry"] = (baseline - absolute, known)
+            columns[f"Weighted missing months {period} entry"] = (baseline - weighted, known)
+            columns[f"Absolute coverage ratio {period} entry"] = (absolute_ratio, positive)
+            columns[f"Weighted coverage ratio {period} entry"] = (weighted_ratio, positive)
+        return {
+            header: [float(value) if present else None for value, present in zip(round_half_up(np.nan_to_num(values)), mask)]
+            for header, (values, mask) in ((header, columns[header]) for header in COVERAGE_HEADERS)
+        }
+
+
+def windows(consultants: Consultants, today: int) -> Dict[str, tuple]:
+    """Per period, the window start and end day of each consultant and whether it applies."""
+    exit_known = consultants.exit > NULL_DATE
+    baseline_end = np.minimum(np.where(exit_known, consultants.exit, today), today)
+    entry, since = consultants.entry, consultants.work_experience_since
+    entered = entry != NO_DAY
+    return {
+        "since": (entry, baseline_end, entered & (baseline_end > entry)),
+        "before": (since, entry, entered & (since != NO_DAY) & (entry > since)),
+    }
+
+
+def baselines(consultants: Consultants, today: int) -> Dict[str, np.ndarray]:
+    window = windows(consultants, today)
+    entry, baseline_end, _ = window["since"]
+    since = window["before"][0]
+    entered, experienced = entry != NO_DAY, since != NO_DAY
+    since_entry = np.where(entered, np.maximum(baseline_end - entry, 0) / DAYS_PER_MONTH, np.nan)
+    # Joining after the baseline end (a future entry date, or an exit before entry) has no baseline.
+    since_entry[entered & (entry > baseline_end)] = np.nan
+    before_entry = np.where(entered & experienced, np.maximum(entry - since, 0) / DAYS_PER_MONTH, np.nan)
+    return {"since": since_entry, "before": before_entry}
+
+
+def engagement_spans(engagements: Engagements, today: int) -> tuple:
+    """Effective end day (capped at today), length in days, and validity of every engagement."""
+    end_known = engagements.end > NULL_DATE
+    ongoing = engagements.is_ongoing & ~end_known
+    total_end = np.where(end_known, engagements.end, np.where(ongoing, today, NO_DAY))
+    effective_end = np.where(end_known, np.minimum(engagements.end, today), total_end)
+    valid = (
+        ~engagements.is_date_invalid
+        & (engagements.start != NO_DAY)
+        & (total_end != NO_DAY)
+        & (total_end > engagements.start)
+    )
+    return effective_end, (total_end - engagements.start).astype(float), valid
+
+
+def stored_months(engagements: Engagements, total_days: np.ndarray, derive: bool = False) -> tuple:
+    """AbsoluteMonth and WeightedMonth of every engagement.
+
+    A missing stored value is 0, as COALESCE(..., 0.0) in the export; with ``derive`` it
+    is derived from the dates and capacity instead.
+    """
+    if not derive:
+        return np.nan_to_num(engagements.absolute_month), np.nan_to_num(engagements.weighted_month)
+    derived = total_days / DAYS_PER_MONTH
+    absolute = np.where(np.isnan(engagements.absolute_month), derived, engagements.absolute_month)
+    weighted = np.where(np.isnan(engagements.weighted_month), absolute * engagements.capacity / 100, engagements.weighted_month)
+    return absolute, weighted
+
+
+def prorated_months(owner, start, end, total_days, absolute, weighted, size) -> tuple:
+    share = np.maximum(end - start, 0) / total_days
+    return (
+        np.bincount(owner, weights=absolute * share, minlength=size),
+        np.bincount(owner, weights=weighted * share, minlength=size),
+    )
+
+
+def union_months(owner, start, end, capacity, size) -> tuple:
+    """Days covered by any engagement, and capacity-days capped at full time, per consultant, in months.
+
+    A sweep over start (+1) and end (-1) events sorted by consultant and day: the running
+    sums between two events of the same consultant are the number of engagements and the
+    capacity booked on each day of that stretch.
+    """
+    keep = end > start
+    owner, start, end, capacity = owner[keep], start[keep], end[keep], capacity[keep]
+    if not owner.size:
+        return np.zeros(size), np.zeros(size)
+    event_owner = np.concatenate([owner, owner])
+    event_day = np.concatenate([start, end])
+    order = np.lexsort((event_day, event_owner))
+    event_owner, event_day = event_owner[order], event_day[order]
+    active = np.cumsum(np.concatenate([np.ones(owner.size), -np.ones(owner.size)])[order])
+    booked = np.cumsum(np.concatenate([capacity, -capacity])[order])
+    # Every consultant's events sum to zero, so the running sums restart at each consultant.
+    stretch = np.diff(event_day).astype(float)
+    stretch[event_owner[1:] != event_owner[:-1]] = 0.0
+    covered = stretch * (np.round(active[:-1]) > 0)
+    weighted = stretch * np.clip(booked[:-1], 0.0, 100.0) / 100
+    return (
+        np.bincount(event_owner[:-1], weights=covered, minlength=size) / DAYS_PER_MONTH,
+        np.bincount(event_owner[:-1], weights=weighted, minlength=size) / DAYS_PER_MONTH,
+    )
+
+
+def compute_coverage(
+    consultants: Consultants,
+    engagements: Engagements,
+    owner: np.ndarray,
+    today: date,
+    method: str = "prorated",
+    derive_months: bool = False,
+) -> Coverage:
+    """Coverage of every consultant; ``owner`` is the consultant index of each engagement.
+
+    Engagements with owner -1 (consultants outside the scope) are ignored.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown coverage method {method!r}; expected one of {METHODS}")
+    today_day = today.toordinal()
+    size = len(consultants)
+    effective_end, total_days, valid = engagement_spans(engagements, today_day)
+    absolute_month, weighted_month = stored_months(engagements, total_days, derive_months)
+    result = Coverage(baselines(consultants, today_day), {}, {})
+    for period, (low, high, applies) in windows(consultants, today_day).items():
+        counted = valid & (owner >= 0) & applies[np.maximum(owner, 0)]
+        who = owner[counted]
+        start = np.maximum(engagements.start[counted], low[who])
+        end = np.minimum(effective_end[counted], high[who])
+        if method == "prorated":
+            absolute, weighted = prorated_months(
+                who, start, end, total_days[counted], absolute_month[counted], weighted_month[counted], size
+            )
+        else:
+            absolute, weighted = union_months(who, start, end, engagements.capacity[counted], size)
+        result.absolute[period], result.weighted[period] = absolute, weighted
+    return result
+
+
+class CoverageEngine:
+    """Coverage of one tenant's consultants, kept current through engagement and consultant changes."""
+
+    def __init__(
+        self,
+        consultants: Consultants,
+        engagements: Engagements,
+        today: date,
+        method: str = "prorated",
+        derive_months: bool = False,
+        coverage: Optional[Coverage] = None,
+    ) -> None:
+        """``coverage`` is the consultants' coverage as of ``today`` if already known (as in a saved state)."""
+        self.consultants = consultants
+        self.engagements = engagements
+        self.today = today
+        self.method = method
+        self.derive_months = derive_months
+        self.index = {consultant_id: position for position, consultant_id in enumerate(consultants.ids)}
+        self.owner = self.owners(engagements)
+        self.coverage = coverage if coverage is not None else compute_coverage(consultants, engagements, self.owner, today, method, derive_months)
+        self.dirty = np.zeros(len(consultants), dtype=bool)
+
+    def owners(self, engagements: Engagements) -> np.ndarray:
+        # Engagements of consultants outside the scope (external, inactive) are ignored, as in the export.
+        return np.fromiter((self.index.get(c, -1) for c in engagements.consultant_ids), dtype=np.int64, count=len(engagements))
+
+    def upsert_engagements(self, changed: Engagements) -> None:
+        """Replace engagements with the same id and add the others."""
+        positions = {engagement_id: position for position, engagement_id in enumerate(self.engagements.ids)}
+        known = np.fromiter((positions.get(i, -1) for i in changed.ids), dtype=np.int64, count=len(changed))
+        # The previous owner of a moved engagement loses its months.
+        self.mark(self.owner[known[known >= 0]])
+        keep = np.ones(len(self.engagements), dtype=bool)
+        keep[known[known >= 0]] = False
+        self.engagements = concatenate(self.engagements.take(np.flatnonzero(keep)), changed)
+        changed_owner = self.owners(changed)
+        self.owner = np.concatenate([self.owner[keep], changed_owner])
+        self.mark(changed_owner)
+
+    def remove_engagements(self, engagement_ids: Iterable[str]) -> None:
+        removed = set(engagement_ids)
+        drop = np.fromiter((i in removed for i in self.engagements.ids), dtype=bool, count=len(self.engagements))
+        self.mark(self.owner[drop])
+        self.engagements = self.engagements.take(np.flatnonzero(~drop))
+        self.owner = self.owner[~drop]
+
+    def update_consultants(self, changed: Consultants) -> None:
+        """New entry, exit or work experience dates; consultants new to the scope are added."""
+        added = [consultant_id for consultant_id in dict.fromkeys(changed.ids) if consultant_id not in self.index]
+        if added:
+            self.add_consultants(added)
+        positions = np.fromiter((self.index[i] for i in changed.ids), dtype=np.int64, count=len(changed))
+        for name in ("entry", "exit", "work_experience_since"):
+            getattr(self.consultants, name)[positions] = getattr(changed, name)
+        self.mark(positions)
+
+    def add_consultants(self, consultant_ids: List[str]) -> None:
+        first = len(self.consultants)
+        self.consultants.ids.extend(consultant_ids)
+        self.index.update((consultant_id, first + offset) for offset, consultant_id in enumerate(consultant_ids))
+        blank = np.full(len(consultant_ids), NO_DAY, dtype=np.int32)
+        for name in ("entry", "exit", "work_experience_since"):
+            setattr(self.consultants, name, np.concatenate([getattr(self.consultants, name), blank]))
+        for values in (getattr(self.coverage, kind) for kind in COVERAGE_KINDS):
+            for period in PERIODS:
+                values[period] = np.concatenate([values[period], np.full(len(consultant_ids), np.nan)])
+        self.dirty = np.concatenate([self.dirty, np.ones(len(consultant_ids), dtype=bool)])
+        # Engagements that arrived before their consultant was in scope now count.
+        self.owner = self.owners(self.engagements)
+
+    def advance(self, today: date) -> None:
+        """Move the evaluation date; only consultants whose windows or engagements reach past the earlier date change."""
+        earlier = min(self.today, today).toordinal()
+        self.today = today
+        exit_known = self.consultants.exit > NULL_DATE
+        self.dirty |= ~exit_known | (self.consultants.exit > earlier)
+        reaching = (self.engagements.is_ongoing | (self.engagements.end > earlier)) & (self.owner >= 0)
+        self.mark(self.owner[reaching])
+
+    def mark(self, positions: np.ndarray) -> None:
+        self.dirty[positions[positions >= 0]] = True
+
+    def refresh(self) -> np.ndarray:
+        """Recompute the consultants marked since the last refresh and return their indices."""
+        changed = np.flatnonzero(self.dirty)
+        if not changed.size:
+            return changed
+        subset = Consultants(
+            ids=[self.consultants.ids[p] for p in changed],
+            entry=self.consultants.entry[changed],
+            exit=self.consultants.exit[changed],
+            work_experience_since=self.consultants.work_experience_since[changed],
+        )
+        remap = np.full(len(self.consultants), -1, dtype=np.int64)
+        remap[changed] = np.arange(changed.size)
+        rows = np.flatnonzero((self.owner >= 0) & self.dirty[np.maximum(self.owner, 0)])
+        coverage = compute_coverage(subset, self.engagements.take(rows), remap[self.owner[rows]], self.today, self.method, self.derive_months)
+        for kind in COVERAGE_KINDS:
+            for period in PERIODS:
+                getattr(self.coverage, kind)[period][changed] = getattr(coverage, kind)[period]
+        self.dirty[:] = False
+        return changed
+
+    def save(self, path: Path) -> Path:
+        with atomic_write(path) as handle:
+            np.savez(
+                handle,
+                format=np.array([STATE_FORMAT]),
+                today=np.array([self.today.toordinal()]),
+                method=np.array([self.method]),
+                derive_months=np.array([self.derive_months]),
+                consultant_ids=np.array(self.consultants.ids, dtype=str),
+                entry=self.consultants.entry,
+                exit=self.consultants.exit,
+                work_experience_since=self.consultants.work_experience_since,
+                engagement_ids=np.array(self.engagements.ids, dtype=str),
+                engagement_consultant_ids=np.array(self.engagements.consultant_ids, dtype=str),
+                **{f"engagement_{name}": getattr(self.engagements, name) for name in ARRAY_FIELDS},
+                **{f"{kind}_{period}": getattr(self.coverage, kind)[period] for kind in COVERAGE_KINDS for period in PERIODS},
+                dirty=self.dirty,
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "CoverageEngine":
+        with np.load(path) as state:
+            if int(state["format"][0]) != STATE_FORMAT:
+                raise ValueError(f"{path} was written by another version of this script; rebuild it with init")
+            consultants = Consultants(
+                ids=state["consultant_ids"].tolist(),
+                entry=state["entry"],
+                exit=state["exit"],
+                work_experience_since=state["work_experience_since"],
+            )
+            engagements = Engagements(
+                ids=state["engagement_ids"].tolist(),
+                consultant_ids=state["engagement_consultant_ids"].tolist(),
+                **{name: state[f"engagement_{name}"] for name in ARRAY_FIELDS},
+            )
+            today = date.fromordinal(int(state["today"][0]))
+            # The stored coverage is restored as is; only consultants marked since are recomputed.
+            coverage = Coverage(*({period: state[f"{kind}_{period}"] for period in PERIODS} for kind in COVERAGE_KINDS))
+            engine = cls(consultants, engagements, today, str(state["method"][0]), bool(state["derive_months"][0]), coverage)
+            engine.dirty = state["dirty"]
+            return engine
+
+
+def concatenate(first: Engagements, second: Engagements) -> Engagements:
+    return Engagements(
+        ids=first.ids + second.ids,
+        consultant_ids=first.consultant_ids + second.consultant_ids,
+        **{name: np.concatenate([getattr(first, name), getattr(second, name)]) for name in ARRAY_FIELDS},
+    )
+
+
+def consultant_id_from_url(url: object) -> str:
+    """The export's Url is @ConsultantUrlPrefix followed by the consultant id."""
+    text = str(url or "").strip()
+    return text[max(text.rfind("="), text.rfind("/")) + 1 :]
+
+
+def patch_table(table: SourceTable, engine: CoverageEngine, consultants: Optional[np.ndarray] = None) -> SourceTable:
+    """``table`` with the coverage columns of ``consultants`` (default: all) replaced by the engine's values.
+
+    Rows are matched by the consultant id at the end of their Url; rows of unknown
+    consultants keep the exported values.
+    """
+    columns = engine.coverage.columns()
+    wanted = None if consultants is None else set(consultants.tolist())
+    rows = []
+    for row, url in enumerate(table.column("Url")):
+        position = engine.index.get(consultant_id_from_url(url))
+        if position is not None and (wanted is None or position in wanted):
+            rows.append((row, position))
+    values = list(table.values)
+    stats = list(table.stats)
+    for header in COVERAGE_HEADERS:
+        column_index = table.index[header]
+        column = list(values[column_index])
+        computed = columns[header]
+        for row, position in rows:
+            column[row] = computed[position]
+        values[column_index] = tuple(column)
+        stats[column_index] = column_stats(values[column_index], len(set(values[column_index])))
+    return SourceTable(table.headers, values, table.categories, table.codes, stats)
+
+
+def read_csv(path: Path) -> List[Dict[str, str]]:
+    with Path(path).open(newline="", encoding="utf-8-sig") as handle:
+        return list(csv.DictReader(handle))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compute engagement month coverage per consultant")
+    commands = parser.add_subparsers(dest="command", required=True)
+    init = commands.add_parser("init", help="Compute every consultant's coverage and store the engine state")
+    init.add_argument("--consultants", required=True, help="CSV with ConsultantId, EntryDate, ExitDate, WorkExperienceSince")
+    init.add_argument("--engagements", required=True, help="CSV with Id, ConsultantId, StartDate, EndDate, IsOngoing, IsDateInvalid, Capacity[, AbsoluteMonth, WeightedMonth]")
+    init.add_argument("--method", choices=METHODS, default="prorated", help="prorated: the export's rule; union: overlapping engagements count once")
+    init.add_argument("--derive-months", action="store_true", help="Derive missing AbsoluteMonth/WeightedMonth from dates and capacity (the export counts them as 0)")
+    init.add_argument("--today", type=date.fromisoformat, help="Evaluate as of this date (YYYY-MM-DD; default: today)")
+    init.add_argument("--state", required=True, help="Engine state file (.npz)")
+    update = commands.add_parser("update", help="Apply engagement and consultant changes and recompute the consultants they touch")
+    update.add_argument("--state", required=True, help="Engine state file written by init")
+    update.add_argument("--engagements", help="CSV of added or changed engagements; rows with Deleted=1 are removed")
+    update.add_argument("--consultants", help="CSV of consultants with changed entry, exit or work experience dates")
+    update.add_argument("--today", type=date.fromisoformat, help="Move the evaluation date (YYYY-MM-DD)")
+    for command in (init, update):
+        command.add_argument("--export", help="Raw data quality export whose coverage columns are patched")
+        command.add_argument("--output", help="Where the patched export is written (requires --export)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    state_path = Path(args.state).expanduser()
+    if args.command == "init":
+        consultants = Consultants.from_rows(read_csv(Path(args.consultants).expanduser()))
+        engagements = Engagements.from_rows(read_csv(Path(args.engagements).expanduser()))
+        engine = CoverageEngine(consultants, engagements, args.today or date.today(), args.method, args.derive_months)
+        changed = None
+        print(f"Computed coverage of {len(consultants)} consultants from {len(engagements)} engagements")
+    else:
+        engine = CoverageEngine.load(state_path)
+        if args.today:
+            engine.advance(args.today)
+        if args.consultants:
+            engine.update_consultants(Consultants.from_rows(read_csv(Path(args.consultants).expanduser())))
+        if args.engagements:
+            rows = read_csv(Path(args.engagements).expanduser())
+            deleted = flags(row.get("Deleted") for row in rows)
+            engine.remove_engagements(row["Id"] for row, gone in zip(rows, deleted) if gone)
+            engine.upsert_engagements(Engagements.from_rows([row for row, gone in zip(rows, deleted) if not gone]))
+        changed = engine.refresh()
+        print(f"Recomputed coverage of {changed.size} of {len(engine.consultants)} consultants")
+    engine.save(state_path)
+    if args.export and args.output:
+        table = patch_table(load_source(Path(args.export).expanduser()), engine, changed)
+        created = write_export(Path(args.output).expanduser(), table.rows(), table.headers)
+        print(f"Wrote patched export: {created}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""Keep Engagement.AbsoluteMonth, ProjectDays and IsOngoing current without rescanning every engagement.
+
+Applies the rules of ``queries/insights/UpdateOngoingEngagementMetrics.sql``: for every
+valid ongoing engagement of a tenant with a ProjectDaysPerMonth setting, the metrics are
+recalculated from AGE(effective end, start date) and written where they differ from the
+stored values. The SQL finds those rows by recalculating all ongoing engagements on every
+run and updates 10,000 at a time, so catching up after a month rollover takes many runs.
+
+Here a full pass computes, next to the metrics, the first date on which each engagement's
+metrics will change again. Those dates form a schedule (one bucket of engagement ids per
+day, saved as ``.npz``); a daily run only loads and updates the engagements in the buckets
+that are due, plus engagements reported as edited and candidates the schedule does not know
+yet (new engagements, or ones that became ongoing). The schedule also keeps the tenants'
+ProjectDaysPerMonth settings it was computed with; when they differ, the run is a full pass.
+The due engagements are processed in chunks on parallel connections.
+
+Usage:
+  python3 scripts/engagement_metrics_sync.py --dsn postgresql://localhost/matchical --schedule sync.npz --full
+  python3 scripts/engagement_metrics_sync.py --dsn postgresql://localhost/matchical --schedule sync.npz
+  python3 scripts/engagement_metrics_sync.py --sqlite engagements.db --schedule sync.npz --changed-ids edited.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__:
+    from .atomic_write import atomic_write
+    from .engagement_coverage import NO_DAY, NULL_DATE, day_numbers
+else:
+    from atomic_write import atomic_write
+    from engagement_coverage import NO_DAY, NULL_DATE, day_numbers
+
+# Metrics of an engagement change at least monthly; within this many days the next change
+# is always found. Engagements without one are checked again after it.
+HORIZON_DAYS = 62
+NEVER = np.iinfo(np.int32).max
+UNIX_EPOCH = date(1970, 1, 1).toordinal()
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_WORKERS = 4
+SCHEDULE_FORMAT = 2
+
+
+def pg_age(end: date, start: date) -> Tuple[int, int]:
+    """AGE(end, start) for end >= start, as (months, days).
+
+    PostgreSQL subtracts the calendar fields and borrows the length of the start's month
+    when the day difference is negative: AGE('2024-03-01', '2024-01-31') is 1 mon 1 day.
+    """
+    months = (end.year - start.year) * 12 + end.month - start.month
+    days = end.day - start.day
+    if days < 0:
+        months -= 1
+        days += days_in_month(start.year, start.month)
+    return months, days
+
+
+def days_in_month(year: int, month: int) -> int:
+    return (date(year + month // 12, month % 12 + 1, 1) - date(year, month, 1)).days
+
+
+def engagement_metrics(start: date, end: Optional[date], capacity: float, project_days_per_month: float, today: date) -> Optional[Tuple[int, int, int]]:
+    """The reference rule for one engagement: (AbsoluteMonth, ProjectDays, IsOngoing), or None when it is not updated."""
+    finished = end is not None and end > date(1900, 1, 1) and end <= today
+    effective_end = end if finished else today
+    if effective_end <= start:
+        return None
+    months, days = pg_age(effective_end, start)
+    absolute_month = max(1, half_up((months * 30 + days) / 30))
+    project_days = half_up((months + days / 30.4375) * project_days_per_month * (capacity / 100.0))
+    return absolute_month, project_days, 0 if finished else 1
+
+
+def half_up(value: float) -> int:
+    """ROUND(x::NUMERIC) for the non-negative values here: halves round up."""
+    return int(np.floor(value + 0.5))
+
+
+def calendar_fields(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Year, month, day and length of the month of each day number."""
+    dates = (days.astype(np.int64) - UNIX_EPOCH).astype("datetime64[D]")
+    months = dates.astype("datetime64[M]")
+    year_month = months.astype(np.int64)
+    month_length = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    return year_month // 12 + 1970, year_month % 12 + 1, (dates - months).astype(np.int64) + 1, month_length
+
+
+def calculated_metrics(
+    start: np.ndarray,
+    end: np.ndarray,
+    capacity: np.ndarray,
+    project_days_per_month: np.ndarray,
+    today: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """``engagement_metrics`` for arrays of day numbers: eligible, AbsoluteMonth, ProjectDays, IsOngoing.
+
+    Rounding is done on exact integer ratios where the SQL's operands are exact
+    (30.4375 = 487/16), so halves round the same way as PostgreSQL's NUMERIC.
+    """
+    finished = (end > NULL_DATE) & (end <= today)
+    effective_end = np.where(finished, end, today)
+    eligible = (start != NO_DAY) & (effective_end > start)
+    start_year, start_month, start_day, start_month_length = calendar_fields(np.where(eligible, start, today))
+    end_year, end_month, end_day, _ = calendar_fields(np.where(eligible, effective_end, today))
+    months = (end_year - start_year) * 12 + end_month - start_month
+    days = end_day - start_day
+    borrow = days < 0
+    months = months - borrow
+    days = days + np.where(borrow, start_month_length, 0)
+    absolute_month = np.maximum(1, (60 * months + 2 * days + 30) // 60)
+    project_days = np.floor((487 * months + 16 * days) * project_days_per_month * capacity / 48700 + 0.5).astype(np.int64)
+    return eligible, absolute_month, project_days, (~finished).astype(np.int64)
+
+
+def next_change_days(start, end, capacity, project_days_per_month, today: int) -> np.ndarray:
+    """First day after ``today`` on which each engagement's calculated metrics differ from today's.
+
+    NEVER for engagements that are finished today: once IsOngoing is written as 0 they leave
+    the update's scope. Engagements without a change within HORIZON_DAYS (tiny capacities)
+    are due again at the horizon.
+    """
+    eligible, absolute, project, ongoing = calculated_metrics(start, end, capacity, project_days_per_month, today)
+    due = np.full(start.shape, today + HORIZON_DAYS, dtype=np.int64)
+    due[eligible & (ongoing == 0)] = NEVER
+    open_rows = np.flatnonzero(~eligible | (ongoing == 1))
+    for offset in range(1, HORIZON_DAYS):
+        if not open_rows.size:
+            break
+        state = calculated_metrics(start[open_rows], end[open_rows], capacity[open_rows], project_days_per_month[open_rows], today + offset)
+        # Eligibility only ever starts: the effective end moves forward with the date.
+        changed = state[0] & (
+            ~eligible[open_rows]
+            | (state[1] != absolute[open_rows])
+            | (state[2] != project[open_rows])
+            | (state[3] != ongoing[open_rows])
+        )
+        due[open_rows[changed]] = today + offset
+        open_rows = open_rows[~changed]
+    return due
+
+
+@dataclass
+class EngagementBatch:
+    ids: np.ndarray
+    tenant_ids: List[object]
+    start: np.ndarray
+    end: np.ndarray
+    capacity: np.ndarray
+    absolute_month: np.ndarray
+    project_days: np.ndarray
+    is_ongoing: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[object]]) -> "EngagementBatch":
+        """Rows of (Id, TenantId, StartDate, EndDate, Capacity, AbsoluteMonth, ProjectDays, IsOngoing); NULLs become -1."""
+        columns = list(zip(*rows)) or [()] * 8
+        stored = [np.fromiter((-1 if value is None else int(value) for value in column), dtype=np.int64, count=len(rows)) for column in columns[5:]]
+        return cls(
+            np.fromiter(columns[0], dtype=np.int64, count=len(rows)),
+            list(columns[1]),
+            day_numbers(columns[2]),
+            day_numbers(columns[3]),
+            np.fromiter((float(value) for value in columns[4]), dtype=float, count=len(rows)),
+            *stored,
+        )
+
+
+class EngagementStore:
+    """Reads and writes engagements over one DB-API connection (PostgreSQL, or SQLite in tests)."""
+
+    def __init__(self, connection, engagement_table: str = "Engagement", settings_table: str = "ConsultancySettingsEXT") -> None:
+        self.connection = connection
+        self.engagement_table = quote(engagement_table)
+        self.settings_table = quote(settings_table)
+        self.placeholder = "?" if isinstance(connection, sqlite3.Connection) else "%s"
+
+    def project_days_per_month(self) -> Dict[object, float]:
+        """ProjectDaysPerMonth per tenant from its settings row with the lowest Id, as settings_scope ranks them."""
+        rows = self.query(
+            f'SELECT "TenantId", "ProjectDaysPerMonth" FROM {self.settings_table} '
+            f'WHERE "ProjectDaysPerMonth" IS NOT NULL ORDER BY "TenantId", "Id"'
+        )
+        settings: Dict[object, float] = {}
+        for tenant_id, value in rows:
+            settings.setdefault(tenant_id, float(value))
+        return settings
+
+    def candidate_ids(self) -> np.ndarray:
+        """Ids of every engagement the update looks at: valid, stored as ongoing, with a start date and capacity."""
+        rows = self.query(
+            f'SELECT "Id" FROM {self.engagement_table} WHERE "IsDateInvalid" = 0 AND "IsOngoing" = 1 '
+            f'AND "StartDate" IS NOT NULL AND "Capacity" IS NOT NULL ORDER BY "Id"'
+        )
+        return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    def fetch(self, ids: np.ndarray) -> EngagementBatch:
+        """The candidates among ``ids``; engagements that left the scope (finished, invalid) are skipped."""
+        marks = ", ".join([self.placeholder] * len(ids))
+        rows = self.query(
+            f'SELECT "Id", "TenantId", "StartDate", "EndDate", "Capacity", "AbsoluteMonth", "ProjectDays", "IsOngoing" '
+            f'FROM {self.engagement_table} WHERE "Id" IN ({marks}) AND "IsDateInvalid" = 0 AND "IsOngoing" = 1 '
+            f'AND "StartDate" IS NOT NULL AND "Capacity" IS NOT NULL',
+            [int(i) for i in ids],
+        ) if len(ids) else []
+        return EngagementBatch.from_rows(rows)
+
+    def update(self, ids: np.ndarray, absolute_month: np.ndarray, project_days: np.ndarray, is_ongoing: np.ndarray) -> int:
+        p = self.placeholder
+        rows = [(int(a), int(d), int(o), int(i)) for i, a, d, o in zip(ids, absolute_month, project_days, is_ongoing)]
+        if rows:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                f'UPDATE {self.engagement_table} SET "AbsoluteMonth" = {p}, "ProjectDays" = {p}, "IsOngoing" = {p} WHERE "Id" = {p}',
+                rows,
+            )
+        self.connection.commit()
+        return len(rows)
+
+    def query(self, sql: str, parameters: Sequence[object] = ()) -> List[Tuple[object, ...]]:
+        cursor = self.connection.cursor()
+        cursor.execute(sql, parameters)
+        return cursor.fetchall()
+
+
+def quote(identifier: str) -> str:
+    return ".".join('"' + part.replace('"', '""') + '"' for part in identifier.split("."))
+
+
+class Schedule:
+    """Engagement ids bucketed by the day their metrics are next due for recalculation.
+
+    Engagements of tenants without a setting are kept with the day NEVER, so that a run
+    tells them apart from candidates it has not seen. ``settings`` are the ProjectDaysPerMonth
+    values per tenant the due days were computed with.
+    """
+
+    def __init__(
+        self, ids: Optional[np.ndarray] = None, due: Optional[np.ndarray] = None, settings: Optional[Dict[str, float]] = None
+    ) -> None:
+        self.due: Dict[int, int] = {}
+        self.settings = settings
+        if ids is not None:
+            self.add(ids, due)
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def add(self, ids: np.ndarray, due: np.ndarray) -> None:
+        self.due.update(zip(ids.tolist(), due.tolist()))
+
+    def retain(self, ids: np.ndarray) -> None:
+        """Forget the engagements not in ``ids`` (those that left the candidates)."""
+        kept = set(ids.tolist())
+        self.due = {engagement_id: day for engagement_id, day in self.due.items() if engagement_id in kept}
+
+    def unknown(self, ids: np.ndarray) -> np.ndarray:
+        """The ``ids`` without a due day."""
+        return ids[np.fromiter((engagement_id not in self.due for engagement_id in ids.tolist()), dtype=bool, count=len(ids))]
+
+    def buckets(self) -> Dict[int, np.ndarray]:
+        """Engagement ids per due day."""
+        if not self.due:
+            return {}
+        ids, days = self.arrays()
+        order = np.argsort(days, kind="stable")
+        ids, days = ids[order], days[order]
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        return {int(day): bucket for day, bucket in zip(days[starts], np.split(ids, starts[1:])) if day != NEVER}
+
+    def pop_due(self, today: int) -> np.ndarray:
+        """Remove and return the ids due on or before ``today``."""
+        ids, days = self.arrays()
+        due = ids[days <= today]
+        for engagement_id in due.tolist():
+            del self.due[engagement_id]
+        return due
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.fromiter(self.due.keys(), dtype=np.int64, count=len(self.due))
+        days = np.fromiter(self.due.values(), dtype=np.int64, count=len(self.due))
+        return ids, days
+
+    def save(self, path: Path, synced: date) -> Path:
+        ids, days = self.arrays()
+        settings = self.settings or {}
+        with atomic_write(path) as handle:
+            np.savez(
+                handle,
+                format=np.array([SCHEDULE_FORMAT]),
+                synced=np.array([synced.toordinal()]),
+                ids=ids,
+                due=days,
+                settings_tenants=np.array(list(settings), dtype=str),
+                settings_values=np.array(list(settings.values()), dtype=float),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["Schedule", date]:
+        with np.load(path) as state:
+            if int(state["format"][0]) != SCHEDULE_FORMAT:
+                raise ValueError(f"{path} was written by another version of this script; run with --full")
+            settings = dict(zip(state["settings_tenants"].tolist(), state["settings_values"].tolist()))
+            return cls(state["ids"], state["due"], settings), date.fromordinal(int(state["synced"][0]))
+
+
+@dataclass
+class SyncReport:
+    checked: int = 0
+    updated: int = 0
+    chunks: int = 0
+    # Whether every candidate was recalculated (asked for, or the settings changed).
+    full: bool = False
+    # Engagements due per day over the next HORIZON_DAYS.
+    upcoming: Dict[str, int] = field(default_factory=dict)
+
+
+def sync_chunk(
+    connect: Callable[[], object],
+    store_options: Dict[str, str],
+    ids: np.ndarray,
+    settings: Dict[object, float],
+    today: date,
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Recalculate and write one chunk on its own connection; returns the updated count and the chunk's next due days."""
+    connection = connect()
+    try:
+        store = EngagementStore(connection, **store_options)
+        batch = store.fetch(ids)
+        # Tenants without a ProjectDaysPerMonth setting are outside the update, as in settings_scope.
+        project_days_per_month = np.array([settings.get(tenant_id, np.nan) for tenant_id in batch.tenant_ids], dtype=float)
+        configured = ~np.isnan(project_days_per_month)
+        project_days_per_month[~configured] = 0.0
+        day = today.toordinal()
+        eligible, absolute, project, ongoing = calculated_metrics(batch.start, batch.end, batch.capacity, project_days_per_month, day)
+        eligible &= configured
+        stale = eligible & (
+            (batch.absolute_month != absolute) | (batch.project_days != project) | (batch.is_ongoing != ongoing)
+        )
+        updated = store.update(batch.ids[stale], absolute[stale], project[stale], ongoing[stale])
+        due = next_change_days(batch.start, batch.end, batch.capacity, project_days_per_month, day)
+        due[~configured] = NEVER
+        return updated, batch.ids, due
+    finally:
+        connection.close()
+
+
+class EngagementMetricsSync:
+    """Runs the update for the engagements that are due, in parallel chunks."""
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        schedule: Optional[Schedule] = None,
+        workers: int = DEFAULT_WORKERS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **store_options: str,
+    ) -> None:
+        self.connect = connect
+        self.schedule = schedule if schedule is not None else Schedule()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.store_options = store_options
+
+    def run(self, today: date, full: bool = False, changed: Iterable[int] = ()) -> SyncReport:
+        """Update the engagements due by ``today`` (every candidate with ``full``) plus the ``changed`` ones.
+
+        Candidates missing from the schedule are due today. A change in any tenant's
+        ProjectDaysPerMonth moves every due day of its engagements, so it makes the run full.
+        """
+        connection = self.connect()
+        try:
+            store = EngagementStore(connection, **self.store_options)
+            settings = store.project_days_per_month()
+            candidates = store.candidate_ids()
+        finally:
+            connection.close()
+        full = full or self.schedule.settings != tenant_settings(settings)
+        if full:
+            self.schedule = Schedule()
+            ids = candidates
+        else:
+            self.schedule.retain(candidates)
+            ids = np.union1d(self.schedule.pop_due(today.toordinal()), self.schedule.unknown(candidates))
+        self.schedule.settings = tenant_settings(settings)
+        ids = np.union1d(ids, np.fromiter(changed, dtype=np.int64))
+        chunks = [ids[offset : offset + self.chunk_size] for offset in range(0, len(ids), self.chunk_size)]
+        report = SyncReport(checked=len(ids), chunks=len(chunks), full=full)
+        # The chunks wait on the database, not the interpreter, so threads with a connection each are enough.
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = executor.map(lambda chunk: sync_chunk(self.connect, self.store_options, chunk, settings, today), chunks)
+            for updated, chunk_ids, due in results:
+                report.updated += updated
+                self.schedule.add(chunk_ids, due)
+        horizon = today.toordinal() + HORIZON_DAYS
+        report.upcoming = {
+            date.fromordinal(day).isoformat(): len(bucket) for day, bucket in self.schedule.buckets().items() if day <= horizon
+        }
+        return report
+
+
+def tenant_settings(settings: Dict[object, float]) -> Dict[str, float]:
+    """ProjectDaysPerMonth per tenant as stored with the schedule, keyed by the tenant id's text."""
+    return {str(tenant_id): value for tenant_id, value in settings.items()}
+
+
+def read_ids(path: Path) -> List[int]:
+    return [int(line) for line in Path(path).read_text(encoding="utf-8").split() if line.strip()]
+
+
+def postgres_connect(dsn: str) -> Callable[[], object]:
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit("PostgreSQL access needs psycopg: pip install -r requirements.txt")
+    return lambda: psycopg.connect(dsn)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recalculate AbsoluteMonth, ProjectDays and IsOngoing of the engagements that are due")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dsn", help="PostgreSQL connection string")
+    target.add_argument("--sqlite", help="SQLite database with the same tables (local testing)")
+    parser.add_argument("--schedule", required=True, help="Schedule file (.npz); written after every run")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recalculate every candidate and rebuild the schedule (implied when the tenants' ProjectDaysPerMonth settings changed)",
+    )
+    parser.add_argument("--changed-ids", help="File with ids of engagements edited since the last run, whitespace separated")
+    parser.add_argument("--today", type=date.fromisoformat, help="Run as of this date (YYYY-MM-DD; default: today)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel connections (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Engagements per chunk (default: %(default)s)")
+    parser.add_argument("--engagement-table", default="Engagement", help="Physical name of the Engagement table")
+    parser.add_argument("--settings-table", default="ConsultancySettingsEXT", help="Physical name of the consultancy settings table")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    connect = postgres_connect(args.dsn) if args.dsn else (lambda: sqlite3.connect(args.sqlite, timeout=60))
+    schedule_path = Path(args.schedule).expanduser()
+    schedule, full = None, args.full
+    if not full:
+        if not schedule_path.exists():
+            print(f"No schedule at {schedule_path}; running a full pass")
+            full = True
+        else:
+            schedule, _ = Schedule.load(schedule_path)
+    today = args.today or date.today()
+    sync = EngagementMetricsSync(
+        connect,
+        schedule,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        engagement_table=args.engagement_table,
+        settings_table=args.settings_table,
+    )
+    report = sync.run(today, full=full, changed=read_ids(Path(args.changed_ids)) if args.changed_ids else ())
+    sync.schedule.save(schedule_path, today)
+    if report.full and not full:
+        print("ProjectDaysPerMonth settings changed since the last run; ran a full pass")
+    print(f"Checked {report.checked} engagements in {report.chunks} chunks, updated {report.updated}")
+    for day, count in report.upcoming.items():
+        print(f"  due {day}: {count}")
+
+
+if __name__ == "__main__":
+    main()
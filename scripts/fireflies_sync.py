@@ -4,20 +4,28 @@
 from __future__ import annotations
 
 import argparse
+import gzip
+import hashlib
 import json
 import os
 import re
+import sqlite3
 import subprocess
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
 from typing import Any, Iterable
-from urllib.parse import urlparse
 
 import requests
 
+if __package__:
+    from .domain_resolution import apex_domain, normalize_email_domain, normalize_host
+else:
+    from domain_resolution import apex_domain, normalize_email_domain, normalize_host
+
 API_URL = "https://api.fireflies.ai/graphql"
 DEFAULT_PAGE_LIMIT = 50
 DEFAULT_DELTA_OVERLAP_DAYS = 7
@@ -44,7 +52,6 @@ PERSONAL_EMAIL_DOMAINS = {
     "web.de",
     "yahoo.com",
 }
-SECOND_LEVEL_PUBLIC_SUFFIXES = {"ac", "co", "com", "gov", "net", "org"}
 CATEGORY_KEYWORDS: dict[str, tuple[str, ...]] = {
     "planning": (
         "plan",
@@ -128,6 +135,53 @@ INTERNAL_MEETING_KEYWORDS: dict[str, int] = {
     "retro": 1,
     "retrospective": 1,
 }
+SENTENCES_FILENAME = "sentences.jsonl"
+VTT_FILENAME = "transcript.vtt"
+MEETING_EXPORT_FILENAMES = (
+    "transcript.md",
+    "metadata.json",
+    SENTENCES_FILENAME,
+    f"{SENTENCES_FILENAME}.gz",
+    VTT_FILENAME,
+)
+TRANSCRIPT_LINE_PATTERN = re.compile(
+    r"^\*\*(?P<speaker>.+?)\*\*(?: \[(?P<start>[\d:]+)(?: - (?P<end>[\d:]+))?\])?: (?P<text>.*)$"
+)
+MEETING_ROOTS = (Path("crm"), Path("docs") / "internal-meetings")
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+DEFAULT_SEARCH_LIMIT = 20
+ANALYTICS_VERSION = 1
+SEARCH_INDEX_VERSION = 2
+UNKNOWN_MONTH = "unknown"
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 16
+MINHASH_SHINGLE_WORDS = 5
+MINHASH_DENSIFY_OFFSET = 1 << 57
+SEARCH_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    meeting_key TEXT NOT NULL UNIQUE,
+    transcript_id TEXT,
+    title TEXT,
+    meeting_at TEXT,
+    account_slug TEXT,
+    bucket TEXT,
+    meeting_kind TEXT,
+    category TEXT,
+    source_mtime REAL NOT NULL DEFAULT 0,
+    first_sentence_rowid INTEGER,
+    last_sentence_rowid INTEGER
+);
+CREATE INDEX IF NOT EXISTS meetings_account_date ON meetings (account_slug, meeting_at);
+CREATE INDEX IF NOT EXISTS meetings_date ON meetings (meeting_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS sentences USING fts5(
+    text,
+    speaker,
+    meeting_id UNINDEXED,
+    start_time UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
 EMPTY_STATE = {
     "imported_transcript_ids": [],
     "latest_imported_meeting_at": None,
@@ -220,6 +274,301 @@ class RoutingDecision:
     dominant_domain: str | None
 
 
+@dataclass
+class TranscriptExports:
+    markdown: str
+    sentences_jsonl: str
+    vtt: str | None
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of imported meetings with LSH band buckets for candidate lookup."""
+
+    def __init__(self, *, bands: int = MINHASH_BANDS) -> None:
+        self.bands = bands
+        self.signatures: dict[str, list[int]] = {}
+        self.buckets: dict[tuple[int, tuple[int, ...]], set[str]] = {}
+
+    def band_keys(self, signature: list[int]) -> list[tuple[int, tuple[int, ...]]]:
+        rows = len(signature) // self.bands
+        return [(band, tuple(signature[band * rows : (band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, key: str, signature: list[int]) -> None:
+        self.remove(key)
+        self.signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self.buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self.band_keys(signature):
+            members = self.buckets.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self.buckets[band_key]
+
+    def query(self, signature: list[int], *, threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> list[tuple[str, float]]:
+        candidates: set[str] = set()
+        for band_key in self.band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        matches = [
+            (key, estimated_similarity(signature, self.signatures[key]))
+            for key in candidates
+        ]
+        return sorted(
+            ((key, similarity) for key, similarity in matches if similarity >= threshold),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "NearDuplicateIndex":
+        index = cls()
+        if not path.exists():
+            return index
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("permutations") != MINHASH_PERMUTATIONS or data.get("bands") != MINHASH_BANDS:
+            return index
+        for key, signature in (data.get("signatures") or {}).items():
+            index.add(key, [int(value) for value in signature])
+        return index
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "permutations": MINHASH_PERMUTATIONS,
+            "bands": self.bands,
+            "signatures": dict(sorted(self.signatures.items())),
+        }
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(payload, separators=(",", ":")) + "\n", encoding="utf-8")
+        temp_path.replace(path)
+
+
+class TranscriptSearchIndex:
+    """SQLite FTS5 index of transcript sentences joined to per-meeting routing metadata.
+
+    Each meeting's sentences get consecutive rowids whose range is kept on its ``meetings``
+    row, so a meeting is removed with a rowid range delete instead of a scan of the
+    UNINDEXED ``meeting_id`` column.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    @classmethod
+    def open(cls, path: Path) -> "TranscriptSearchIndex":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SEARCH_INDEX_VERSION:
+            # Written by another version of this script; the next refresh rebuilds it.
+            connection.executescript("DROP TABLE IF EXISTS sentences; DROP TABLE IF EXISTS meetings;")
+            connection.execute(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}")
+        connection.executescript(SEARCH_INDEX_SCHEMA)
+        return cls(connection)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def indexed_mtimes(self) -> dict[str, float]:
+        return dict(self.connection.execute("SELECT meeting_key, source_mtime FROM meetings"))
+
+    def remove_meeting(self, key: str) -> None:
+        row = self.connection.execute(
+            "SELECT id, first_sentence_rowid, last_sentence_rowid FROM meetings WHERE meeting_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return
+        meeting_id, first_rowid, last_rowid = row
+        if first_rowid is not None:
+            self.connection.execute("DELETE FROM sentences WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+        self.connection.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+    def index_meeting(
+        self,
+        key: str,
+        metadata: dict[str, Any],
+        sentences: Iterable[dict[str, Any]],
+        *,
+        source_mtime: float,
+    ) -> None:
+        with self.connection:
+            self.remove_meeting(key)
+            cursor = self.connection.execute(
+                "INSERT INTO meetings (meeting_key, transcript_id, title, meeting_at, account_slug, bucket,"
+                " meeting_kind, category, source_mtime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    metadata.get("transcript_id"),
+                    metadata.get("title"),
+                    metadata.get("meeting_at"),
+                    metadata.get("account_slug"),
+                    metadata.get("crm_bucket"),
+                    metadata.get("meeting_kind"),
+                    metadata.get("category"),
+                    source_mtime,
+                ),
+            )
+            meeting_id = cursor.lastrowid
+            last = self.connection.execute("SELECT rowid FROM sentences ORDER BY rowid DESC LIMIT 1").fetchone()
+            first_rowid = (last[0] if last else 0) + 1
+            rows = [
+                (first_rowid + offset, sentence["text"], sentence["speaker"], meeting_id, sentence["start_time"])
+                for offset, sentence in enumerate(sentences)
+            ]
+            self.connection.executemany(
+                "INSERT INTO sentences (rowid, text, speaker, meeting_id, start_time) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if rows:
+                self.connection.execute(
+                    "UPDATE meetings SET first_sentence_rowid = ?, last_sentence_rowid = ? WHERE id = ?",
+                    (first_rowid, rows[-1][0], meeting_id),
+                )
+
+    def search(
+        self,
+        query: str,
+        *,
+        account_slug: str | None = None,
+        from_date: date | None = None,
+        to_date: date | None = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+    ) -> list[dict[str, Any]]:
+        match_expression = fts_match_expression(query)
+        if not match_expression:
+            return []
+        clauses = ["sentences MATCH ?"]
+        params: list[Any] = [match_expression]
+        if account_slug:
+            clauses.append("meetings.account_slug = ?")
+            params.append(account_slug)
+        if from_date:
+            clauses.append("meetings.meeting_at >= ?")
+            params.append(to_utc_iso(start_of_day_utc(from_date)))
+        if to_date:
+            clauses.append("meetings.meeting_at < ?")
+            params.append(to_utc_iso(end_of_day_exclusive_utc(to_date)))
+        params.append(limit)
+        rows = self.connection.execute(
+            "SELECT snippet(sentences, 0, '[', ']', '...', 16), sentences.speaker, sentences.start_time,"
+            " meetings.meeting_key, meetings.title, meetings.meeting_at, meetings.account_slug, meetings.bucket,"
+            " meetings.meeting_kind, meetings.category, bm25(sentences)"
+            " FROM sentences JOIN meetings ON meetings.id = sentences.meeting_id"
+            f" WHERE {' AND '.join(clauses)}"
+            " ORDER BY bm25(sentences) LIMIT ?",
+            params,
+        ).fetchall()
+        columns = (
+            "snippet",
+            "speaker",
+            "start_time",
+            "path",
+            "title",
+            "meeting_at",
+            "account_slug",
+            "bucket",
+            "meeting_kind",
+            "category",
+            "score",
+        )
+        return [dict(zip(columns, row)) for row in rows]
+
+
+class MeetingAnalyticsStore:
+    """Meeting aggregates per account x month x category plus the per-meeting rows they were summed from."""
+
+    def __init__(self) -> None:
+        self.meetings: dict[str, dict[str, Any]] = {}
+        self.aggregates: dict[tuple[str, str, str], dict[str, Any]] = {}
+
+    @staticmethod
+    def aggregate_key(contribution: dict[str, Any]) -> tuple[str, str, str]:
+        return (contribution["account"], contribution["month"], contribution["category"])
+
+    def upsert_meeting(self, key: str, contribution: dict[str, Any]) -> None:
+        self.remove_meeting(key)
+        self.meetings[key] = contribution
+        aggregate = self.aggregates.setdefault(
+            self.aggregate_key(contribution),
+            {
+                "account": contribution["account"],
+                "month": contribution["month"],
+                "category": contribution["category"],
+                "meetings": 0,
+                "duration_minutes": 0.0,
+                "sentence_count": 0,
+                "speaker_seconds": {},
+            },
+        )
+        self.apply(aggregate, contribution, sign=1)
+
+    def remove_meeting(self, key: str) -> None:
+        contribution = self.meetings.pop(key, None)
+        if contribution is None:
+            return
+        aggregate_key = self.aggregate_key(contribution)
+        aggregate = self.aggregates[aggregate_key]
+        self.apply(aggregate, contribution, sign=-1)
+        if aggregate["meetings"] <= 0:
+            del self.aggregates[aggregate_key]
+
+    @staticmethod
+    def apply(aggregate: dict[str, Any], contribution: dict[str, Any], *, sign: int) -> None:
+        aggregate["meetings"] += sign
+        aggregate["duration_minutes"] = round(aggregate["duration_minutes"] + sign * contribution["duration_minutes"], 4)
+        aggregate["sentence_count"] += sign * contribution["sentence_count"]
+        speaker_seconds = aggregate["speaker_seconds"]
+        for speaker, seconds in contribution["speaker_seconds"].items():
+            total = round(speaker_seconds.get(speaker, 0.0) + sign * seconds, 4)
+            if total > 0:
+                speaker_seconds[speaker] = total
+            else:
+                speaker_seconds.pop(speaker, None)
+
+    def rows(
+        self,
+        *,
+        account: str | None = None,
+        from_month: str | None = None,
+        to_month: str | None = None,
+    ) -> list[dict[str, Any]]:
+        # Meetings without a date sort after every YYYY-MM, so any month bound leaves them out.
+        bounded = from_month is not None or to_month is not None
+        return [
+            aggregate
+            for key, aggregate in sorted(self.aggregates.items())
+            if (account is None or key[0] == account)
+            and not (bounded and key[1] == UNKNOWN_MONTH)
+            and (from_month is None or key[1] >= from_month)
+            and (to_month is None or key[1] <= to_month)
+        ]
+
+    @classmethod
+    def load(cls, path: Path) -> "MeetingAnalyticsStore":
+        store = cls()
+        if not path.exists():
+            return store
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != ANALYTICS_VERSION:
+            return store
+        store.meetings = data.get("meetings") or {}
+        store.aggregates = {store.aggregate_key(aggregate): aggregate for aggregate in data.get("aggregates") or []}
+        return store
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": ANALYTICS_VERSION,
+            "aggregates": self.rows(),
+            "meetings": dict(sorted(self.meetings.items())),
+        }
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(payload, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        temp_path.replace(path)
+
+
 class FirefliesError(RuntimeError):
     """Raised for Fireflies API failures."""
 
@@ -332,6 +681,50 @@ def parse_args() -> argparse.Namespace:
         help="Overlap window used when querying the delta cursor",
     )
 
+    for import_parser in (backfill_parser, delta_parser):
+        import_parser.add_argument("--vtt", action="store_true", help="Also write a WebVTT transcript.vtt per meeting")
+        import_parser.add_argument(
+            "--compress-sentences",
+            action="store_true",
+            help="Write sentences.jsonl gzip-compressed as sentences.jsonl.gz",
+        )
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="Find near-duplicate meeting imports across the tree")
+    dedupe_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_DUPLICATE_THRESHOLD,
+        help="Minimum estimated Jaccard similarity of sentence shingles",
+    )
+    dedupe_parser.add_argument("--workers", type=int, default=None, help="Process pool size (defaults to CPU count)")
+    dedupe_parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Remove duplicate imports and record their transcript ids on the kept meeting",
+    )
+
+    search_parser = subparsers.add_parser("search", help="Full-text search over imported transcript sentences")
+    search_parser.add_argument("query", help="Words that must all appear in a sentence")
+    search_parser.add_argument("--account", help="Restrict to one CRM account slug")
+    search_parser.add_argument("--from", dest="from_date", help="Inclusive meeting start date (YYYY-MM-DD)")
+    search_parser.add_argument("--to", dest="to_date", help="Inclusive meeting end date (YYYY-MM-DD)")
+    search_parser.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT, help="Maximum number of hits")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    search_parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="Skip re-indexing meetings that changed on disk since the last run",
+    )
+
+    analytics_parser = subparsers.add_parser("analytics", help="Meeting counts and minutes per account, month and category")
+    analytics_parser.add_argument("--rebuild", action="store_true", help="Recompute the aggregates from the whole tree")
+    analytics_parser.add_argument("--workers", type=int, default=None, help="Process pool size for --rebuild")
+    analytics_parser.add_argument("--account", help="Restrict to one account slug (internal meetings use _internal)")
+    analytics_parser.add_argument("--from-month", help="Inclusive first month (YYYY-MM)")
+    analytics_parser.add_argument("--to-month", help="Inclusive last month (YYYY-MM)")
+    analytics_parser.add_argument("--json", action="store_true", help="Print aggregates as JSON")
+    analytics_parser.add_argument("--output", help="Also write the selected aggregates as JSON to this path")
+
     return parser.parse_args()
 
 
@@ -433,29 +826,6 @@ def end_of_day_exclusive_utc(value: date) -> datetime:
     return datetime.combine(value + timedelta(days=1), time.min, tzinfo=timezone.utc)
 
 
-def normalize_host(value: str | None) -> str | None:
-    if not value:
-        return None
-    raw = value.strip().lower()
-    if not raw:
-        return None
-    parsed = urlparse(raw if "://" in raw else f"https://{raw}")
-    host = parsed.netloc or parsed.path
-    host = host.split("@")[-1].split(":")[0].strip(".")
-    return host or None
-
-
-def apex_domain(host: str | None) -> str | None:
-    if not host:
-        return None
-    parts = [part for part in host.lower().split(".") if part]
-    if len(parts) <= 2:
-        return ".".join(parts)
-    if len(parts[-1]) == 2 and parts[-2] in SECOND_LEVEL_PUBLIC_SUFFIXES and len(parts) >= 3:
-        return ".".join(parts[-3:])
-    return ".".join(parts[-2:])
-
-
 def slugify(value: str) -> str:
     normalized = re.sub(r"[^a-z0-9]+", "-", value.lower())
     normalized = normalized.strip("-")
@@ -477,12 +847,6 @@ def account_slug_from_domain(domain: str) -> str:
     return slugify(root_label)
 
 
-def normalize_email_domain(email: str | None) -> str | None:
-    if not email or "@" not in email:
-        return None
-    return apex_domain(email.rsplit("@", 1)[1].strip().lower())
-
-
 def internal_domains() -> set[str]:
     configured = os.environ.get("FIREFLIES_INTERNAL_DOMAINS", "")
     values = {item.strip().lower() for item in configured.split(",") if item.strip()}
@@ -783,20 +1147,34 @@ def meeting_kind_for_bucket(bucket: str | None) -> str:
     return "unresolved"
 
 
-def render_transcript_markdown(transcript: dict[str, Any]) -> str:
-    sentences = transcript.get("sentences") or []
-    rendered_lines = [f"# {transcript_title(transcript)}", ""]
-
-    for sentence in sentences:
+def iter_transcript_sentences(transcript: dict[str, Any]) -> Iterable[dict[str, Any]]:
+    for sentence in transcript.get("sentences") or []:
         if not isinstance(sentence, dict):
             continue
-        speaker = str(sentence.get("speaker_name") or "Unknown speaker").strip() or "Unknown speaker"
         raw_text = str(sentence.get("raw_text") or sentence.get("text") or "").strip()
         text = re.sub(r"\s+", " ", raw_text)
         if not text:
             continue
-        start_time = format_seconds(sentence.get("start_time"))
-        end_time = format_seconds(sentence.get("end_time"))
+        yield {
+            "index": sentence.get("index"),
+            "speaker": str(sentence.get("speaker_name") or "Unknown speaker").strip() or "Unknown speaker",
+            "speaker_id": sentence.get("speaker_id"),
+            "start_time": parse_seconds(sentence.get("start_time")),
+            "end_time": parse_seconds(sentence.get("end_time")),
+            "text": text,
+        }
+
+
+def render_transcript_exports(transcript: dict[str, Any], *, include_vtt: bool = False) -> TranscriptExports:
+    rendered_lines = [f"# {transcript_title(transcript)}", ""]
+    sentence_lines: list[str] = []
+    vtt_lines = ["WEBVTT", ""] if include_vtt else []
+
+    for sentence in iter_transcript_sentences(transcript):
+        speaker = sentence["speaker"]
+        text = sentence["text"]
+        start_time = format_seconds(sentence["start_time"])
+        end_time = format_seconds(sentence["end_time"])
         if start_time and end_time:
             rendered_lines.append(f"**{speaker}** [{start_time} - {end_time}]: {text}")
         elif start_time:
@@ -804,6 +1182,15 @@ def render_transcript_markdown(transcript: dict[str, Any]) -> str:
         else:
             rendered_lines.append(f"**{speaker}**: {text}")
 
+        sentence_lines.append(json.dumps(sentence, ensure_ascii=False, separators=(",", ":")))
+
+        if include_vtt and sentence["start_time"] is not None:
+            cue_start = sentence["start_time"]
+            cue_end = sentence["end_time"] if sentence["end_time"] is not None else cue_start
+            vtt_lines.append(f"{format_vtt_timestamp(cue_start)} --> {format_vtt_timestamp(max(cue_start, cue_end))}")
+            vtt_lines.append(f"<v {escape_vtt_text(speaker)}>{escape_vtt_text(text)}")
+            vtt_lines.append("")
+
     if len(rendered_lines) == 2:
         rendered_lines.append("_Fireflies returned no sentence-level transcript data for this meeting._")
         attendance_names = [
@@ -818,7 +1205,105 @@ def render_transcript_markdown(transcript: dict[str, Any]) -> str:
                 rendered_lines.append(f"- {name}")
 
     rendered_lines.append("")
-    return "\n".join(rendered_lines)
+    return TranscriptExports(
+        markdown="\n".join(rendered_lines),
+        sentences_jsonl="".join(f"{line}\n" for line in sentence_lines),
+        vtt="\n".join(vtt_lines) if include_vtt else None,
+    )
+
+
+def render_transcript_markdown(transcript: dict[str, Any]) -> str:
+    return render_transcript_exports(transcript).markdown
+
+
+def write_transcript_exports(destination_dir: Path, exports: TranscriptExports, *, compress: bool = False) -> None:
+    (destination_dir / "transcript.md").write_text(exports.markdown, encoding="utf-8")
+
+    plain_path = destination_dir / SENTENCES_FILENAME
+    compressed_path = destination_dir / f"{SENTENCES_FILENAME}.gz"
+    payload = exports.sentences_jsonl.encode("utf-8")
+    if compress:
+        # mtime=0 keeps the archive byte-stable across re-imports of the same transcript.
+        with compressed_path.open("wb") as raw_handle:
+            with gzip.GzipFile(filename=SENTENCES_FILENAME, mode="wb", fileobj=raw_handle, mtime=0) as handle:
+                handle.write(payload)
+        plain_path.unlink(missing_ok=True)
+    else:
+        plain_path.write_bytes(payload)
+        compressed_path.unlink(missing_ok=True)
+
+    vtt_path = destination_dir / VTT_FILENAME
+    if exports.vtt is not None:
+        vtt_path.write_text(exports.vtt, encoding="utf-8")
+    else:
+        # A re-import without --vtt must not leave the previous import's captions behind.
+        vtt_path.unlink(missing_ok=True)
+
+
+def read_transcript_sentences(meeting_dir: Path) -> Iterable[dict[str, Any]]:
+    compressed_path = meeting_dir / f"{SENTENCES_FILENAME}.gz"
+    plain_path = meeting_dir / SENTENCES_FILENAME
+    if compressed_path.exists():
+        handle = gzip.open(compressed_path, "rt", encoding="utf-8")
+    elif plain_path.exists():
+        handle = plain_path.open("r", encoding="utf-8")
+    else:
+        # Imports that predate sentences.jsonl only have the rendered markdown.
+        yield from parse_transcript_markdown(meeting_dir / "transcript.md")
+        return
+    with handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_transcript_markdown(path: Path) -> Iterable[dict[str, Any]]:
+    if not path.exists():
+        return
+    index = 0
+    for raw_line in path.read_text(encoding="utf-8").splitlines():
+        match = TRANSCRIPT_LINE_PATTERN.match(raw_line)
+        if not match:
+            continue
+        yield {
+            "index": index,
+            "speaker": match.group("speaker"),
+            "speaker_id": None,
+            "start_time": parse_clock_seconds(match.group("start")),
+            "end_time": parse_clock_seconds(match.group("end")),
+            "text": match.group("text").strip(),
+        }
+        index += 1
+
+
+def parse_clock_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    seconds = 0
+    for part in value.split(":"):
+        seconds = seconds * 60 + int(part)
+    return float(seconds)
+
+
+def parse_seconds(value: Any) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_vtt_timestamp(value: float) -> str:
+    total_millis = int(round(value * 1000))
+    hours, remainder = divmod(total_millis, 3_600_000)
+    minutes, remainder = divmod(remainder, 60_000)
+    seconds, millis = divmod(remainder, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+
+def escape_vtt_text(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
 
 def format_seconds(value: Any) -> str | None:
@@ -835,6 +1320,231 @@ def format_seconds(value: Any) -> str | None:
     return f"{minutes:02d}:{seconds:02d}"
 
 
+def duplicate_index_path() -> Path:
+    return repo_root() / "tmp" / "fireflies-duplicate-index.json"
+
+
+def shingle_hashes(texts: Iterable[str], *, size: int = MINHASH_SHINGLE_WORDS) -> set[int]:
+    words = normalize_match_text(" ".join(texts)).split()
+    if not words:
+        return set()
+    shingles = (" ".join(words[offset : offset + size]) for offset in range(max(1, len(words) - size + 1)))
+    return {int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles}
+
+
+def minhash_signature(texts: Iterable[str]) -> list[int] | None:
+    # One-permutation hashing: the low bits pick a bin and each bin keeps its minimum,
+    # so one hash per shingle replaces MINHASH_PERMUTATIONS independent permutations.
+    hashes = shingle_hashes(texts)
+    if not hashes:
+        return None
+    bins: list[int | None] = [None] * MINHASH_PERMUTATIONS
+    for value in hashes:
+        slot = value % MINHASH_PERMUTATIONS
+        rest = value // MINHASH_PERMUTATIONS
+        current = bins[slot]
+        if current is None or rest < current:
+            bins[slot] = rest
+    # Densify empty bins by rotation so short transcripts still get a full signature.
+    signature: list[int] = []
+    for slot in range(MINHASH_PERMUTATIONS):
+        distance = 0
+        while bins[(slot + distance) % MINHASH_PERMUTATIONS] is None:
+            distance += 1
+        signature.append(bins[(slot + distance) % MINHASH_PERMUTATIONS] + distance * MINHASH_DENSIFY_OFFSET)
+    return signature
+
+
+def estimated_similarity(left: list[int], right: list[int]) -> float:
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def iter_meeting_dirs(root: Path) -> list[Path]:
+    return sorted(
+        metadata_path.parent
+        for meeting_root in MEETING_ROOTS
+        if (root / meeting_root).exists()
+        for metadata_path in (root / meeting_root).glob("**/metadata.json")
+    )
+
+
+def meeting_key(root: Path, meeting_dir: Path) -> str:
+    return meeting_dir.relative_to(root).as_posix()
+
+
+def meeting_dir_signature(meeting_dir: Path) -> list[int] | None:
+    return minhash_signature(sentence["text"] for sentence in read_transcript_sentences(meeting_dir))
+
+
+def flag_near_duplicates(
+    duplicate_index: NearDuplicateIndex,
+    *,
+    key: str,
+    signature: list[int] | None,
+    threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+) -> list[dict[str, Any]]:
+    if signature is None:
+        duplicate_index.remove(key)
+        return []
+    matches = [
+        {"path": match_key, "similarity": round(similarity, 3)}
+        for match_key, similarity in duplicate_index.query(signature, threshold=threshold)
+        if match_key != key
+    ]
+    duplicate_index.add(key, signature)
+    return matches
+
+
+def near_duplicate_clusters(duplicate_index: NearDuplicateIndex, *, threshold: float) -> list[list[str]]:
+    parents = {key: key for key in duplicate_index.signatures}
+
+    def find(key: str) -> str:
+        while parents[key] != key:
+            parents[key] = parents[parents[key]]
+            key = parents[key]
+        return key
+
+    for key, signature in duplicate_index.signatures.items():
+        for match_key, _similarity in duplicate_index.query(signature, threshold=threshold):
+            left, right = find(key), find(match_key)
+            if left != right:
+                parents[max(left, right)] = min(left, right)
+
+    clusters: dict[str, list[str]] = {}
+    for key in sorted(parents):
+        clusters.setdefault(find(key), []).append(key)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def read_meeting_metadata(meeting_dir: Path) -> dict[str, Any]:
+    try:
+        return json.loads((meeting_dir / "metadata.json").read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def canonical_meeting_key(root: Path, keys: list[str]) -> str:
+    def rank(key: str) -> tuple[int, int, str]:
+        metadata = read_meeting_metadata(root / key)
+        return (-int(metadata.get("sentence_count") or 0), len(key), key)
+
+    return min(keys, key=rank)
+
+
+def duplicate_groups(
+    root: Path, duplicate_index: NearDuplicateIndex, members: list[str], *, threshold: float
+) -> list[tuple[str, list[str]]]:
+    """Split a cluster into (canonical, duplicates) groups.
+
+    Clusters are transitive (A~B and B~C puts A and C together even when they differ), so
+    only members at least ``threshold`` similar to the canonical meeting itself join its
+    group; the rest are grouped again around their own canonical meeting.
+    """
+    groups = []
+    remaining = list(members)
+    while len(remaining) > 1:
+        canonical = canonical_meeting_key(root, remaining)
+        signature = duplicate_index.signatures[canonical]
+        duplicates = [
+            key
+            for key in remaining
+            if key != canonical and estimated_similarity(signature, duplicate_index.signatures[key]) >= threshold
+        ]
+        if duplicates:
+            groups.append((canonical, duplicates))
+        remaining = [key for key in remaining if key != canonical and key not in duplicates]
+    return groups
+
+
+def merge_duplicate_meetings(root: Path, *, canonical: str, duplicates: list[str]) -> None:
+    canonical_dir = root / canonical
+    metadata = read_meeting_metadata(canonical_dir)
+    merged_ids = set(metadata.get("merged_transcript_ids") or [])
+    for key in duplicates:
+        duplicate_dir = root / key
+        transcript_id = read_meeting_metadata(duplicate_dir).get("transcript_id")
+        if transcript_id and transcript_id != metadata.get("transcript_id"):
+            merged_ids.add(transcript_id)
+        for filename in MEETING_EXPORT_FILENAMES:
+            (duplicate_dir / filename).unlink(missing_ok=True)
+        if not any(duplicate_dir.iterdir()):
+            duplicate_dir.rmdir()
+    metadata["merged_transcript_ids"] = sorted(merged_ids)
+    metadata.pop("near_duplicates", None)
+    (canonical_dir / "metadata.json").write_text(
+        json.dumps(metadata, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def search_index_path() -> Path:
+    return repo_root() / "tmp" / "fireflies-search.sqlite3"
+
+
+def fts_match_expression(query: str) -> str:
+    # Quote every token so user input never trips FTS5 query syntax; tokens are ANDed.
+    return " ".join(f'"{token}"' for token in re.findall(r"\w+", query))
+
+
+def meeting_source_mtime(meeting_dir: Path) -> float:
+    return max(
+        (path.stat().st_mtime for filename in MEETING_EXPORT_FILENAMES for path in [meeting_dir / filename] if path.exists()),
+        default=0.0,
+    )
+
+
+def refresh_search_index(search_index: TranscriptSearchIndex, root: Path) -> tuple[int, int]:
+    indexed = search_index.indexed_mtimes()
+    seen: set[str] = set()
+    updated = 0
+    for meeting_dir in iter_meeting_dirs(root):
+        key = meeting_key(root, meeting_dir)
+        seen.add(key)
+        source_mtime = meeting_source_mtime(meeting_dir)
+        if indexed.get(key) == source_mtime:
+            continue
+        search_index.index_meeting(
+            key,
+            read_meeting_metadata(meeting_dir),
+            read_transcript_sentences(meeting_dir),
+            source_mtime=source_mtime,
+        )
+        updated += 1
+    removed = sorted(set(indexed) - seen)
+    with search_index.connection:
+        for key in removed:
+            search_index.remove_meeting(key)
+    return updated, len(removed)
+
+
+def analytics_store_path() -> Path:
+    return repo_root() / "tmp" / "fireflies-analytics.json"
+
+
+def meeting_contribution(metadata: dict[str, Any], sentences: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    sentence_count = 0
+    speaker_seconds: Counter[str] = Counter()
+    for sentence in sentences:
+        sentence_count += 1
+        start_time, end_time = sentence.get("start_time"), sentence.get("end_time")
+        if start_time is not None and end_time is not None and end_time > start_time:
+            speaker_seconds[sentence["speaker"]] += end_time - start_time
+    meeting_at = str(metadata.get("meeting_at") or "")
+    return {
+        # Meetings without an account (internal, unresolved) aggregate under their meeting kind.
+        "account": metadata.get("account_slug") or f"_{metadata.get('meeting_kind') or 'unresolved'}",
+        "month": meeting_at[:7] if meeting_at else UNKNOWN_MONTH,
+        "category": metadata.get("category") or "general",
+        "duration_minutes": float(metadata.get("duration_minutes") or 0.0),
+        "sentence_count": sentence_count,
+        "speaker_seconds": {speaker: round(seconds, 3) for speaker, seconds in sorted(speaker_seconds.items())},
+    }
+
+
+def meeting_dir_contribution(meeting_dir: Path) -> dict[str, Any]:
+    return meeting_contribution(read_meeting_metadata(meeting_dir), read_transcript_sentences(meeting_dir))
+
+
 def build_metadata(
     transcript: dict[str, Any],
     *,
@@ -1076,6 +1786,11 @@ def import_transcript(
     state_path: Path,
     accounts_by_alias: dict[str, AccountRecord],
     accounts_by_slug: dict[str, AccountRecord],
+    write_vtt: bool = False,
+    compress_sentences: bool = False,
+    duplicate_index: NearDuplicateIndex | None = None,
+    search_index: TranscriptSearchIndex | None = None,
+    analytics_store: MeetingAnalyticsStore | None = None,
 ) -> Path:
     decision = route_transcript(
         transcript,
@@ -1094,11 +1809,32 @@ def import_transcript(
     )
     destination_dir = resolve_destination(decision.destination_dir, transcript["id"])
     destination_dir.mkdir(parents=True, exist_ok=True)
-    (destination_dir / "transcript.md").write_text(render_transcript_markdown(transcript), encoding="utf-8")
+    exports = render_transcript_exports(transcript, include_vtt=write_vtt)
+    write_transcript_exports(destination_dir, exports, compress=compress_sentences)
+    if duplicate_index is not None:
+        near_duplicates = flag_near_duplicates(
+            duplicate_index,
+            key=meeting_key(root, destination_dir),
+            signature=minhash_signature(sentence["text"] for sentence in iter_transcript_sentences(transcript)),
+        )
+        if near_duplicates:
+            metadata["near_duplicates"] = near_duplicates
     (destination_dir / "metadata.json").write_text(
         json.dumps(metadata, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
         encoding="utf-8",
     )
+    if search_index is not None:
+        search_index.index_meeting(
+            meeting_key(root, destination_dir),
+            metadata,
+            iter_transcript_sentences(transcript),
+            source_mtime=meeting_source_mtime(destination_dir),
+        )
+    if analytics_store is not None:
+        analytics_store.upsert_meeting(
+            meeting_key(root, destination_dir),
+            meeting_contribution(metadata, iter_transcript_sentences(transcript)),
+        )
     update_state_after_import(state, transcript)
     save_state(state_path, state)
     return destination_dir
@@ -1114,41 +1850,61 @@ def import_window(
     to_date_iso: str | None,
     page_limit: int,
     update_delta_cursor_at_end: bool,
+    write_vtt: bool = False,
+    compress_sentences: bool = False,
 ) -> int:
     accounts_by_slug = load_account_index(root)
     accounts_by_alias = index_accounts_by_alias(accounts_by_slug)
-    imported_ids = set(state.get("imported_transcript_ids") or [])
-    transcripts = client.list_transcripts(
-        from_date_iso=from_date_iso,
-        to_date_iso=to_date_iso,
-        limit=page_limit,
-        mine=True,
-    )
-    successes = 0
-    failures: list[str] = []
-
-    for summary in transcripts:
-        transcript_id = str(summary.get("id") or "").strip()
-        if not transcript_id or transcript_id in imported_ids:
-            continue
-
-        print(f"Importing {transcript_id} - {summary.get('title') or 'untitled'}")
-        try:
-            detail = client.get_transcript(transcript_id)
-            destination = import_transcript(
-                detail,
-                root=root,
-                state=state,
-                state_path=state_path,
-                accounts_by_alias=accounts_by_alias,
-                accounts_by_slug=accounts_by_slug,
-            )
-            imported_ids.add(transcript_id)
-            successes += 1
-            print(f"  wrote {destination.relative_to(root)}")
-        except Exception as exc:  # noqa: BLE001
-            failures.append(f"{transcript_id}: {exc}")
-            print(f"  failed: {exc}", file=sys.stderr)
+    duplicate_path = duplicate_index_path()
+    duplicate_index = NearDuplicateIndex.load(duplicate_path)
+    search_index = TranscriptSearchIndex.open(search_index_path())
+    try:
+        analytics_path = analytics_store_path()
+        analytics_store = MeetingAnalyticsStore.load(analytics_path)
+        imported_ids = set(state.get("imported_transcript_ids") or [])
+        transcripts = client.list_transcripts(
+            from_date_iso=from_date_iso,
+            to_date_iso=to_date_iso,
+            limit=page_limit,
+            mine=True,
+        )
+        successes = 0
+        failures: list[str] = []
+
+        for summary in transcripts:
+            transcript_id = str(summary.get("id") or "").strip()
+            if not transcript_id or transcript_id in imported_ids:
+                continue
+
+            print(f"Importing {transcript_id} - {summary.get('title') or 'untitled'}")
+            try:
+                detail = client.get_transcript(transcript_id)
+                destination = import_transcript(
+                    detail,
+                    root=root,
+                    state=state,
+                    state_path=state_path,
+                    accounts_by_alias=accounts_by_alias,
+                    accounts_by_slug=accounts_by_slug,
+                    write_vtt=write_vtt,
+                    compress_sentences=compress_sentences,
+                    duplicate_index=duplicate_index,
+                    search_index=search_index,
+                    analytics_store=analytics_store,
+                )
+                imported_ids.add(transcript_id)
+                successes += 1
+                print(f"  wrote {destination.relative_to(root)}")
+                for duplicate in read_meeting_metadata(destination).get("near_duplicates") or []:
+                    print(f"  near-duplicate of {duplicate['path']} (similarity {duplicate['similarity']:.2f})")
+            except Exception as exc:  # noqa: BLE001
+                failures.append(f"{transcript_id}: {exc}")
+                print(f"  failed: {exc}", file=sys.stderr)
+
+        duplicate_index.save(duplicate_path)
+        analytics_store.save(analytics_path)
+    finally:
+        search_index.close()
 
     if update_delta_cursor_at_end and not failures:
         state["delta_cursor_at"] = to_utc_iso(datetime.now(timezone.utc))
@@ -1182,6 +1938,8 @@ def backfill_command(args: argparse.Namespace) -> int:
         to_date_iso=to_utc_iso(end_of_day_exclusive_utc(to_date)),
         page_limit=args.page_limit,
         update_delta_cursor_at_end=False,
+        write_vtt=args.vtt,
+        compress_sentences=args.compress_sentences,
     )
     print(f"Imported {successes} transcripts.")
     return 0
@@ -1212,17 +1970,136 @@ def delta_command(args: argparse.Namespace) -> int:
         to_date_iso=None,
         page_limit=args.page_limit,
         update_delta_cursor_at_end=True,
+        write_vtt=args.vtt,
+        compress_sentences=args.compress_sentences,
     )
     print(f"Imported {successes} transcripts.")
     return 0
 
 
+def dedupe_command(args: argparse.Namespace) -> int:
+    if not 0 < args.threshold <= 1:
+        raise SystemExit("--threshold must be greater than 0 and at most 1.")
+
+    root = repo_root()
+    meeting_dirs = iter_meeting_dirs(root)
+    duplicate_index = NearDuplicateIndex()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        signatures = executor.map(meeting_dir_signature, meeting_dirs, chunksize=16)
+        for meeting_dir, signature in zip(meeting_dirs, signatures):
+            if signature is not None:
+                duplicate_index.add(meeting_key(root, meeting_dir), signature)
+
+    groups = [
+        group
+        for members in near_duplicate_clusters(duplicate_index, threshold=args.threshold)
+        for group in duplicate_groups(root, duplicate_index, members, threshold=args.threshold)
+    ]
+    merged: list[str] = []
+    for canonical, duplicates in groups:
+        print(canonical)
+        for key in duplicates:
+            similarity = estimated_similarity(duplicate_index.signatures[canonical], duplicate_index.signatures[key])
+            print(f"  duplicate {key} (similarity {similarity:.2f})")
+        if args.merge:
+            merge_duplicate_meetings(root, canonical=canonical, duplicates=duplicates)
+            for key in duplicates:
+                duplicate_index.remove(key)
+            merged += duplicates
+
+    duplicate_index.save(duplicate_index_path())
+    # The merged imports are gone from the tree, so their analytics rows must go too.
+    analytics_path = analytics_store_path()
+    if merged and analytics_path.exists():
+        store = MeetingAnalyticsStore.load(analytics_path)
+        for key in merged:
+            store.remove_meeting(key)
+        store.save(analytics_path)
+    action = "Merged" if args.merge else "Found"
+    print(f"{action} {len(groups)} near-duplicate clusters across {len(meeting_dirs)} meetings.")
+    return 0
+
+
+def search_command(args: argparse.Namespace) -> int:
+    if args.limit < 1:
+        raise SystemExit("--limit must be positive.")
+    from_date = parse_iso_date(args.from_date) if args.from_date else None
+    to_date = parse_iso_date(args.to_date) if args.to_date else None
+
+    search_index = TranscriptSearchIndex.open(search_index_path())
+    try:
+        if not args.no_refresh:
+            refresh_search_index(search_index, repo_root())
+        results = search_index.search(
+            args.query,
+            account_slug=args.account,
+            from_date=from_date,
+            to_date=to_date,
+            limit=args.limit,
+        )
+    finally:
+        search_index.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 0
+    for result in results:
+        meeting_day = (result["meeting_at"] or "unknown-date")[:10]
+        timestamp = format_seconds(result["start_time"]) or "--:--"
+        print(f"{meeting_day} {result['account_slug'] or result['meeting_kind']} | {result['title']}")
+        print(f"  {result['speaker']} [{timestamp}]: {result['snippet']}")
+        print(f"  {result['path']}")
+    return 0
+
+
+def analytics_command(args: argparse.Namespace) -> int:
+    for value in (args.from_month, args.to_month):
+        if value and not re.fullmatch(r"\d{4}-\d{2}", value):
+            raise SystemExit(f"Invalid month: {value}. Expected YYYY-MM.")
+
+    root = repo_root()
+    store_path = analytics_store_path()
+    if args.rebuild:
+        meeting_dirs = iter_meeting_dirs(root)
+        store = MeetingAnalyticsStore()
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            contributions = executor.map(meeting_dir_contribution, meeting_dirs, chunksize=16)
+            for meeting_dir, contribution in zip(meeting_dirs, contributions):
+                store.upsert_meeting(meeting_key(root, meeting_dir), contribution)
+        store.save(store_path)
+    else:
+        store = MeetingAnalyticsStore.load(store_path)
+
+    rows = store.rows(account=args.account, from_month=args.from_month, to_month=args.to_month)
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(rows, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return 0
+    for row in rows:
+        print(
+            f"{row['account']:<32} {row['month']:<8} {row['category']:<11}"
+            f" {row['meetings']:>4} meetings {row['duration_minutes']:>9.1f} min {row['sentence_count']:>7} sentences"
+        )
+    if not rows and not store.meetings:
+        print("No analytics materialized yet. Run with --rebuild first.")
+    return 0
+
+
 def main() -> int:
     args = parse_args()
     if args.command == "backfill":
         return backfill_command(args)
     if args.command == "delta":
         return delta_command(args)
+    if args.command == "dedupe":
+        return dedupe_command(args)
+    if args.command == "search":
+        return search_command(args)
+    if args.command == "analytics":
+        return analytics_command(args)
     raise SystemExit(f"Unsupported command: {args.command}")
 
 
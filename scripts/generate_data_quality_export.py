@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Generate a synthetic raw data quality export for load testing the dashboard builder.
+
+The workbook has every column the builder requires, with value kinds, blank rates and
+derived columns (coverage months, ratios and flags) shaped like a real tenant export.
+Consultants are placed in an organisation tree (legal entity > department > unit > team,
+each team with a lead) whose size grows with the consultant count the way real tenants
+do: a few legal entities and departments, many small teams.
+
+Usage:
+  python3 scripts/generate_data_quality_export.py --consultants 10000 --output /tmp/synthetic-raw.xlsx
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from openpyxl import Workbook
+
+if __package__:
+    from .build_data_quality_excel_dashboard import REQUIRED_HEADERS, months_between
+    from .xlsx_stream_writer import StreamedWorkbook
+else:
+    from build_data_quality_excel_dashboard import REQUIRED_HEADERS, months_between
+    from xlsx_stream_writer import StreamedWorkbook
+
+DEFAULT_SEED = 20240601
+# Distinct values per segment dimension in a reference tenant of REFERENCE_CONSULTANTS
+# consultants, and the exponent with which the count grows for larger tenants.
+REFERENCE_CONSULTANTS = 635
+SEGMENT_PROFILE = {
+    "Legal entity": (3, 0.3),
+    "Department": (18, 0.5),
+    "Unit": (65, 0.7),
+    "Team": (144, 0.9),
+    "Location": (10, 0.5),
+}
+AVAILABILITY = ["No", "Yes", "-"]
+AVAILABILITY_WEIGHTS = [66, 33, 1]
+ONGOING_ENGAGEMENT_WEIGHTS = [305, 187, 81, 32, 15, 10, 2, 3]
+DAYS_PER_WEEK = [5.0, 4.0, 3.0, 2.5, 2.0, 1.5, 1.0]
+FIRST_NAMES = [
+    "Anna", "Ben", "Clara", "David", "Elif", "Felix", "Greta", "Hannes", "Ines", "Jonas",
+    "Katrin", "Lukas", "Mara", "Niklas", "Olga", "Paul", "Rania", "Sven", "Tanja", "Yusuf",
+]
+LAST_NAMES = [
+    "Albrecht", "Becker", "Celik", "Dietrich", "Engel", "Fischer", "Graf", "Hoffmann", "Jung", "Krause",
+    "Lorenz", "Meyer", "Nowak", "Otto", "Peters", "Richter", "Schmidt", "Vogel", "Weber", "Zimmermann",
+]
+ORGANISATION_WORDS = [
+    "Analytics", "Architecture", "Cloud", "Data", "Digital", "Enterprise", "Integration", "Mobility",
+    "Platform", "Security", "Software", "Solutions", "Strategy", "Transformation",
+]
+CITIES = [
+    "Berlin", "Frankfurt", "Hamburg", "Karlsruhe", "Cologne", "Leipzig", "Mannheim", "Munich",
+    "Nuremberg", "Stuttgart", "Vienna", "Zurich",
+]
+COMMENTS = [
+    "Available for remote projects only.",
+    "Project end date is fixed; a follow-up project can start during the handover.",
+    "Focus on cloud migrations and platform engineering.",
+    "Part-time until the end of the quarter.",
+    "\n",
+]
+
+
+def segment_cardinality(dimension: str, consultants: int) -> int:
+    distinct, exponent = SEGMENT_PROFILE[dimension]
+    return max(1, min(consultants, round(distinct * (consultants / REFERENCE_CONSULTANTS) ** exponent)))
+
+
+def skewed_weights(count: int, skew: float) -> List[float]:
+    """Zipf-like weights: the first value is the most common."""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def organisation_name(rng: random.Random, code: str, lead: Optional[str] = None) -> str:
+    name = f"{code} {rng.choice(ORGANISATION_WORDS)} & {rng.choice(ORGANISATION_WORDS)}"
+    return f"{name} ({lead})" if lead else name
+
+
+def add_months(value: date, months: int) -> datetime:
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def ratio(months: float, baseline: int) -> float:
+    return round(months / baseline, 2) if baseline else 0
+
+
+class Organisation:
+    """The segment values of a synthetic tenant; teams nest in units, departments and legal entities."""
+
+    def __init__(self, rng: random.Random, consultants: int) -> None:
+        counts = {dimension: segment_cardinality(dimension, consultants) for dimension in SEGMENT_PROFILE}
+        self.legal_entities = [f"Company {index + 1} GmbH" for index in range(counts["Legal entity"])]
+        legal_entity_weights = skewed_weights(len(self.legal_entities), 2.0)
+        self.departments = []
+        for index in range(counts["Department"]):
+            # Every legal entity has at least one department; most belong to the first.
+            if index < len(self.legal_entities):
+                legal_entity = self.legal_entities[index]
+            else:
+                legal_entity = rng.choices(self.legal_entities, legal_entity_weights)[0]
+            self.departments.append((organisation_name(rng, f"D{index + 1:02d}"), legal_entity))
+        self.units = [
+            (organisation_name(rng, f"U{index + 1:03d}"), rng.randrange(len(self.departments)))
+            for index in range(counts["Unit"])
+        ]
+        self.teams = []
+        for index in range(counts["Team"]):
+            lead = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index + 1}"
+            self.teams.append((organisation_name(rng, f"T{index + 1:04d}", lead), rng.randrange(len(self.units)), lead))
+        self.team_weights = skewed_weights(len(self.teams), 0.5)
+        self.locations = [
+            CITIES[index % len(CITIES)] + (f" {index // len(CITIES) + 1}" if index >= len(CITIES) else "")
+            for index in range(counts["Location"])
+        ]
+        self.location_weights = skewed_weights(len(self.locations), 1.0)
+
+    def segments(self, rng: random.Random) -> Dict[str, str]:
+        team, unit_index, lead = rng.choices(self.teams, self.team_weights)[0]
+        unit, department_index = self.units[unit_index]
+        department, legal_entity = self.departments[department_index]
+        return {
+            "Department": department,
+            "Team": team,
+            "Unit": unit,
+            "Legal entity": legal_entity,
+            "Location": rng.choices(self.locations, self.location_weights)[0],
+            # A few consultants report to the lead of another team, or to no one.
+            "Lead": lead if rng.random() < 0.9 else (rng.choice(self.teams)[2] if rng.random() < 0.95 else None),
+        }
+
+
+def consultant_row(rng: random.Random, organisation: Organisation, number: int, today: date) -> Dict[str, object]:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    # One percent join in the coming months; everyone else joined in the last twenty years.
+    entry = add_months(today, rng.randint(1, 3) if rng.random() < 0.01 else -rng.randint(0, 240))
+    experience = None
+    if rng.random() >= 0.07:
+        if rng.random() < 0.1:
+            experience = entry + timedelta(days=rng.randint(1, 400))
+        else:
+            experience = add_months(entry, -rng.randint(0, 240)) + timedelta(days=rng.randint(0, 27))
+
+    ongoing = rng.choices(range(len(ONGOING_ENGAGEMENT_WEIGHTS)), ONGOING_ENGAGEMENT_WEIGHTS)[0]
+    total = ongoing + int(rng.expovariate(1 / 8))
+    oldest_ongoing = add_months(today, -rng.randint(0, 60)) if ongoing else None
+    last_start = last_end = None
+    if total > ongoing and rng.random() >= 0.04:
+        last_start = add_months(today, -rng.randint(1, 120)) + timedelta(days=rng.randint(0, 27))
+        last_end = last_start + timedelta(days=rng.randint(30, 900))
+
+    since_baseline = max(0, months_between(entry, today))
+    weighted_cover = 0 if rng.random() < 0.03 else rng.betavariate(5, 1)
+    weighted_since = round(since_baseline * weighted_cover, 2)
+    absolute_since = round(weighted_since * rng.uniform(1, 2.5), 2)
+    before_baseline = max(0, months_between(experience, entry.date())) if experience and experience < entry else 0
+    weighted_before = round(before_baseline * rng.betavariate(2, 2), 2)
+    absolute_before = round(weighted_before * rng.uniform(1, 1.5), 2)
+
+    available = rng.choices(AVAILABILITY, AVAILABILITY_WEIGHTS)[0]
+    available_from = None
+    if available == "Yes" or rng.random() < 0.2:
+        available_from = datetime.combine(today, datetime.min.time()) + timedelta(days=rng.randint(-30, 180))
+
+    row = {
+        "External": str(1000 + number),
+        "Mat": f"{rng.getrandbits(24):06X}",
+        "Url": f"https://app.matchical.com/Consulting/ConsultantDetail?ConsultantId={uuid.UUID(int=rng.getrandbits(128), version=4)}",
+        "Full name": f"{first} {last}",
+        "Email": f"{first.lower()}.{last.lower()}.{number}@example.com",
+        "Entry date": entry,
+        "Work experience since": experience,
+        "Total engagements": total,
+        "Engagements with invalid dates": 1 if rng.random() < 0.02 else 0,
+        "Ongoing engagements": ongoing,
+        "Oldest ongoing engagement start date": oldest_ongoing,
+        "Last finished engagement start date": last_start,
+        "Last finished engagement end date": last_end,
+        "Is profile photo missing": rng.random() < 0.12,
+        "Months since entry baseline": since_baseline,
+        "Absolute months since entry": absolute_since,
+        "Weighted months since entry": weighted_since,
+        "Absolute missing months since entry": round(since_baseline - absolute_since, 2),
+        "Weighted missing months since entry": round(since_baseline - weighted_since, 2),
+        "Absolute coverage ratio since entry": ratio(absolute_since, since_baseline),
+        "Weighted coverage ratio since entry": ratio(weighted_since, since_baseline),
+        "Months before entry baseline": before_baseline,
+        "Absolute months before entry": absolute_before,
+        "Weighted months before entry": weighted_before,
+        "Absolute missing months before entry": round(before_baseline - absolute_before, 2),
+        "Weighted missing months before entry": round(before_baseline - weighted_before, 2),
+        "Absolute coverage ratio before entry": ratio(absolute_before, before_baseline),
+        "Weighted coverage ratio before entry": ratio(weighted_before, before_baseline),
+        "Is entry date missing": False,
+        "Is work experience since missing": experience is None,
+        "Is work experience since after entry date": experience is not None and experience > entry,
+        "Is available": available,
+        "Available from": available_from,
+        "Available to": available_from + timedelta(days=rng.randint(14, 365)) if available_from and rng.random() < 0.1 else None,
+        "Is willing to travel": rng.random() < 0.4,
+        "Available days per week": rng.choice(DAYS_PER_WEEK) if available == "Yes" else 0,
+        "Availability comment": rng.choice(COMMENTS) if rng.random() < 0.5 else None,
+    }
+    row.update(organisation.segments(rng))
+    return row
+
+
+def generate_rows(consultants: int, today: date, seed: int = DEFAULT_SEED) -> List[List[object]]:
+    """Rows of a synthetic export in REQUIRED_HEADERS order; the same seed gives the same rows."""
+    rng = random.Random(seed)
+    organisation = Organisation(rng, consultants)
+    return [
+        [row[header] for header in REQUIRED_HEADERS]
+        for row in (consultant_row(rng, organisation, number, today) for number in range(consultants))
+    ]
+
+
+def write_export(output_path: Path, rows: Iterable[Sequence[object]], headers: Sequence[str] = REQUIRED_HEADERS) -> Path:
+    wb = Workbook(write_only=True)
+    stream = StreamedWorkbook(wb)
+    sheet = stream.stream(wb.create_sheet("Sheet1"))
+    sheet.append(list(headers))
+    for row in rows:
+        sheet.append(row)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    stream.save(output_path)
+    return output_path
+
+
+def generate_export(output_path: Path, consultants: int, today: Optional[date] = None, seed: int = DEFAULT_SEED) -> Path:
+    return write_export(output_path, generate_rows(consultants, today or date.today(), seed))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a synthetic raw data quality export")
+    parser.add_argument("--consultants", type=int, required=True, help="Number of consultant rows")
+    parser.add_argument("--output", required=True, help="Path of the generated workbook")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed (default: %(default)s)")
+    parser.add_argument("--today", type=date.fromisoformat, help="Reference date for entry and engagement dates (YYYY-MM-DD)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    created = generate_export(Path(args.output).expanduser(), args.consultants, args.today, args.seed)
+    print(f"Created synthetic export with {args.consultants} consultants: {created}")
+
+
+if __name__ == "__main__":
+    main()
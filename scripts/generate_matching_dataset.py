@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+"""Generate a synthetic matching tenant as PostgreSQL COPY files.
+
+The performance analysis of the matching queries assumes ~500 Experience rows per
+consultant across the RoleSkill, Skill, Role, CustomRole(Skill), Industry,
+FunctionalArea and Language categories. This writes one tenant of that shape -
+Consultant, Experience, ConsultantLocations, ExternalUser, Demand, DemandRequirement,
+Opportunity, CoOwner, the location and consultancy user closures and the permission
+rows the queries gate on - in COPY text format, one file per table and shard.
+
+Consultants are split into shards of ``--shard-size`` that run in a process pool; each
+shard writes its rows in chunks of a few hundred consultants, so memory stays flat at any
+tenant size. Shards have their own random streams, so the output does not depend on the
+number of workers. Experience rows are built with NumPy per chunk:
+
+- ``--popularity-skew``: Zipf exponent of role, skill, industry, functional area and
+  language popularity (0: uniform).
+- ``--score-skew``: tilts the 1-5 score distribution to low (> 0) or high (< 0) scores.
+- ``--density-skew``: spread (log-normal sigma) of the experience count per consultant
+  around ``--experiences`` (0: every consultant has exactly that many). Counts are capped
+  at ``MAX_EXPERIENCE``, so large spreads lower the mean a little.
+- ``--category-mix``: shares of the variable rows going to RoleSkill, Skill and
+  CustomRoleSkill; the Role, CustomRole, Industry, FunctionalArea and Language counts
+  are fixed.
+
+``dataset.json`` in the output directory lists the files per table (it is written last,
+so a directory without it is incomplete) and ``load.sql`` loads them with psql
+``\\copy``. ``load_dataset`` streams them into an open psycopg connection.
+
+Usage:
+  python3 scripts/generate_matching_dataset.py --consultants 100000 --output /tmp/tenant-100k --workers 8
+  psql -d bench -f /tmp/tenant-100k/load.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__:
+    from .odc_sql import quote
+else:
+    from odc_sql import quote
+
+DATASET_FORMAT = 1
+DEFAULT_SEED = 20260301
+NULL = "\\N"
+
+# Reference ids passed as @Cat_*, @Filter_* and friends. The application reads them from
+# static entities; any distinct values do here.
+CATEGORY = {
+    "RoleSkill": 1,
+    "Skill": 2,
+    "Role": 3,
+    "CustomRoleSkill": 4,
+    "CustomSkill": 5,
+    "CustomRole": 6,
+    "Industry": 7,
+    "FunctionalArea": 8,
+    "Language": 9,
+}
+FILTER = {"Default": 1, "Soft": 2, "Hard": 3}
+AVAILABILITY = {"Yes": 1, "No": 2}
+PERMISSION = {"InternalConsultant": 1, "ExternalConsultant": 2, "Opportunity": 3}
+PERMISSION_LEVEL = {"On": 1, "All": 2, "Own": 3, "MyReports": 4}
+PERMISSION_SCENARIOS = ("admin", "global", "myreports")
+STATUS_READY, STATUS_DRAFT, STATUS_INACTIVE = 1, 2, 3
+
+# Taxonomy of a synthetic tenant and the fixed part of one consultant's experience.
+TAXONOMY = {"role": 60, "skill": 600, "custom_role": 30, "custom_skill": 200, "industry": 40, "functional_area": 25, "language": 20}
+SKILLS_PER_ROLE = 80
+ROLES_PER_CONSULTANT = 4
+CUSTOM_ROLES_PER_CONSULTANT = 2
+FIXED_EXPERIENCE = {"Industry": 8, "FunctionalArea": 5, "Language": 3}
+FIXED_ROWS = ROLES_PER_CONSULTANT + CUSTOM_ROLES_PER_CONSULTANT + sum(FIXED_EXPERIENCE.values())
+# Most rows one consultant can have without repeating a taxonomy entry.
+MAX_EXPERIENCE = FIXED_ROWS + ROLES_PER_CONSULTANT * SKILLS_PER_ROLE + CUSTOM_ROLES_PER_CONSULTANT * TAXONOMY["custom_skill"] + TAXONOMY["skill"]
+DEFAULT_CATEGORY_MIX = (0.55, 0.30, 0.15)
+# Location tree: countries, regions per country, cities per region.
+LOCATION_TREE = (6, 4, 8)
+MANAGER_FAN_OUT = 8
+CHUNK_CONSULTANTS = 500
+
+# Columns the dataset fills, per table in load order; the rest stay NULL.
+TABLES = {
+    "ConsultancyUser": ("Id", "TenantId", "UserId"),
+    "ConsultancyUserClosure": ("Id", "TenantId", "AncestorId", "DescendantId", "Depth"),
+    "UserRole": ("Id", "TenantId", "Name", "IsSuperAdmin"),
+    "UserRolePermissions": ("Id", "TenantId", "UserRoleId", "PermissionId", "PermissionLevelId"),
+    "ConsultancyUserRoles": ("Id", "TenantId", "ConsultancyUserId", "UserRoleId"),
+    "LocationTagsClosure": ("Id", "AncestorId", "DescendantId", "Depth"),
+    "ExternalUser": ("Id", "TenantId", "OwnerId", "CreatorId"),
+    "Consultant": (
+        "Id", "TenantId", "StatusId", "IsInternal", "ConsultancyUserId", "ExternalUserId",
+        "AvailabilityCategoryId", "MinCapacity", "MaxCapacity", "EuroFixedRate",
+    ),
+    "ConsultantLocations": ("Id", "TenantId", "ConsultantId", "LocationTagId"),
+    "Experience": (
+        "Id", "TenantId", "ConsultantId", "CategoryId", "RoleId", "SkillId", "CustomRoleId",
+        "IndustryId", "FunctionalAreaId", "LanguageId", "Score",
+    ),
+    "Opportunity": ("Id", "TenantId", "CreatorId"),
+    "CoOwner": ("Id", "TenantId", "OpportunityId", "ConsultancyUserId"),
+    "Demand": (
+        "Id", "TenantId", "OpportunityId", "LocationTagId", "LocationFilterCategoryId",
+        "AvailabilityFilterCategoryId", "IsCapacityFilterActive", "Capacity", "ClientOffsiteRate",
+    ),
+    "DemandRequirement": (
+        "Id", "TenantId", "DemandId", "CategoryId", "RoleId", "SkillId", "CustomRoleId", "IndustryId",
+        "FunctionalAreaId", "LanguageId", "Score", "DynamicWeight", "RoleWeight", "FilterCategoryId",
+        "IsActive", "HasMissingKeys",
+    ),
+    "Status": ("Id", "IsReady", "IsActive", "Label"),
+}
+SHARD_TABLES = ("ExternalUser", "Consultant", "ConsultantLocations", "Experience")
+SHARED_TABLES = tuple(table for table in TABLES if table not in SHARD_TABLES and table != "Status")
+# The demand role of the benchmark demands (0 and 1); the consultants holding it are the scored ones.
+DEMAND_ROLE = 0
+BENCHMARK_DEMANDS = 2
+
+
+def guid(*key: object) -> str:
+    digest = hashlib.md5(":".join(map(str, key)).encode()).hexdigest()
+    return f"{digest[:8]}-{digest[8:12]}-4{digest[13:16]}-8{digest[17:20]}-{digest[20:32]}"
+
+
+@dataclass
+class DatasetSpec:
+    consultants: int
+    experiences: int = 500
+    demands: int = 2000
+    requirements: int = 15
+    eligible_share: float = 0.3
+    scored_share: float = 0.6
+    external_share: float = 0.2
+    users: int = 0
+    popularity_skew: float = 1.0
+    score_skew: float = 0.0
+    density_skew: float = 0.0
+    category_mix: Tuple[float, float, float] = DEFAULT_CATEGORY_MIX
+    shard_size: int = 5000
+    seed: int = DEFAULT_SEED
+    tenant_id: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.users = self.users or max(20, self.consultants // 40)
+        self.category_mix = tuple(self.category_mix)
+        shape = {item.name: getattr(self, item.name) for item in fields(self) if item.init}
+        self.tenant_id = guid("tenant", json.dumps(shape, sort_keys=True))
+
+    @property
+    def shards(self) -> int:
+        return -(-self.consultants // self.shard_size)
+
+
+class DatasetIds:
+    """Ids of a tenant's rows: a per-kind GUID prefix plus the row number in hex."""
+
+    def __init__(self, tenant_id: str) -> None:
+        self.tenant = tenant_id
+        self.prefixes: Dict[str, str] = {}
+
+    def prefix(self, kind: str) -> str:
+        if kind not in self.prefixes:
+            self.prefixes[kind] = guid(self.tenant, kind)[:24]
+        return self.prefixes[kind]
+
+    def key(self, kind: str, number: int) -> str:
+        return f"{self.prefix(kind)}{number:012x}"
+
+    def keys(self, kind: str, count: int) -> np.ndarray:
+        """Ids 0..count-1 of ``kind`` plus NULL at index -1."""
+        return np.array([self.key(kind, number) for number in range(count)] + [NULL], dtype=object)
+
+    def consultant_id(self, number: int) -> str:
+        return self.key("consultant", number)
+
+    def demand_id(self, number: int) -> str:
+        return self.key("demand", number)
+
+    def user_id(self, number: int) -> str:
+        return self.key("consultancy-user", number)
+
+    def login(self, scenario: str) -> str:
+        return f"bench-{scenario}@{self.tenant}"
+
+    def bench_user(self, scenario: str) -> str:
+        return self.key("bench-user", PERMISSION_SCENARIOS.index(scenario))
+
+    def user_role(self, scenario: str) -> str:
+        return self.key("user-role", PERMISSION_SCENARIOS.index(scenario))
+
+
+def zipf_log_weights(size: int, skew: float) -> np.ndarray:
+    return -skew * np.log(np.arange(1, size + 1))
+
+
+def weighted_order(rng: np.random.Generator, log_weights: np.ndarray, shape: Tuple[int, ...], take: int) -> np.ndarray:
+    """``take`` distinct indexes per row, drawn without replacement (Gumbel top-k)."""
+    keys = log_weights + rng.gumbel(size=shape + (len(log_weights),))
+    if take >= len(log_weights):
+        return np.argsort(-keys, axis=-1)
+    top = np.argpartition(-keys, take - 1, axis=-1)[..., :take]
+    order = np.argsort(-np.take_along_axis(keys, top, axis=-1), axis=-1)
+    return np.take_along_axis(top, order, axis=-1)
+
+
+def score_probabilities(skew: float) -> np.ndarray:
+    """P(score) for 0..5: 10% zero scores, the rest bell-shaped around 3 and tilted by ``skew``."""
+    scores = np.arange(1, 6)
+    weights = np.array([1.0, 2.0, 3.0, 2.0, 1.0]) * np.exp(-skew * (scores - 3))
+    return np.concatenate([[0.1], 0.9 * weights / weights.sum()])
+
+
+def role_skill_table() -> np.ndarray:
+    """Skill indexes of each role's skill pool; neighbouring roles share skills."""
+    step = TAXONOMY["skill"] // TAXONOMY["role"]
+    return (np.arange(TAXONOMY["role"])[:, None] * step + np.arange(SKILLS_PER_ROLE)) % TAXONOMY["skill"]
+
+
+def experience_counts(spec: DatasetSpec, totals: np.ndarray) -> Dict[str, np.ndarray]:
+    """Variable rows per consultant: per role (RoleSkill), per custom role, and Skill."""
+    rest = np.maximum(totals - FIXED_ROWS, 0)
+    role_share, _, custom_share = spec.category_mix
+    per_role = np.minimum(np.rint(rest * role_share / ROLES_PER_CONSULTANT), SKILLS_PER_ROLE).astype(np.int64)
+    per_custom_role = np.minimum(np.rint(rest * custom_share / CUSTOM_ROLES_PER_CONSULTANT), TAXONOMY["custom_skill"]).astype(np.int64)
+    skills = rest - per_role * ROLES_PER_CONSULTANT - per_custom_role * CUSTOM_ROLES_PER_CONSULTANT
+    return {"RoleSkill": per_role, "CustomRoleSkill": per_custom_role, "Skill": np.clip(skills, 0, TAXONOMY["skill"])}
+
+
+def masked_picks(order: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(row, pick) of the first ``counts[row]`` picks in every row of ``order`` (rows on axis 0)."""
+    width = order.shape[-1]
+    mask = np.broadcast_to(np.arange(width) < counts.reshape((-1,) + (1,) * (order.ndim - 1)), order.shape)
+    rows = np.broadcast_to(np.arange(order.shape[0]).reshape((-1,) + (1,) * (order.ndim - 1)), order.shape)
+    return rows[mask], mask
+
+
+class ExperienceChunk:
+    """Experience rows of consultants ``first``..``first + count - 1`` as index arrays (-1: NULL)."""
+
+    COLUMNS = ("consultant", "category", "role", "skill", "custom_role", "industry", "functional_area", "language")
+
+    def __init__(self, spec: DatasetSpec, rng: np.random.Generator, first: int, count: int) -> None:
+        self.parts: List[Dict[str, np.ndarray]] = []
+        skew = spec.popularity_skew
+        if spec.density_skew > 0:
+            sigma = spec.density_skew
+            totals = np.minimum(np.rint(spec.experiences * rng.lognormal(-sigma * sigma / 2, sigma, count)), MAX_EXPERIENCE).astype(np.int64)
+        else:
+            totals = np.full(count, spec.experiences, dtype=np.int64)
+        counts = experience_counts(spec, totals)
+
+        # Roles: the demand role for the scored share (always for consultant 0), others by popularity.
+        roles = weighted_order(rng, zipf_log_weights(TAXONOMY["role"] - 1, skew), (count,), ROLES_PER_CONSULTANT) + 1
+        scored = rng.random(count) < spec.scored_share
+        if first == 0:
+            scored[0] = True
+        roles[scored, 0] = DEMAND_ROLE
+        self.add("Role", np.repeat(np.arange(count), ROLES_PER_CONSULTANT), role=roles.ravel())
+
+        skill_pool = role_skill_table()
+        order = weighted_order(rng, zipf_log_weights(SKILLS_PER_ROLE, skew), (count, ROLES_PER_CONSULTANT), int(counts["RoleSkill"].max(initial=0)))
+        consultant, mask = masked_picks(order, counts["RoleSkill"])
+        slot_roles = np.broadcast_to(roles[:, :, None], order.shape)
+        self.add("RoleSkill", consultant, role=slot_roles[mask], skill=skill_pool[slot_roles, order][mask])
+
+        custom_roles = weighted_order(rng, zipf_log_weights(TAXONOMY["custom_role"], skew), (count,), CUSTOM_ROLES_PER_CONSULTANT)
+        self.add("CustomRole", np.repeat(np.arange(count), CUSTOM_ROLES_PER_CONSULTANT), custom_role=custom_roles.ravel())
+        order = weighted_order(rng, zipf_log_weights(TAXONOMY["custom_skill"], skew), (count, CUSTOM_ROLES_PER_CONSULTANT), int(counts["CustomRoleSkill"].max(initial=0)))
+        consultant, mask = masked_picks(order, counts["CustomRoleSkill"])
+        slot_roles = np.broadcast_to(custom_roles[:, :, None], order.shape)
+        # Custom skills follow the standard skills in the SkillId lookup.
+        self.add("CustomRoleSkill", consultant, custom_role=slot_roles[mask], skill=order[mask] + TAXONOMY["skill"])
+
+        order = weighted_order(rng, zipf_log_weights(TAXONOMY["skill"], skew), (count,), int(counts["Skill"].max(initial=0)))
+        consultant, mask = masked_picks(order, counts["Skill"])
+        self.add("Skill", consultant, skill=order[mask])
+
+        for category, column, kind in (("Industry", "industry", "industry"), ("FunctionalArea", "functional_area", "functional_area"), ("Language", "language", "language")):
+            picks = weighted_order(rng, zipf_log_weights(TAXONOMY[kind], skew), (count,), FIXED_EXPERIENCE[category])
+            self.add(category, np.repeat(np.arange(count), FIXED_EXPERIENCE[category]), **{column: picks.ravel()})
+
+        columns = {name: np.concatenate([part[name] for part in self.parts]) for name in self.COLUMNS}
+        # Rows of a consultant are written together, as the experience calculation inserts them.
+        order = np.argsort(columns["consultant"], kind="stable")
+        self.columns = {name: values[order] for name, values in columns.items()}
+        self.columns["consultant"] += first
+        self.columns["score"] = rng.choice(6, size=len(order), p=score_probabilities(spec.score_skew))
+        self.parts = []
+
+    def add(self, category: str, consultant: np.ndarray, **keys: np.ndarray) -> None:
+        size = len(consultant)
+        part = {name: np.full(size, -1, dtype=np.int64) for name in self.COLUMNS}
+        part["consultant"] = consultant.astype(np.int64)
+        part["category"] = np.full(size, CATEGORY[category], dtype=np.int64)
+        for name, values in keys.items():
+            part[name] = values.astype(np.int64)
+        self.parts.append(part)
+
+    def __len__(self) -> int:
+        return len(self.columns["score"])
+
+
+class TaxonomyKeys:
+    """Id lookups with NULL at index -1, shared by every chunk of a shard."""
+
+    def __init__(self, ids: DatasetIds) -> None:
+        self.role = ids.keys("role", TAXONOMY["role"])
+        skills = ids.keys("skill", TAXONOMY["skill"])[:-1]
+        self.skill = np.concatenate([skills, ids.keys("custom-skill", TAXONOMY["custom_skill"])])
+        self.custom_role = ids.keys("custom-role", TAXONOMY["custom_role"])
+        self.industry = ids.keys("industry", TAXONOMY["industry"])
+        self.functional_area = ids.keys("functional-area", TAXONOMY["functional_area"])
+        self.language = ids.keys("language", TAXONOMY["language"])
+
+
+def experience_lines(chunk: ExperienceChunk, ids: DatasetIds, keys: TaxonomyKeys, shard: int, first_row: int) -> str:
+    columns = chunk.columns
+    consultant_prefix, experience_prefix = ids.prefix("consultant"), f"{ids.prefix('experience')}{shard:05x}"
+    values = zip(
+        range(first_row, first_row + len(chunk)),
+        columns["consultant"].tolist(),
+        columns["category"].tolist(),
+        keys.role[columns["role"]].tolist(),
+        keys.skill[columns["skill"]].tolist(),
+        keys.custom_role[columns["custom_role"]].tolist(),
+        keys.industry[columns["industry"]].tolist(),
+        keys.functional_area[columns["functional_area"]].tolist(),
+        keys.language[columns["language"]].tolist(),
+        columns["score"].tolist(),
+    )
+    tenant = ids.tenant
+    return "".join(
+        f"{experience_prefix}{row:07x}\t{tenant}\t{consultant_prefix}{consultant:012x}\t{category}\t{role}\t{skill}\t{custom_role}\t{industry}\t{area}\t{language}\t{score}\n"
+        for row, consultant, category, role, skill, custom_role, industry, area, language, score in values
+    )
+
+
+def copy_value(value: object) -> str:
+    if value is None:
+        return NULL
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_lines(rows: Iterable[Sequence[object]]) -> Iterator[str]:
+    for row in rows:
+        yield "\t".join(copy_value(value) for value in row) + "\n"
+
+
+def city_ids(ids: DatasetIds) -> List[str]:
+    countries, regions, cities = LOCATION_TREE
+    return [ids.key("location", (country * regions + region) * cities + city + 1000) for country in range(countries) for region in range(regions) for city in range(cities)]
+
+
+def location_parents(ids: DatasetIds) -> Dict[str, Optional[str]]:
+    countries, regions, cities = LOCATION_TREE
+    parents: Dict[str, Optional[str]] = {}
+    for country in range(countries):
+        country_id = ids.key("location", country)
+        parents[country_id] = None
+        for region in range(regions):
+            region_id = ids.key("location", 100 + country * regions + region)
+            parents[region_id] = country_id
+            for city in range(cities):
+                parents[ids.key("location", (country * regions + region) * cities + city + 1000)] = region_id
+    return parents
+
+
+def consultant_shard_rows(spec: DatasetSpec, ids: DatasetIds, rng: np.random.Generator, first: int, count: int) -> Dict[str, List[tuple]]:
+    """ExternalUser, Consultant and ConsultantLocations rows of a chunk of consultants."""
+    numbers = np.arange(first, first + count)
+    external = rng.random(count) < spec.external_share
+    ready = rng.random(count) < spec.eligible_share
+    if first == 0:
+        # Consultant 0 is the subject of GetMatchesByConsultantId: internal, ready, a match.
+        external[0], ready[0] = False, True
+    owners = rng.integers(spec.users, size=count)
+    has_owner = rng.random(count) < 0.8
+    status = np.where(ready, STATUS_READY, rng.choice([STATUS_DRAFT, STATUS_INACTIVE], size=count))
+    availability = np.where(rng.random(count) < 0.6, AVAILABILITY["Yes"], AVAILABILITY["No"])
+    min_capacity = rng.choice([20, 40, 50], size=count)
+    max_capacity = rng.choice([80, 100], size=count)
+    rate = rng.choice([0, 650, 800, 950, 1100, 1300], size=count)
+    cities = city_ids(ids)
+    location_count = rng.choice([1, 1, 2], size=count)
+    locations = weighted_order(rng, zipf_log_weights(len(cities), spec.popularity_skew / 2), (count,), 2)
+
+    rows: Dict[str, List[tuple]] = {"ExternalUser": [], "Consultant": [], "ConsultantLocations": []}
+    for position, number in enumerate(numbers.tolist()):
+        consultant_id = ids.consultant_id(number)
+        owner = ids.user_id(int(owners[position]))
+        if external[position]:
+            external_id = ids.key("external-user", number)
+            rows["ExternalUser"].append((external_id, ids.tenant, owner if has_owner[position] else None, owner))
+        rows["Consultant"].append((
+            consultant_id, ids.tenant, int(status[position]), 0 if external[position] else 1,
+            None if external[position] else owner, external_id if external[position] else None,
+            int(availability[position]), int(min_capacity[position]), int(max_capacity[position]), int(rate[position]),
+        ))
+        for slot in range(int(location_count[position])):
+            rows["ConsultantLocations"].append((ids.key("consultant-location", number * 2 + slot), ids.tenant, consultant_id, cities[int(locations[position, slot])]))
+    return rows
+
+
+def table_path(directory: Path, table: str, part: int) -> Path:
+    return directory / f"{table}.{part:05d}.copy"
+
+
+def write_shard(spec: DatasetSpec, directory: Path, shard: int) -> Dict[str, int]:
+    """Write the consultant tables of one shard; returns rows per table."""
+    ids = DatasetIds(spec.tenant_id)
+    keys = TaxonomyKeys(ids)
+    rng = np.random.default_rng([spec.seed, shard])
+    first_consultant = shard * spec.shard_size
+    last_consultant = min(first_consultant + spec.shard_size, spec.consultants)
+    counts = dict.fromkeys(SHARD_TABLES, 0)
+    handles = {table: table_path(directory, table, shard).open("w", encoding="utf-8", newline="\n") for table in SHARD_TABLES}
+    try:
+        for first in range(first_consultant, last_consultant, CHUNK_CONSULTANTS):
+            count = min(CHUNK_CONSULTANTS, last_consultant - first)
+            for table, rows in consultant_shard_rows(spec, ids, rng, first, count).items():
+                handles[table].writelines(copy_lines(rows))
+                counts[table] += len(rows)
+            chunk = ExperienceChunk(spec, rng, first, count)
+            handles["Experience"].write(experience_lines(chunk, ids, keys, shard, counts["Experience"]))
+            counts["Experience"] += len(chunk)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return counts
+
+
+def shared_rows(spec: DatasetSpec) -> Iterator[Tuple[str, Iterable[tuple]]]:
+    """(table, rows) of the tables that do not grow with the consultants."""
+    ids = DatasetIds(spec.tenant_id)
+    # Shards use the streams [seed, 0..shards-1]; the next one is free.
+    rng = np.random.default_rng([spec.seed, spec.shards])
+    scenarios = PERMISSION_SCENARIOS[1:]
+    yield "ConsultancyUser", [(ids.user_id(user), ids.tenant, ids.key("login", user)) for user in range(spec.users)] + [
+        (ids.bench_user(scenario), ids.tenant, ids.login(scenario)) for scenario in scenarios
+    ]
+    yield "ConsultancyUserClosure", user_closure(spec, ids)
+    yield "UserRole", [(ids.user_role(scenario), ids.tenant, scenario, 0) for scenario in scenarios]
+    levels = {"global": PERMISSION_LEVEL["All"], "myreports": PERMISSION_LEVEL["MyReports"]}
+    yield "UserRolePermissions", [
+        (ids.key("role-permission", PERMISSION_SCENARIOS.index(scenario) * 10 + permission), ids.tenant, ids.user_role(scenario), permission, levels[scenario])
+        for scenario in scenarios
+        for permission in PERMISSION.values()
+    ]
+    yield "ConsultancyUserRoles", [(ids.key("user-role-link", position), ids.tenant, ids.bench_user(scenario), ids.user_role(scenario)) for position, scenario in enumerate(scenarios)]
+    yield "LocationTagsClosure", location_closure(ids)
+    creators = rng.integers(spec.users, size=spec.demands).tolist()
+    co_owners = rng.integers(spec.users, size=spec.demands).tolist()
+    yield "Opportunity", [(ids.key("opportunity", demand), ids.tenant, ids.user_id(creators[demand])) for demand in range(spec.demands)]
+    yield "CoOwner", [(ids.key("co-owner", demand), ids.tenant, ids.key("opportunity", demand), ids.user_id(co_owners[demand])) for demand in range(spec.demands)]
+    yield "Demand", demand_rows(spec, ids, rng)
+    yield "DemandRequirement", requirement_rows(spec, ids, rng)
+
+
+def user_closure(spec: DatasetSpec, ids: DatasetIds) -> Iterator[tuple]:
+    """Closure of the consultancy user hierarchy (fan-out ``MANAGER_FAN_OUT``).
+
+    The MyReports bench user reports to the last user; the MyReports path shows it the
+    consultants owned by its ancestors.
+    """
+    number = 0
+    chains = [(ids.user_id(user), user, 0) for user in range(spec.users)]
+    chains.append((ids.bench_user("myreports"), spec.users - 1, 1))
+    for descendant, user, depth in chains:
+        if depth:
+            yield ids.key("user-closure", number), ids.tenant, descendant, descendant, 0
+            number += 1
+        ancestor: Optional[int] = user
+        while ancestor is not None:
+            yield ids.key("user-closure", number), ids.tenant, ids.user_id(ancestor), descendant, depth
+            number += 1
+            ancestor, depth = ((ancestor - 1) // MANAGER_FAN_OUT if ancestor else None), depth + 1
+
+
+def location_closure(ids: DatasetIds) -> Iterator[tuple]:
+    parents = location_parents(ids)
+    number = 0
+    for descendant in parents:
+        ancestor, depth = descendant, 0
+        while ancestor is not None:
+            yield ids.key("location-closure", number), ancestor, descendant, depth
+            number += 1
+            ancestor, depth = parents[ancestor], depth + 1
+
+
+def demand_rows(spec: DatasetSpec, ids: DatasetIds, rng: np.random.Generator) -> Iterator[tuple]:
+    cities = city_ids(ids)
+    for demand in range(spec.demands):
+        # The benchmark demands have no location, availability or capacity filter.
+        benchmark = demand < BENCHMARK_DEMANDS
+        yield (
+            ids.demand_id(demand),
+            ids.tenant,
+            ids.key("opportunity", demand),
+            cities[int(rng.integers(len(cities)))],
+            FILTER["Default"] if benchmark else int(rng.choice(list(FILTER.values()))),
+            FILTER["Default"] if benchmark else int(rng.choice([FILTER["Default"], FILTER["Default"], FILTER["Hard"]])),
+            0 if benchmark else int(rng.choice([0, 0, 1])),
+            int(rng.choice([50, 80, 100])),
+            int(rng.choice([0, 900, 1100, 1400])),
+        )
+
+
+def requirement_rows(spec: DatasetSpec, ids: DatasetIds, rng: np.random.Generator) -> Iterator[tuple]:
+    """One Role, RoleSkill requirements of that role, two industries, a functional area and a language."""
+    skill_pool = role_skill_table()
+    role_weights = zipf_log_weights(TAXONOMY["role"], spec.popularity_skew)
+    number = 0
+    for demand in range(spec.demands):
+        role = DEMAND_ROLE if demand < BENCHMARK_DEMANDS else int(weighted_order(rng, role_weights, (), 1)[0])
+        role_id = ids.key("role", role)
+        skills = weighted_order(rng, zipf_log_weights(SKILLS_PER_ROLE, spec.popularity_skew), (), max(spec.requirements - 5, 0))
+        requirements = [("Role", {"RoleId": role_id})]
+        requirements += [("RoleSkill", {"RoleId": role_id, "SkillId": ids.key("skill", int(skill_pool[role, skill]))}) for skill in skills]
+        requirements += [("Industry", {"IndustryId": ids.key("industry", int(industry))}) for industry in rng.choice(TAXONOMY["industry"], 2, replace=False)]
+        requirements += [("FunctionalArea", {"FunctionalAreaId": ids.key("functional-area", int(rng.integers(TAXONOMY["functional_area"])))})]
+        requirements += [("Language", {"LanguageId": ids.key("language", int(rng.integers(TAXONOMY["language"])))})]
+        # Demand 1 carries the three filtered requirements of the "3 Filters" estimate.
+        filters = {1: FILTER["Hard"], 2: FILTER["Soft"], len(requirements) - 1: FILTER["Soft"]} if demand == 1 else {}
+        for position, (category, keys) in enumerate(requirements[: spec.requirements]):
+            number += 1
+            yield (
+                ids.key("requirement", number), ids.tenant, ids.demand_id(demand), CATEGORY[category],
+                keys.get("RoleId"), keys.get("SkillId"), None, keys.get("IndustryId"),
+                keys.get("FunctionalAreaId"), keys.get("LanguageId"),
+                1 if position in filters else int(rng.choice([2, 3, 3, 4])),
+                int(rng.choice([1, 1, 2, 3])), int(rng.choice([1, 2, 3, 4, 5])),
+                filters.get(position, FILTER["Default"]), 1, 0,
+            )
+
+
+def write_shared(spec: DatasetSpec, directory: Path) -> Dict[str, int]:
+    counts = {}
+    for table, rows in shared_rows(spec):
+        counts[table] = 0
+        with table_path(directory, table, 0).open("w", encoding="utf-8", newline="\n") as handle:
+            for line in copy_lines(rows):
+                handle.write(line)
+                counts[table] += 1
+    return counts
+
+
+def status_rows() -> List[tuple]:
+    """The Status reference rows the eligibility filter joins (shared by all tenants)."""
+    return [(STATUS_READY, 1, 1, "Ready"), (STATUS_DRAFT, 0, 1, "Draft"), (STATUS_INACTIVE, 1, 0, "Inactive")]
+
+
+def manifest_path(directory: Path) -> Path:
+    return directory / "dataset.json"
+
+
+def generate_dataset(spec: DatasetSpec, directory: Path, workers: Optional[int] = None) -> Dict[str, object]:
+    """Write every table of the tenant to ``directory`` and return the manifest."""
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path(directory).unlink(missing_ok=True)
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    counts: Dict[str, int] = {}
+    if workers == 1:
+        results = [write_shared(spec, directory)] + [write_shard(spec, directory, shard) for shard in range(spec.shards)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shared = executor.submit(write_shared, spec, directory)
+            shards = [executor.submit(write_shard, spec, directory, shard) for shard in range(spec.shards)]
+            results = [shared.result()] + [future.result() for future in shards]
+    for result in results:
+        for table, rows in result.items():
+            counts[table] = counts.get(table, 0) + rows
+    tables = {}
+    for table in TABLES:
+        if table == "Status":
+            continue
+        parts = range(spec.shards) if table in SHARD_TABLES else range(1)
+        tables[table] = {"columns": list(TABLES[table]), "files": [table_path(directory, table, part).name for part in parts], "rows": counts[table]}
+    manifest = {
+        "format": DATASET_FORMAT,
+        "tenant_id": spec.tenant_id,
+        "spec": asdict(spec),
+        "seconds": round(time.perf_counter() - started, 1),
+        "tables": tables,
+    }
+    write_load_script(directory, tables)
+    manifest_path(directory).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def copy_statement(table: str, columns: Sequence[str]) -> str:
+    return f"COPY {quote(table)} ({', '.join(map(quote, columns))}) FROM STDIN"
+
+
+def write_load_script(directory: Path, tables: Dict[str, Dict[str, object]]) -> Path:
+    lines = []
+    for table, entry in tables.items():
+        for name in entry["files"]:
+            target = quote(table) + " (" + ", ".join(map(quote, entry["columns"])) + ")"
+            lines.append(f"\\copy {target} FROM '{(directory / name).resolve()}'")
+    path = directory / "load.sql"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def read_manifest(directory: Path) -> Optional[Dict[str, object]]:
+    path = manifest_path(directory)
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    return manifest if manifest.get("format") == DATASET_FORMAT else None
+
+
+def load_dataset(connection, directory: Path, block_size: int = 1 << 20, progress: Optional[IO[str]] = None) -> Dict[str, int]:
+    """Stream the COPY files of a generated dataset into ``connection`` (psycopg 3)."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise ValueError(f"{directory} has no complete dataset; generate it first")
+    with connection.cursor() as cursor:
+        for table, entry in manifest["tables"].items():
+            started = time.perf_counter()
+            with cursor.copy(copy_statement(table, entry["columns"])) as copy:
+                for name in entry["files"]:
+                    with (directory / name).open("rb") as handle:
+                        while block := handle.read(block_size):
+                            copy.write(block)
+            if progress:
+                print(f"  {table}: {entry['rows']} rows in {time.perf_counter() - started:.1f}s", file=progress, flush=True)
+    return {table: entry["rows"] for table, entry in manifest["tables"].items()}
+
+
+def parse_mix(value: str) -> Tuple[float, float, float]:
+    try:
+        shares = tuple(float(share) for share in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected three comma separated shares, got {value!r}")
+    if len(shares) != 3 or min(shares) < 0 or not sum(shares):
+        raise argparse.ArgumentTypeError("expected three non-negative shares (RoleSkill,Skill,CustomRoleSkill)")
+    return tuple(share / sum(shares) for share in shares)
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--experiences", type=int, default=500, help="Experience rows per consultant (mean)")
+    parser.add_argument("--demands", type=int, default=2000, help="Demands per tenant, 15 requirements each")
+    parser.add_argument("--popularity-skew", type=float, default=1.0, help="Zipf exponent of role/skill/industry popularity (default: %(default)s)")
+    parser.add_argument("--score-skew", type=float, default=0.0, help="> 0 favours low scores, < 0 high scores")
+    parser.add_argument("--density-skew", type=float, default=0.0, help="Log-normal spread of experience rows per consultant")
+    parser.add_argument("--category-mix", type=parse_mix, default=DEFAULT_CATEGORY_MIX, help="RoleSkill,Skill,CustomRoleSkill shares of the variable rows")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+
+
+def spec_from_args(args: argparse.Namespace, consultants: int) -> DatasetSpec:
+    return DatasetSpec(
+        consultants,
+        experiences=args.experiences,
+        demands=args.demands,
+        popularity_skew=args.popularity_skew,
+        score_skew=args.score_skew,
+        density_skew=args.density_skew,
+        category_mix=args.category_mix,
+        seed=args.seed,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a synthetic matching tenant as PostgreSQL COPY files")
+    parser.add_argument("--consultants", type=int, required=True)
+    parser.add_argument("--output", required=True, help="Directory for the COPY files, dataset.json and load.sql")
+    parser.add_argument("--workers", type=int, help="Processes (default: CPU count)")
+    add_spec_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    manifest = generate_dataset(spec_from_args(args, args.consultants), Path(args.output).expanduser(), args.workers)
+    for table, entry in manifest["tables"].items():
+        print(f"{table:<24} {entry['rows']:>12} rows in {len(entry['files'])} file(s)")
+    print(f"Tenant {manifest['tenant_id']} written in {manifest['seconds']}s; load with psql -f {Path(args.output) / 'load.sql'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
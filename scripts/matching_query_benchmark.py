@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""Benchmark the matching queries on a local PostgreSQL against the documented estimates.
+
+``queries/matching/docs/performance-analysis.md`` estimates GetMatchesByDemandId latency
+for tenants of 5,000 to 100,000 consultants (500 Experience rows each, 15 requirements per
+demand, ~30% of consultants eligible, ~60% of those scored). This script loads one
+synthetic tenant of that shape per scale, creates the indexes the document lists, and
+times the translated ODC queries (see ``odc_sql.py``):
+
+- GetMatchesByDemandId for a demand without filtered requirements and one with three
+  (the "No Filters" and "3 Filters" columns of the estimate table),
+- GetMatchesByConsultantId for an eligible consultant,
+- GetMatchingScoreByConsultantIds for one demand and a batch of consultants.
+
+Each query runs warm (``--warmup`` runs first), ``--repeat`` times; p50 and p95 latency
+come from those runs and the shared buffers (hit and read) from one
+``EXPLAIN (ANALYZE, BUFFERS)`` run. GetMatchesByDemandId runs are checked against the
+estimate range of their scale; a p95 above it is reported and sets the exit status. The
+estimates assume Aurora db.r6g.large, so compare like with like.
+
+Without ``--dsn`` a throwaway server is created with ``initdb`` in ``--data-dir`` and
+started with ``pg_ctl`` (both from ``--pg-bin`` or the PATH). Tenants are written as COPY
+files by ``generate_matching_dataset.py`` into ``--data-dir``/datasets (the skew options
+are passed through), streamed in, and reused by later runs with the same options.
+
+Usage:
+  python3 scripts/matching_query_benchmark.py --scales 5000,10000 --output matching-bench.json
+  python3 scripts/matching_query_benchmark.py --dsn postgresql://localhost/bench --permission myreports
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+if __package__:
+    from .generate_matching_dataset import (
+        AVAILABILITY, CATEGORY, FILTER, PERMISSION, PERMISSION_LEVEL, PERMISSION_SCENARIOS, TABLES,
+        DatasetIds, DatasetSpec, add_spec_arguments, generate_dataset, load_dataset, location_closure, read_manifest, spec_from_args, status_rows,
+    )
+    from .odc_sql import QUERY_DIR, attribute_names, create_table_statements, entity_names, load_schema, quote, read_query, translate
+else:
+    from generate_matching_dataset import (
+        AVAILABILITY, CATEGORY, FILTER, PERMISSION, PERMISSION_LEVEL, PERMISSION_SCENARIOS, TABLES,
+        DatasetIds, DatasetSpec, add_spec_arguments, generate_dataset, load_dataset, location_closure, read_manifest, spec_from_args, status_rows,
+    )
+    from odc_sql import QUERY_DIR, attribute_names, create_table_statements, entity_names, load_schema, quote, read_query, translate
+
+ANALYSIS_PATH = QUERY_DIR / "matching" / "docs" / "performance-analysis.md"
+QUERIES = ("GetMatchesByDemandId", "GetMatchesByConsultantId", "GetMatchingScoreByConsultantIds")
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / "matchical-matching-benchmark"
+DEFAULT_PORT = 55432
+SCORING_MODE = {"strict": 1, "global": 2, "hybrid": 3}
+
+
+@dataclass
+class Estimate:
+    consultants: int
+    experience_rows: str
+    eligible: int
+    scored: int
+    no_filters: Tuple[float, float]
+    filtered: Tuple[float, float]
+    assessment: str
+
+
+@dataclass
+class Measurement:
+    query: str
+    scenario: str
+    consultants: int
+    p50_ms: float
+    p95_ms: float
+    runs: int
+    rows: int
+    count: Optional[int] = None
+    shared_hit_blocks: Optional[int] = None
+    shared_read_blocks: Optional[int] = None
+    estimate_ms: Optional[Tuple[float, float]] = None
+    verdict: str = ""
+
+
+def table_rows(text: str, heading: str) -> List[List[str]]:
+    """Cells of the first Markdown table after ``heading``, header and separator rows skipped."""
+    start = text.find(heading)
+    if start < 0:
+        raise ValueError(f"{heading!r} not found in the performance analysis")
+    rows: List[List[str]] = []
+    for line in text[start:].splitlines()[1:]:
+        if line.startswith("#") and rows:
+            break
+        if not line.startswith("|"):
+            if rows:
+                break
+            continue
+        rows.append([cell.strip() for cell in line.strip().strip("|").split("|")])
+    return [row for row in rows[1:] if not set("".join(row)) <= set("-: ")]
+
+
+def parse_count(text: str) -> int:
+    return int(text.replace(",", ""))
+
+
+def milliseconds(text: str) -> Tuple[float, float]:
+    low, high = re.fullmatch(r"(\d+)\s*-\s*(\d+)\s*ms", text.replace("–", "-")).groups()
+    return float(low), float(high)
+
+
+def parse_estimates(text: str) -> List[Estimate]:
+    """Rows of the Scalability Estimates table."""
+    return [
+        Estimate(parse_count(row[0]), row[1], parse_count(row[2]), parse_count(row[3]), milliseconds(row[4]), milliseconds(row[5]), row[6])
+        for row in table_rows(text, "## Scalability Estimates")
+    ]
+
+
+def index_columns(text: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r"\w+", text))
+
+
+def documented_indexes(text: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """(table, columns) of every index under Index Requirements, without duplicates."""
+    indexes: Dict[Tuple[str, Tuple[str, ...]], None] = {}
+    for heading, table in (("### Experience Table", "Experience"), ("### DemandRequirement Table", "DemandRequirement")):
+        for row in table_rows(text, heading):
+            indexes.setdefault((table, index_columns(row[1])))
+    for row in table_rows(text, "### Other Tables"):
+        indexes.setdefault((row[0], index_columns(row[1])))
+    return list(indexes)
+
+
+def index_statements(indexes: Iterable[Tuple[str, Sequence[str]]]) -> List[str]:
+    statements = []
+    for table, columns in indexes:
+        name = "bench_" + "_".join([table] + list(columns)).lower()
+        if len(name) > 63:
+            name = name[:54] + "_" + hashlib.md5(name.encode()).hexdigest()[:8]
+        statements.append(f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({', '.join(quote(column) for column in columns)})")
+    return statements
+
+
+
+def query_parameters(spec: DatasetSpec, permission: str, scoring_mode: str, score_batch: int) -> Dict[str, object]:
+    ids = DatasetIds(spec.tenant_id)
+    parameters: Dict[str, object] = {f"Cat_{name}": value for name, value in CATEGORY.items()}
+    parameters.update({f"Filter_{name}": value for name, value in FILTER.items()})
+    parameters.update({f"AvailabilityCategory_{name}": value for name, value in AVAILABILITY.items()})
+    parameters.update({f"Permission{name}Id": value for name, value in PERMISSION.items()})
+    parameters.update({f"PermissionLevel{name}Id": value for name, value in PERMISSION_LEVEL.items()})
+    parameters.update({
+        "ScoringMode_StrictRole": SCORING_MODE["strict"],
+        "ScoringMode_GlobalSkill": SCORING_MODE["global"],
+        "ScoringMode_RoleFirstHybrid": SCORING_MODE["hybrid"],
+        "RoleSkillScoringModeId": SCORING_MODE[scoring_mode],
+        "TenantId": ids.tenant,
+        "UserId": ids.login(permission) if permission != "admin" else "",
+        "IsMatchicalAdmin": 1 if permission == "admin" else 0,
+        "UseCustomRoles": 0,
+        "IsInExternalFilterActive": 0,
+        "ShowInternal": 1,
+        "ShowExternal": 1,
+        "StartIndex": 0,
+        "MaxRecords": 12,
+        "DemandId": ids.demand_id(0),
+        "ConsultantId": ids.consultant_id(0),
+        "DemandIds": [ids.demand_id(0)],
+        "ConsultantIds": [ids.consultant_id(number) for number in range(min(score_batch, spec.consultants))],
+    })
+    return parameters
+
+
+def scenarios(spec: DatasetSpec, parameters: Dict[str, object]) -> List[Tuple[str, str, Dict[str, object]]]:
+    """(query, scenario, parameters) of every timed call."""
+    return [
+        ("GetMatchesByDemandId", "no-filters", parameters),
+        ("GetMatchesByDemandId", "3-filters", dict(parameters, DemandId=DatasetIds(spec.tenant_id).demand_id(1))),
+        ("GetMatchesByConsultantId", "eligible-consultant", parameters),
+        ("GetMatchingScoreByConsultantIds", f"1x{len(parameters['ConsultantIds'])}", parameters),
+    ]
+
+
+def percentile(values: Sequence[float], share: float) -> float:
+    """Nearest-rank percentile; ``share`` between 0 and 100."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share / 100 * len(ordered)) - 1, 0)]
+
+
+def check(measurement: Measurement, estimates: Sequence[Estimate]) -> Measurement:
+    """Attach the documented range of the run's scale and how the p95 compares to it."""
+    if measurement.query != "GetMatchesByDemandId":
+        return measurement
+    estimate = next((row for row in estimates if row.consultants == measurement.consultants), None)
+    if estimate is None:
+        measurement.verdict = "no estimate"
+        return measurement
+    low, high = estimate.filtered if measurement.scenario == "3-filters" else estimate.no_filters
+    measurement.estimate_ms = (low, high)
+    measurement.verdict = "slower" if measurement.p95_ms > high else "faster" if measurement.p95_ms < low else "within"
+    return measurement
+
+
+class LocalPostgres:
+    """A PostgreSQL server of its own in ``data_dir``, reachable over a socket in that directory."""
+
+    def __init__(self, data_dir: Path, port: int = DEFAULT_PORT, bin_dir: Optional[str] = None, settings: Optional[Dict[str, str]] = None) -> None:
+        self.data_dir = data_dir
+        self.port = port
+        self.bin_dir = bin_dir
+        self.settings = settings or {}
+
+    def binary(self, name: str) -> str:
+        path = str(Path(self.bin_dir) / name) if self.bin_dir else shutil.which(name)
+        if not path:
+            raise SystemExit(f"{name} not found; pass --pg-bin or --dsn")
+        return path
+
+    @property
+    def dsn(self) -> str:
+        return f"host={self.data_dir} port={self.port} user=postgres dbname=postgres"
+
+    def __enter__(self) -> "LocalPostgres":
+        cluster = self.data_dir / "cluster"
+        if not (cluster / "PG_VERSION").exists():
+            subprocess.run([self.binary("initdb"), "-D", str(cluster), "-U", "postgres", "--auth=trust", "-E", "UTF8"], check=True, stdout=subprocess.DEVNULL)
+        options = f"-p {self.port} -k {self.data_dir} -c listen_addresses=''" + "".join(f" -c {name}={value}" for name, value in self.settings.items())
+        subprocess.run([self.binary("pg_ctl"), "-D", str(cluster), "-o", options, "-l", str(self.data_dir / "server.log"), "-w", "start"], check=True, stdout=subprocess.DEVNULL)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        subprocess.run([self.binary("pg_ctl"), "-D", str(self.data_dir / "cluster"), "-m", "fast", "-w", "stop"], check=False, stdout=subprocess.DEVNULL)
+
+
+def connect(dsn: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit("PostgreSQL access needs psycopg: pip install -r requirements.txt")
+    # Client-side binding inlines the arguments like ODC does, so EXPLAIN takes them too.
+    return psycopg.connect(dsn, autocommit=True, cursor_factory=psycopg.ClientCursor)
+
+
+def create_schema(connection, texts: Sequence[str], indexes: Iterable[Tuple[str, Sequence[str]]]) -> None:
+    entities = dict.fromkeys(entity for text in texts for entity in entity_names(text))
+    spellings = [attribute for text in texts for attribute in attribute_names(text)]
+    spellings += [column for columns in TABLES.values() for column in columns]
+    with connection.cursor() as cursor:
+        for statement in create_table_statements(entities, spellings, load_schema()):
+            cursor.execute(statement)
+        marks = ", ".join(["%s"] * len(TABLES["Status"]))
+        for row in status_rows():
+            cursor.execute(f'INSERT INTO "Status" ({", ".join(map(quote, TABLES["Status"]))}) VALUES ({marks}) ON CONFLICT DO NOTHING', row)
+        for statement in index_statements(indexes):
+            cursor.execute(statement)
+
+
+def is_loaded(connection, spec: DatasetSpec) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM "DemandRequirement" WHERE "TenantId" = %s LIMIT 1', (spec.tenant_id,))
+        return cursor.fetchone() is not None
+
+
+def load_tenant(connection, spec: DatasetSpec, data_dir: Path, workers: Optional[int] = None) -> Dict[str, int]:
+    """Generate the tenant's COPY files unless ``data_dir`` has them, then copy every table in.
+
+    DemandRequirement goes last and marks the tenant complete.
+    """
+    directory = data_dir / "datasets" / spec.tenant_id
+    if read_manifest(directory) is None:
+        started = time.perf_counter()
+        generate_dataset(spec, directory, workers)
+        print(f"  generated {directory} in {time.perf_counter() - started:.1f}s", flush=True)
+    with connection.cursor() as cursor:
+        # Left over from an interrupted load.
+        for table, columns in TABLES.items():
+            if "TenantId" in columns:
+                cursor.execute(f'DELETE FROM {quote(table)} WHERE "TenantId" = %s', (spec.tenant_id,))
+        cursor.execute('DELETE FROM "LocationTagsClosure" WHERE "Id" = ANY(%s)', ([row[0] for row in location_closure(DatasetIds(spec.tenant_id))],))
+    counts = load_dataset(connection, directory, progress=sys.stdout)
+    with connection.cursor() as cursor:
+        for table in counts:
+            cursor.execute(f"ANALYZE {quote(table)}")
+    return counts
+
+
+def explain_buffers(cursor, sql: str, arguments: Sequence[object]) -> Tuple[int, int]:
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, arguments)
+    plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    root = plan[0]["Plan"]
+    return root.get("Shared Hit Blocks", 0), root.get("Shared Read Blocks", 0)
+
+
+def measure(connection, query: str, scenario: str, consultants: int, text: str, parameters: Dict[str, object], repeat: int, warmup: int) -> Measurement:
+    sql, arguments = translate(text, parameters)
+    timings = []
+    with connection.cursor() as cursor:
+        for run in range(warmup + repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, arguments)
+            rows = cursor.fetchall()
+            if run >= warmup:
+                timings.append((time.perf_counter() - started) * 1000)
+        columns = [column.name.lower() for column in cursor.description or []]
+        hit, read = explain_buffers(cursor, sql, arguments)
+    total = rows[0][columns.index("count")] if rows and "count" in columns else None
+    return Measurement(
+        query=query,
+        scenario=scenario,
+        consultants=consultants,
+        p50_ms=round(percentile(timings, 50), 2),
+        p95_ms=round(percentile(timings, 95), 2),
+        runs=len(timings),
+        rows=len(rows),
+        count=total,
+        shared_hit_blocks=hit,
+        shared_read_blocks=read,
+    )
+
+
+def run_benchmark(
+    dsn: str,
+    specs: Sequence[DatasetSpec],
+    data_dir: Path,
+    permission: str = "admin",
+    scoring_mode: str = "strict",
+    repeat: int = 20,
+    warmup: int = 3,
+    score_batch: int = 50,
+    workers: Optional[int] = None,
+) -> List[Measurement]:
+    analysis = ANALYSIS_PATH.read_text(encoding="utf-8")
+    estimates = parse_estimates(analysis)
+    texts = {name: read_query(QUERY_DIR / "matching" / f"{name}.sql") for name in QUERIES}
+    measurements = []
+    with connect(dsn) as connection:
+        create_schema(connection, list(texts.values()), documented_indexes(analysis))
+        for spec in specs:
+            if not is_loaded(connection, spec):
+                print(f"Loading tenant of {spec.consultants} consultants ({spec.tenant_id})", flush=True)
+                load_tenant(connection, spec, data_dir, workers)
+            parameters = query_parameters(spec, permission, scoring_mode, score_batch)
+            for query, scenario, values in scenarios(spec, parameters):
+                measurement = check(measure(connection, query, scenario, spec.consultants, texts[query], values, repeat, warmup), estimates)
+                print(format_measurement(measurement), flush=True)
+                measurements.append(measurement)
+    return measurements
+
+
+def format_measurement(measurement: Measurement) -> str:
+    estimate = f"{measurement.estimate_ms[0]:g}-{measurement.estimate_ms[1]:g}ms" if measurement.estimate_ms else "-"
+    buffers = f"hit={measurement.shared_hit_blocks} read={measurement.shared_read_blocks}"
+    return (
+        f"{measurement.consultants:>7} {measurement.query:<32} {measurement.scenario:<20} "
+        f"p50={measurement.p50_ms:8.1f}ms p95={measurement.p95_ms:8.1f}ms  rows={measurement.rows:<4} {buffers:<28} "
+        f"documented {estimate} {measurement.verdict}"
+    ).rstrip()
+
+
+def parse_scales(value: str) -> List[int]:
+    try:
+        scales = [int(scale.replace("_", "")) for scale in value.split(",") if scale.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated consultant counts, got {value!r}")
+    if not scales or min(scales) < 1:
+        raise argparse.ArgumentTypeError("consultant counts must be positive")
+    return scales
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the matching queries on PostgreSQL against the documented estimates")
+    parser.add_argument("--scales", type=parse_scales, help="Comma separated consultant counts (default: every row of the estimate table)")
+    parser.add_argument("--dsn", help="Use this PostgreSQL database instead of starting a local server")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="Cluster and generated datasets directory (default: %(default)s)")
+    parser.add_argument("--pg-bin", help="Directory with initdb and pg_ctl (default: from PATH)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--shared-buffers", default="1GB", help="shared_buffers of the local server (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="Processes generating a dataset (default: CPU count)")
+    add_spec_arguments(parser)
+    parser.add_argument("--permission", choices=PERMISSION_SCENARIOS, default="admin", help="Permission path the queries run under")
+    parser.add_argument("--scoring-mode", choices=sorted(SCORING_MODE), default="strict")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed runs per query first")
+    parser.add_argument("--score-batch", type=int, default=50, help="Consultants per GetMatchingScoreByConsultantIds call")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    scales = args.scales or [estimate.consultants for estimate in parse_estimates(ANALYSIS_PATH.read_text(encoding="utf-8"))]
+    specs = [spec_from_args(args, scale) for scale in scales]
+    data_dir = Path(args.data_dir).expanduser()
+    data_dir.mkdir(parents=True, exist_ok=True)
+    options = (args.permission, args.scoring_mode, args.repeat, args.warmup, args.score_batch, args.workers)
+    if args.dsn:
+        measurements = run_benchmark(args.dsn, specs, data_dir, *options)
+    else:
+        with LocalPostgres(data_dir, args.port, args.pg_bin, {"shared_buffers": args.shared_buffers}) as server:
+            measurements = run_benchmark(server.dsn, specs, data_dir, *options)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {"permission": args.permission, "scoring_mode": args.scoring_mode, "dataset": asdict(specs[0]) if specs else None},
+        "measurements": [asdict(measurement) for measurement in measurements],
+    }
+    if args.output:
+        Path(args.output).expanduser().write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    slower = [measurement for measurement in measurements if measurement.verdict == "slower"]
+    print(f"{len(slower)} run(s) slower than the documented estimate", file=sys.stderr if slower else sys.stdout)
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Run the ODC Advanced SQL files under ``queries/`` on a plain PostgreSQL database.
+
+The queries are written for OutSystems ODC: ``{Entity}`` names a table, ``[Attribute]``
+a column and ``@Param`` a parameter. ``translate`` turns a query into PostgreSQL with
+``%s`` placeholders (psycopg style) and the matching argument list; list arguments are
+expanded to one placeholder per item, which is what ``Expand Inline`` parameters such
+as ``@DemandIds`` receive from the application as comma separated ids. Tables and columns
+become quoted identifiers with the query's spelling ("Consultant"."TenantId").
+
+``create_table_statements`` builds matching tables from the physical schema snapshot in
+``docs/entities/modules``: the snapshot has lower-case column names and types, the
+queries give the spelling.
+
+Usage:
+  python3 scripts/odc_sql.py queries/matching/GetMatchesByDemandId.sql --param TenantId=t1 --param DemandId=d1
+  python3 scripts/odc_sql.py --ddl queries/matching/GetMatchesByDemandId.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+QUERY_DIR = ROOT / "queries"
+SCHEMA_DIR = ROOT / "docs" / "entities" / "modules"
+
+# String literals, quoted identifiers and comments are copied unchanged; only the ODC
+# tokens outside of them are rewritten. A bare % has to be doubled for psycopg.
+TOKEN = re.compile(
+    r"""'(?:[^']|'')*'|"[^"]*"|--[^\n]*|/\*.*?\*/|\{(\w+)\}|\[([A-Za-z_]\w*)\]|@(\w+)|%""",
+    re.S,
+)
+PLACEHOLDER = "%s"
+
+
+def quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def tokens(sql: str, kind: int) -> List[str]:
+    """Distinct entities (1), attributes (2) or parameters (3) of ``sql``, in order of use."""
+    seen: Dict[str, None] = {}
+    for match in TOKEN.finditer(sql):
+        if match.group(kind):
+            seen.setdefault(match.group(kind))
+    return list(seen)
+
+
+def entity_names(sql: str) -> List[str]:
+    return tokens(sql, 1)
+
+
+def attribute_names(sql: str) -> List[str]:
+    return tokens(sql, 2)
+
+
+def parameter_names(sql: str) -> List[str]:
+    return tokens(sql, 3)
+
+
+def translate(sql: str, parameters: Mapping[str, object]) -> Tuple[str, List[object]]:
+    """PostgreSQL text of an ODC query plus the arguments for its ``%s`` placeholders."""
+    missing = [name for name in parameter_names(sql) if name not in parameters]
+    if missing:
+        raise ValueError(f"Missing query parameters: {', '.join(missing)}")
+    arguments: List[object] = []
+
+    def replace(match: re.Match) -> str:
+        entity, attribute, parameter = match.groups()
+        if entity:
+            return quote(entity)
+        if attribute:
+            return quote(attribute)
+        if parameter:
+            value = parameters[parameter]
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    # IN (NULL) matches nothing, like an empty id list.
+                    return "NULL"
+                arguments.extend(value)
+                return ", ".join([PLACEHOLDER] * len(value))
+            arguments.append(value)
+            return PLACEHOLDER
+        return match.group(0).replace("%", "%%")
+
+    return TOKEN.sub(replace, sql), arguments
+
+
+def read_query(path: Path) -> str:
+    # ODC rejects a trailing semicolon, so the files never have one; strip it anyway so
+    # the text can be wrapped in EXPLAIN.
+    return path.read_text(encoding="utf-8").strip().rstrip(";")
+
+
+def query_paths(*folders: str) -> List[Path]:
+    return sorted(path for folder in folders for path in (QUERY_DIR / folder).glob("*.sql"))
+
+
+def load_schema(directory: Path = SCHEMA_DIR) -> Dict[str, List[Tuple[str, str]]]:
+    """Columns (physical name, data type) per entity from the schema snapshot modules."""
+    schema = {}
+    for path in sorted(directory.glob("*.json")):
+        for entity in json.loads(path.read_text(encoding="utf-8")):
+            schema[entity["Entity"]] = [(column["name"], column["dataType"]) for column in entity["Columns"]]
+    return schema
+
+
+def create_table_statements(
+    entities: Iterable[str],
+    spellings: Iterable[str],
+    schema: Mapping[str, Sequence[Tuple[str, str]]],
+) -> List[str]:
+    """``CREATE TABLE`` per entity, with columns spelled as in the queries (``spellings``).
+
+    Columns no query uses keep their physical lower-case name. Entities with an ``id``
+    column get it as primary key, as in ODC.
+    """
+    spelled = {name.lower(): name for name in spellings}
+    statements = []
+    for entity in entities:
+        if entity not in schema:
+            raise ValueError(f"Entity {entity!r} is not in the schema snapshot")
+        columns = [f"  {quote(spelled.get(name, name))} {data_type}" for name, data_type in schema[entity]]
+        if any(name == "id" for name, _ in schema[entity]):
+            columns.append(f"  PRIMARY KEY ({quote(spelled.get('id', 'id'))})")
+        statements.append(f"CREATE TABLE IF NOT EXISTS {quote(entity)} (\n" + ",\n".join(columns) + "\n)")
+    return statements
+
+
+def parse_parameter(value: str) -> Tuple[str, object]:
+    name, _, text = value.partition("=")
+    if not name or not _:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value!r}")
+    if "," in text:
+        return name.lstrip("@"), text.split(",")
+    return name.lstrip("@"), int(text) if re.fullmatch(r"-?\d+", text) else text
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Translate ODC Advanced SQL to PostgreSQL")
+    parser.add_argument("query", nargs="+", help="ODC .sql files")
+    parser.add_argument("--param", type=parse_parameter, action="append", default=[], help="Parameter value NAME=VALUE (comma separated for lists)")
+    parser.add_argument("--ddl", action="store_true", help="Print CREATE TABLE statements for the entities the queries use instead")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    texts = [read_query(Path(path)) for path in args.query]
+    if args.ddl:
+        entities = [entity for text in texts for entity in entity_names(text)]
+        spellings = [attribute for text in texts for attribute in attribute_names(text)]
+        for statement in create_table_statements(dict.fromkeys(entities), spellings, load_schema()):
+            print(statement + ";\n")
+        return 0
+    parameters = dict(args.param)
+    for text in texts:
+        sql, arguments = translate(text, parameters)
+        print(sql)
+        print(f"-- arguments: {arguments!r}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""Capture PostgreSQL plans of the ODC queries and flag plan and latency regressions.
+
+Every ``.sql`` under ``queries/matching``, ``queries/reference`` and ``queries/insights``
+runs against a synthetic tenant (``generate_matching_dataset.py``) on a local PostgreSQL
+with the indexes of ``performance-analysis.md``. Each query is timed (``--repeat`` runs
+after ``--warmup``) and then run once under ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)``.
+Queries that write (UpdateOngoingEngagementMetrics) run in a transaction that is rolled
+back. The matching queries run under the Matchical admin path, like the benchmark, and
+the permission checks as the MyReports bench user.
+
+The plans are normalized (node types, tables, indexes, estimated and actual rows; no
+costs or timings) and stored with the timings and the dataset options in
+``--history``/<commit>.json. A run is compared with the latest earlier capture on the same
+dataset (or ``--baseline``, which must have used it too) and these findings set the exit
+status:
+
+- ``seq-scan``: a sequential scan of a table with at least ``--seq-scan-rows`` rows,
+- ``lost-index``: an Experience index the baseline plan used is no longer used,
+- ``row-estimate``: estimated and actual rows of a node in the scoring branches
+  (``branch_*`` CTEs and the Experience joins they inline to) differ by
+  ``--row-estimate-factor`` or more,
+- ``latency``: p95 above ``--max-ms`` (for GetMatchesByDemandId: the documented estimate
+  of the scale, when there is one),
+- ``slowdown``: p50 ``--slowdown`` times the baseline or more,
+- ``error``: the query no longer translates or fails to run; the other queries are
+  still captured.
+
+A changed plan shape (``plan-changed``) is reported but not counted as a regression.
+The tables the dataset leaves empty (descriptions, engagements, settings) give trivial
+plans; their captures still catch queries that stop translating or running.
+
+Usage:
+  python3 scripts/query_plan_regressions.py --consultants 5000
+  python3 scripts/query_plan_regressions.py --dsn postgresql://localhost/bench --query GetMatches --baseline 6d3db02
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+if __package__:
+    from .generate_matching_dataset import PERMISSION, DatasetIds, DatasetSpec, add_spec_arguments, spec_from_args
+    from .matching_query_benchmark import (
+        ANALYSIS_PATH, DEFAULT_DATA_DIR, DEFAULT_PORT, QUERIES, LocalPostgres, connect, create_schema,
+        documented_indexes, is_loaded, load_tenant, parse_estimates, percentile, query_parameters, scenarios,
+    )
+    from .odc_sql import QUERY_DIR, ROOT, query_paths, read_query, translate
+else:
+    from generate_matching_dataset import PERMISSION, DatasetIds, DatasetSpec, add_spec_arguments, spec_from_args
+    from matching_query_benchmark import (
+        ANALYSIS_PATH, DEFAULT_DATA_DIR, DEFAULT_PORT, QUERIES, LocalPostgres, connect, create_schema,
+        documented_indexes, is_loaded, load_tenant, parse_estimates, percentile, query_parameters, scenarios,
+    )
+    from odc_sql import QUERY_DIR, ROOT, query_paths, read_query, translate
+
+HISTORY_DIR = ROOT / "output" / "query-plans"
+FOLDERS = ("matching", "reference", "insights")
+DEFAULT_CONSULTANTS = 5000
+DEFAULT_MAX_MS = 1000.0
+DEFAULT_ROW_ESTIMATE_FACTOR = 10.0
+DEFAULT_SEQ_SCAN_ROWS = 10000
+DEFAULT_SLOWDOWN = 1.5
+# Below these sizes a misestimate or slowdown is noise.
+ROW_ESTIMATE_MIN_ROWS = 1000
+SLOWDOWN_MIN_MS = 5.0
+REGRESSIONS = ("seq-scan", "lost-index", "row-estimate", "latency", "slowdown", "error")
+INDEX_NODES = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+@dataclass
+class Capture:
+    query: str
+    scenario: str
+    p50_ms: float
+    p95_ms: float
+    runs: int
+    rows: int
+    planning_ms: float
+    execution_ms: float
+    shared_hit_blocks: int
+    shared_read_blocks: int
+    digest: str = ""
+    plan: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class Finding:
+    query: str
+    scenario: str
+    kind: str
+    detail: str
+
+
+def normalize_plan(node: Mapping[str, object], scope: str = "", relation: str = "") -> Dict[str, object]:
+    """Plan node without costs and timings; ``scope`` is the enclosing CTE or subquery.
+
+    Bitmap Index Scans get the table of their Bitmap Heap Scan, so every index use is
+    tied to a table.
+    """
+    subplan = str(node.get("Subplan Name", ""))
+    if node.get("CTE Name") and node.get("Node Type") != "CTE Scan":
+        scope = str(node["CTE Name"])
+    elif subplan.startswith("CTE "):
+        scope = subplan[4:]
+    elif node.get("Node Type") == "Subquery Scan" and node.get("Alias"):
+        scope = str(node["Alias"])
+    relation = str(node.get("Relation Name", relation if node.get("Node Type") in ("Bitmap Index Scan", "BitmapAnd", "BitmapOr") else ""))
+    normalized: Dict[str, object] = {"node": node.get("Node Type", "")}
+    for key, name in (("Join Type", "join"), ("Strategy", "strategy"), ("Index Name", "index"), ("Alias", "alias"), ("CTE Name", "cte")):
+        if node.get(key):
+            normalized[name] = node[key]
+    if relation:
+        normalized["relation"] = relation
+    if scope:
+        normalized["scope"] = scope
+    normalized["estimated_rows"] = int(node.get("Plan Rows", 0))
+    normalized["actual_rows"] = int(node.get("Actual Rows", 0))
+    normalized["loops"] = int(node.get("Actual Loops", 0))
+    children = node.get("Plans") or []
+    if children:
+        normalized["plans"] = [normalize_plan(child, scope, relation) for child in children]
+    return normalized
+
+
+def walk(node: Mapping[str, object]) -> Iterator[Mapping[str, object]]:
+    yield node
+    for child in node.get("plans", []):
+        yield from walk(child)
+
+
+def plan_shape(plan: Mapping[str, object], depth: int = 0) -> List[str]:
+    """One line per node: type, join, table and index; what a plan change is compared on."""
+    parts = [plan["node"], plan.get("join", ""), plan.get("relation", ""), plan.get("index", "")]
+    lines = ["  " * depth + " ".join(str(part) for part in parts if part)]
+    for child in plan.get("plans", []):
+        lines.extend(plan_shape(child, depth + 1))
+    return lines
+
+
+def plan_digest(plan: Mapping[str, object]) -> str:
+    return hashlib.sha1("\n".join(plan_shape(plan)).encode()).hexdigest()[:12]
+
+
+def indexes_used(plan: Mapping[str, object], table: str) -> List[str]:
+    return sorted({str(node["index"]) for node in walk(plan) if node["node"] in INDEX_NODES and node.get("relation") == table})
+
+
+def in_branch(node: Mapping[str, object]) -> bool:
+    """Part of a scoring branch: a ``branch_*`` scope, an Experience scan or a join over one."""
+    if str(node.get("scope", "")).startswith("branch_") or node.get("relation") == "Experience":
+        return True
+    if node["node"] not in ("Nested Loop", "Hash Join", "Merge Join"):
+        return False
+    # The Experience side of a hash join sits under its Hash node.
+    inputs = [grandchild for child in node.get("plans", []) for grandchild in [child] + list(child.get("plans", []))]
+    return any(child.get("relation") == "Experience" for child in inputs)
+
+
+def latency_limit(query: str, scenario: str, consultants: int, estimates: Sequence, max_ms: float) -> float:
+    if query.endswith("/GetMatchesByDemandId"):
+        estimate = next((row for row in estimates if row.consultants == consultants), None)
+        if estimate is not None:
+            return (estimate.filtered if scenario == "3-filters" else estimate.no_filters)[1]
+    return max_ms
+
+
+def find_regressions(
+    capture: Capture,
+    baseline: Optional[Capture],
+    table_rows: Mapping[str, float],
+    max_ms: float = DEFAULT_MAX_MS,
+    row_estimate_factor: float = DEFAULT_ROW_ESTIMATE_FACTOR,
+    seq_scan_rows: int = DEFAULT_SEQ_SCAN_ROWS,
+    slowdown: float = DEFAULT_SLOWDOWN,
+) -> List[Finding]:
+    findings: List[Finding] = []
+
+    def report(kind: str, detail: str) -> None:
+        findings.append(Finding(capture.query, capture.scenario, kind, detail))
+
+    plan = capture.plan
+    for node in walk(plan):
+        table = node.get("relation")
+        if node["node"] == "Seq Scan" and table_rows.get(str(table), 0) >= seq_scan_rows:
+            report("seq-scan", f"Seq Scan on {table} ({table_rows[str(table)]:.0f} rows)")
+        estimated, actual = node["estimated_rows"], node["actual_rows"]
+        if node["loops"] and max(estimated, actual) >= ROW_ESTIMATE_MIN_ROWS and in_branch(node):
+            factor = max(estimated, actual) / max(min(estimated, actual), 1)
+            if factor >= row_estimate_factor:
+                where = node.get("scope") or table or "branch"
+                report("row-estimate", f"{node['node']} in {where}: estimated {estimated} rows, actual {actual} ({factor:.0f}x)")
+    if capture.p95_ms > max_ms:
+        report("latency", f"p95 {capture.p95_ms:.1f}ms above {max_ms:g}ms")
+    if baseline is None:
+        return findings
+    lost = sorted(set(indexes_used(baseline.plan, "Experience")) - set(indexes_used(plan, "Experience")))
+    if lost:
+        report("lost-index", "Experience index(es) no longer used: " + ", ".join(lost))
+    if capture.p50_ms >= baseline.p50_ms * slowdown and capture.p50_ms - baseline.p50_ms >= SLOWDOWN_MIN_MS:
+        report("slowdown", f"p50 {capture.p50_ms:.1f}ms vs {baseline.p50_ms:.1f}ms")
+    if baseline.digest and capture.digest != baseline.digest:
+        report("plan-changed", f"plan {baseline.digest} -> {capture.digest}")
+    return findings
+
+
+def plan_parameters(spec: DatasetSpec, scoring_mode: str = "strict", score_batch: int = 50) -> Dict[str, object]:
+    """Parameters of every query: the benchmark's matching parameters plus the reference ones."""
+    ids = DatasetIds(spec.tenant_id)
+    parameters = query_parameters(spec, "admin", scoring_mode, score_batch)
+    check = {
+        "PermissionId": PERMISSION["InternalConsultant"],
+        "ExternalConsultantPermissionId": PERMISSION["ExternalConsultant"],
+        "PermissionMethodId": 1,
+        "AffectedConsultancyUserId": ids.user_id(0),
+        "AffectedConsultantId": ids.consultant_id(0),
+    }
+    parameters.update(check)
+    parameters.update({
+        "SystemLanguage": ids.key("language", 0),
+        "DescriptionKeyId": ids.key("description-key", 0),
+        "PreferredLanguageCode": "en",
+        "PermissionLevelOffId": 5,
+        "PermissionLevelUnavailableId": 6,
+        "PermissionChecksJson": json.dumps([check, dict(check, PermissionId=PERMISSION["Opportunity"], AffectedConsultantId="")]),
+    })
+    return parameters
+
+
+def captures(spec: DatasetSpec, parameters: Dict[str, object], folders: Sequence[str] = FOLDERS) -> List[Tuple[str, str, Dict[str, object]]]:
+    """(query, scenario, parameters) per run; the matching queries in the benchmark's scenarios."""
+    matching = {query: [] for query in QUERIES}
+    for query, scenario, values in scenarios(spec, parameters):
+        matching[query].append((scenario, values))
+    runs = []
+    for path in query_paths(*folders):
+        name = f"{path.parent.name}/{path.stem}"
+        if path.stem in matching:
+            runs.extend((name, scenario, values) for scenario, values in matching[path.stem])
+        elif path.parent.name == "reference":
+            runs.append((name, "myreports-user", dict(parameters, UserId=DatasetIds(spec.tenant_id).login("myreports"))))
+        else:
+            runs.append((name, "default", parameters))
+    return runs
+
+
+def capture_plan(connection, query: str, scenario: str, text: str, parameters: Dict[str, object], repeat: int, warmup: int) -> Capture:
+    sql, arguments = translate(text, parameters)
+    timings = []
+    rows = 0
+    with connection.cursor() as cursor:
+        for run in range(warmup + repeat):
+            # Rolled back, so writing queries see the same data every run.
+            with connection.transaction(force_rollback=True):
+                started = time.perf_counter()
+                cursor.execute(sql, arguments)
+                rows = len(cursor.fetchall()) if cursor.description else cursor.rowcount
+                if run >= warmup:
+                    timings.append((time.perf_counter() - started) * 1000)
+        with connection.transaction(force_rollback=True):
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, arguments)
+            explained = cursor.fetchone()[0]
+    explained = json.loads(explained) if isinstance(explained, str) else explained
+    root = explained[0]["Plan"]
+    plan = normalize_plan(root)
+    return Capture(
+        query=query,
+        scenario=scenario,
+        p50_ms=round(percentile(timings, 50), 2),
+        p95_ms=round(percentile(timings, 95), 2),
+        runs=len(timings),
+        rows=rows,
+        planning_ms=round(explained[0].get("Planning Time", 0.0), 2),
+        execution_ms=round(explained[0].get("Execution Time", 0.0), 2),
+        shared_hit_blocks=root.get("Shared Hit Blocks", 0),
+        shared_read_blocks=root.get("Shared Read Blocks", 0),
+        digest=plan_digest(plan),
+        plan=plan,
+    )
+
+
+def capture_runs(
+    connection, runs: Sequence[Tuple[str, str, Dict[str, object]]], texts: Mapping[str, str], repeat: int, warmup: int
+) -> Tuple[List[Capture], List[Finding]]:
+    """Capture every run; a query that fails to translate or execute becomes an ``error`` finding."""
+    results, errors = [], []
+    for query, scenario, values in runs:
+        try:
+            capture = capture_plan(connection, query, scenario, texts[query], values, repeat, warmup)
+        except Exception as exc:  # Translation or database errors; the failed run was rolled back.
+            error = Finding(query, scenario, "error", f"{type(exc).__name__}: {exc}".strip())
+            print(f"{query:<55} {scenario:<20} {error.detail}", flush=True)
+            errors.append(error)
+            continue
+        print(format_capture(capture), flush=True)
+        results.append(capture)
+    return results, errors
+
+
+def table_sizes(connection) -> Dict[str, float]:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace")
+        return {name: float(rows) for name, rows in cursor.fetchall()}
+
+
+def current_commit() -> str:
+    """Short HEAD commit, with ``-dirty`` when the queries have uncommitted changes."""
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = git("status", "--porcelain", "--", "queries")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def history_path(history: Path, commit: str) -> Path:
+    return history / f"{re.sub(r'[^A-Za-z0-9._-]+', '_', commit)}.json"
+
+
+def load_run(path: Path) -> Dict[Tuple[str, str], Capture]:
+    run = json.loads(path.read_text(encoding="utf-8"))
+    return {(item["query"], item["scenario"]): Capture(**item) for item in run["captures"]}
+
+
+def find_baseline(history: Path, commit: str, dataset: Mapping[str, object], baseline: Optional[str] = None) -> Optional[Path]:
+    """``baseline``'s capture, or the latest capture of another commit on the same ``dataset``.
+
+    Plans and timings depend on the data, so a capture of another dataset is no baseline.
+    """
+    # Compare as stored: JSON turns the category mix tuple into a list.
+    dataset = json.loads(json.dumps(dataset))
+    if baseline:
+        path = history_path(history, baseline)
+        if not path.exists():
+            raise SystemExit(f"No plan capture for {baseline} in {history}")
+        captured = json.loads(path.read_text(encoding="utf-8")).get("dataset")
+        if captured != dataset:
+            changed = sorted(key for key in set(dataset) | set(captured or {}) if (captured or {}).get(key) != dataset.get(key))
+            raise SystemExit(f"The plan capture for {baseline} used another dataset (differs in {', '.join(changed)}); rerun it with the same options")
+        return path
+    others = []
+    for path in history.glob("*.json"):
+        run = json.loads(path.read_text(encoding="utf-8"))
+        if run.get("commit") != commit and run.get("dataset") == dataset:
+            others.append((run.get("created", ""), path))
+    return max(others)[1] if others else None
+
+
+def format_capture(capture: Capture) -> str:
+    return (
+        f"{capture.query:<55} {capture.scenario:<20} p50={capture.p50_ms:8.1f}ms p95={capture.p95_ms:8.1f}ms "
+        f"rows={capture.rows:<5} hit={capture.shared_hit_blocks} read={capture.shared_read_blocks} plan={capture.digest}"
+    )
+
+
+def run_captures(
+    dsn: str,
+    spec: DatasetSpec,
+    data_dir: Path,
+    folders: Sequence[str] = FOLDERS,
+    pattern: Optional[str] = None,
+    scoring_mode: str = "strict",
+    repeat: int = 5,
+    warmup: int = 1,
+    workers: Optional[int] = None,
+) -> Tuple[List[Capture], List[Finding], Dict[str, float], str]:
+    analysis = ANALYSIS_PATH.read_text(encoding="utf-8")
+    texts = {f"{path.parent.name}/{path.stem}": read_query(path) for path in query_paths(*folders)}
+    with connect(dsn) as connection:
+        create_schema(connection, list(texts.values()), documented_indexes(analysis))
+        if not is_loaded(connection, spec):
+            print(f"Loading tenant of {spec.consultants} consultants ({spec.tenant_id})", flush=True)
+            load_tenant(connection, spec, data_dir, workers)
+        sizes = table_sizes(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            version = cursor.fetchone()[0]
+        runs = [run for run in captures(spec, plan_parameters(spec, scoring_mode), folders) if not pattern or pattern in run[0]]
+        results, errors = capture_runs(connection, runs, texts, repeat, warmup)
+    return results, errors, sizes, version
+
+
+def parse_folders(value: str) -> List[str]:
+    folders = [folder.strip() for folder in value.split(",") if folder.strip()]
+    missing = [folder for folder in folders if not (QUERY_DIR / folder).is_dir()]
+    if not folders or missing:
+        raise argparse.ArgumentTypeError(f"unknown query folder(s): {', '.join(missing) or value!r}")
+    return folders
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Capture EXPLAIN ANALYZE plans of the ODC queries and flag regressions")
+    parser.add_argument("--consultants", type=int, default=DEFAULT_CONSULTANTS, help="Consultants of the synthetic tenant (default: %(default)s)")
+    parser.add_argument("--folders", type=parse_folders, default=list(FOLDERS), help="Comma separated folders under queries/ (default: %(default)s)")
+    parser.add_argument("--query", help="Only queries whose folder/name contains this text")
+    parser.add_argument("--dsn", help="Use this PostgreSQL database instead of starting a local server")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR), help="Cluster and generated datasets directory (default: %(default)s)")
+    parser.add_argument("--pg-bin", help="Directory with initdb and pg_ctl (default: from PATH)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--shared-buffers", default="1GB", help="shared_buffers of the local server (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="Processes generating a dataset (default: CPU count)")
+    add_spec_arguments(parser)
+    parser.add_argument("--scoring-mode", choices=("strict", "global", "hybrid"), default="strict")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per query first")
+    parser.add_argument("--history", default=str(HISTORY_DIR), help="Directory of the per-commit captures (default: %(default)s)")
+    parser.add_argument("--commit", help="Name of this capture (default: short HEAD, -dirty with uncommitted query changes)")
+    parser.add_argument("--baseline", help="Compare with this commit's capture on the same dataset (default: the latest other capture of it)")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS, help="p95 limit of queries without a documented estimate (default: %(default)s)")
+    parser.add_argument("--row-estimate-factor", type=float, default=DEFAULT_ROW_ESTIMATE_FACTOR)
+    parser.add_argument("--seq-scan-rows", type=int, default=DEFAULT_SEQ_SCAN_ROWS, help="Flag sequential scans of tables this large (default: %(default)s)")
+    parser.add_argument("--slowdown", type=float, default=DEFAULT_SLOWDOWN, help="Flag p50 this many times the baseline (default: %(default)s)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    spec = spec_from_args(args, args.consultants)
+    data_dir = Path(args.data_dir).expanduser()
+    data_dir.mkdir(parents=True, exist_ok=True)
+    options = (args.folders, args.query, args.scoring_mode, args.repeat, args.warmup, args.workers)
+    if args.dsn:
+        results, errors, sizes, version = run_captures(args.dsn, spec, data_dir, *options)
+    else:
+        with LocalPostgres(data_dir, args.port, args.pg_bin, {"shared_buffers": args.shared_buffers}) as server:
+            results, errors, sizes, version = run_captures(server.dsn, spec, data_dir, *options)
+
+    history = Path(args.history).expanduser()
+    history.mkdir(parents=True, exist_ok=True)
+    commit = args.commit or current_commit()
+    baseline_path = find_baseline(history, commit, asdict(spec), args.baseline)
+    baseline = load_run(baseline_path) if baseline_path else {}
+    estimates = parse_estimates(ANALYSIS_PATH.read_text(encoding="utf-8"))
+    findings = list(errors)
+    for capture in results:
+        limit = latency_limit(capture.query, capture.scenario, spec.consultants, estimates, args.max_ms)
+        findings += find_regressions(
+            capture, baseline.get((capture.query, capture.scenario)), sizes, limit, args.row_estimate_factor, args.seq_scan_rows, args.slowdown
+        )
+    run = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "server_version": version,
+        "baseline": baseline_path.stem if baseline_path else None,
+        "dataset": asdict(spec),
+        "captures": [asdict(capture) for capture in results],
+        "findings": [asdict(finding) for finding in findings],
+    }
+    path = history_path(history, commit)
+    path.write_text(json.dumps(run, indent=2) + "\n", encoding="utf-8")
+
+    for finding in findings:
+        print(f"{finding.kind:<13} {finding.query} [{finding.scenario}]: {finding.detail}")
+    regressions = [finding for finding in findings if finding.kind in REGRESSIONS]
+    compared = f"compared with {baseline_path.stem}" if baseline_path else "no baseline"
+    print(f"{len(regressions)} regression(s), {compared}; plans written to {path}", file=sys.stderr if regressions else sys.stdout)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
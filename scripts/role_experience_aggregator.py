@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Aggregate the raw role experience export without a second SQL pass.
+
+``GetInternalConsultantRoleExperienceRaw.sql`` exports one row per consultant and role
+(roles, or custom roles with ``@UseCustomRoles = 1``); ``...Aggregated.sql`` reduces the
+same experience rows to one row per consultant. This script computes the aggregated view
+from the raw export instead, plus a per-role report, with group-by reductions over
+integer-coded consultants and roles:
+
+- Role count: the consultant's roles with experience.
+- Primary role, Months weighted, Latest recency at / is ongoing: from the row flagged
+  Is primary (the consultant's top role); an ongoing primary role is recent as of today.
+- Per role: consultants, consultants with it as primary role, ongoing, total and median
+  weighted months.
+
+The coded rows are saved as a compressed ``.npz`` state. A later raw export covering only
+some consultants replaces their rows and re-aggregates just those consultants.
+
+The raw export does not carry everything the aggregated SQL reads, so the results differ from
+it in these cases:
+
+- It has no role ids, so roles are told apart by name: Role count counts distinct names, where
+  the SQL counts COUNT(DISTINCT RoleKey), and two roles sharing a name count once.
+- A top role without any experience rows has no Primary role here (the SQL still names it).
+- Latest recency is ongoing comes from the primary row's Recency_is_ongoing, which is the flag
+  of the role's most recent experience; the SQL takes MAX(IsOngoing) over all experience rows
+  of the primary role, so an older ongoing experience behind a newer finished one is only
+  ongoing there.
+
+Usage:
+  python3 scripts/role_experience_aggregator.py aggregate --input BIT-roles-raw.xlsx --state BIT-roles.npz \\
+    --output BIT-roles-aggregated.xlsx --roles BIT-roles.csv
+  python3 scripts/role_experience_aggregator.py update --state BIT-roles.npz --input BIT-roles-changed.xlsx \\
+    --output BIT-roles-aggregated.xlsx
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from openpyxl import load_workbook
+
+if __package__:
+    from .atomic_write import atomic_write
+    from .data_quality_snapshots import decode_labels, encode_labels, segment_medians
+    from .engagement_coverage import NO_DAY, consultant_id_from_url, day_number
+    from .generate_data_quality_export import write_export
+    from .source_table import parse_date
+else:
+    from atomic_write import atomic_write
+    from data_quality_snapshots import decode_labels, encode_labels, segment_medians
+    from engagement_coverage import NO_DAY, consultant_id_from_url, day_number
+    from generate_data_quality_export import write_export
+    from source_table import parse_date
+
+CONSULTANT_HEADERS = [
+    "External",
+    "Mat",
+    "Url",
+    "Full name",
+    "Email",
+    "Entry date",
+    "Work experience since",
+    "Is available",
+    "Available from",
+    "Available to",
+    "Is willing to travel",
+    "Available days per week",
+    "Availability comment",
+    "Department",
+    "Team",
+    "Unit",
+    "Legal entity",
+    "Seniority level",
+    "Location",
+    "Lead",
+]
+ROLE_HEADERS = ["Role", "Months weighted", "Recency at", "Recency is ongoing", "Is primary"]
+RAW_HEADERS = CONSULTANT_HEADERS + ROLE_HEADERS
+AGGREGATED_HEADERS = CONSULTANT_HEADERS + ["Role count", "Primary role", "Months weighted", "Latest recency at", "Latest recency is ongoing"]
+ROLE_REPORT_HEADERS = ["Role", "Consultants", "Primary for", "Ongoing", "Months weighted total", "Months weighted median"]
+CONSULTANT_DATE_HEADERS = ["Entry date", "Work experience since", "Available from", "Available to"]
+ROLE_MODES = ("roles", "custom-roles")
+STATE_FORMAT = 1
+# Per-row arrays of RoleExperience.
+ROW_ARRAYS = ("consultant", "role", "months", "recency", "ongoing", "primary")
+# Tri-state booleans (SQL TRUE/FALSE/NULL) as int8.
+UNKNOWN = -1
+
+
+def header_key(header: object) -> str:
+    """"External_id", "External id" and "External" are the same column: SQL aliases and workbook headers."""
+    key = " ".join(str(header or "").replace("_", " ").split()).lower()
+    return key[:-3] if key.endswith(" id") else key
+
+
+def tri_state(value: object) -> int:
+    if value is None or value == "":
+        return UNKNOWN
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in ("1", "true", "yes") else 0
+    return 1 if value else 0
+
+
+def id_order(consultant_id: str) -> Tuple[int, object]:
+    """Sort key of a consultant id: numeric ids by value, as the SQL compares them, before any other text."""
+    return (0, int(consultant_id)) if consultant_id.isdigit() else (1, consultant_id)
+
+
+def read_export(path: Path) -> Tuple[List[str], List[Tuple[object, ...]]]:
+    """Header row and rows of a raw export workbook (first sheet) or CSV file."""
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as handle:
+            reader = csv.reader(handle)
+            headers = next(reader, [])
+            return headers, [tuple(value if value != "" else None for value in row) for row in reader if any(row)]
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        headers = [str(header).strip() if header is not None else "" for header in next(rows, ())]
+        return headers, [row for row in rows if any(value is not None and value != "" for value in row)]
+    finally:
+        wb.close()
+
+
+@dataclass
+class RoleExperience:
+    """Raw export rows, coded: consultant and role codes index ``consultants`` and ``roles``."""
+
+    consultant_keys: List[str]
+    # CONSULTANT_HEADERS values of each consultant, as exported.
+    consultants: List[Tuple[object, ...]]
+    roles: List[str]
+    consultant: np.ndarray
+    role: np.ndarray
+    months: np.ndarray
+    recency: np.ndarray
+    ongoing: np.ndarray
+    primary: np.ndarray
+
+    @classmethod
+    def from_rows(cls, headers: Sequence[object], rows: Iterable[Sequence[object]]) -> "RoleExperience":
+        positions = {header_key(header): position for position, header in enumerate(headers)}
+        missing = [header for header in RAW_HEADERS if header_key(header) not in positions]
+        if missing:
+            raise ValueError(f"Role experience export missing required columns: {missing}")
+        consultant_positions = [positions[header_key(header)] for header in CONSULTANT_HEADERS]
+        url, role, months, recency, ongoing, primary = (
+            positions[header_key(header)] for header in ["Url"] + ROLE_HEADERS
+        )
+        consultant_index: Dict[str, int] = {}
+        role_index: Dict[str, int] = {}
+        consultants: List[Tuple[object, ...]] = []
+        columns: Dict[str, list] = {name: [] for name in ROW_ARRAYS}
+        for row in rows:
+            key = str(row[url] or "").strip()
+            code = consultant_index.get(key)
+            if code is None:
+                code = consultant_index[key] = len(consultants)
+                consultants.append(tuple(row[p] for p in consultant_positions))
+            # A consultant without role experience has one row with a blank role and Is primary.
+            is_primary = tri_state(row[primary])
+            name = row[role]
+            has_role = is_primary != UNKNOWN or (name is not None and str(name).strip() != "")
+            columns["consultant"].append(code)
+            columns["role"].append(role_index.setdefault(str(name or "").strip(), len(role_index)) if has_role else -1)
+            columns["months"].append(float(row[months] or 0.0))
+            columns["recency"].append(day_number(row[recency]))
+            columns["ongoing"].append(tri_state(row[ongoing]))
+            columns["primary"].append(is_primary)
+        return cls(
+            consultant_keys=list(consultant_index),
+            consultants=consultants,
+            roles=list(role_index),
+            consultant=np.array(columns["consultant"], dtype=np.int32),
+            role=np.array(columns["role"], dtype=np.int32),
+            months=np.array(columns["months"], dtype=np.float64),
+            recency=np.array(columns["recency"], dtype=np.int32),
+            ongoing=np.array(columns["ongoing"], dtype=np.int8),
+            primary=np.array(columns["primary"], dtype=np.int8),
+        )
+
+    @classmethod
+    def from_export(cls, path: Path) -> "RoleExperience":
+        return cls.from_rows(*read_export(path))
+
+
+class RoleExperienceAggregator:
+    """Per-consultant aggregates of a raw role experience export, kept current through partial exports."""
+
+    def __init__(self, raw: RoleExperience, role_mode: str = "roles") -> None:
+        if role_mode not in ROLE_MODES:
+            raise ValueError(f"Unknown role mode {role_mode!r}; expected one of {ROLE_MODES}")
+        self.raw = raw
+        self.role_mode = role_mode
+        self.index = {key: code for code, key in enumerate(raw.consultant_keys)}
+        # Codes of consultants that left the scope; codes stay stable, so they are only skipped in the output.
+        self.removed: set = set()
+        size = len(raw.consultant_keys)
+        self.role_count = np.zeros(size, dtype=np.int32)
+        self.primary_role = np.full(size, -1, dtype=np.int32)
+        self.primary_rows = np.zeros(size, dtype=np.int32)
+        self.primary_months = np.zeros(size, dtype=np.float64)
+        self.primary_recency = np.full(size, NO_DAY, dtype=np.int32)
+        self.primary_ongoing = np.zeros(size, dtype=bool)
+        self.aggregate(np.arange(size))
+
+    def aggregate(self, consultants: np.ndarray) -> None:
+        """Recompute the aggregates of the given consultant codes from their raw rows."""
+        size = len(self.raw.consultant_keys)
+        selected = np.zeros(size, dtype=bool)
+        selected[consultants] = True
+        raw = self.raw
+        rows = selected[raw.consultant]
+        has_role = rows & (raw.role >= 0)
+        # Distinct roles: a repeated consultant/role pair (two role ids with one name) counts once.
+        pairs = np.unique(raw.consultant[has_role].astype(np.int64) * max(len(raw.roles), 1) + raw.role[has_role])
+        self.role_count[consultants] = np.bincount(pairs // max(len(raw.roles), 1), minlength=size)[consultants]
+
+        primary = rows & (raw.primary == 1)
+        owners = raw.consultant[primary]
+        self.primary_rows[consultants] = np.bincount(owners, minlength=size)[consultants]
+        self.primary_months[consultants] = np.bincount(owners, weights=raw.months[primary], minlength=size)[consultants]
+        recency = np.full(size, NO_DAY, dtype=np.int32)
+        np.maximum.at(recency, owners, raw.recency[primary])
+        self.primary_recency[consultants] = recency[consultants]
+        ongoing = np.zeros(size, dtype=bool)
+        ongoing[owners[raw.ongoing[primary] == 1]] = True
+        self.primary_ongoing[consultants] = ongoing[consultants]
+        role = np.full(size, -1, dtype=np.int32)
+        role[owners] = raw.role[primary]
+        self.primary_role[consultants] = role[consultants]
+
+    def replace_consultants(self, changed: RoleExperience, removed: Iterable[str] = ()) -> np.ndarray:
+        """Swap in the rows of ``changed`` consultants (adding new ones), drop ``removed`` ones; returns the recomputed codes."""
+        raw = self.raw
+        role_index = {name: code for code, name in enumerate(raw.roles)}
+        # The trailing -1 maps the "no role" code of ``changed`` onto itself.
+        role_codes = np.array([role_index.setdefault(name, len(role_index)) for name in changed.roles] + [-1], dtype=np.int32)
+        added = [key for key in changed.consultant_keys if key not in self.index]
+        consultant_codes = np.array([self.index.get(key, -1) for key in changed.consultant_keys], dtype=np.int32)
+        consultant_codes[consultant_codes < 0] = np.arange(len(self.index), len(self.index) + len(added), dtype=np.int32)
+        raw.roles = list(role_index)
+        for key, code, values in zip(changed.consultant_keys, consultant_codes, changed.consultants):
+            if code < len(raw.consultants):
+                raw.consultants[code] = values
+            else:
+                raw.consultant_keys.append(key)
+                raw.consultants.append(values)
+                self.index[key] = int(code)
+        self.grow(len(raw.consultant_keys))
+
+        removed_codes = np.array([self.index[key] for key in removed if key in self.index], dtype=np.int32)
+        replaced = np.zeros(len(raw.consultant_keys), dtype=bool)
+        replaced[consultant_codes] = True
+        replaced[removed_codes] = True
+        keep = ~replaced[raw.consultant]
+        incoming = {
+            "consultant": consultant_codes[changed.consultant],
+            "role": role_codes[changed.role],
+        }
+        for name in ROW_ARRAYS:
+            setattr(raw, name, np.concatenate([getattr(raw, name)[keep], incoming.get(name, getattr(changed, name))]))
+        recomputed = np.flatnonzero(replaced)
+        self.aggregate(recomputed)
+        self.removed = (self.removed | set(removed_codes.tolist())) - set(consultant_codes.tolist())
+        return recomputed
+
+    def grow(self, size: int) -> None:
+        extra = size - len(self.role_count)
+        if extra <= 0:
+            return
+        self.role_count = np.append(self.role_count, np.zeros(extra, dtype=np.int32))
+        self.primary_role = np.append(self.primary_role, np.full(extra, -1, dtype=np.int32))
+        self.primary_rows = np.append(self.primary_rows, np.zeros(extra, dtype=np.int32))
+        self.primary_months = np.append(self.primary_months, np.zeros(extra))
+        self.primary_recency = np.append(self.primary_recency, np.full(extra, NO_DAY, dtype=np.int32))
+        self.primary_ongoing = np.append(self.primary_ongoing, np.zeros(extra, dtype=bool))
+
+    def active(self) -> List[int]:
+        return [code for code in range(len(self.raw.consultant_keys)) if code not in self.removed]
+
+    def consultant_rows(self, today: date) -> List[List[object]]:
+        """Rows of the aggregated export in AGGREGATED_HEADERS order, sorted by name and consultant id like the SQL."""
+        today_value = datetime.combine(today, datetime.min.time())
+        name = CONSULTANT_HEADERS.index("Full name")
+        keyed = []
+        for code in self.active():
+            values = self.raw.consultants[code]
+            has_rows = self.primary_rows[code] > 0
+            ongoing = bool(self.primary_ongoing[code])
+            recency = self.primary_recency[code]
+            row = (
+                list(values)
+                + [
+                    int(self.role_count[code]),
+                    (self.raw.roles[self.primary_role[code]] or None) if self.primary_role[code] >= 0 else None,
+                    round(float(self.primary_months[code]), 2),
+                    today_value if ongoing else (datetime.fromordinal(int(recency)) if recency != NO_DAY else None),
+                    True if ongoing else (False if has_rows else None),
+                ]
+            )
+            keyed.append(((str(values[name] or ""), id_order(consultant_id_from_url(self.raw.consultant_keys[code]))), row))
+        keyed.sort(key=lambda item: item[0])
+        return [row for _, row in keyed]
+
+    def role_report(self) -> List[List[object]]:
+        """One row per role with experience (ROLE_REPORT_HEADERS), most common first."""
+        raw = self.raw
+        size = len(raw.roles)
+        active = np.ones(len(raw.consultant_keys), dtype=bool)
+        active[list(self.removed)] = False
+        counted = (raw.role >= 0) & active[raw.consultant]
+        roles, months = raw.role[counted], raw.months[counted]
+        pairs = np.unique(raw.consultant[counted].astype(np.int64) * size + roles)
+        consultants = np.bincount(pairs % size, minlength=size)
+        primary = np.bincount(roles[raw.primary[counted] == 1], minlength=size)
+        ongoing = np.bincount(roles[raw.ongoing[counted] == 1], minlength=size)
+        totals = np.bincount(roles, weights=months, minlength=size)
+        medians = segment_medians(roles, months, size)
+        order = sorted(np.flatnonzero(consultants), key=lambda code: (-consultants[code], raw.roles[code]))
+        return [
+            [raw.roles[code] or None, int(consultants[code]), int(primary[code]), int(ongoing[code]), round(float(totals[code]), 2), round(float(medians[code]), 2)]
+            for code in order
+        ]
+
+    def save(self, path: Path) -> Path:
+        """The coded rows as a compressed ``.npz``; consultant columns are stored as codes into their distinct values."""
+        raw = self.raw
+        arrays = {
+            "format": np.array([STATE_FORMAT]),
+            "role_mode": np.array([self.role_mode]),
+            "consultant_keys": encode_labels(raw.consultant_keys),
+            "roles": encode_labels(raw.roles),
+            "removed": np.array(sorted(self.removed), dtype=np.int32),
+            "consultant": raw.consultant,
+            "role": raw.role,
+            # Exported months have two decimals; float32 keeps them exactly enough to round back.
+            "months": raw.months.astype(np.float32),
+            "recency": raw.recency,
+            "ongoing": raw.ongoing,
+            "primary": raw.primary,
+        }
+        for position, header in enumerate(CONSULTANT_HEADERS):
+            distinct: Dict[str, int] = {}
+            codes = [distinct.setdefault(json.dumps(values[position], default=str), len(distinct)) for values in raw.consultants]
+            arrays[f"column_{position}"] = np.array(codes, dtype=np.int32)
+            arrays[f"values_{position}"] = encode_labels(list(distinct))
+        with atomic_write(path) as handle:
+            np.savez_compressed(handle, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "RoleExperienceAggregator":
+        with np.load(path) as state:
+            if int(state["format"][0]) != STATE_FORMAT:
+                raise ValueError(f"{path} was written by another version of this script; aggregate the export again")
+            columns = []
+            for position, header in enumerate(CONSULTANT_HEADERS):
+                distinct = [json.loads(text) for text in decode_labels(state[f"values_{position}"])]
+                if header in CONSULTANT_DATE_HEADERS:
+                    distinct = [parse_date(value) for value in distinct]
+                columns.append([distinct[code] for code in state[f"column_{position}"]])
+            raw = RoleExperience(
+                consultant_keys=decode_labels(state["consultant_keys"]),
+                consultants=list(zip(*columns)),
+                roles=decode_labels(state["roles"]),
+                consultant=state["consultant"],
+                role=state["role"],
+                months=np.round(state["months"].astype(np.float64), 2),
+                recency=state["recency"],
+                ongoing=state["ongoing"],
+                primary=state["primary"],
+            )
+            aggregator = cls(raw, str(state["role_mode"][0]))
+            aggregator.removed = set(state["removed"].tolist())
+        return aggregator
+
+
+def write_role_report(path: Path, rows: List[List[object]]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(ROLE_REPORT_HEADERS)
+        writer.writerows(rows)
+    return path
+
+
+def read_keys(path: Path) -> List[str]:
+    return [line.strip() for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Aggregate a raw role experience export per consultant and per role")
+    commands = parser.add_subparsers(dest="command", required=True)
+    aggregate = commands.add_parser("aggregate", help="Aggregate a full raw export")
+    aggregate.add_argument("--use-custom-roles", action="store_true", help="The export was run with @UseCustomRoles = 1")
+    update = commands.add_parser("update", help="Replace the rows of the consultants in a partial raw export and re-aggregate them")
+    update.add_argument("--removed", help="File with the Url of each consultant that left the scope, one per line")
+    for command in (aggregate, update):
+        command.add_argument("--input", required=True if command is aggregate else False, help="Raw role experience export (.xlsx or .csv)")
+        command.add_argument("--state", required=True, help="Aggregation state (.npz)")
+        command.add_argument("--output", help="Write the aggregated export (.xlsx) here")
+        command.add_argument("--roles", help="Write the per-role report (.csv) here")
+        command.add_argument("--today", type=date.fromisoformat, help="Date used for ongoing primary roles (default: today)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    state_path = Path(args.state).expanduser()
+    if args.command == "aggregate":
+        raw = RoleExperience.from_export(Path(args.input).expanduser())
+        aggregator = RoleExperienceAggregator(raw, "custom-roles" if args.use_custom_roles else "roles")
+        print(f"Aggregated {len(raw.consultant)} rows of {len(raw.consultant_keys)} consultants and {len(raw.roles)} {aggregator.role_mode}")
+    else:
+        aggregator = RoleExperienceAggregator.load(state_path)
+        changed = RoleExperience.from_export(Path(args.input).expanduser()) if args.input else RoleExperience.from_rows(RAW_HEADERS, [])
+        removed = read_keys(Path(args.removed).expanduser()) if args.removed else []
+        recomputed = aggregator.replace_consultants(changed, removed)
+        print(f"Re-aggregated {recomputed.size} of {len(aggregator.active())} consultants")
+    aggregator.save(state_path)
+    today = args.today or date.today()
+    if args.output:
+        created = write_export(Path(args.output).expanduser(), aggregator.consultant_rows(today), AGGREGATED_HEADERS)
+        print(f"Wrote aggregated export: {created}")
+    if args.roles:
+        created = write_role_report(Path(args.roles).expanduser(), aggregator.role_report())
+        print(f"Wrote role report: {created}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Column-oriented table for a raw data quality export.
+
+The export is read once into one array per header. Categorical columns (the filter and
+segment dimensions) keep each distinct value once, interned, plus an integer code per
+row; date columns get ISO-8601 text parsed into datetimes. Distinct values and per-column
+statistics are collected in the same pass, so later stages look them up instead of
+rescanning the rows.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from dataclasses import astuple, dataclass, fields
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class ColumnStats:
+    """Summary of one column: its value kinds, blanks, distinct values and range."""
+
+    kinds: Tuple[str, ...]
+    non_blank: int
+    blank: int
+    distinct: int
+    minimum: object = None
+    maximum: object = None
+
+
+def value_kind(value: object) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, (datetime, date)):
+        return "date"
+    if isinstance(value, str):
+        return "text"
+    return type(value).__name__
+
+
+def parse_date(value: object) -> object:
+    """ISO-8601 text as a datetime; anything else is returned unchanged."""
+    if isinstance(value, str) and value.strip():
+        try:
+            return datetime.fromisoformat(value.strip())
+        except ValueError:
+            return value
+    return value
+
+
+def column_stats(values: Sequence[object], distinct: int) -> ColumnStats:
+    kinds = set()
+    non_blank = 0
+    ordered: Dict[str, List[object]] = {}
+    for value in values:
+        if value is None or value == "":
+            continue
+        non_blank += 1
+        kind = value_kind(value)
+        kinds.add(kind)
+        if kind in ("number", "date"):
+            ordered.setdefault(kind, []).append(value)
+    # A range is only meaningful when the column holds a single orderable kind.
+    bounds = next(iter(ordered.values())) if len(kinds) == 1 and ordered else None
+    return ColumnStats(
+        kinds=tuple(sorted(kinds)),
+        non_blank=non_blank,
+        blank=len(values) - non_blank,
+        distinct=distinct,
+        minimum=min(bounds) if bounds else None,
+        maximum=max(bounds) if bounds else None,
+    )
+
+
+class SourceTable:
+    """One column per header; categorical columns are stored as codes into their distinct values."""
+
+    # Bump when ``to_state`` changes; stored states (the parse cache) are keyed by it.
+    STATE_FORMAT = 1
+
+    def __init__(
+        self,
+        headers: Sequence[str],
+        values: List[Sequence[object]],
+        categories: Dict[str, List[object]],
+        codes: Dict[str, array],
+        stats: List[ColumnStats],
+    ) -> None:
+        self.headers = list(headers)
+        self.values = values
+        # A repeated header name resolves to its last column, like a {header: index} dict.
+        self.index = {header: position for position, header in enumerate(self.headers)}
+        self.categories = categories
+        self.codes = codes
+        self.stats = stats
+        self.row_count = len(values[0]) if values else 0
+        self._unique: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_rows(
+        cls,
+        headers: Sequence[str],
+        rows: Iterable[Sequence[object]],
+        categorical: Iterable[str] = (),
+        dates: Iterable[str] = (),
+    ) -> "SourceTable":
+        headers = list(headers)
+        index = {header: position for position, header in enumerate(headers)}
+        categorical_positions = {index[header]: header for header in categorical if header in index}
+        date_positions = {index[header] for header in dates if header in index}
+        transposed = list(zip(*rows)) or [()] * len(headers)
+        values: List[Sequence[object]] = []
+        categories: Dict[str, List[object]] = {}
+        codes: Dict[str, array] = {}
+        stats: List[ColumnStats] = []
+        for position, column in enumerate(transposed):
+            if position in date_positions:
+                column = tuple(parse_date(value) for value in column)
+            header = categorical_positions.get(position)
+            if header is not None:
+                # Keyed by type too, so 1, 1.0 and TRUE stay distinct values.
+                lookup: Dict[Tuple[type, object], int] = {}
+                column_codes = array("l")
+                interned: List[object] = []
+                for value in column:
+                    key = (value.__class__, value)
+                    code = lookup.get(key)
+                    if code is None:
+                        code = lookup[key] = len(interned)
+                        interned.append(sys.intern(value) if isinstance(value, str) else value)
+                    column_codes.append(code)
+                categories[header] = interned
+                codes[header] = column_codes
+                column = tuple(interned[code] for code in column_codes)
+                distinct = len(interned)
+            else:
+                distinct = len(set(column))
+            values.append(column)
+            stats.append(column_stats(column, distinct))
+        return cls(headers, values, categories, codes, stats)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def column(self, header: str) -> Sequence[object]:
+        return self.values[self.index[header]]
+
+    def column_stats(self, header: str) -> ColumnStats:
+        return self.stats[self.index[header]]
+
+    def rows(self) -> Iterator[Tuple[object, ...]]:
+        """Rows in source order, as read."""
+        return zip(*self.values)
+
+    def unique_values(self, header: str) -> List[str]:
+        """Sorted distinct non-blank values of ``header`` as stripped text."""
+        unique = self._unique.get(header)
+        if unique is None:
+            distinct = self.categories.get(header)
+            if distinct is None:
+                distinct = set(self.column(header))
+            unique = self._unique[header] = sorted(
+                {str(value).strip() for value in distinct if value is not None and str(value).strip() != ""}
+            )
+        return unique
+
+    def to_state(self) -> Dict[str, Any]:
+        """The table as builtin types only, so a pickle of it does not depend on this module's import path."""
+        return {
+            "headers": self.headers,
+            "values": self.values,
+            "categories": self.categories,
+            "codes": self.codes,
+            "stats": [astuple(stats) for stats in self.stats],
+        }
+
+    @classmethod
+    def state_layout(cls) -> List[object]:
+        """What a stored state must match to be read back: the format and the ColumnStats fields it stores by position."""
+        return [cls.STATE_FORMAT, [field.name for field in fields(ColumnStats)]]
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SourceTable":
+        return cls(
+            state["headers"],
+            state["values"],
+            state["categories"],
+            state["codes"],
+            [ColumnStats(*stats) for stats in state["stats"]],
+        )
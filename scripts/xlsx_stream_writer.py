@@ -0,0 +1,284 @@
+"""Stream large worksheets of an openpyxl write-only workbook as raw sheet XML.
+
+openpyxl builds a cell object and an element tree for every value it writes, which
+dominates the build time of sheets with tens of thousands of rows. A ``StreamedWorkbook``
+lets selected sheets bypass that: openpyxl still creates the sheet (column widths, frozen
+panes, auto filter, visibility) and every other part of the workbook, while the rows of the
+streamed sheets are serialised straight to XML with a shared string table and spliced into
+the saved package.
+
+``SharedFormulaColumns`` writes formulas repeated down a column as Excel shared formulas,
+through either writer.
+"""
+
+from __future__ import annotations
+
+import io
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Dict, IO, Iterable, List, MutableMapping, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.compat import safe_string
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.worksheet.formula import ArrayFormula
+
+SPREADSHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIP_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_RELATIONSHIP_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+SHARED_STRINGS_TYPE = f"{RELATIONSHIP_NS}/sharedStrings"
+SHARED_STRINGS_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+EMPTY_SHEET_DATA = (b"<sheetData></sheetData>", b"<sheetData />", b"<sheetData/>")
+DATE_TYPES = (datetime, date, time, timedelta)
+
+
+class SharedFormula(ArrayFormula):
+    """One cell of an Excel shared formula.
+
+    The first cell of the group carries the formula text and the range it covers; the
+    others only carry the group index, and Excel rebuilds their formulas by moving the
+    first one down. Subclassing ArrayFormula lets openpyxl write the attributes as is.
+    """
+
+    t = "shared"
+
+    def __init__(self, si: int, ref: Optional[str] = None, text: Optional[str] = None) -> None:
+        super().__init__(ref, text)
+        self.si = si
+
+    def __iter__(self):
+        yield "t", self.t
+        if self.ref:
+            yield "ref", self.ref
+        yield "si", str(self.si)
+
+
+class SharedFormulaColumns:
+    """Write column-uniform per-row formulas of one sheet as shared formulas.
+
+    Each column is registered with the rows that carry its formula, and every contiguous
+    run of those rows becomes one shared formula. The formula of each row must be the
+    first row's formula with its relative references moved down.
+    """
+
+    def __init__(self) -> None:
+        self.runs: Dict[object, Tuple[str, List[int], List[SharedFormula]]] = {}
+        self.next_index = 0
+
+    def add(self, column: str, rows: Iterable[int], key: object = None) -> None:
+        """Share ``column``'s formula over ``rows``; ``key`` addresses the cell in a row (default: the column)."""
+        bounds: List[List[int]] = []
+        for row in sorted(rows):
+            if bounds and row == bounds[-1][1] + 1:
+                bounds[-1][1] = row
+            else:
+                bounds.append([row, row])
+        self.runs[column if key is None else key] = (
+            column,
+            [bound for pair in bounds for bound in pair],
+            [SharedFormula(self.next_index + index) for index in range(len(bounds))],
+        )
+        self.next_index += len(bounds)
+
+    def formula(self, key: object, row: int, text: str) -> object:
+        """Return the cell value for ``text`` at ``row``: a shared formula if the row is in a run."""
+        column, bounds, followers = self.runs[key]
+        position = bisect_right(bounds, row) - 1
+        if position < 0 or (position % 2 and bounds[position] != row):
+            return text
+        run = position // 2
+        first, last = bounds[2 * run], bounds[2 * run + 1]
+        if row != first:
+            return followers[run]
+        return SharedFormula(followers[run].si, f"{column}{first}:{column}{last}", text)
+
+    def apply(self, row: int, values: MutableMapping) -> None:
+        """Replace the registered formulas present in ``values`` for sheet row ``row``."""
+        for key in self.runs:
+            text = values.get(key)
+            if text is not None:
+                values[key] = self.formula(key, row, text)
+
+
+class SharedStringTable:
+    """Distinct cell strings in first-use order; cells refer to them by index."""
+
+    def __init__(self) -> None:
+        self.index: Dict[str, int] = {}
+
+    def add(self, text: str) -> int:
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.index)
+        return position
+
+    def to_xml(self) -> bytes:
+        items = []
+        for text in self.index:
+            space = ' xml:space="preserve"' if text != text.strip() else ""
+            items.append(f"<si><t{space}>{escape(text)}</t></si>")
+        return (
+            f'<sst xmlns="{SPREADSHEET_NS}" uniqueCount="{len(items)}">{"".join(items)}</sst>'
+        ).encode("utf-8")
+
+
+class StreamedSheet:
+    """Rows of one worksheet, serialised to a temporary file as they are appended."""
+
+    def __init__(self, ws, shared_strings: SharedStringTable) -> None:
+        self.ws = ws
+        self.title = ws.title
+        self.shared_strings = shared_strings
+        self.body: IO[bytes] = tempfile.TemporaryFile()
+        self.row_count = 0
+        self.columns: List[str] = []
+        # Date cells take openpyxl's default number format for their type; the style is
+        # registered with the workbook once and reused for every date of that type.
+        self.date_styles: Dict[type, int] = {}
+
+    def column(self, index: int) -> str:
+        while len(self.columns) <= index:
+            self.columns.append(get_column_letter(len(self.columns) + 1))
+        return self.columns[index]
+
+    def append(self, values: Sequence[object]) -> None:
+        """Append one row; accepts the same values and write-only cells as ``ws.append``."""
+        self.row_count += 1
+        r = self.row_count
+        cells = []
+        for index, value in enumerate(values):
+            style = 0
+            if isinstance(value, Cell):
+                style = value.style_id if value.has_style else 0
+                value = value.value
+            if value is None or value == "":
+                if style:
+                    cells.append(f'<c r="{self.column(index)}{r}" s="{style}"/>')
+                continue
+            cells.append(self.cell_xml(f"{self.column(index)}{r}", value, style))
+        self.body.write(f'<row r="{r}">{"".join(cells)}</row>'.encode("utf-8"))
+
+    def cell_xml(self, ref: str, value: object, style: int) -> str:
+        style_attr = f' s="{style}"' if style else ""
+        if isinstance(value, str):
+            if value.startswith("=") and len(value) > 1:
+                return f'<c r="{ref}"{style_attr}><f>{escape(value[1:])}</f></c>'
+            return f'<c r="{ref}"{style_attr} t="s"><v>{self.shared_strings.add(value)}</v></c>'
+        if isinstance(value, bool):
+            return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c r="{ref}"{style_attr}><v>{safe_string(value)}</v></c>'
+        if isinstance(value, DATE_TYPES):
+            if not style_attr:
+                style_attr = f' s="{self.date_style(value)}"'
+            return f'<c r="{ref}"{style_attr}><v>{safe_string(to_excel(value))}</v></c>'
+        if isinstance(value, SharedFormula):
+            if value.text is None:
+                return f'<c r="{ref}"{style_attr}><f t="shared" si="{value.si}"/></c>'
+            return f'<c r="{ref}"{style_attr}><f t="shared" ref="{value.ref}" si="{value.si}">{escape(value.text[1:])}</f></c>'
+        if isinstance(value, ArrayFormula):
+            return f'<c r="{ref}"{style_attr}><f t="array" ref="{value.ref}">{escape(value.text[1:])}</f></c>'
+        raise TypeError(f"Cannot stream value of type {type(value).__name__} to {self.title}!{ref}")
+
+    def date_style(self, value: object) -> int:
+        style = self.date_styles.get(type(value))
+        if style is None:
+            style = self.date_styles[type(value)] = WriteOnlyCell(self.ws, value=value).style_id
+        return style
+
+    def copy_body(self, target: IO[bytes]) -> None:
+        self.body.seek(0)
+        shutil.copyfileobj(self.body, target)
+        self.body.close()
+
+
+class StreamedWorkbook:
+    """An openpyxl write-only workbook whose large sheets are streamed as raw XML."""
+
+    def __init__(self, wb) -> None:
+        self.wb = wb
+        self.shared_strings = SharedStringTable()
+        self.sheets: Dict[str, StreamedSheet] = {}
+
+    def stream(self, ws) -> StreamedSheet:
+        """Take over the rows of ``ws``; openpyxl keeps writing its layout and settings."""
+        sheet = StreamedSheet(ws, self.shared_strings)
+        self.sheets[ws.title] = sheet
+        return sheet
+
+    def save(self, output_path: Path) -> None:
+        package = io.BytesIO()
+        self.wb.save(package)
+        with zipfile.ZipFile(package) as source:
+            sheet_parts = worksheet_parts(source)
+            streamed_parts = {sheet_parts[title]: sheet for title, sheet in self.sheets.items()}
+            with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as target:
+                for item in source.infolist():
+                    data = source.read(item.filename)
+                    if item.filename in streamed_parts:
+                        write_streamed_part(target, item.filename, data, streamed_parts[item.filename])
+                    elif item.filename == "[Content_Types].xml":
+                        target.writestr(item.filename, add_shared_strings_content_type(data))
+                    elif item.filename == "xl/_rels/workbook.xml.rels":
+                        target.writestr(item.filename, add_shared_strings_relationship(data))
+                    else:
+                        target.writestr(item, data)
+                target.writestr(SHARED_STRINGS_PART, self.shared_strings.to_xml())
+
+
+def worksheet_parts(package: zipfile.ZipFile) -> Dict[str, str]:
+    """Map sheet titles to their part names inside the package."""
+    relationships = ET.fromstring(package.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in relationships.iter(f"{{{PACKAGE_RELATIONSHIP_NS}}}Relationship")
+    }
+    workbook = ET.fromstring(package.read("xl/workbook.xml"))
+    parts = {}
+    for sheet in workbook.iter(f"{{{SPREADSHEET_NS}}}sheet"):
+        target = targets[sheet.get(f"{{{RELATIONSHIP_NS}}}id")]
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+
+def split_sheet_data(data: bytes) -> Tuple[bytes, bytes]:
+    for empty in EMPTY_SHEET_DATA:
+        head, found, tail = data.partition(empty)
+        if found:
+            return head + b"<sheetData>", b"</sheetData>" + tail
+    raise ValueError("Streamed worksheets must not have rows written through openpyxl")
+
+
+def write_streamed_part(target: zipfile.ZipFile, name: str, data: bytes, sheet: StreamedSheet) -> None:
+    head, tail = split_sheet_data(data)
+    with target.open(name, "w", force_zip64=True) as handle:
+        handle.write(head)
+        sheet.copy_body(handle)
+        handle.write(tail)
+
+
+def add_shared_strings_content_type(data: bytes) -> bytes:
+    if SHARED_STRINGS_CONTENT_TYPE.encode() in data:
+        return data
+    override = f'<Override PartName="/{SHARED_STRINGS_PART}" ContentType="{SHARED_STRINGS_CONTENT_TYPE}" />'
+    return data.replace(b"</Types>", override.encode() + b"</Types>")
+
+
+def add_shared_strings_relationship(data: bytes) -> bytes:
+    if SHARED_STRINGS_TYPE.encode() in data:
+        return data
+    relationships = ET.fromstring(data)
+    ids = {rel.get("Id") for rel in relationships}
+    number = len(ids) + 1
+    while f"rId{number}" in ids:
+        number += 1
+    relationship = f'<Relationship Type="{SHARED_STRINGS_TYPE}" Target="sharedStrings.xml" Id="rId{number}" />'
+    return data.replace(b"</Relationships>", relationship.encode() + b"</Relationships>")
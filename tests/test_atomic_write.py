@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.atomic_write import atomic_write
+
+
+class AtomicWriteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "state" / "BIT.npz"
+
+    def test_target_is_replaced_once_written(self) -> None:
+        with atomic_write(self.path) as handle:
+            handle.write(b"first")
+            self.assertFalse(self.path.exists())
+        with atomic_write(self.path) as handle:
+            handle.write(b"second")
+        self.assertEqual(self.path.read_bytes(), b"second")
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+
+    def test_failed_write_keeps_the_previous_file(self) -> None:
+        self.path.parent.mkdir(parents=True)
+        self.path.write_bytes(b"previous")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.path) as handle:
+                handle.write(b"partial")
+                raise RuntimeError("interrupted")
+        self.assertEqual(self.path.read_bytes(), b"previous")
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+
+
+if __name__ == "__main__":
+    unittest.main()
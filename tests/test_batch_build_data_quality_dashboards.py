@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from unittest import mock
+
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.batch_build_data_quality_dashboards import build_all, jobs_from_directory, jobs_from_manifest, tenant_from_path
+from scripts.build_data_quality_excel_dashboard import REQUIRED_HEADERS
+
+
+def crash_or_touch(input_path: Path, output_path: Path, **_: object) -> None:
+    """Stand-in for build_dashboard (patched before the pool forks) that kills the worker for CRASH."""
+    if input_path.stem == "CRASH-raw":
+        os._exit(1)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text("built")
+
+
+def write_export(path: Path, count: int) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(REQUIRED_HEADERS)
+    for index in range(count):
+        values = {
+            "Full name": f"Consultant {index}",
+            "Entry date": datetime(2021, 1 + index % 12, 1),
+            "Months since entry baseline": 40,
+            "Weighted months since entry": index % 40,
+            "Absolute months since entry": index % 30,
+            "Is available": "Yes",
+            "Department": f"Department {index % 2}",
+        }
+        ws.append([values.get(header) for header in REQUIRED_HEADERS])
+    wb.save(path)
+
+
+class BatchBuildTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+
+    def test_tenant_names_come_from_export_file_names(self) -> None:
+        self.assertEqual(tenant_from_path(Path("BIT-raw-updated.xlsx")), "BIT")
+        self.assertEqual(tenant_from_path(Path("acme.xlsx")), "acme")
+
+    def test_directory_batch_builds_every_tenant_and_collects_failures(self) -> None:
+        write_export(self.root / "ACME-raw.xlsx", 8)
+        write_export(self.root / "GLOBEX-raw-updated.xlsx", 5)
+        (self.root / "BROKEN-raw.xlsx").write_text("not a workbook")
+        (self.root / "~$ACME-raw.xlsx").write_text("lock file")
+        output_dir = self.root / "dashboards"
+
+        jobs = jobs_from_directory(self.root, output_dir)
+        self.assertEqual([job.tenant for job in jobs], ["ACME", "BROKEN", "GLOBEX"])
+        results = build_all(jobs, {"mode": "static", "today": date(2025, 6, 15)}, workers=2)
+
+        self.assertEqual([(result.tenant, result.status) for result in results], [("ACME", "ok"), ("BROKEN", "failed"), ("GLOBEX", "ok")])
+        self.assertIn("BadZipFile", results[1].error)
+        self.assertTrue(all(result.seconds >= 0 for result in results))
+        dashboard = load_workbook(output_dir / "ACME-DataQuality-Dashboard.xlsx")
+        self.assertEqual(dashboard.active.title, "Dashboard")
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the patched builder must reach the workers")
+    def test_a_dead_worker_fails_only_its_own_tenant(self) -> None:
+        names = ["A", "B", "CRASH", "D", "E", "F"]
+        for name in names:
+            (self.root / f"{name}-raw.xlsx").write_text("export")
+        jobs = jobs_from_directory(self.root, self.root / "dashboards")
+
+        with mock.patch("scripts.batch_build_data_quality_dashboards.build_dashboard", crash_or_touch):
+            results = build_all(jobs, {}, workers=2)
+
+        self.assertEqual([(result.tenant, result.status) for result in results], [(name, "failed" if name == "CRASH" else "ok") for name in names])
+        self.assertIn("BrokenProcessPool", results[2].error)
+        self.assertEqual(len(list((self.root / "dashboards").glob("*.xlsx"))), 5)
+
+    def test_manifest_paths_are_relative_to_the_manifest(self) -> None:
+        (self.root / "exports").mkdir()
+        manifest = self.root / "tenants.csv"
+        manifest.write_text("tenant,input,output\nAcme,exports/a.xlsx,\n,exports/BIT-raw.xlsx,out/bit.xlsx\n", encoding="utf-8")
+        jobs = jobs_from_manifest(manifest, self.root / "dashboards")
+        self.assertEqual([job.tenant for job in jobs], ["Acme", "BIT"])
+        self.assertEqual(jobs[0].output_path, self.root / "dashboards" / "Acme-DataQuality-Dashboard.xlsx")
+        self.assertEqual(jobs[1].input_path, (self.root / "exports" / "BIT-raw.xlsx").resolve())
+        self.assertEqual(jobs[1].output_path, (self.root / "out" / "bit.xlsx").resolve())
+
+    def test_two_tenants_writing_the_same_dashboard_are_rejected(self) -> None:
+        manifest = self.root / "tenants.csv"
+        manifest.write_text("tenant,input,output\nA,a.xlsx,same.xlsx\nB,b.xlsx,same.xlsx\n", encoding="utf-8")
+        with self.assertRaises(ValueError):
+            build_all(jobs_from_manifest(manifest, self.root), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.benchmark_data_quality_dashboard import compare_runs, measure_build
+from scripts.build_data_quality_excel_dashboard import FILTER_HEADERS, REQUIRED_HEADERS, load_source
+from scripts.generate_data_quality_export import generate_export, generate_rows, segment_cardinality
+
+
+class SyntheticExportTests(unittest.TestCase):
+    def test_rows_are_reproducible_and_follow_the_export_shape(self) -> None:
+        today = date(2026, 1, 15)
+        rows = generate_rows(300, today, seed=7)
+        self.assertEqual(rows, generate_rows(300, today, seed=7))
+        self.assertNotEqual(rows, generate_rows(300, today, seed=8))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = generate_export(Path(tmp) / "synthetic-raw.xlsx", 300, today, seed=7)
+            table = load_source(path)
+        self.assertEqual(table.headers, REQUIRED_HEADERS)
+        self.assertEqual(len(table), 300)
+        for header in FILTER_HEADERS:
+            self.assertGreater(table.column_stats(header).distinct, 1, header)
+        self.assertLessEqual(table.column_stats("Legal entity").distinct, segment_cardinality("Legal entity", 300))
+        self.assertEqual(table.column_stats("Entry date").kinds, ("date",))
+        self.assertEqual(table.column_stats("Is profile photo missing").kinds, ("bool",))
+        self.assertGreater(table.column_stats("Work experience since").blank, 0)
+
+    def test_segment_counts_grow_slower_than_the_tenant(self) -> None:
+        for dimension in ("Legal entity", "Department", "Team"):
+            small, large = segment_cardinality(dimension, 1000), segment_cardinality(dimension, 100000)
+            self.assertLess(small, large)
+            self.assertLess(large / small, 100)
+        self.assertLess(segment_cardinality("Department", 100000), segment_cardinality("Team", 100000))
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_build_is_timed_per_stage(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = generate_export(Path(tmp) / "synthetic-raw.xlsx", 50, date(2026, 1, 15))
+            output_path = Path(tmp) / "dashboard.xlsx"
+            run = measure_build(input_path, output_path, {"writer": "stream", "today": date(2026, 1, 15)})
+            self.assertEqual(run.output_bytes, output_path.stat().st_size)
+        for stage in ("load_source", "write_raw_data_sheet", "write_lists_sheet", "write_model_sheet", "write_dashboard_sheet", "save"):
+            self.assertIn(stage, run.stages)
+        self.assertNotIn("compute_model_values", run.stages)
+        self.assertLessEqual(sum(run.stages.values()), run.seconds + 0.01)
+
+    def test_growth_beyond_tolerance_and_noise_is_a_regression(self) -> None:
+        baseline = {"runs": [{"consultants": 1000, "seconds": 2.0, "peak_rss_mb": 100.0, "output_bytes": 10**6, "stages": {"load_source": 1.0, "save": 0.01}}]}
+        current = {"runs": [
+            {"consultants": 1000, "seconds": 2.1, "peak_rss_mb": 130.0, "output_bytes": 10**6, "stages": {"load_source": 1.5, "save": 0.03}},
+            {"consultants": 5000, "seconds": 9.0, "peak_rss_mb": 200.0, "output_bytes": 10**7, "stages": {}},
+        ]}
+
+        regressions = compare_runs(current, baseline, tolerance=0.2)
+
+        self.assertEqual([(r.consultants, r.metric) for r in regressions], [(1000, "peak_rss_mb"), (1000, "stages.load_source")])
+        self.assertAlmostEqual(regressions[1].change, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from datetime import date, datetime
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scripts.build_data_quality_excel_dashboard as builder
+from scripts.build_profiler import BuildHooks, BuildProfiler, sidecar_path
+from scripts.build_data_quality_excel_dashboard import (
+    REQUIRED_HEADERS,
+    build_dashboard,
+    compute_model_values,
+    load_source,
+    segment_candidate_end_row,
+    segment_order,
+    source_table,
+)
+
+
+def consultant_row(index: int) -> dict:
+    return {
+        "External": str(1000 + index),
+        "Mat": f"M{index:04d}",
+        "Url": f"https://app.example.com/consultant/{index}",
+        "Full name": f"Consultant {index}",
+        "Email": f"consultant{index}@example.com",
+        "Entry date": datetime(2020 + index % 4, 1 + index % 12, 1),
+        "Work experience since": datetime(2010, 1, 1),
+        "Total engagements": index % 7,
+        "Engagements with invalid dates": index % 5 == 0 and 1 or 0,
+        "Ongoing engagements": index % 3,
+        "Oldest ongoing engagement start date": datetime(2022, 1, 1) if index % 3 else None,
+        "Months since entry baseline": 40,
+        "Absolute months since entry": 10 + index % 30,
+        "Weighted months since entry": 8 + index % 30,
+        "Months before entry baseline": 60,
+        "Absolute months before entry": index % 60,
+        "Weighted months before entry": index % 50,
+        "Is work experience since after entry date": index % 11 == 0,
+        "Is available": ("Yes", "No", "-")[index % 3],
+        "Available days per week": index % 6,
+        "Department": f"Department {index % 3}",
+        "Team": f"Team {index % 4}",
+        "Unit": f"Unit {index % 2}",
+        "Legal entity": "Example GmbH",
+        "Location": ("Berlin", "Stuttgart", "")[index % 3],
+        "Lead": f"Lead {index % 5}",
+    }
+
+
+def write_source_workbook(path: Path, count: int) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(REQUIRED_HEADERS)
+    for index in range(count):
+        values = consultant_row(index)
+        ws.append([values.get(header) for header in REQUIRED_HEADERS])
+    wb.save(path)
+
+
+class BuildDashboardTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.input_path = Path(self.tmp.name) / "raw.xlsx"
+        write_source_workbook(self.input_path, 25)
+
+    def test_load_source_reads_required_headers_and_rows(self) -> None:
+        table = load_source(self.input_path)
+        self.assertEqual(table.headers, REQUIRED_HEADERS)
+        self.assertEqual(len(table), 25)
+        self.assertEqual(table.column("Full name")[0], "Consultant 0")
+        self.assertEqual(table.unique_values("Location"), ["Berlin", "Stuttgart"])
+        self.assertEqual(len(table.categories["Team"]), 4)
+        self.assertEqual(list(table.codes["Team"][:5]), [0, 1, 2, 3, 0])
+        stats = table.column_stats("Entry date")
+        self.assertEqual((stats.kinds, stats.blank, stats.minimum), (("date",), 0, datetime(2020, 1, 1)))
+
+    def test_source_cache_skips_parsing_until_the_file_changes(self) -> None:
+        cache_dir = Path(self.tmp.name) / "cache"
+        parsed = load_source(self.input_path, cache_dir)
+        self.assertEqual(len(list(cache_dir.glob("*.pickle"))), 1)
+
+        with mock.patch.object(builder, "parse_source", side_effect=AssertionError("parsed again")):
+            cached = load_source(self.input_path, cache_dir)
+            build_dashboard(self.input_path, Path(self.tmp.name) / "cached.xlsx", mode="static", cache_dir=cache_dir)
+        self.assertEqual(list(cached.rows()), list(parsed.rows()))
+        self.assertEqual(cached.stats, parsed.stats)
+        self.assertEqual(cached.unique_values("Lead"), parsed.unique_values("Lead"))
+
+        write_source_workbook(self.input_path, 26)
+        self.assertEqual(len(load_source(self.input_path, cache_dir)), 26)
+        self.assertEqual(len(list(cache_dir.glob("*.pickle"))), 2)
+
+        cache_path = cache_dir / f"{builder.source_cache_key(self.input_path)}.pickle"
+        cache_path.write_bytes(b"truncated")
+        self.assertEqual(len(load_source(self.input_path, cache_dir)), 26)
+        # A pickle of a class that no longer exists fails with an import error, not an UnpicklingError.
+        cache_path.write_bytes(b"cretired_module\nSourceTable\n.")
+        self.assertEqual(len(load_source(self.input_path, cache_dir)), 26)
+
+        with mock.patch.object(builder.SourceTable, "STATE_FORMAT", builder.SourceTable.STATE_FORMAT + 1):
+            self.assertNotEqual(builder.source_cache_key(self.input_path), cache_path.stem)
+
+    def test_source_table_parses_text_dates_and_interns_categories(self) -> None:
+        table = source_table(
+            REQUIRED_HEADERS,
+            source_rows({"Entry date": "2024-03-01", "Team": "Blue"}, {"Entry date": "soon", "Team": "".join(["Bl", "ue"])}),
+        )
+        self.assertEqual(list(table.column("Entry date")), [datetime(2024, 3, 1), "soon"])
+        first, second = table.column("Team")
+        self.assertIs(first, second)
+        self.assertEqual(table.column_stats("Entry date").kinds, ("date", "text"))
+
+    def test_build_writes_all_sheets_with_streamed_formulas(self) -> None:
+        output_path = build_dashboard(self.input_path, Path(self.tmp.name) / "out" / "dashboard.xlsx", list_backend="excel365")
+        wb = load_workbook(output_path)
+        self.assertEqual(wb.sheetnames, ["Raw_data", "Lists", "Segments", "Model", "Dashboard"])
+        self.assertEqual(wb.active.title, "Dashboard")
+
+        raw = wb["Raw_data"]
+        self.assertEqual(raw.freeze_panes, "A2")
+        self.assertEqual(raw.auto_filter.ref, "A1:AQ26")
+        self.assertEqual(raw["R2"].value, "=ROUND(O2-P2,2)")
+        self.assertEqual(raw["T26"].value, '=IFERROR(P26/O26,"")')
+        self.assertEqual(raw["T26"].number_format, "0%")
+        with zipfile.ZipFile(output_path) as package:
+            raw_xml = package.read("xl/worksheets/sheet1.xml").decode()
+            model_xml = package.read("xl/worksheets/sheet4.xml").decode()
+        self.assertEqual(raw_xml.count('t="shared" ref='), 8)
+        self.assertIn('<f t="shared" ref="T2:T26"', raw_xml)
+        self.assertIn('<f t="shared" ref="A2:A26"', model_xml)
+        self.assertIn('<f t="shared" ref="K2:K6"', model_xml)
+        self.assertTrue(raw["A1"].font.b)
+
+        lists = wb["Lists"]
+        self.assertEqual([lists[f"B{row}"].value for row in range(1, 6)], ["Department", "All", "Department 0", "Department 1", "Department 2"])
+        self.assertEqual(lists["I6"].value, "Location")
+
+        model = wb["Model"]
+        self.assertEqual(model.sheet_state, "hidden")
+        self.assertTrue(model["A26"].value.startswith("=--(AND("))
+        self.assertIsNone(model["A27"].value)
+        # Lead has the most distinct values (5), so the candidate block ends at row 6.
+        self.assertTrue(model["K6"].value.startswith("=IF(J6"))
+        self.assertIsNone(model["K7"].value)
+        self.assertEqual(model["O11"].value, '=IFERROR(INDEX($J$2:$J$6,MATCH(LARGE($N$2:$N$6,10),$N$2:$N$6,0)),"")')
+        self.assertIn("INDEX(Segments!$H$1:$H$27,INDEX(Segments!$P2:$U2,", model["K2"].value)
+        self.assertNotIn("SUMPRODUCT", model["L2"].value)
+
+        segments = wb["Segments"]
+        self.assertEqual(segments.sheet_state, "hidden")
+        self.assertEqual(segments.max_row, 27)
+        self.assertEqual(sorted(segments[f"A{r}"].value for r in range(3, 28)), list(range(2, 27)))
+        self.assertEqual([(segments[f"J{r}"].value, segments[f"P{r}"].value) for r in range(2, 5)], [(2, 11), (11, 19), (19, 27)])
+        self.assertEqual((segments["H2"].value, segments["I2"].value), (0, 0))
+        self.assertEqual(segments["H3"].value, "=H2+INDEX(Model!$A$2:$A$26,G3-1)")
+
+        dashboard = wb["Dashboard"]
+        self.assertEqual(dashboard["B11"].value, "Department")
+        self.assertEqual(len(dashboard.data_validations.dataValidation), 9)
+        self.assertEqual(len(dashboard._charts), 3)
+        self.assertIsNotNone(dashboard["H7"].comment)
+        ranked = dashboard["K37"].value
+        self.assertEqual(ranked.ref, "K37:K61")
+        self.assertEqual(
+            ranked.text,
+            '=IFERROR(INDEX(_xlfn.SORTBY(_xlfn._xlws.FILTER(ROW(Model!$R$2:$R$26),Model!$A$2:$A$26=1),'
+            '_xlfn._xlws.FILTER(Model!$R$2:$R$26,Model!$A$2:$A$26=1),-1),ROW(K37:K61)-36),"")',
+        )
+        self.assertIsNone(dashboard["K61"].value)
+        self.assertEqual(dashboard["A37"].value, '=IF($K37="","",INDEX(Raw_data!$D$2:$D$26,$K37-1))')
+        self.assertIn("HYPERLINK(", dashboard["C61"].value)
+        self.assertEqual(dashboard["B37"].number_format, "yyyy-mm-dd")
+        self.assertEqual(dashboard["B15"].value, '=COUNTIFS(Model!$A$2:$A$26,1,Model!$B$2:$B$26,">=0.3",Model!$B$2:$B$26,"<0.5")')
+        self.assertEqual(dashboard["I16"].value, dashboard["I5"].value)
+        self.assertIsNone(dashboard["A62"].value)
+        self.assertTrue(wb.calculation.forceFullCalc)
+
+    def test_legacy_list_backend_walks_presorted_rows(self) -> None:
+        today = date(2025, 6, 15)
+        output_path = build_dashboard(self.input_path, Path(self.tmp.name) / "legacy.xlsx", mode="hybrid", today=today, list_backend="legacy")
+        wb = load_workbook(output_path)
+        model, dashboard = wb["Model"], wb["Dashboard"]
+        self.assertEqual(model["AA1"].value, "Presorted_running")
+        self.assertEqual(model["AA3"].value, "=AA2+Z3")
+        self.assertEqual(dashboard["K37"].value, '=IF(1<=$E$5,INDEX(Model!$Y$2:$Y$26,IFERROR(MATCH(0,Model!$AA$2:$AA$26,1),0)+1),"")')
+        self.assertEqual(dashboard["A37"].value, '=IF($K37="","",INDEX(Raw_data!$D$2:$D$26,$K37-1))')
+
+        values = compute_model_values(load_source(self.input_path), today)
+        expected = sorted(range(2, 27), key=lambda r: values[r]["R"], reverse=True)
+        self.assertEqual([model[f"W{r}"].value for r in range(2, 27)], expected)
+
+    def test_legacy_list_backend_ranks_live_scores_in_formula_mode(self) -> None:
+        # Between these dates the oldest ongoing engagements pass 24 months, which reorders the scores.
+        built, opened = date(2023, 6, 15), date(2025, 6, 15)
+        table = load_source(self.input_path)
+        self.assertNotEqual(builder.presorted_anomaly_rows(table, built, "Weighted"), builder.presorted_anomaly_rows(table, opened, "Weighted"))
+
+        output_path = build_dashboard(self.input_path, Path(self.tmp.name) / "legacy.xlsx", today=built, list_backend="legacy")
+        wb = load_workbook(output_path)
+        model, dashboard = wb["Model"], wb["Dashboard"]
+        self.assertEqual(model.max_column, len(builder.MODEL_COLUMNS))
+        self.assertIn("TODAY()", model["D3"].value)
+        self.assertEqual(dashboard["K37"].value, '=IF(1<=$E$5,MATCH(LARGE(Model!$R$2:$R$26,1),Model!$R$2:$R$26,0)+1,"")')
+        self.assertEqual(dashboard["A37"].value, '=IF($K37="","",INDEX(Raw_data!$D$2:$D$26,$K37-1))')
+
+    def test_hybrid_mode_keeps_volatile_columns_out_of_model(self) -> None:
+        output_path = build_dashboard(self.input_path, Path(self.tmp.name) / "hybrid.xlsx", mode="hybrid", today=date(2025, 6, 15))
+        wb = load_workbook(output_path)
+        model = wb["Model"]
+        self.assertFalse(wb.calculation.forceFullCalc)
+        self.assertEqual(model["D3"].value, 41)
+        self.assertEqual(model["D2"].value, '=""')
+        self.assertIn(model["E3"].value, (0, 1))
+        self.assertNotIn("TODAY()", model["A2"].value)
+        self.assertTrue(model["B2"].value.startswith("=IFERROR(IF(Dashboard!$B$3"))
+        self.assertTrue(model["K2"].value.startswith("=IF(J2"))
+
+    def test_static_mode_writes_values_and_flags_dashboard(self) -> None:
+        output_path = build_dashboard(self.input_path, Path(self.tmp.name) / "static.xlsx", mode="static", today=date(2025, 6, 15))
+        wb = load_workbook(output_path)
+        model = wb["Model"]
+        formulas = [
+            cell.value
+            for row in model.iter_rows(min_row=2)
+            for cell in row
+            if isinstance(cell.value, str) and cell.value.startswith("=") and cell.value != '=""'
+        ]
+        self.assertEqual(formulas, [])
+        self.assertEqual(model["J2"].value, "Department 0")
+        self.assertEqual(model["K2"].value, 9)
+        self.assertEqual(model["AA26"].value, sum(model[f"A{r}"].value for r in range(2, 27)))
+        self.assertIn("Static snapshot", wb["Dashboard"]["A2"].value)
+
+    def test_stream_writer_matches_openpyxl_writer(self) -> None:
+        today = date(2025, 6, 15)
+        for mode in ("formula", "static"):
+            reference = load_workbook(build_dashboard(self.input_path, Path(self.tmp.name) / f"{mode}.xlsx", mode=mode, today=today))
+            streamed = load_workbook(
+                build_dashboard(self.input_path, Path(self.tmp.name) / f"{mode}-stream.xlsx", mode=mode, today=today, writer="stream")
+            )
+            self.assertEqual(streamed.sheetnames, reference.sheetnames)
+            for title in ("Raw_data", "Segments", "Model"):
+                if title not in reference.sheetnames:
+                    continue
+                expected, actual = reference[title], streamed[title]
+                self.assertEqual(
+                    [(c.coordinate, c.value, c.number_format, c.font.b) for row in actual.iter_rows() for c in row],
+                    [(c.coordinate, c.value, c.number_format, c.font.b) for row in expected.iter_rows() for c in row],
+                )
+                self.assertEqual(actual.sheet_state, expected.sheet_state)
+                self.assertEqual(actual.auto_filter.ref, expected.auto_filter.ref)
+            self.assertEqual(len(streamed["Dashboard"]._charts), 3)
+
+    def test_profiler_records_stages_and_sheet_counts(self) -> None:
+        output_path = Path(self.tmp.name) / "dashboard.xlsx"
+        cprofile_path = Path(self.tmp.name) / "dashboard.pstats"
+        profiler = BuildProfiler(trace_memory=True, cprofile_path=cprofile_path)
+        build_dashboard(self.input_path, output_path, mode="hybrid", today=date(2026, 1, 15), writer="stream", hooks=profiler)
+
+        stages = profiler.stages
+        self.assertEqual(
+            list(stages),
+            ["load_source", "source_loaded", "compute_model_values", "write_raw_data_sheet", "write_lists_sheet",
+             "write_segments_sheet", "presorted_anomaly_rows", "write_model_sheet", "write_dashboard_sheet", "sheets_written", "save"],
+        )
+        self.assertTrue(all(stage.calls == 1 and stage.peak_mb is not None for stage in stages.values()))
+        self.assertEqual(stages["write_raw_data_sheet"].sheet, "Raw_data")
+        # Header row plus one row per consultant in every source column.
+        self.assertGreaterEqual(stages["write_raw_data_sheet"].cells, 26 * 20)
+        self.assertEqual(stages["write_model_sheet"].formulas, profiler.sheets["Model"]["formulas"])
+        self.assertGreater(stages["write_model_sheet"].formulas, 0)
+        self.assertIsNone(stages["load_source"].cells)
+        self.assertTrue(cprofile_path.exists())
+
+        sidecar = profiler.write(sidecar_path(output_path), mode="hybrid")
+        self.assertEqual(sidecar.name, "dashboard.profile.json")
+        report = json.loads(sidecar.read_text(encoding="utf-8"))
+        self.assertEqual(report["mode"], "hybrid")
+        self.assertEqual(report["output_bytes"], output_path.stat().st_size)
+        self.assertEqual(len(report["stages"]), 11)
+
+    def test_profile_traces_memory_only_when_asked(self) -> None:
+        profiler = BuildProfiler()
+        build_dashboard(self.input_path, Path(self.tmp.name) / "dashboard.xlsx", mode="static", today=date(2026, 1, 15), hooks=profiler)
+        self.assertTrue(all(stage.peak_mb is None for stage in profiler.stages.values()))
+        self.assertIsNone(profiler.peak_mb)
+
+        for flag in ("--cprofile", "--profile-memory"):
+            argv = ["build", "--input", str(self.input_path), "--output", str(Path(self.tmp.name) / "out.xlsx"), flag]
+            with mock.patch.object(sys, "argv", argv), self.assertRaisesRegex(SystemExit, f"{flag} needs --profile"):
+                builder.main()
+        self.assertFalse((Path(self.tmp.name) / "out.xlsx").exists())
+
+    def test_hooks_see_a_failed_build(self) -> None:
+        events = []
+
+        class Recorder(BuildHooks):
+            def stage_finished(self, name, sheet=None):
+                events.append(name)
+
+            def build_finished(self, output_path):
+                events.append(output_path)
+
+        input_path = Path(self.tmp.name) / "missing-columns.xlsx"
+        wb = Workbook()
+        wb.active.append(["Full name"])
+        wb.save(input_path)
+        with self.assertRaises(ValueError):
+            build_dashboard(input_path, Path(self.tmp.name) / "out.xlsx", hooks=Recorder())
+        self.assertEqual(events, ["load_source", None])
+
+
+def source_rows(*overrides: dict) -> list:
+    rows = []
+    for index, override in enumerate(overrides):
+        values = consultant_row(index)
+        values.update(override)
+        rows.append([values.get(header) for header in REQUIRED_HEADERS])
+    return rows
+
+
+def source_data(*overrides: dict):
+    return source_table(REQUIRED_HEADERS, source_rows(*overrides))
+
+
+class SegmentCapacityTests(unittest.TestCase):
+    def test_candidate_block_tracks_largest_dimension(self) -> None:
+        self.assertEqual(segment_candidate_end_row([3, 1500, 0]), 1501)
+        self.assertEqual(segment_candidate_end_row([0, 0]), 2)
+
+    def test_static_values_cover_more_than_a_thousand_segments(self) -> None:
+        table = source_data(*({"Department": f"Department {index:04d}"} for index in range(1200)))
+        values = compute_model_values(table, date(2025, 6, 15))
+        self.assertEqual(values[1201]["J"], "Department 1199")
+        self.assertEqual(values[1201]["K"], 1)
+
+
+class SegmentOrderTests(unittest.TestCase):
+    def test_runs_follow_the_candidates_and_fold_case(self) -> None:
+        orders, spans = segment_order(
+            source_data(
+                {"Department": "Sales", "Team": "B"},
+                {"Department": "Ops", "Team": ""},
+                {"Department": "sales", "Team": "A"},
+                {"Department": "", "Team": "A"},
+            )
+        )
+        # Sales and sales are separate candidates but equal in Excel, so both count the same run.
+        self.assertEqual(orders["Department"], [3, 2, 4, 5])
+        self.assertEqual(spans["Department"], [(0, 1), (1, 3), (1, 3)])
+        self.assertEqual(orders["Team"], [4, 5, 2, 3])
+        self.assertEqual(spans["Team"], [(0, 2), (2, 3)])
+        self.assertEqual(spans["Legal entity"], [(0, 4)])
+
+
+class ComputeModelValuesTests(unittest.TestCase):
+    def compute(self, *overrides: dict) -> dict:
+        return compute_model_values(source_data(*overrides), date(2025, 6, 15))
+
+    def test_consultant_columns_follow_formula_semantics(self) -> None:
+        values = self.compute(
+            {"Entry date": datetime(2026, 1, 1), "Weighted months since entry": 10, "Months since entry baseline": 40},
+            {"Ongoing engagements": 2, "Oldest ongoing engagement start date": datetime(2023, 6, 16), "Engagements with invalid dates": 0},
+            {"Ongoing engagements": 0, "Weighted months since entry": 4, "Is available": "no", "Available days per week": 2},
+        )
+        excluded, stale, blank_age = values[2], values[3], values[4]
+
+        self.assertEqual((excluded["A"], excluded["B"], excluded["R"], excluded["U"]), (0, 0.25, -1e99, ""))
+        self.assertEqual(stale["D"], 23)
+        self.assertEqual(stale["A"], 1)
+        # An empty Ongoing_age_months is text, and Excel ranks text above every number.
+        self.assertEqual(blank_age["D"], "")
+        self.assertEqual((blank_age["F"], blank_age["H"], blank_age["E"]), (1, 1, 1))
+        self.assertAlmostEqual(blank_age["I"], 40 + 20)
+        self.assertAlmostEqual(blank_age["R"], blank_age["I"] + 4 / 100000000)
+
+    def test_segment_candidates_and_top_list(self) -> None:
+        values = self.compute(
+            {"Department": "Sales", "Weighted months since entry": 1},
+            {"Department": "sales", "Weighted months since entry": 40},
+            {"Department": "Ops", "Weighted months since entry": 40},
+        )
+        self.assertEqual([values[r]["J"] for r in (2, 3, 4)], ["Ops", "Sales", "sales"])
+        self.assertEqual([values[r]["K"] for r in (2, 3, 4)], [1, 2, 2])
+        self.assertNotIn("J", values[5])
+        self.assertEqual([values[r]["O"] for r in (2, 3, 4, 5)], ["sales", "Sales", "Ops", ""])
+        self.assertEqual(values[2]["P"], 0.5)
+
+    def test_segment_without_included_consultants_is_skipped_in_top_list(self) -> None:
+        values = self.compute({"Department": "Future", "Entry date": datetime(2030, 1, 1)}, {"Department": "Sales"})
+        self.assertEqual((values[2]["K"], values[2]["N"]), (0, ""))
+        self.assertEqual([values[2]["O"], values[3]["O"]], ["Sales", ""])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import csv
+import io
+import sys
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.build_data_quality_excel_dashboard import REQUIRED_HEADERS, compute_model_values, source_table
+from scripts.data_quality_metrics import DataQualityMetrics, MetricFilters, render_csv
+
+TODAY = date(2025, 6, 15)
+
+
+def source_rows(count: int) -> list:
+    rows = []
+    for index in range(count):
+        values = {
+            "Full name": f"Consultant {index}",
+            "Entry date": datetime(2020 + index % 7, 1 + index % 12, 1),
+            "Engagements with invalid dates": 1 if index % 5 == 0 else 0,
+            "Ongoing engagements": index % 3,
+            "Oldest ongoing engagement start date": datetime(2021 + index % 4, 3, 10) if index % 4 else None,
+            "Months since entry baseline": 40,
+            "Weighted months since entry": (index * 7) % 45,
+            "Absolute months since entry": (index * 11) % 50,
+            "Months before entry baseline": 60 if index % 6 else None,
+            "Weighted months before entry": (index * 5) % 60,
+            "Absolute months before entry": (index * 3) % 60,
+            "Is work experience since after entry date": index % 9 == 0,
+            "Is available": ("Yes", "No", "-")[index % 3],
+            "Available days per week": index % 4,
+            "Department": ("Sales", "Delivery", "IT", None)[index % 4],
+            "Team": f"Team {index % 5}",
+            "Location": ("Berlin", "Stuttgart")[index % 2],
+        }
+        rows.append([values.get(header) for header in REQUIRED_HEADERS])
+    return rows
+
+
+class DataQualityMetricsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rows = source_rows(60)
+        self.table = source_table(REQUIRED_HEADERS, self.rows)
+        self.metrics = DataQualityMetrics(self.table, TODAY)
+
+    def test_default_filters_match_static_model_evaluation(self) -> None:
+        model = compute_model_values(self.table, TODAY)
+        consultants = range(2, len(self.rows) + 2)
+        result = self.metrics.compute()
+
+        self.assertEqual(result["consultants"], sum(model[r]["A"] for r in consultants))
+        self.assertEqual(result["anomaly_consultants"], sum(model[r]["F"] for r in consultants if model[r]["A"] == 1))
+        top = [(model[r]["O"], model[r]["P"], model[r]["Q"]) for r in range(2, 12) if model[r]["O"] != ""]
+        self.assertEqual([(s["segment"], s["low_coverage_rate"], s["consultants"]) for s in result["top_segments"]], top)
+
+        ranked = sorted((model[r]["R"], r) for r in consultants if model[r]["A"] == 1)[::-1]
+        names = [self.rows[r - 2][REQUIRED_HEADERS.index("Full name")] for _, r in ranked]
+        self.assertEqual([c["full_name"] for c in result["ranked_consultants"]], names)
+
+    def test_filters_narrow_every_figure(self) -> None:
+        result = self.metrics.compute(MetricFilters(metric_type="Absolute", location="berlin", segment_dimension="Team"))
+        self.assertEqual(result["consultants"], sum(1 for c in result["ranked_consultants"]))
+        self.assertTrue(all(c["full_name"].endswith(("0", "2", "4", "6", "8")) for c in result["ranked_consultants"]))
+        self.assertEqual(sum(result["since_entry_bands"].values()), result["consultants"])
+        self.assertTrue(all(segment["segment"].startswith("Team") for segment in result["top_segments"]))
+        self.assertEqual(self.metrics.compute(MetricFilters(department="Nowhere"))["consultants"], 0)
+
+    def test_unknown_metric_type_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            MetricFilters(metric_type="Median")
+
+    def test_group_by_yields_one_csv_row_per_value(self) -> None:
+        filter_states = list(self.metrics.iter_group_filters(MetricFilters(), ["Department"]))
+        self.assertEqual([filters.department for filters in filter_states], ["Delivery", "IT", "Sales"])
+        rows = list(csv.DictReader(io.StringIO(render_csv([self.metrics.compute(filters) for filters in filter_states]))))
+        self.assertEqual([row["department"] for row in rows], ["Delivery", "IT", "Sales"])
+        self.assertIn("top_10_segment", rows[0])
+        self.assertEqual(rows[2]["top_1_segment"], "Sales")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from openpyxl import load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.build_data_quality_excel_dashboard import REQUIRED_HEADERS, build_dashboard, source_table
+from scripts.data_quality_metrics import DataQualityMetrics, MetricFilters
+from scripts.data_quality_snapshots import SnapshotRecorder, SnapshotStore, segment_medians
+from scripts.generate_data_quality_export import generate_rows, write_export
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = SnapshotStore(Path(self.tmp.name) / "snapshots")
+        self.rows = generate_rows(400, date(2026, 1, 15), seed=3)
+
+    def test_trends_match_the_dashboard_figures_of_each_snapshot(self) -> None:
+        early = source_table(REQUIRED_HEADERS, self.rows[:300])
+        late = source_table(REQUIRED_HEADERS, self.rows)
+        self.store.add_table("BIT", early, date(2026, 1, 15))
+        self.store.add_table("BIT", late, date(2026, 2, 15))
+
+        trends = self.store.trends("BIT", "Department", "Absolute")
+        self.assertEqual(trends.dates, [date(2026, 1, 15), date(2026, 2, 15)])
+        for column, (table, as_of) in enumerate([(early, date(2026, 1, 15)), (late, date(2026, 2, 15))]):
+            metrics = DataQualityMetrics(table, as_of)
+            expected = metrics.compute(MetricFilters(metric_type="Absolute"))
+            self.assertEqual(trends.measure("consultants")[column], expected["consultants"])
+            self.assertEqual(trends.measure("anomalies")[column], expected["anomaly_consultants"])
+            self.assertAlmostEqual(trends.measure("median_coverage")[column], expected["medians"]["absolute_since_entry"], places=5)
+            for segment in trends.segments[:5]:
+                expected = metrics.compute(MetricFilters(metric_type="Absolute", department=segment))
+                self.assertEqual(trends.measure("consultants", segment)[column], expected["consultants"])
+                self.assertEqual(trends.measure("anomalies", segment)[column], expected["anomaly_consultants"])
+
+        result = trends.to_dict()
+        self.assertEqual(result["dates"], ["2026-01-15", "2026-02-15"])
+        self.assertEqual(set(result["segments"]), set(trends.segments))
+        self.assertIsInstance(result["overall"]["consultants"][0], int)
+
+    def test_segment_missing_from_a_snapshot_has_no_consultants(self) -> None:
+        rows = [list(row) for row in self.rows[:50]]
+        team = REQUIRED_HEADERS.index("Team")
+        self.store.add_table("BIT", source_table(REQUIRED_HEADERS, rows), date(2026, 1, 1))
+        rows[0][team] = "New team"
+        self.store.add_table("BIT", source_table(REQUIRED_HEADERS, rows), date(2026, 2, 1))
+
+        trends = self.store.trends("BIT", "Team").to_dict()
+        self.assertEqual(trends["segments"]["New team"]["consultants"], [0, 1])
+        self.assertEqual(trends["segments"]["New team"]["median_coverage"][0], None)
+        self.assertEqual(self.store.trends("BIT", "Team", start=date(2026, 1, 15)).dates, [date(2026, 2, 1)])
+        self.assertEqual(self.store.dates("unknown"), [])
+
+        path = self.store.path("BIT", date(2026, 2, 1))
+        with np.load(path) as snapshot:
+            arrays = dict(snapshot, format=np.array([0]))
+        np.savez_compressed(path, **arrays)
+        with self.assertRaises(ValueError):
+            self.store.trends("BIT", "Team")
+
+    def test_segment_medians(self) -> None:
+        codes = np.array([0, 2, 0, 0, 2, 1, 1])
+        values = np.array([0.9, 0.1, 0.2, 0.5, 0.3, 0.4, 0.8])
+        medians = segment_medians(codes, values, 4)
+        np.testing.assert_allclose(medians[:3], [0.5, 0.6, 0.2])
+        self.assertTrue(np.isnan(medians[3]))
+
+    def test_build_records_snapshot_and_writes_trends_sheet(self) -> None:
+        input_path = write_export(Path(self.tmp.name) / "BIT-raw.xlsx", self.rows[:60])
+        output_path = Path(self.tmp.name) / "dashboard.xlsx"
+        for as_of in (date(2026, 1, 15), date(2026, 2, 15)):
+            recorder = SnapshotRecorder(self.store, "BIT", trends_sheet=True)
+            build_dashboard(input_path, output_path, today=as_of, writer="stream", hooks=recorder)
+        self.assertEqual(recorder.snapshot_path, self.store.path("BIT", date(2026, 2, 15)))
+
+        wb = load_workbook(output_path)
+        self.assertEqual(wb.active.title, "Dashboard")
+        ws = wb["Trends"]
+        self.assertEqual([cell.value for cell in ws[1]], ["Department", "Weighted measure", "2026-01-15", "2026-02-15"])
+        self.assertEqual([ws["A2"].value, ws["B2"].value, ws["C2"].value], ["All", "Consultants", 60])
+        self.assertEqual(ws.max_row, 1 + 5 * (1 + len(self.store.trends("BIT").segments)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.domain_resolution import PublicSuffixTrie, apex_domain, normalize_email_domain, normalize_host
+
+
+class DomainResolutionTests(unittest.TestCase):
+    def test_apex_domain_uses_bundled_public_suffixes(self) -> None:
+        self.assertEqual(apex_domain("mail.adesso.de"), "adesso.de")
+        self.assertEqual(apex_domain("foo.co.uk"), "foo.co.uk")
+        self.assertEqual(apex_domain("mail.foo.com.au"), "foo.com.au")
+        self.assertEqual(apex_domain("www.bmf.gv.at"), "bmf.gv.at")
+        self.assertEqual(apex_domain("com.au"), "com.au")
+
+    def test_wildcard_and_exception_rules(self) -> None:
+        trie = PublicSuffixTrie()
+        for rule in ("jp", "*.kawasaki.jp", "!city.kawasaki.jp"):
+            trie.add_rule(rule)
+        self.assertEqual(trie.suffix_label_count(["a", "b", "kawasaki", "jp"]), 3)
+        self.assertEqual(trie.suffix_label_count(["www", "city", "kawasaki", "jp"]), 2)
+        self.assertEqual(trie.suffix_label_count(["example", "unknown-tld"]), 1)
+
+    def test_email_and_host_normalization(self) -> None:
+        self.assertEqual(normalize_email_domain("Jane.Doe@Sub.Example.COM.au"), "example.com.au")
+        self.assertIsNone(normalize_email_domain("not-an-email"))
+        self.assertEqual(normalize_host("https://www.Example.com:8443/path"), "www.example.com")
+        self.assertIsNone(normalize_host("  "))
+
+
+if __name__ == "__main__":
+    unittest.main()
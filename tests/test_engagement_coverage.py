@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scripts.engagement_coverage as coverage_module
+from scripts.build_data_quality_excel_dashboard import load_source
+from scripts.engagement_coverage import (
+    COVERAGE_HEADERS,
+    Consultants,
+    CoverageEngine,
+    Engagements,
+    patch_table,
+)
+from scripts.generate_data_quality_export import generate_export
+
+TODAY = date(2026, 1, 15)
+
+
+def random_tenant(seed: int, consultants: int = 60):
+    rng = random.Random(seed)
+    consultant_rows, engagement_rows = [], []
+    for number in range(consultants):
+        entry = TODAY - timedelta(days=rng.randint(-60, 4000)) if rng.random() > 0.05 else None
+        since = entry - timedelta(days=rng.randint(-100, 3000)) if entry and rng.random() > 0.1 else None
+        exit_date = TODAY - timedelta(days=rng.randint(0, 300)) if rng.random() < 0.1 else (date(1900, 1, 1) if rng.random() < 0.5 else None)
+        consultant_rows.append({"ConsultantId": f"c{number}", "EntryDate": entry, "ExitDate": exit_date, "WorkExperienceSince": since})
+        for _ in range(rng.randint(0, 6)):
+            start = TODAY - timedelta(days=rng.randint(1, 6000))
+            ongoing = rng.random() < 0.3
+            end = None if ongoing else (date(1900, 1, 1) if rng.random() < 0.05 else start + timedelta(days=rng.randint(-10, 900)))
+            engagement_rows.append({
+                "Id": f"e{len(engagement_rows)}",
+                "ConsultantId": f"c{number}",
+                "StartDate": start if rng.random() > 0.03 else None,
+                "EndDate": end,
+                "IsOngoing": ongoing,
+                "IsDateInvalid": rng.random() < 0.05,
+                "Capacity": rng.choice([20, 50, 80, 100]),
+                "AbsoluteMonth": rng.randint(1, 30),
+                "WeightedMonth": rng.uniform(0, 30),
+            })
+    return consultant_rows, engagement_rows
+
+
+def reference_months(consultant, engagements, period):
+    """The export's prorated sum for one consultant, rule by rule as in the SQL."""
+    entry, since, exit_date = consultant["EntryDate"], consultant["WorkExperienceSince"], consultant["ExitDate"]
+    baseline_end = min(exit_date if exit_date and exit_date != date(1900, 1, 1) else TODAY, TODAY)
+    if period == "since":
+        low, high, applies = entry, baseline_end, entry is not None and baseline_end > entry
+    else:
+        low, high, applies = since, entry, entry is not None and since is not None and entry > since
+    absolute = weighted = 0.0
+    for engagement in engagements:
+        end = engagement["EndDate"] if engagement["EndDate"] and engagement["EndDate"] > date(1900, 1, 1) else None
+        total_end = end or (TODAY if engagement["IsOngoing"] else None)
+        start = engagement["StartDate"]
+        if not applies or engagement["IsDateInvalid"] or start is None or total_end is None or total_end <= start:
+            continue
+        effective_end = min(end, TODAY) if end else TODAY
+        share = max((min(effective_end, high) - max(start, low)).days, 0) / (total_end - start).days
+        absolute += engagement["AbsoluteMonth"] * share
+        weighted += engagement["WeightedMonth"] * share
+    return absolute, weighted
+
+
+class CoverageTests(unittest.TestCase):
+    def test_prorated_months_match_the_export_rules(self) -> None:
+        consultant_rows, engagement_rows = random_tenant(3)
+        engine = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(engagement_rows), TODAY)
+        columns = engine.coverage.columns()
+
+        for position, consultant in enumerate(consultant_rows):
+            engagements = [row for row in engagement_rows if row["ConsultantId"] == consultant["ConsultantId"]]
+            for period in ("since", "before"):
+                absolute, weighted = reference_months(consultant, engagements, period)
+                baseline = engine.coverage.baseline[period][position]
+                if period == "before" or baseline == baseline:
+                    self.assertAlmostEqual(engine.coverage.absolute[period][position], absolute, places=9)
+                    self.assertAlmostEqual(engine.coverage.weighted[period][position], weighted, places=9)
+            if consultant["EntryDate"] is None or consultant["EntryDate"] > TODAY:
+                self.assertIsNone(columns["Months since entry baseline"][position])
+                self.assertIsNone(columns["Absolute months since entry"][position])
+            baseline = columns["Months since entry baseline"][position]
+            if baseline:
+                self.assertLessEqual(columns["Weighted months since entry"][position], baseline)
+                self.assertAlmostEqual(
+                    columns["Weighted coverage ratio since entry"][position],
+                    round(min(max(engine.coverage.weighted["since"][position], 0), engine.coverage.baseline["since"][position]) / engine.coverage.baseline["since"][position], 2),
+                )
+
+    def test_union_counts_overlapping_days_once_and_caps_capacity(self) -> None:
+        consultants = Consultants.from_rows([{"ConsultantId": "a", "EntryDate": date(2025, 1, 1)}])
+        engagements = Engagements.from_rows([
+            {"Id": "1", "ConsultantId": "a", "StartDate": date(2025, 1, 1), "EndDate": date(2025, 7, 1), "Capacity": 80},
+            {"Id": "2", "ConsultantId": "a", "StartDate": date(2025, 4, 1), "EndDate": date(2025, 10, 1), "Capacity": 50},
+            # Outside the window: ends before entry.
+            {"Id": "3", "ConsultantId": "a", "StartDate": date(2024, 1, 1), "EndDate": date(2024, 6, 1), "Capacity": 100},
+        ])
+
+        union = CoverageEngine(consultants, engagements, TODAY, method="union").coverage
+        prorated = CoverageEngine(consultants, engagements, TODAY, derive_months=True).coverage
+
+        days = (date(2025, 10, 1) - date(2025, 1, 1)).days
+        self.assertAlmostEqual(union.absolute["since"][0] * 30.4375, days)
+        jan_apr, apr_jul, jul_oct = 90, 91, 92
+        self.assertAlmostEqual(union.weighted["since"][0] * 30.4375, jan_apr * 0.8 + apr_jul * 1.0 + jul_oct * 0.5)
+        self.assertAlmostEqual(prorated.absolute["since"][0] * 30.4375, (181 + 183))
+
+    def test_incremental_updates_match_a_full_recompute(self) -> None:
+        consultant_rows, engagement_rows = random_tenant(5)
+        engine = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(engagement_rows), TODAY, method="union")
+
+        changed = dict(engagement_rows[4], StartDate=TODAY - timedelta(days=50), ConsultantId="c7")
+        added = {"Id": "new", "ConsultantId": "c2", "StartDate": TODAY - timedelta(days=400), "IsOngoing": True, "Capacity": 60}
+        engine.upsert_engagements(Engagements.from_rows([changed, added]))
+        engine.remove_engagements([engagement_rows[10]["Id"]])
+        engine.update_consultants(Consultants.from_rows([dict(consultant_rows[9], EntryDate=TODAY - timedelta(days=900)), {"ConsultantId": "late", "EntryDate": TODAY - timedelta(days=30)}]))
+        engine.advance(TODAY + timedelta(days=40))
+        recomputed = engine.refresh()
+
+        expected_rows = [changed if row["Id"] == changed["Id"] else row for row in engagement_rows if row["Id"] != engagement_rows[10]["Id"]] + [added]
+        expected_consultants = [dict(row, EntryDate=TODAY - timedelta(days=900)) if row["ConsultantId"] == "c9" else row for row in consultant_rows]
+        expected_consultants.append({"ConsultantId": "late", "EntryDate": TODAY - timedelta(days=30)})
+        full = CoverageEngine(Consultants.from_rows(expected_consultants), Engagements.from_rows(expected_rows), TODAY + timedelta(days=40), method="union")
+        self.assertEqual(engine.coverage.columns(), full.coverage.columns())
+        self.assertLess(recomputed.size, len(expected_consultants))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            loaded = CoverageEngine.load(engine.save(Path(tmp) / "state.npz"))
+        self.assertEqual(loaded.method, "union")
+        self.assertEqual(loaded.coverage.columns(), full.coverage.columns())
+
+    def test_loaded_state_recomputes_only_the_changed_consultants(self) -> None:
+        consultant_rows, engagement_rows = random_tenant(11)
+        engine = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(engagement_rows), TODAY)
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = engine.save(Path(tmp) / "state.npz")
+            with mock.patch.object(coverage_module, "compute_coverage", wraps=coverage_module.compute_coverage) as compute:
+                loaded = CoverageEngine.load(state_path)
+                compute.assert_not_called()
+                self.assertEqual(loaded.coverage.columns(), engine.coverage.columns())
+
+                moved = dict(engagement_rows[0], ConsultantId="c3", StartDate=TODAY - timedelta(days=200))
+                loaded.upsert_engagements(Engagements.from_rows([moved]))
+                recomputed = loaded.refresh()
+                self.assertEqual(sorted(loaded.consultants.ids[p] for p in recomputed), sorted({engagement_rows[0]["ConsultantId"], "c3"}))
+                self.assertEqual(len(compute.call_args.args[0]), recomputed.size)
+
+        expected_rows = [moved] + engagement_rows[1:]
+        full = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(expected_rows), TODAY)
+        self.assertEqual(loaded.coverage.columns(), full.coverage.columns())
+
+    def test_missing_stored_months_count_as_zero_unless_derived(self) -> None:
+        consultants = Consultants.from_rows([{"ConsultantId": "a", "EntryDate": date(2025, 1, 15)}])
+        engagements = Engagements.from_rows([
+            {"Id": "1", "ConsultantId": "a", "StartDate": date(2025, 1, 15), "EndDate": date(2025, 7, 15), "Capacity": 50},
+            {"Id": "2", "ConsultantId": "a", "StartDate": date(2025, 8, 1), "EndDate": date(2025, 9, 1), "AbsoluteMonth": 1, "WeightedMonth": ""},
+        ])
+
+        stored = CoverageEngine(consultants, engagements, TODAY).coverage
+        derived = CoverageEngine(consultants, engagements, TODAY, derive_months=True).coverage
+
+        self.assertEqual((stored.absolute["since"][0], stored.weighted["since"][0]), (1.0, 0.0))
+        self.assertAlmostEqual(derived.absolute["since"][0] * 30.4375, 181 + 30.4375)
+        self.assertAlmostEqual(derived.weighted["since"][0] * 30.4375, 181 * 0.5 + 30.4375)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = CoverageEngine(consultants, engagements, TODAY, derive_months=True)
+            self.assertTrue(CoverageEngine.load(engine.save(Path(tmp) / "state.npz")).derive_months)
+
+    def test_engagements_outside_the_scope_are_ignored(self) -> None:
+        consultant_rows, engagement_rows = random_tenant(7, consultants=20)
+        external = {"Id": "ext-1", "ConsultantId": "external", "StartDate": TODAY - timedelta(days=300), "IsOngoing": True, "AbsoluteMonth": 9, "WeightedMonth": 9}
+        in_scope = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(engagement_rows), TODAY)
+
+        engine = CoverageEngine(Consultants.from_rows(consultant_rows), Engagements.from_rows(engagement_rows + [external]), TODAY)
+        self.assertEqual(engine.coverage.columns(), in_scope.coverage.columns())
+        engine.upsert_engagements(Engagements.from_rows([dict(external, Id="ext-2")]))
+        engine.refresh()
+        self.assertEqual(engine.coverage.columns(), in_scope.coverage.columns())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            loaded = CoverageEngine.load(engine.save(Path(tmp) / "state.npz"))
+        self.assertEqual(len(loaded.engagements), len(engagement_rows) + 2)
+        self.assertEqual(loaded.coverage.columns(), in_scope.coverage.columns())
+        # The engagements count once their consultant enters the scope.
+        loaded.update_consultants(Consultants.from_rows([{"ConsultantId": "external", "EntryDate": TODAY - timedelta(days=400)}]))
+        loaded.refresh()
+        self.assertGreater(loaded.coverage.absolute["since"][loaded.index["external"]], 0)
+
+    def test_patched_export_takes_the_computed_columns(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            table = load_source(generate_export(Path(tmp) / "synthetic-raw.xlsx", 20, TODAY))
+        urls = table.column("Url")
+        consultant_id = urls[3].rsplit("=", 1)[1]
+        consultants = Consultants.from_rows([{"ConsultantId": consultant_id, "EntryDate": date(2025, 1, 15)}])
+        engagements = Engagements.from_rows([{"Id": "1", "ConsultantId": consultant_id, "StartDate": date(2025, 1, 15), "IsOngoing": 1, "Capacity": 50}])
+
+        patched = patch_table(table, CoverageEngine(consultants, engagements, TODAY, derive_months=True))
+
+        row = dict(zip(patched.headers, list(patched.rows())[3]))
+        # 365 days of 30.4375.
+        self.assertEqual(row["Months since entry baseline"], 11.99)
+        self.assertEqual(row["Absolute months since entry"], 11.99)
+        self.assertEqual(row["Absolute missing months since entry"], 0.0)
+        self.assertEqual(row["Weighted months since entry"], 6.0)
+        self.assertEqual(row["Weighted coverage ratio since entry"], 0.5)
+        self.assertIsNone(row["Months before entry baseline"])
+        self.assertEqual(list(patched.rows())[4], list(table.rows())[4])
+        for header in COVERAGE_HEADERS:
+            self.assertIn(header, patched.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
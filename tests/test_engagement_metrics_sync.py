@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.engagement_metrics_sync import (
+    EngagementMetricsSync,
+    EngagementStore,
+    Schedule,
+    calculated_metrics,
+    engagement_metrics,
+    pg_age,
+)
+
+TODAY = date(2026, 1, 15)
+SCHEMA = """
+CREATE TABLE "ConsultancySettingsEXT" ("Id" INTEGER PRIMARY KEY, "TenantId" INTEGER, "ProjectDaysPerMonth" REAL);
+CREATE TABLE "Engagement" (
+  "Id" INTEGER PRIMARY KEY, "TenantId" INTEGER, "StartDate" TEXT, "EndDate" TEXT, "Capacity" REAL,
+  "AbsoluteMonth" INTEGER, "ProjectDays" INTEGER, "IsOngoing" INTEGER, "IsDateInvalid" INTEGER
+);
+"""
+
+
+def create_database(path: Path, engagements: int = 400, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    # Tenant 1 has two settings rows (the lowest Id wins), tenant 2 only a NULL one, tenant 3 none.
+    connection.executemany(
+        'INSERT INTO "ConsultancySettingsEXT" VALUES (?, ?, ?)',
+        [(5, 1, 20), (9, 1, 18), (6, 2, None), (7, 4, 21.5)],
+    )
+    rows = []
+    for engagement_id in range(1, engagements + 1):
+        start = TODAY - timedelta(days=rng.randint(-20, 2000))
+        end = None
+        if rng.random() < 0.4:
+            end = start + timedelta(days=rng.randint(1, 2100))
+        elif rng.random() < 0.1:
+            end = date(1900, 1, 1)
+        rows.append((
+            engagement_id,
+            rng.choice([1, 1, 1, 2, 3, 4]),
+            start.isoformat(),
+            end.isoformat() if end else None,
+            rng.choice([10, 50, 80, 100, 100, 3]),
+            rng.choice([None, rng.randint(1, 40)]),
+            None,
+            1 if rng.random() < 0.9 else 0,
+            1 if rng.random() < 0.05 else 0,
+        ))
+    connection.executemany('INSERT INTO "Engagement" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    connection.commit()
+    connection.close()
+
+
+def out_of_sync(path: Path, today: date) -> list:
+    """Ids the SQL would update on ``today``, evaluated row by row with the reference rule."""
+    connection = sqlite3.connect(path)
+    settings = EngagementStore(connection).project_days_per_month()
+    rows = connection.execute(
+        'SELECT "Id", "TenantId", "StartDate", "EndDate", "Capacity", "AbsoluteMonth", "ProjectDays", "IsOngoing" '
+        'FROM "Engagement" WHERE "IsDateInvalid" = 0 AND "IsOngoing" = 1 AND "StartDate" IS NOT NULL AND "Capacity" IS NOT NULL'
+    ).fetchall()
+    connection.close()
+    stale = []
+    for engagement_id, tenant_id, start, end, capacity, absolute, project, ongoing in rows:
+        if tenant_id not in settings:
+            continue
+        end_date = date.fromisoformat(end) if end else None
+        calculated = engagement_metrics(date.fromisoformat(start), end_date, capacity, settings[tenant_id], today)
+        if calculated is not None and calculated != (absolute, project, ongoing):
+            stale.append(engagement_id)
+    return stale
+
+
+class MetricRuleTests(unittest.TestCase):
+    def test_age_borrows_the_start_month_like_postgres(self) -> None:
+        self.assertEqual(pg_age(date(2024, 3, 1), date(2024, 1, 31)), (1, 1))
+        self.assertEqual(pg_age(date(2023, 3, 31), date(2023, 2, 28)), (1, 3))
+        self.assertEqual(pg_age(date(2024, 2, 29), date(2023, 1, 31)), (12, 29))
+        self.assertEqual(pg_age(date(2026, 1, 15), date(2025, 12, 31)), (0, 15))
+
+    def test_vectorized_rule_matches_the_reference(self) -> None:
+        rng = random.Random(4)
+        start = [TODAY - timedelta(days=rng.randint(-30, 5000)) for _ in range(3000)]
+        end = [s + timedelta(days=rng.randint(1, 3000)) if rng.random() < 0.5 else None for s in start]
+        capacity = np.array([rng.choice([5, 10, 25, 50, 80, 100]) for _ in start], dtype=float)
+        per_month = np.array([rng.choice([18, 20, 21.5]) for _ in start], dtype=float)
+
+        eligible, absolute, project, ongoing = calculated_metrics(
+            np.array([s.toordinal() for s in start]),
+            np.array([e.toordinal() if e else 0 for e in end]),
+            capacity,
+            per_month,
+            TODAY.toordinal(),
+        )
+
+        for position in range(len(start)):
+            expected = engagement_metrics(start[position], end[position], capacity[position], per_month[position], TODAY)
+            self.assertEqual(eligible[position], expected is not None)
+            if expected is not None:
+                self.assertEqual((absolute[position], project[position], ongoing[position]), expected)
+
+
+class SyncTests(unittest.TestCase):
+    def test_daily_runs_keep_every_engagement_in_sync(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "engagements.db"
+            create_database(path)
+            sync = EngagementMetricsSync(lambda: sqlite3.connect(path, timeout=30), workers=3, chunk_size=50)
+            self.assertTrue(out_of_sync(path, TODAY))
+
+            full = sync.run(TODAY, full=True)
+            self.assertEqual(out_of_sync(path, TODAY), [])
+            self.assertGreater(full.chunks, 1)
+
+            checked = 0
+            for offset in range(1, 75):
+                day = TODAY + timedelta(days=offset)
+                checked += sync.run(day).checked
+                self.assertEqual(out_of_sync(path, day), [], day)
+            # A daily full rescan would have looked at every candidate each day.
+            self.assertLess(checked, full.checked * 74 / 3)
+
+            with sqlite3.connect(path) as connection:
+                settings = EngagementStore(connection).project_days_per_month()
+                untouched = connection.execute('SELECT COUNT(*) FROM "Engagement" WHERE "TenantId" IN (2, 3) AND "ProjectDays" IS NOT NULL').fetchone()[0]
+            self.assertEqual(settings, {1: 20.0, 4: 21.5})
+            self.assertEqual(untouched, 0)
+
+    def test_edited_engagements_are_recalculated_and_rescheduled(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "engagements.db"
+            create_database(path, engagements=60)
+            sync = EngagementMetricsSync(lambda: sqlite3.connect(path), workers=2, chunk_size=25)
+            sync.run(TODAY, full=True)
+            schedule_path = sync.schedule.save(Path(tmp) / "sync.npz", TODAY)
+            engagement_id = min(sync.schedule.due)
+
+            with sqlite3.connect(path) as connection:
+                connection.execute('UPDATE "Engagement" SET "Capacity" = 1, "TenantId" = 1 WHERE "Id" = ?', (engagement_id,))
+            self.assertEqual(out_of_sync(path, TODAY), [engagement_id])
+
+            schedule, synced = Schedule.load(schedule_path)
+            self.assertEqual(synced, TODAY)
+            reloaded = EngagementMetricsSync(lambda: sqlite3.connect(path), schedule)
+            report = reloaded.run(TODAY, changed=[engagement_id])
+            self.assertEqual((report.checked, report.updated), (1, 1))
+            self.assertEqual(out_of_sync(path, TODAY), [])
+            self.assertGreater(reloaded.schedule.due[engagement_id], TODAY.toordinal())
+
+    def test_new_engagements_and_setting_changes_are_picked_up(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "engagements.db"
+            create_database(path, engagements=60)
+            sync = EngagementMetricsSync(lambda: sqlite3.connect(path), workers=2, chunk_size=25)
+            sync.run(TODAY, full=True)
+            schedule_path = sync.schedule.save(Path(tmp) / "sync.npz", TODAY)
+
+            with sqlite3.connect(path) as connection:
+                connection.execute(
+                    'INSERT INTO "Engagement" VALUES (1000, 1, ?, NULL, 50, NULL, NULL, 1, 0)', ((TODAY - timedelta(days=90)).isoformat(),)
+                )
+            sync = EngagementMetricsSync(lambda: sqlite3.connect(path), Schedule.load(schedule_path)[0])
+            report = sync.run(TODAY)
+            self.assertEqual((report.checked, report.updated, report.full), (1, 1, False))
+            self.assertEqual(out_of_sync(path, TODAY), [])
+            self.assertEqual(sync.run(TODAY).checked, 0)
+
+            with sqlite3.connect(path) as connection:
+                connection.execute('UPDATE "ConsultancySettingsEXT" SET "ProjectDaysPerMonth" = 15 WHERE "Id" = 5')
+            self.assertTrue(out_of_sync(path, TODAY))
+            report = sync.run(TODAY)
+            self.assertTrue(report.full)
+            self.assertEqual(out_of_sync(path, TODAY), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
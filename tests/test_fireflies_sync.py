@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import gzip
+import json
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import scripts.fireflies_sync as fireflies_sync
+from scripts.fireflies_sync import (
+    SENTENCES_FILENAME,
+    VTT_FILENAME,
+    MeetingAnalyticsStore,
+    NearDuplicateIndex,
+    TranscriptSearchIndex,
+    duplicate_groups,
+    flag_near_duplicates,
+    meeting_contribution,
+    minhash_signature,
+    near_duplicate_clusters,
+    read_transcript_sentences,
+    refresh_search_index,
+    render_transcript_exports,
+    render_transcript_markdown,
+    write_transcript_exports,
+)
+
+WORDS = (
+    "staffing demand consultant profile matching skill role project engagement availability "
+    "location pricing proposal pilot onboarding roadmap tenant export dashboard coverage"
+).split()
+
+
+def sample_transcript() -> dict:
+    return {
+        "id": "01ABCDEF0123456789",
+        "title": "Acme meets matchical",
+        "sentences": [
+            {"index": 0, "speaker_name": "Anna", "speaker_id": 1, "text": "Hello  there.", "start_time": 0.5, "end_time": 2.25},
+            {"index": 1, "speaker_name": "", "speaker_id": None, "raw_text": "A <b> & c", "start_time": 3725.0, "end_time": None},
+            {"index": 2, "speaker_name": "Ben", "text": "   ", "start_time": 4, "end_time": 5},
+        ],
+    }
+
+
+class TranscriptExportTests(unittest.TestCase):
+    def test_markdown_matches_existing_line_format(self) -> None:
+        markdown = render_transcript_markdown(sample_transcript())
+        self.assertEqual(
+            markdown.splitlines(),
+            [
+                "# Acme meets matchical",
+                "",
+                "**Anna** [00:00 - 00:02]: Hello there.",
+                "**Unknown speaker** [01:02:05]: A <b> & c",
+            ],
+        )
+
+    def test_sentences_jsonl_and_vtt_are_rendered_in_one_pass(self) -> None:
+        exports = render_transcript_exports(sample_transcript(), include_vtt=True)
+        records = [json.loads(line) for line in exports.sentences_jsonl.splitlines()]
+        self.assertEqual([record["index"] for record in records], [0, 1])
+        self.assertEqual(records[0]["start_time"], 0.5)
+        self.assertIsNone(records[1]["end_time"])
+        self.assertTrue(exports.vtt.startswith("WEBVTT\n"))
+        self.assertIn("00:00:00.500 --> 00:00:02.250\n<v Anna>Hello there.", exports.vtt)
+        self.assertIn("01:02:05.000 --> 01:02:05.000\n<v Unknown speaker>A &lt;b&gt; &amp; c", exports.vtt)
+
+    def test_vtt_is_omitted_by_default(self) -> None:
+        self.assertIsNone(render_transcript_exports(sample_transcript()).vtt)
+
+    def test_compressed_sentences_replace_plain_file(self) -> None:
+        exports = render_transcript_exports(sample_transcript(), include_vtt=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            meeting_dir = Path(tmp)
+            write_transcript_exports(meeting_dir, exports)
+            self.assertTrue((meeting_dir / SENTENCES_FILENAME).exists())
+            self.assertTrue((meeting_dir / VTT_FILENAME).exists())
+
+            write_transcript_exports(meeting_dir, exports, compress=True)
+            self.assertFalse((meeting_dir / SENTENCES_FILENAME).exists())
+            with gzip.open(meeting_dir / f"{SENTENCES_FILENAME}.gz", "rt", encoding="utf-8") as handle:
+                self.assertEqual(handle.read(), exports.sentences_jsonl)
+            self.assertEqual(len(list(read_transcript_sentences(meeting_dir))), 2)
+
+            write_transcript_exports(meeting_dir, render_transcript_exports(sample_transcript()))
+            self.assertFalse((meeting_dir / VTT_FILENAME).exists())
+
+
+class NearDuplicateTests(unittest.TestCase):
+    @staticmethod
+    def sentences(seed: int, count: int = 400) -> list[str]:
+        return [" ".join(WORDS[(seed * 7 + i * 3 + j) % len(WORDS)] + str((i * j + seed) % 11) for j in range(8)) for i in range(count)]
+
+    def test_lightly_edited_clone_is_flagged(self) -> None:
+        original = self.sentences(1)
+        clone = original[:]
+        clone[10] = "completely different words here"
+        index = NearDuplicateIndex()
+        self.assertEqual(flag_near_duplicates(index, key="a", signature=minhash_signature(original)), [])
+        matches = flag_near_duplicates(index, key="b", signature=minhash_signature(clone))
+        self.assertEqual([match["path"] for match in matches], ["a"])
+        self.assertGreater(matches[0]["similarity"], 0.9)
+
+    def test_unrelated_meetings_are_not_clustered(self) -> None:
+        index = NearDuplicateIndex()
+        index.add("a", minhash_signature(self.sentences(1)))
+        index.add("b", minhash_signature(self.sentences(5)))
+        index.add("c", minhash_signature(self.sentences(1)))
+        self.assertEqual(near_duplicate_clusters(index, threshold=0.8), [["a", "c"]])
+
+    def test_chained_cluster_only_merges_members_similar_to_the_canonical(self) -> None:
+        # a~b and b~c share 108 of 128 slots, a and c only 88, so the cluster is transitive.
+        a = list(range(128))
+        b = a[:108] + [1000 + slot for slot in range(20)]
+        c = [2000 + slot for slot in range(20)] + b[20:]
+        index = NearDuplicateIndex()
+        for key, signature in (("a", a), ("b", b), ("c", c)):
+            index.add(key, signature)
+        [members] = near_duplicate_clusters(index, threshold=0.8)
+        self.assertEqual(members, ["a", "b", "c"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            self.assertEqual(duplicate_groups(root, index, members, threshold=0.8), [("a", ["b"])])
+            (root / "b").mkdir()
+            (root / "b" / "metadata.json").write_text(json.dumps({"sentence_count": 10}), encoding="utf-8")
+            self.assertEqual(duplicate_groups(root, index, members, threshold=0.8), [("b", ["a", "c"])])
+
+    def test_index_round_trips_through_json(self) -> None:
+        index = NearDuplicateIndex()
+        index.add("a", minhash_signature(self.sentences(2)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "index.json"
+            index.save(path)
+            loaded = NearDuplicateIndex.load(path)
+        self.assertEqual(loaded.signatures, index.signatures)
+        self.assertEqual(loaded.query(index.signatures["a"])[0][0], "a")
+
+
+class TranscriptSearchIndexTests(unittest.TestCase):
+    def write_meeting(self, root: Path, relative: str, metadata: dict, lines: list[str]) -> Path:
+        meeting_dir = root / relative
+        meeting_dir.mkdir(parents=True)
+        (meeting_dir / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+        (meeting_dir / "transcript.md").write_text("\n".join(["# Title", "", *lines, ""]), encoding="utf-8")
+        return meeting_dir
+
+    def test_refresh_search_and_filters(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            self.write_meeting(
+                root,
+                "crm/clients/acme/meetings/2025-04-03-intro",
+                {"transcript_id": "a", "title": "Intro", "meeting_at": "2025-04-03T10:00:00Z", "account_slug": "acme", "crm_bucket": "clients"},
+                ["**Anna** [00:05 - 00:09]: Our pricing is per consultant.", "**Ben** [01:10]: Sounds good."],
+            )
+            internal_dir = self.write_meeting(
+                root,
+                "docs/internal-meetings/2025-05-01-daily-abcd1234",
+                {"transcript_id": "b", "title": "Daily", "meeting_at": "2025-05-01T08:00:00Z", "meeting_kind": "internal"},
+                ["**Carl** [00:01 - 00:02]: Pricing review for Acme tomorrow."],
+            )
+            search_index = TranscriptSearchIndex.open(root / "tmp" / "search.sqlite3")
+            try:
+                self.assertEqual(refresh_search_index(search_index, root), (2, 0))
+                self.assertEqual(refresh_search_index(search_index, root), (0, 0))
+
+                hits = search_index.search("pricing")
+                self.assertEqual(len(hits), 2)
+                self.assertEqual(search_index.search("pricing", account_slug="acme")[0]["speaker"], "Anna")
+                self.assertEqual(search_index.search("pricing", account_slug="acme")[0]["start_time"], 5.0)
+                dated = search_index.search("pricing", from_date=date(2025, 4, 4), to_date=date(2025, 5, 1))
+                self.assertEqual([hit["path"] for hit in dated], ["docs/internal-meetings/2025-05-01-daily-abcd1234"])
+                self.assertEqual(search_index.search('"unbalanced AND ('), [])
+
+                for path in internal_dir.iterdir():
+                    path.unlink()
+                internal_dir.rmdir()
+                self.assertEqual(refresh_search_index(search_index, root), (0, 1))
+                self.assertEqual(len(search_index.search("pricing")), 1)
+            finally:
+                search_index.close()
+
+
+    def test_reindexing_deletes_only_the_meetings_sentence_range(self) -> None:
+        def sentences(*texts: str) -> list:
+            return [{"text": text, "speaker": "Anna", "start_time": float(index)} for index, text in enumerate(texts)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "search.sqlite3"
+            search_index = TranscriptSearchIndex.open(path)
+            try:
+                search_index.index_meeting("a", {}, sentences("pricing one", "pricing two"), source_mtime=1.0)
+                search_index.index_meeting("b", {}, sentences("pricing three"), source_mtime=1.0)
+                search_index.index_meeting("c", {}, [], source_mtime=1.0)
+                search_index.index_meeting("a", {}, sentences("roadmap only"), source_mtime=2.0)
+                self.assertEqual([hit["path"] for hit in search_index.search("pricing")], ["b"])
+                self.assertEqual([hit["path"] for hit in search_index.search("roadmap")], ["a"])
+                ranges = dict(search_index.connection.execute("SELECT meeting_key, first_sentence_rowid FROM meetings"))
+                self.assertEqual(ranges, {"b": 3, "c": None, "a": 4})
+                with search_index.connection:
+                    search_index.remove_meeting("c")
+                    search_index.remove_meeting("b")
+                self.assertEqual(search_index.search("pricing"), [])
+                search_index.connection.execute("PRAGMA user_version = 1")
+                search_index.connection.commit()
+            finally:
+                search_index.close()
+
+            search_index = TranscriptSearchIndex.open(path)
+            try:
+                self.assertEqual(search_index.indexed_mtimes(), {})
+            finally:
+                search_index.close()
+
+    def test_import_window_closes_the_index_when_listing_fails(self) -> None:
+        class FailingClient:
+            def list_transcripts(self, **_: object) -> list:
+                raise RuntimeError("API unavailable")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            opened = []
+            real_open = TranscriptSearchIndex.open
+
+            def open_index(path: Path) -> TranscriptSearchIndex:
+                opened.append(mock.Mock(wraps=real_open(path)))
+                return opened[-1]
+
+            with mock.patch.object(fireflies_sync, "repo_root", return_value=root), mock.patch.object(
+                TranscriptSearchIndex, "open", side_effect=open_index
+            ), self.assertRaisesRegex(RuntimeError, "API unavailable"):
+                fireflies_sync.import_window(
+                    FailingClient(),
+                    root=root,
+                    state={},
+                    state_path=root / "state.json",
+                    from_date_iso=None,
+                    to_date_iso=None,
+                    page_limit=10,
+                    update_delta_cursor_at_end=False,
+                )
+            opened[0].close.assert_called_once_with()
+
+
+class MeetingAnalyticsTests(unittest.TestCase):
+    def contribution(self, **metadata: object) -> dict:
+        sentences = [
+            {"speaker": "Anna", "start_time": 0.0, "end_time": 4.5, "text": "a"},
+            {"speaker": "Ben", "start_time": 5.0, "end_time": 7.0, "text": "b"},
+            {"speaker": "Anna", "start_time": 8.0, "end_time": None, "text": "c"},
+        ]
+        return meeting_contribution(metadata, sentences)
+
+    def test_contribution_derives_month_and_talk_time(self) -> None:
+        contribution = self.contribution(account_slug="acme", meeting_at="2025-04-03T10:00:00Z", category="sales", duration_minutes=30)
+        self.assertEqual(contribution["account"], "acme")
+        self.assertEqual(contribution["month"], "2025-04")
+        self.assertEqual(contribution["sentence_count"], 3)
+        self.assertEqual(contribution["speaker_seconds"], {"Anna": 4.5, "Ben": 2.0})
+        self.assertEqual(self.contribution(meeting_kind="internal")["account"], "_internal")
+
+    def test_reimport_replaces_previous_contribution(self) -> None:
+        store = MeetingAnalyticsStore()
+        store.upsert_meeting("m1", self.contribution(account_slug="acme", meeting_at="2025-04-03", category="sales", duration_minutes=30))
+        store.upsert_meeting("m2", self.contribution(account_slug="acme", meeting_at="2025-04-20", category="sales", duration_minutes=15))
+        [row] = store.rows(account="acme")
+        self.assertEqual((row["meetings"], row["duration_minutes"], row["sentence_count"]), (2, 45.0, 6))
+        self.assertEqual(row["speaker_seconds"], {"Anna": 9.0, "Ben": 4.0})
+
+        store.upsert_meeting("m2", self.contribution(account_slug="acme", meeting_at="2025-05-02", category="delivery", duration_minutes=15))
+        self.assertEqual([(row["month"], row["meetings"]) for row in store.rows()], [("2025-04", 1), ("2025-05", 1)])
+        self.assertEqual(store.rows(from_month="2025-05")[0]["category"], "delivery")
+        store.upsert_meeting("m3", self.contribution(account_slug="acme", category="sales"))
+        self.assertEqual([row["month"] for row in store.rows()], ["2025-04", "2025-05", "unknown"])
+        self.assertEqual([row["month"] for row in store.rows(from_month="2025-05")], ["2025-05"])
+        self.assertEqual([row["month"] for row in store.rows(to_month="2025-04")], ["2025-04"])
+        store.remove_meeting("m3")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "analytics.json"
+            store.save(path)
+            loaded = MeetingAnalyticsStore.load(path)
+        loaded.remove_meeting("m1")
+        self.assertEqual([row["month"] for row in loaded.rows()], ["2025-05"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import filecmp
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.generate_matching_dataset import (
+    CATEGORY,
+    FILTER,
+    NULL,
+    STATUS_READY,
+    TABLES,
+    DatasetIds,
+    DatasetSpec,
+    ExperienceChunk,
+    generate_dataset,
+    read_manifest,
+)
+from scripts.odc_sql import load_schema
+
+
+def read_rows(directory: Path, manifest: dict, table: str) -> list:
+    return [
+        line.rstrip("\n").split("\t")
+        for name in manifest["tables"][table]["files"]
+        for line in (directory / name).read_text(encoding="utf-8").splitlines(keepends=True)
+    ]
+
+
+class DatasetTests(unittest.TestCase):
+    def test_dataset_has_the_documented_shape(self) -> None:
+        spec = DatasetSpec(400, experiences=500, demands=30, shard_size=150, seed=3)
+        schema = load_schema()
+        with tempfile.TemporaryDirectory() as temp:
+            directory = Path(temp)
+            manifest = generate_dataset(spec, directory, workers=1)
+            tables = {table: read_rows(directory, manifest, table) for table in manifest["tables"]}
+            self.assertEqual(read_manifest(directory)["tenant_id"], spec.tenant_id)
+            self.assertEqual(len(manifest["tables"]["Experience"]["files"]), 3)
+            self.assertIn('\\copy "Experience" ("Id", "TenantId"', (directory / "load.sql").read_text(encoding="utf-8"))
+
+        self.assertEqual(list(tables)[0], "ConsultancyUser")
+        for table, rows in tables.items():
+            physical = {name for name, _ in schema[table]}
+            self.assertTrue({column.lower() for column in TABLES[table]} <= physical, table)
+            self.assertEqual({len(row) for row in rows}, {len(TABLES[table])}, table)
+            self.assertEqual(len({row[0] for row in rows}), len(rows), table)
+            self.assertEqual(manifest["tables"][table]["rows"], len(rows), table)
+        experience = Counter(row[2] for row in tables["Experience"])
+        self.assertEqual(set(experience.values()), {500})
+        self.assertEqual(len(tables["DemandRequirement"]), 30 * 15)
+        ready = sum(row[2] == str(STATUS_READY) for row in tables["Consultant"])
+        self.assertAlmostEqual(ready / 400, spec.eligible_share, delta=0.07)
+        ids = DatasetIds(spec.tenant_id)
+        holders = {row[2] for row in tables["Experience"] if row[3] == str(CATEGORY["Role"]) and row[4] == ids.key("role", 0)}
+        self.assertAlmostEqual(len(holders) / 400, spec.scored_share, delta=0.07)
+        self.assertIn(ids.consultant_id(0), holders)
+        consultants = {row[0] for row in tables["Consultant"]}
+        self.assertEqual({row[2] for row in tables["Experience"]}, consultants)
+        skills = [row for row in tables["Experience"] if row[3] == str(CATEGORY["Skill"])]
+        self.assertEqual({(row[4], row[6]) for row in skills}, {(NULL, NULL)})
+
+        filtered = [row for row in tables["DemandRequirement"] if row[13] != str(FILTER["Default"])]
+        self.assertEqual({row[2] for row in filtered}, {ids.demand_id(1)})
+        self.assertEqual(len(filtered), 3)
+
+    def test_output_does_not_depend_on_the_worker_count(self) -> None:
+        spec = DatasetSpec(300, experiences=120, demands=10, shard_size=100, density_skew=0.5, seed=5)
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            generate_dataset(spec, Path(first), workers=1)
+            generate_dataset(spec, Path(second), workers=2)
+            names = sorted(path.name for path in Path(first).glob("*.copy"))
+            self.assertEqual(names, sorted(path.name for path in Path(second).glob("*.copy")))
+            _, mismatch, errors = filecmp.cmpfiles(first, second, names, shallow=False)
+            self.assertEqual((mismatch, errors), ([], []))
+
+    def test_skew_options_shape_the_experience_rows(self) -> None:
+        def chunk(**options: float) -> ExperienceChunk:
+            return ExperienceChunk(DatasetSpec(400, seed=7, **options), np.random.default_rng(1), 0, 400)
+
+        plain, low = chunk(), chunk(score_skew=1.5)
+        self.assertLess(low.columns["score"].mean(), plain.columns["score"].mean() - 0.5)
+
+        counts = np.bincount(chunk(density_skew=0.5).columns["consultant"])
+        self.assertGreater(counts.std(), 150)
+        self.assertAlmostEqual(counts.mean(), 500, delta=40)
+        self.assertEqual(set(np.bincount(plain.columns["consultant"])), {500})
+
+        def top_skill_share(current: ExperienceChunk) -> float:
+            skills = current.columns["skill"][current.columns["category"] == CATEGORY["Skill"]]
+            return np.bincount(skills).max() / len(skills)
+
+        self.assertGreater(top_skill_share(chunk(popularity_skew=1.5)), 2 * top_skill_share(chunk(popularity_skew=0)))
+        mix = chunk(category_mix=(0.2, 0.7, 0.1))
+        self.assertGreater((mix.columns["category"] == CATEGORY["Skill"]).sum(), (plain.columns["category"] == CATEGORY["Skill"]).sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
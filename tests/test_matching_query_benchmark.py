@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.generate_matching_dataset import DatasetIds, DatasetSpec
+from scripts.matching_query_benchmark import (
+    ANALYSIS_PATH,
+    QUERIES,
+    Measurement,
+    check,
+    documented_indexes,
+    parse_estimates,
+    percentile,
+    query_parameters,
+    scenarios,
+)
+from scripts.odc_sql import QUERY_DIR, load_schema, parameter_names, read_query, translate
+
+
+class DocumentTests(unittest.TestCase):
+    def test_estimates_and_indexes_come_from_the_performance_analysis(self) -> None:
+        text = ANALYSIS_PATH.read_text(encoding="utf-8")
+
+        estimates = parse_estimates(text)
+        indexes = documented_indexes(text)
+
+        self.assertEqual([row.consultants for row in estimates], [5000, 10000, 20000, 30000, 50000, 100000])
+        self.assertEqual((estimates[4].no_filters, estimates[4].filtered, estimates[4].scored), ((150, 300), (280, 550), 9000))
+        self.assertIn(("Experience", ("TenantId", "ConsultantId", "CategoryId", "SkillId", "Score")), indexes)
+        self.assertIn(("LocationTagsClosure", ("DescendantId", "AncestorId")), indexes)
+        self.assertEqual(len(indexes), len(set(indexes)))
+        schema = load_schema()
+        for table, columns in indexes:
+            physical = {name for name, _ in schema[table]}
+            self.assertTrue({column.lower() for column in columns} <= physical, (table, columns))
+
+    def test_runs_are_checked_against_the_range_of_their_scale(self) -> None:
+        estimates = parse_estimates(ANALYSIS_PATH.read_text(encoding="utf-8"))
+        timings = [float(value) for value in range(1, 21)]
+        self.assertEqual((percentile(timings, 50), percentile(timings, 95)), (10.0, 19.0))
+
+        def run(scenario: str, p95: float, consultants: int = 5000, query: str = "GetMatchesByDemandId") -> Measurement:
+            return check(Measurement(query, scenario, consultants, p95 / 2, p95, 20, 12), estimates)
+
+        self.assertEqual(run("no-filters", 59).verdict, "within")
+        self.assertEqual(run("no-filters", 61).verdict, "slower")
+        self.assertEqual(run("3-filters", 61).verdict, "within")
+        self.assertEqual(run("3-filters", 20).verdict, "faster")
+        self.assertEqual(run("no-filters", 10, consultants=7000).verdict, "no estimate")
+        self.assertEqual(run("1x50", 900, query="GetMatchingScoreByConsultantIds").verdict, "")
+
+
+class ScenarioTests(unittest.TestCase):
+    def test_every_scenario_has_its_parameters(self) -> None:
+        spec = DatasetSpec(100, demands=5)
+        for permission in ("admin", "global", "myreports"):
+            parameters = query_parameters(spec, permission, "hybrid", 25)
+            for query, scenario, values in scenarios(spec, parameters):
+                self.assertIn(query, QUERIES)
+                text = read_query(QUERY_DIR / "matching" / f"{query}.sql")
+                sql, arguments = translate(text, values)
+                self.assertEqual(sql.count("%s"), len(arguments), (query, scenario))
+                self.assertTrue(set(parameter_names(text)) <= set(values))
+        self.assertEqual(len(parameters["ConsultantIds"]), 25)
+        self.assertEqual(parameters["UserId"], DatasetIds(spec.tenant_id).login("myreports"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.odc_sql import (
+    TOKEN,
+    attribute_names,
+    create_table_statements,
+    entity_names,
+    load_schema,
+    parameter_names,
+    query_paths,
+    read_query,
+    translate,
+)
+
+
+class TranslateTests(unittest.TestCase):
+    def test_entities_attributes_and_parameters_become_postgres(self) -> None:
+        sql = """/* Input: @TenantId, {Ignored}.[Comment] */
+SELECT {Demand}.[Id], req.[Score] * 100 AS Pct, '@literal [kept] 5%' AS Note
+FROM {DemandRequirement} req -- @NotAParameter
+JOIN {Demand} ON {Demand}.[Id] = req.[DemandId]
+WHERE req.[TenantId] = @TenantId AND req.[DemandId] IN (@DemandIds) AND req.[Score] >= @TenantId"""
+
+        translated, arguments = translate(sql, {"TenantId": "t1", "DemandIds": ["d1", "d2"]})
+
+        self.assertIn('SELECT "Demand"."Id", req."Score" * 100 AS Pct, \'@literal [kept] 5%%\' AS Note', translated)
+        self.assertIn('FROM "DemandRequirement" req -- @NotAParameter', translated)
+        self.assertIn('WHERE req."TenantId" = %s AND req."DemandId" IN (%s, %s) AND req."Score" >= %s', translated)
+        self.assertTrue(translated.startswith("/* Input: @TenantId, {Ignored}.[Comment] */"))
+        self.assertEqual(arguments, ["t1", "d1", "d2", "t1"])
+        self.assertEqual(entity_names(sql), ["Demand", "DemandRequirement"])
+        self.assertEqual(parameter_names(sql), ["TenantId", "DemandIds"])
+
+        empty, arguments = translate("SELECT 1 WHERE x IN (@Ids)", {"Ids": []})
+        self.assertEqual((empty, arguments), ("SELECT 1 WHERE x IN (NULL)", []))
+        with self.assertRaisesRegex(ValueError, "DemandIds"):
+            translate(sql, {"TenantId": "t1"})
+
+    def test_every_query_translates_against_the_schema_snapshot(self) -> None:
+        schema = load_schema()
+        paths = query_paths("matching", "reference", "insights")
+        self.assertGreaterEqual(len(paths), 10)
+        for path in paths:
+            text = read_query(path)
+            translated, arguments = translate(text, {name: 1 for name in parameter_names(text)})
+            code = TOKEN.sub(lambda match: match.group(0) if match.group(0)[:1] in "'\"" else " ", translated)
+            self.assertFalse(re.search(r"[{}@]|\[[A-Za-z_]", code), path.name)
+            self.assertEqual(translated.count("%s"), len(arguments), path.name)
+
+            statements = create_table_statements(entity_names(text), attribute_names(text), schema)
+            ddl = "\n".join(statements)
+            for entity in entity_names(text):
+                self.assertIn(f'CREATE TABLE IF NOT EXISTS "{entity}"', ddl)
+        consultant = create_table_statements(["Consultant"], ["TenantId", "Id"], schema)[0]
+        self.assertIn('"TenantId" character varying', consultant)
+        self.assertIn('"statusid" integer', consultant)
+        self.assertIn('PRIMARY KEY ("Id")', consultant)
+        with self.assertRaisesRegex(ValueError, "Nope"):
+            create_table_statements(["Nope"], [], schema)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import unittest
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.generate_matching_dataset import DatasetSpec
+from scripts.matching_query_benchmark import ANALYSIS_PATH, parse_estimates
+from scripts.odc_sql import QUERY_DIR, parameter_names, query_paths, read_query, translate
+from scripts.query_plan_regressions import (
+    Capture,
+    capture_runs,
+    captures,
+    find_baseline,
+    find_regressions,
+    history_path,
+    latency_limit,
+    load_run,
+    normalize_plan,
+    plan_digest,
+    plan_parameters,
+)
+
+
+def scan(node_type: str, relation: str, rows: int, actual: int, **extra: object) -> dict:
+    return dict({"Node Type": node_type, "Relation Name": relation, "Plan Rows": rows, "Actual Rows": actual, "Actual Loops": 1}, **extra)
+
+
+def explained(experience: dict, requirement_rows: int = 15) -> dict:
+    """Root of an EXPLAIN (FORMAT JSON) plan joining DemandRequirement and Experience."""
+    return {
+        "Node Type": "Aggregate",
+        "Strategy": "Hashed",
+        "Plan Rows": 100,
+        "Actual Rows": 90,
+        "Actual Loops": 1,
+        "Total Cost": 123.4,
+        "Actual Total Time": 5.6,
+        "Plans": [
+            {
+                "Node Type": "Nested Loop",
+                "Join Type": "Inner",
+                "Plan Rows": 4000,
+                "Actual Rows": 4000,
+                "Actual Loops": 1,
+                "Plans": [scan("Seq Scan", "DemandRequirement", requirement_rows, requirement_rows), experience],
+            }
+        ],
+    }
+
+
+def capture(plan: dict, p50: float = 10.0, p95: float = 12.0) -> Capture:
+    normalized = normalize_plan(plan)
+    return Capture("matching/GetMatchesByDemandId", "no-filters", p50, p95, 5, 12, 1.0, p50, 100, 0, plan_digest(normalized), normalized)
+
+
+INDEXED = {
+    "Node Type": "Bitmap Heap Scan",
+    "Relation Name": "Experience",
+    "Plan Rows": 4000,
+    "Actual Rows": 4000,
+    "Actual Loops": 1,
+    "Plans": [{"Node Type": "Bitmap Index Scan", "Index Name": "bench_experience_skill", "Plan Rows": 4000, "Actual Rows": 4000, "Actual Loops": 1}],
+}
+
+
+class FailingConnection:
+    """Just enough of a psycopg connection to run capture_plan; SQL containing ``fail`` raises."""
+
+    description = [("Id",)]
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    @contextmanager
+    def transaction(self, force_rollback: bool = False):
+        yield
+
+    def execute(self, sql: str, arguments: object) -> None:
+        if "fail" in sql:
+            raise RuntimeError("relation \"fail\" does not exist")
+
+    def fetchall(self) -> list:
+        return [(1,)]
+
+    def fetchone(self) -> tuple:
+        return ([{"Plan": explained(INDEXED), "Planning Time": 0.1, "Execution Time": 1.0}],)
+
+
+class PlanTests(unittest.TestCase):
+    def test_plans_are_normalized_without_costs_and_timings(self) -> None:
+        plan = normalize_plan(explained(INDEXED))
+
+        self.assertNotIn("Total Cost", json.dumps(plan))
+        self.assertEqual(plan["strategy"], "Hashed")
+        index_scan = plan["plans"][0]["plans"][1]["plans"][0]
+        self.assertEqual((index_scan["relation"], index_scan["index"]), ("Experience", "bench_experience_skill"))
+        scoped = normalize_plan({"Node Type": "Subquery Scan", "Alias": "branch_role", "Plans": [scan("Seq Scan", "Experience", 1, 1)]})
+        self.assertEqual(scoped["plans"][0]["scope"], "branch_role")
+        same = dict(explained(INDEXED), **{"Actual Total Time": 99.0, "Actual Rows": 7})
+        self.assertEqual(plan_digest(plan), plan_digest(normalize_plan(same)))
+
+    def test_regressions_are_flagged(self) -> None:
+        sizes = {"Experience": 2_500_000, "DemandRequirement": 450, "Status": 3}
+        baseline = capture(explained(INDEXED))
+
+        self.assertEqual([finding.kind for finding in find_regressions(baseline, baseline, sizes)], [])
+
+        seq = capture(explained(scan("Seq Scan", "Experience", 4000, 4000)), p50=30.0, p95=40.0)
+        kinds = [finding.kind for finding in find_regressions(seq, baseline, sizes, max_ms=35)]
+        self.assertEqual(kinds, ["seq-scan", "latency", "lost-index", "slowdown", "plan-changed"])
+
+        blowup = capture(explained(dict(INDEXED, **{"Plan Rows": 40})))
+        findings = find_regressions(blowup, None, sizes)
+        self.assertEqual([finding.kind for finding in findings], ["row-estimate"])
+        self.assertIn("Experience: estimated 40 rows, actual 4000", findings[0].detail)
+
+        large = capture(explained(INDEXED, requirement_rows=30_000))
+        self.assertEqual([finding.kind for finding in find_regressions(large, None, dict(sizes, DemandRequirement=30_000))], ["seq-scan"])
+
+        estimates = parse_estimates(ANALYSIS_PATH.read_text(encoding="utf-8"))
+        self.assertEqual(latency_limit("matching/GetMatchesByDemandId", "3-filters", 5000, estimates, 1000), 100)
+        self.assertEqual(latency_limit("reference/GetUserPermissionCheck", "default", 5000, estimates, 1000), 1000)
+
+    def test_every_query_is_captured_with_its_parameters(self) -> None:
+        spec = DatasetSpec(100, demands=5)
+        runs = captures(spec, plan_parameters(spec))
+
+        self.assertEqual({query for query, _, _ in runs}, {f"{path.parent.name}/{path.stem}" for path in query_paths("matching", "reference", "insights")})
+        self.assertEqual(len(runs), len({(query, scenario) for query, scenario, _ in runs}))
+        for query, scenario, values in runs:
+            text = read_query(QUERY_DIR / f"{query}.sql")
+            self.assertTrue(set(parameter_names(text)) <= set(values), query)
+            sql, arguments = translate(text, values)
+            self.assertEqual(sql.count("%s"), len(arguments), (query, scenario))
+
+    def test_failing_queries_are_findings_and_the_others_are_captured(self) -> None:
+        texts = {"a/Ok": "SELECT 1", "a/Fails": "SELECT * FROM fail", "a/Untranslated": "SELECT @Missing"}
+        runs = [(query, "default", {}) for query in texts]
+        results, errors = capture_runs(FailingConnection(), runs, texts, repeat=2, warmup=0)
+
+        self.assertEqual([(capture.query, capture.runs) for capture in results], [("a/Ok", 2)])
+        self.assertEqual([(error.query, error.kind) for error in errors], [("a/Fails", "error"), ("a/Untranslated", "error")])
+        self.assertIn("RuntimeError", errors[0].detail)
+        self.assertIn("ValueError: Missing query parameters", errors[1].detail)
+
+    def test_baseline_is_the_latest_capture_of_another_commit(self) -> None:
+        dataset, other = asdict(DatasetSpec(consultants=2000)), asdict(DatasetSpec(consultants=5000))
+        with tempfile.TemporaryDirectory() as temp:
+            history = Path(temp)
+            self.assertIsNone(find_baseline(history, "abc1234", dataset))
+            for commit, created, spec in (
+                ("old0001", "2026-10-01T10:00:00", dataset),
+                ("new0002", "2026-10-02T10:00:00", dataset),
+                ("big0003", "2026-10-03T10:00:00", other),
+                ("abc1234", "2026-10-04T10:00:00", dataset),
+            ):
+                run = {"commit": commit, "created": created, "dataset": spec, "captures": [asdict(capture(explained(INDEXED)))]}
+                history_path(history, commit).write_text(json.dumps(run), encoding="utf-8")
+
+            # The newer capture of a larger dataset is skipped.
+            self.assertEqual(find_baseline(history, "abc1234", dataset).stem, "new0002")
+            self.assertEqual(find_baseline(history, "abc1234", other).stem, "big0003")
+            self.assertEqual(find_baseline(history, "abc1234", dataset, "old0001").stem, "old0001")
+            previous = load_run(find_baseline(history, "abc1234", dataset))
+            self.assertEqual(list(previous), [("matching/GetMatchesByDemandId", "no-filters")])
+            self.assertEqual(history_path(history, "abc/1234 dirty").name, "abc_1234_dirty.json")
+            with self.assertRaises(SystemExit):
+                find_baseline(history, "abc1234", dataset, "missing")
+            with self.assertRaisesRegex(SystemExit, "big0003 used another dataset \\(differs in consultants, tenant_id, users\\)"):
+                find_baseline(history, "abc1234", dataset, "big0003")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.generate_data_quality_export import write_export
+from scripts.role_experience_aggregator import (
+    AGGREGATED_HEADERS,
+    CONSULTANT_HEADERS,
+    RAW_HEADERS,
+    RoleExperience,
+    RoleExperienceAggregator,
+)
+
+TODAY = date(2026, 1, 15)
+ROLES = ["Business Analyst", "Data Engineer", "Project Manager", "Scrum Master", "Architect", "Tester"]
+
+
+def consultant_values(number: int, department: str = "Technology") -> list:
+    values = {header: None for header in CONSULTANT_HEADERS}
+    values.update({
+        "External": f"ext-{number}",
+        "Url": f"https://app.matchical.com/consultant?id={number}",
+        "Full name": f"Consultant {number:03d}",
+        "Entry date": datetime(2020, 1, 1) + timedelta(days=number),
+        "Is available": "Yes",
+        "Is willing to travel": number % 2 == 0,
+        "Department": department,
+    })
+    return [values[header] for header in CONSULTANT_HEADERS]
+
+
+def raw_rows(seed: int, consultants: range) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for number in consultants:
+        roles = rng.sample(ROLES, rng.randint(0, 4))
+        top = rng.choice(roles) if roles and rng.random() < 0.9 else None
+        if not roles:
+            rows.append(consultant_values(number) + [None, 0.0, None, None, None])
+        for role in roles:
+            recency = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 300))
+            rows.append(consultant_values(number) + [role, round(rng.uniform(0, 120), 2), recency, rng.random() < 0.3, role == top])
+    return rows
+
+
+def expected_aggregate(rows: list) -> dict:
+    """Aggregated columns per consultant Url, computed row by row."""
+    url, role, months, recency, ongoing, primary = (RAW_HEADERS.index(h) for h in ["Url", "Role", "Months weighted", "Recency at", "Recency is ongoing", "Is primary"])
+    result = {}
+    for row in rows:
+        entry = result.setdefault(row[url], {"roles": set(), "primary": None, "months": 0.0, "recency": None, "ongoing": None})
+        if row[primary] is None:
+            continue
+        entry["roles"].add(row[role])
+        if row[primary]:
+            entry["primary"], entry["months"] = row[role], row[months]
+            entry["ongoing"] = bool(row[ongoing])
+            entry["recency"] = datetime.combine(TODAY, datetime.min.time()) if row[ongoing] else row[recency]
+    return {
+        key: [len(entry["roles"]), entry["primary"], entry["months"], entry["recency"], entry["ongoing"]]
+        for key, entry in result.items()
+    }
+
+
+def aggregated_by_url(aggregator: RoleExperienceAggregator) -> dict:
+    url = AGGREGATED_HEADERS.index("Url")
+    return {row[url]: row[len(CONSULTANT_HEADERS):] for row in aggregator.consultant_rows(TODAY)}
+
+
+class RoleExperienceAggregatorTests(unittest.TestCase):
+    def test_aggregates_match_the_aggregated_export_rules(self) -> None:
+        rows = raw_rows(1, range(80))
+        # The SQL aliases work as headers too.
+        sql_headers = [header.replace(" ", "_") + ("_id" if header in ("External", "Mat") else "") for header in RAW_HEADERS]
+
+        aggregator = RoleExperienceAggregator(RoleExperience.from_rows(sql_headers, rows), "custom-roles")
+
+        self.assertEqual(aggregated_by_url(aggregator), expected_aggregate(rows))
+        names = [row[AGGREGATED_HEADERS.index("Full name")] for row in aggregator.consultant_rows(TODAY)]
+        self.assertEqual(names, sorted(names))
+
+    def test_namesakes_are_ordered_by_consultant_id(self) -> None:
+        name, url = CONSULTANT_HEADERS.index("Full name"), AGGREGATED_HEADERS.index("Url")
+        rows = []
+        for number in (10, 9, 2):
+            values = consultant_values(number)
+            values[name] = "Alex Example" if number != 2 else "Zoe Example"
+            rows.append(values + ["Tester", 1.0, datetime(2025, 5, 1), False, True])
+
+        ordered = RoleExperienceAggregator(RoleExperience.from_rows(RAW_HEADERS, rows)).consultant_rows(TODAY)
+
+        self.assertEqual([row[url].rsplit("=", 1)[1] for row in ordered], ["9", "10", "2"])
+
+    def test_role_report_counts_each_role(self) -> None:
+        rows = [
+            consultant_values(1) + ["Tester", 10.0, datetime(2025, 5, 1), True, True],
+            consultant_values(1) + ["Architect", 4.5, datetime(2025, 2, 1), False, False],
+            consultant_values(2) + ["Tester", 20.0, datetime(2025, 3, 1), False, False],
+            consultant_values(3) + ["Tester", 30.0, datetime(2025, 3, 1), False, True],
+            consultant_values(4) + [None, 0.0, None, None, None],
+        ]
+
+        report = RoleExperienceAggregator(RoleExperience.from_rows(RAW_HEADERS, rows)).role_report()
+
+        self.assertEqual(report, [["Tester", 3, 2, 1, 60.0, 20.0], ["Architect", 1, 0, 0, 4.5, 4.5]])
+
+    def test_partial_exports_update_only_their_consultants(self) -> None:
+        rows = raw_rows(2, range(60))
+        aggregator = RoleExperienceAggregator(RoleExperience.from_rows(RAW_HEADERS, rows))
+        changed = raw_rows(3, range(50, 70))
+        url = RAW_HEADERS.index("Url")
+        removed = consultant_values(7)[url]
+
+        recomputed = aggregator.replace_consultants(RoleExperience.from_rows(RAW_HEADERS, changed), [removed])
+
+        self.assertEqual(recomputed.size, 21)
+        expected_rows = [row for row in rows if row[url] not in {r[url] for r in changed} and row[url] != removed] + changed
+        self.assertEqual(aggregated_by_url(aggregator), expected_aggregate(expected_rows))
+        full_report = RoleExperienceAggregator(RoleExperience.from_rows(RAW_HEADERS, expected_rows)).role_report()
+        self.assertEqual(aggregator.role_report(), full_report)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state = aggregator.save(Path(tmp) / "roles.npz")
+            loaded = RoleExperienceAggregator.load(state)
+            export = write_export(Path(tmp) / "aggregated.xlsx", loaded.consultant_rows(TODAY), AGGREGATED_HEADERS)
+            self.assertTrue(export.exists())
+        self.assertEqual(loaded.role_mode, "roles")
+        self.assertEqual(loaded.consultant_rows(TODAY), aggregator.consultant_rows(TODAY))
+        self.assertEqual(loaded.role_report(), full_report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.build_data_quality_excel_dashboard import styled_cell
+from scripts.xlsx_stream_writer import SharedFormula, SharedFormulaColumns, StreamedWorkbook
+
+
+class StreamedWorkbookTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_streamed_rows_round_trip_through_openpyxl(self) -> None:
+        wb = Workbook(write_only=True)
+        stream = StreamedWorkbook(wb)
+        ws = wb.create_sheet("Data")
+        ws.freeze_panes = "A2"
+        rows = stream.stream(ws)
+        rows.append([styled_cell(ws, "Name", font=Font(bold=True)), "Since", "Ratio", "Flag"])
+        rows.append(["  Ann & Bob <x> ", datetime(2024, 3, 1), styled_cell(ws, "=IFERROR(1/3,\"\")", number_format="0%"), True])
+        rows.append(["Cleo", date(2023, 1, 31), None, False])
+        rows.append(["Cleo", None, "", 2.5])
+        wb.create_sheet("Notes").append(["kept by openpyxl"])
+        path = Path(self.tmp.name) / "stream.xlsx"
+        stream.save(path)
+
+        with zipfile.ZipFile(path) as package:
+            self.assertEqual(package.read("xl/sharedStrings.xml").count(b"<si>"), 6)
+        loaded = load_workbook(path)
+        data = loaded["Data"]
+        self.assertEqual(data.freeze_panes, "A2")
+        self.assertTrue(data["A1"].font.b)
+        self.assertEqual(data["A2"].value, "  Ann & Bob <x> ")
+        self.assertEqual(data["B2"].value, datetime(2024, 3, 1))
+        self.assertEqual(data["B3"].value, datetime(2023, 1, 31))
+        self.assertEqual(data["C2"].value, '=IFERROR(1/3,"")')
+        self.assertEqual(data["C2"].number_format, "0%")
+        self.assertEqual([data["D2"].value, data["D3"].value, data["D4"].value], [True, False, 2.5])
+        self.assertIsNone(data["C4"].value)
+        self.assertEqual(loaded["Notes"]["A1"].value, "kept by openpyxl")
+
+    def test_shared_formula_runs_round_trip_through_both_writers(self) -> None:
+        for streamed in (False, True):
+            wb = Workbook(write_only=True)
+            stream = StreamedWorkbook(wb)
+            ws = wb.create_sheet("Data")
+            rows = stream.stream(ws) if streamed else ws
+            shared = SharedFormulaColumns()
+            shared.add("B", [2, 3, 4, 6, 7])
+            for r in range(1, 8):
+                row = {"A": r, "B": f"=A{r}*2+$A$1" if r != 5 else 0}
+                shared.apply(r, row)
+                rows.append([row["A"], row["B"]])
+            wb.create_sheet("Other")
+            path = Path(self.tmp.name) / f"shared-{streamed}.xlsx"
+            if streamed:
+                stream.save(path)
+            else:
+                wb.save(path)
+
+            with zipfile.ZipFile(path) as package:
+                xml = package.read("xl/worksheets/sheet1.xml").decode()
+            self.assertIn('ref="B2:B4" si="0"', xml)
+            self.assertIn('ref="B6:B7" si="1"', xml)
+            data = load_workbook(path)["Data"]
+            self.assertEqual(data["B1"].value, "=A1*2+$A$1")
+            self.assertEqual([data[f"B{r}"].value for r in range(2, 8)], ["=A2*2+$A$1", "=A3*2+$A$1", "=A4*2+$A$1", 0, "=A6*2+$A$1", "=A7*2+$A$1"])
+
+    def test_shared_formula_attributes(self) -> None:
+        self.assertEqual(dict(SharedFormula(3, "C2:C9", "=A2")), {"t": "shared", "ref": "C2:C9", "si": "3"})
+        self.assertEqual(dict(SharedFormula(3)), {"t": "shared", "si": "3"})
+
+
+if __name__ == "__main__":
+    unittest.main()